@@ -0,0 +1,66 @@
+"""Reading and writing the small JSON files kept in the cache directory.
+
+Everything in them can be worked out again, so a missing or unreadable file is
+simply empty, and one that cannot be written is only warned about.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import sys
+import tempfile
+from contextlib import suppress
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def load_cache_file(path: Path) -> Dict[str, Any]:
+    """The object held in the file at path, or an empty one."""
+    try:
+        with open(path, encoding="utf-8") as cache_file:
+            data = json.load(cache_file)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as error:
+        logger.debug("Ignoring the cache file '%s': %s", path, error)
+        return {}
+    if not isinstance(data, dict):
+        return {}
+    return data
+
+
+def save_cache_file(path: Path, data: Dict[str, Any], description: str) -> None:
+    """Replace the file at path with data, warning about the description if not."""
+    # Written to a file of its own first, so that a run reading the file
+    # meanwhile never sees half of it. The name is unique to this write, so
+    # that two runs saving at once never write into the same one either.
+    partial: Optional[str] = None
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile(
+            "w",
+            encoding="utf-8",
+            dir=path.parent,
+            prefix=path.name + ".",
+            suffix=".tmp",
+            delete=False,
+        ) as cache_file:
+            partial = cache_file.name
+            json.dump(data, cache_file)
+        os.replace(partial, path)
+    except OSError as error:
+        if partial is not None:
+            with suppress(OSError):
+                os.unlink(partial)
+        # Without the file, what it holds is worked out every time, as it
+        # always was, so this is not worth failing the run over.
+        print(
+            "WARNING: Unable to update the {} '{}': {}".format(
+                description, path, error
+            ),
+            file=sys.stderr,
+        )
@@ -0,0 +1,100 @@
+"""Remembers what the installed tools can do from one run to the next.
+
+Finding out whether speedtest is installed, or whether traceroute takes -n,
+means running it, which for a run started by cron every few minutes is a fork
+and up to ten seconds of waiting every time for an answer that only changes
+when the tool is reinstalled. The answers are kept in a small JSON file in the
+cache directory, under the path of each binary, along with its modification
+time and inode:
+
+    {"/usr/bin/traceroute": {"mtime_ns": 1700000000000000000, "inode": 1234,
+                             "capabilities": {"numeric": true}}}
+
+A binary that is replaced, upgraded, or moved no longer matches, and is probed
+again. One that cannot be found on the PATH at all has nothing to key it by,
+so it is probed every time, as it always was.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import shutil
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from internet_troubleshooter.cache_file import load_cache_file, save_cache_file
+from internet_troubleshooter.config import default_cache_dir
+
+logger = logging.getLogger(__name__)
+
+CAPABILITY_CACHE_FILE_NAME = "capabilities.json"
+
+# The daemon probes from threads of its own, which take turns at the file.
+_lock = threading.Lock()
+
+
+def default_capability_cache_path() -> Path:
+    return default_cache_dir() / CAPABILITY_CACHE_FILE_NAME
+
+
+def _binary_identity(binary: str) -> Optional[Tuple[str, Dict[str, int]]]:
+    """The path binary runs from and what tells that file apart, if it is found."""
+    path = shutil.which(binary)
+    if path is None:
+        return None
+    try:
+        status = os.stat(path)
+    except OSError:
+        return None
+    return path, {"mtime_ns": status.st_mtime_ns, "inode": status.st_ino}
+
+
+def _capabilities(entry: Any, identity: Dict[str, int]) -> Optional[Dict[str, Any]]:
+    """The capabilities of entry, or None when it is of some other binary."""
+    if not isinstance(entry, dict) or any(
+        entry.get(key) != value for key, value in identity.items()
+    ):
+        return None
+    capabilities = entry.get("capabilities")
+    return capabilities if isinstance(capabilities, dict) else None
+
+
+class CapabilityCache:
+    """Whether each installed binary has each capability probed for."""
+
+    def __init__(self, path: Optional[Path] = None) -> None:
+        self.path = default_capability_cache_path() if path is None else path
+
+    def get(self, binary: str, capability: str) -> Optional[bool]:
+        """What was found out about capability of binary, or None if not known."""
+        identity = _binary_identity(binary)
+        if identity is None:
+            return None
+        path, stamp = identity
+        with _lock:
+            entry = load_cache_file(self.path).get(path)
+        capabilities = _capabilities(entry, stamp)
+        if capabilities is None:
+            return None
+        value = capabilities.get(capability)
+        if not isinstance(value, bool):
+            return None
+        logger.debug("Cached %s %s: %s", path, capability, value)
+        return value
+
+    def put(self, binary: str, capability: str, value: bool) -> None:
+        """Remember value as whether binary, as installed now, has capability."""
+        identity = _binary_identity(binary)
+        if identity is None:
+            return
+        path, stamp = identity
+        with _lock:
+            entries = load_cache_file(self.path)
+            capabilities = _capabilities(entries.get(path), stamp)
+            if capabilities is None:
+                capabilities = {}
+                entries[path] = dict(stamp, capabilities=capabilities)
+            capabilities[capability] = value
+            save_cache_file(self.path, entries, "capability cache")
@@ -0,0 +1,138 @@
+"""Coarser copies of the chart series, for drawing long histories quickly.
+
+A report of a year of runs holds a hundred thousand points or more per line,
+which a browser cannot draw and still respond to. The charts instead start out
+at a level of one point per hour or per day, spanning the lowest to the highest
+value of the runs in it, and swap in a finer level as they are zoomed into.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, List, Mapping, Optional, Sequence
+
+from internet_troubleshooter.utils import safe_mean
+
+# How long the points of each level span, finest first, where 0 is a point per
+# run. Days start at local midnight, as the dates of the runs are local.
+DAY_SECONDS = 24 * 60 * 60
+LEVEL_SECONDS = (0, 60 * 60, DAY_SECONDS)
+
+# One value per point of a level, None where nothing was measured.
+Series = List[Optional[float]]
+
+
+@dataclass
+class Level:
+    """Every chart series at one resolution, aligned to the same dates.
+
+    Each point spans seconds from its date on, or is a single run when seconds
+    is 0, and holds the mean, lowest, and highest value of each series over the
+    runs in it. incomplete holds the dates of the points spanning a run where a
+    test did not complete.
+    """
+
+    seconds: int
+    dates: List[datetime]
+    runs: List[int]
+    means: Dict[str, Series]
+    lows: Dict[str, Series]
+    highs: Dict[str, Series]
+    incomplete: List[datetime]
+
+
+def raw_level(
+    dates: Sequence[datetime],
+    series: Mapping[str, Series],
+    incomplete: Sequence[bool],
+) -> Level:
+    """The level of every run, where a point's mean is its lowest and highest."""
+    return Level(
+        seconds=0,
+        dates=list(dates),
+        runs=[1] * len(dates),
+        means=dict(series),
+        lows=dict(series),
+        highs=dict(series),
+        incomplete=[date for date, flag in zip(dates, incomplete) if flag],
+    )
+
+
+def _bucket_start(date: datetime, seconds: int) -> datetime:
+    span = timedelta(seconds=seconds)
+    return datetime.min + (date - datetime.min) // span * span
+
+
+def _buckets(dates: Sequence[datetime], seconds: int) -> Dict[datetime, List[int]]:
+    """The positions of the runs in each span of seconds, by when it starts."""
+    buckets: Dict[datetime, List[int]] = {}
+    for position, date in enumerate(dates):
+        buckets.setdefault(_bucket_start(date, seconds), []).append(position)
+    return buckets
+
+
+def aggregate(raw: Level, seconds: int) -> Level:
+    """raw with a point per span of seconds that holds any run."""
+    buckets = _buckets(raw.dates, seconds)
+    means: Dict[str, Series] = {key: [] for key in raw.means}
+    lows: Dict[str, Series] = {key: [] for key in raw.means}
+    highs: Dict[str, Series] = {key: [] for key in raw.means}
+    for positions in buckets.values():
+        for key, values in raw.means.items():
+            measured = [
+                value
+                for value in (values[position] for position in positions)
+                if value is not None
+            ]
+            means[key].append(safe_mean(measured))
+            lows[key].append(min(measured) if measured else None)
+            highs[key].append(max(measured) if measured else None)
+    return Level(
+        seconds=seconds,
+        dates=list(buckets),
+        runs=[len(positions) for positions in buckets.values()],
+        means=means,
+        lows=lows,
+        highs=highs,
+        incomplete=list(
+            dict.fromkeys(_bucket_start(date, seconds) for date in raw.incomplete)
+        ),
+    )
+
+
+def _spanning_days(raw: Level, max_points: int) -> Level:
+    """raw with a point per as few whole days as bring it to max_points."""
+    span = raw.dates[-1] - raw.dates[0]
+    days = max(1, -(-(span // timedelta(days=1) + 1) // max_points))
+    while True:
+        level = aggregate(raw, days * DAY_SECONDS)
+        if len(level.dates) <= max_points:
+            return level
+        days += 1
+
+
+def build_levels(raw: Level, max_points: Optional[int] = None) -> List[Level]:
+    """raw and each coarser level of LEVEL_SECONDS, finest first.
+
+    A level is only kept when it has fewer points than the finer one before
+    it, so runs an hour or more apart have no hourly level. When even the
+    coarsest has more than max_points, a level spanning as many days per point
+    as it takes to have no more is added.
+    """
+    levels = [raw]
+    for seconds in LEVEL_SECONDS[1:]:
+        level = aggregate(raw, seconds)
+        if len(level.dates) < len(levels[-1].dates):
+            levels.append(level)
+    if max_points and len(levels[-1].dates) > max_points:
+        levels.append(_spanning_days(raw, max_points))
+    return levels
+
+
+def choose_level(levels: Sequence[Level], max_points: int) -> int:
+    """Where in levels the finest with at most max_points is, or else the coarsest."""
+    for position, level in enumerate(levels):
+        if len(level.dates) <= max_points:
+            return position
+    return len(levels) - 1
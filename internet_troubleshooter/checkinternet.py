@@ -3,36 +3,78 @@ from __future__ import annotations
 
 import argparse
 import logging
-from datetime import datetime
+import signal
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from itertools import chain
+import math
 import sys
-from typing import Dict, List, Optional, Tuple
+from time import monotonic
+from typing import (
+    TYPE_CHECKING,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+)
 
-from internet_troubleshooter import __version__
+from internet_troubleshooter import __version__, log_index
 from internet_troubleshooter.config import (
     ConfigError,
     Option,
     as_bool,
     as_choice,
+    as_datetime,
     as_float,
     as_int,
     as_str,
+    as_str_list,
     default_config_path,
     load_config,
+    parse_datetime,
+)
+from internet_troubleshooter.mtr import (
+    DEFAULT_MTR_DURATION,
+    DEFAULT_MTR_SNAPSHOT_INTERVAL,
+    DEFAULT_MTR_WINDOW,
+    MTR_ROUND_COUNT,
+    PathMonitor,
+    watch,
 )
+from internet_troubleshooter.path_cache import DEFAULT_TRACE_CACHE_TTL, PathCache
 from internet_troubleshooter.ping_test import PingResult
-from internet_troubleshooter.trace_test import TraceResult, default_hop_ping_count
+from internet_troubleshooter.trace_test import (
+    DEFAULT_TRACE_PARALLELISM,
+    TraceResult,
+    default_hop_ping_count,
+)
 from internet_troubleshooter.speed_test import SpeedResult
-from internet_troubleshooter.render import (
+from internet_troubleshooter.result import (
+    PING_TEST,
+    SPEED_TEST,
+    TestResult,
+    TimeWindow,
+)
+from internet_troubleshooter.scheduler import Schedule, run_schedules
+from internet_troubleshooter.utils import (
     PLOT_DOWNLOAD_MBPS,
     PLOT_LATENCY_MS,
+    PLOT_MAX_POINTS,
     PLOT_PACKET_LOSS_PCT,
     PLOT_UPLOAD_MBPS,
-    RenderThresholds,
-    to_html,
-    to_human,
+    configure_logging,
+    is_valid_host,
 )
-from internet_troubleshooter.result import TestResult
-from internet_troubleshooter.utils import configure_logging, is_valid_host
+
+# Rendering is only imported by display, and the SQLite store only once one is
+# given, so that the commands that run the tests start without them.
+if TYPE_CHECKING:
+    from internet_troubleshooter.render import RenderThresholds
 
 logger = logging.getLogger(__name__)
 
@@ -46,29 +88,94 @@ DISPLAY_FORMATS = ("human", "html")
 # only what was actually passed, which is what lets the config file fill in the
 # rest without overriding an explicit flag.
 RUN_OPTIONS: Dict[str, Option] = {
-    "ping_ip": Option("8.8.8.8", as_str),
+    "ping_ip": Option(["8.8.8.8"], as_str_list),
     "ping_count": Option(None, as_int),
+    "ping_per_packet": Option(False, as_bool),
+    "adaptive_ping": Option(False, as_bool),
+    "native_ping": Option(False, as_bool),
+    "native_trace": Option(False, as_bool),
     "trace_hop_ping_count": Option(None, as_int),
+    "trace_parallelism": Option(DEFAULT_TRACE_PARALLELISM, as_int),
+    "trace_cache_ttl": Option(DEFAULT_TRACE_CACHE_TTL, as_float),
     "max_packet_loss": Option(3.0, as_float),
     "skip_speedtest": Option(False, as_bool),
     "skip_pingtest": Option(False, as_bool),
+    "parallel_tests": Option(False, as_bool),
     "yaml_file": Option(None, as_str),
+    "store": Option(None, as_str),
+}
+
+DAEMON_OPTIONS: Dict[str, Option] = {
+    "ping_ip": RUN_OPTIONS["ping_ip"],
+    "ping_count": RUN_OPTIONS["ping_count"],
+    "ping_per_packet": RUN_OPTIONS["ping_per_packet"],
+    "adaptive_ping": RUN_OPTIONS["adaptive_ping"],
+    "native_ping": RUN_OPTIONS["native_ping"],
+    "native_trace": RUN_OPTIONS["native_trace"],
+    "trace_hop_ping_count": RUN_OPTIONS["trace_hop_ping_count"],
+    "trace_parallelism": RUN_OPTIONS["trace_parallelism"],
+    "trace_cache_ttl": RUN_OPTIONS["trace_cache_ttl"],
+    "max_packet_loss": RUN_OPTIONS["max_packet_loss"],
+    "skip_speedtest": RUN_OPTIONS["skip_speedtest"],
+    "skip_pingtest": RUN_OPTIONS["skip_pingtest"],
+    "yaml_file": RUN_OPTIONS["yaml_file"],
+    "store": RUN_OPTIONS["store"],
+    "interval": Option(300.0, as_float),
+    "speed_interval": Option(None, as_float),
+    "trace_interval": Option(None, as_float),
+    "jitter": Option(0.1, as_float),
+}
+
+MTR_OPTIONS: Dict[str, Option] = {
+    "ping_ip": Option("8.8.8.8", as_str),
+    "duration": Option(DEFAULT_MTR_DURATION, as_float),
+    "snapshot_interval": Option(DEFAULT_MTR_SNAPSHOT_INTERVAL, as_float),
+    "window": Option(DEFAULT_MTR_WINDOW, as_int),
+    "native_ping": RUN_OPTIONS["native_ping"],
+    "native_trace": RUN_OPTIONS["native_trace"],
+    "yaml_file": RUN_OPTIONS["yaml_file"],
+    "store": RUN_OPTIONS["store"],
 }
 
 DISPLAY_OPTIONS: Dict[str, Option] = {
     "yaml_file": Option(None, as_str),
+    "store": Option(None, as_str),
     "format": Option("human", as_choice(DISPLAY_FORMATS)),
     "html_file": Option(None, as_str),
     "embed_plotly": Option(False, as_bool),
+    "since": Option(None, as_datetime),
+    "until": Option(None, as_datetime),
+    "last": Option(None, as_float),
     "target_download_mbps": Option(PLOT_DOWNLOAD_MBPS, as_float),
     "target_upload_mbps": Option(PLOT_UPLOAD_MBPS, as_float),
     "target_latency_ms": Option(PLOT_LATENCY_MS, as_float),
     "target_packet_loss_pct": Option(PLOT_PACKET_LOSS_PCT, as_float),
+    "max_points": Option(PLOT_MAX_POINTS, as_int),
+}
+
+MIGRATE_OPTIONS: Dict[str, Option] = {
+    "yaml_file": Option(None, as_str),
+    "store": Option(None, as_str),
+}
+
+REINDEX_OPTIONS: Dict[str, Option] = {
+    "yaml_file": Option(None, as_str),
 }
 
 COMMAND_OPTIONS: Dict[str, Dict[str, Option]] = {
     "run": RUN_OPTIONS,
+    "daemon": DAEMON_OPTIONS,
+    "mtr": MTR_OPTIONS,
     "display": DISPLAY_OPTIONS,
+    "migrate": MIGRATE_OPTIONS,
+    "reindex": REINDEX_OPTIONS,
+}
+
+# The options a subcommand cannot do without, from the command line or the
+# config file.
+REQUIRED_OPTIONS: Dict[str, Tuple[str, ...]] = {
+    "migrate": ("yaml_file", "store"),
+    "reindex": ("yaml_file",),
 }
 
 
@@ -76,82 +183,260 @@ def _default_note(options: Dict[str, Option], name: str) -> str:
     return "(default: {})".format(options[name].default)
 
 
-def _build_parser() -> argparse.ArgumentParser:
-    parser = argparse.ArgumentParser(description="Test internet connection.")
-    parser.add_argument(
-        "--version",
-        action="version",
-        version="%(prog)s {}".format(__version__),
-        help="Print the version and exit.",
-    )
-    parser.add_argument(
-        "--debug",
+def _date_time_arg(value: str) -> datetime:
+    try:
+        return parse_datetime(value)
+    except ValueError as error:
+        raise argparse.ArgumentTypeError(str(error))
+
+
+def _add_native_arguments(command: argparse.ArgumentParser) -> None:
+    """Add the options of pinging and tracing from checkinternet to command."""
+    command.add_argument(
+        "--native_ping",
         action="store_true",
-        help="Print progress and raw command output to stderr.",
+        default=argparse.SUPPRESS,
+        help="Send the pings from checkinternet itself rather than running ping, "
+        "which records every packet. Needs root, or a group allowed by "
+        "net.ipv4.ping_group_range.",
     )
-    parser.add_argument(
-        "--config",
-        default=None,
-        metavar="PATH",
-        help="Config file of defaults to read instead of {}. Values in it are "
-        "used for the options that are not passed on the command line.".format(
-            default_config_path()
-        ),
+    command.add_argument(
+        "--native_trace",
+        action="store_true",
+        default=argparse.SUPPRESS,
+        help="Trace from checkinternet itself, probing every hop at once, "
+        "rather than running traceroute. Needs root.",
     )
 
-    subparsers = parser.add_subparsers(dest="command", required=True)
 
-    run_cmd = subparsers.add_parser("run", help="Run the tests once.")
+def _add_output_arguments(command: argparse.ArgumentParser) -> None:
+    """Add the options of where results go to command."""
+    command.add_argument(
+        "--yaml_file",
+        default=argparse.SUPPRESS,
+        type=str,
+        help="File to append the results to, for later display.",
+    )
+    command.add_argument(
+        "--store",
+        default=argparse.SUPPRESS,
+        type=str,
+        help="SQLite results store to add the results to, for later "
+        "display. Created if it does not exist.",
+    )
 
-    run_cmd.add_argument(
+
+def _add_test_arguments(
+    command: argparse.ArgumentParser, options: Dict[str, Option]
+) -> None:
+    """Add the options of the tests, and of where their results go, to command."""
+    command.add_argument(
         "--ping_ip",
         default=argparse.SUPPRESS,
-        help="IP address or hostname to ping. {}".format(
-            _default_note(RUN_OPTIONS, "ping_ip")
+        nargs="+",
+        metavar="HOST",
+        help="IP addresses or hostnames to ping, all at the same time. The "
+        "first is the one traced when it loses packets. (default: {})".format(
+            " ".join(options["ping_ip"].default)
         ),
     )
-    run_cmd.add_argument(
+    command.add_argument(
         "--ping_count",
         default=argparse.SUPPRESS,
         type=int,
         help="Packets to send. (default: 400 as root, otherwise 10)",
     )
-    run_cmd.add_argument(
+    command.add_argument(
+        "--adaptive_ping",
+        action="store_true",
+        default=argparse.SUPPRESS,
+        help="Send the packets of each ping, and of each traceroute hop, in "
+        "batches, and stop as soon as the packet loss is known to be under or "
+        "over --max_packet_loss. The packet counts become the most to send.",
+    )
+    command.add_argument(
+        "--ping_per_packet",
+        action="store_true",
+        default=argparse.SUPPRESS,
+        help="Record the round trip of every packet sent to the ping targets, "
+        "to measure jitter, percentiles, and bursts of loss.",
+    )
+    _add_native_arguments(command)
+    command.add_argument(
         "--trace_hop_ping_count",
         default=argparse.SUPPRESS,
         type=int,
         help="Packets to send to each traceroute hop. "
         "(default: 50 as root, otherwise 10)",
     )
-    run_cmd.add_argument(
+    command.add_argument(
+        "--trace_parallelism",
+        default=argparse.SUPPRESS,
+        type=int,
+        help="Traceroute hops to ping at the same time. {}".format(
+            _default_note(options, "trace_parallelism")
+        ),
+    )
+    command.add_argument(
+        "--trace_cache_ttl",
+        default=argparse.SUPPRESS,
+        type=float,
+        metavar="SECONDS",
+        help="Seconds to keep pinging the hops last traced to a target instead "
+        "of tracing it again, unless its first or last hop stops answering. "
+        "0 traces every time. {}".format(_default_note(options, "trace_cache_ttl")),
+    )
+    command.add_argument(
         "--max_packet_loss",
         default=argparse.SUPPRESS,
         type=float,
         help="Packet loss percent above which a traceroute is run. {}".format(
-            _default_note(RUN_OPTIONS, "max_packet_loss")
+            _default_note(options, "max_packet_loss")
         ),
     )
-    run_cmd.add_argument(
+    command.add_argument(
         "--skip_speedtest",
         action="store_true",
         default=argparse.SUPPRESS,
         help="Do not run the speed test.",
     )
-    run_cmd.add_argument(
+    command.add_argument(
         "--skip_pingtest",
         action="store_true",
         default=argparse.SUPPRESS,
         help="Do not run the ping test, and therefore never traceroute.",
     )
+    _add_output_arguments(command)
+
+
+def _add_mtr_arguments(command: argparse.ArgumentParser) -> None:
+    command.add_argument(
+        "--ping_ip",
+        default=argparse.SUPPRESS,
+        metavar="HOST",
+        help="IP address or hostname to trace, and to ping along with every "
+        "hop on the way. {}".format(_default_note(MTR_OPTIONS, "ping_ip")),
+    )
+    command.add_argument(
+        "--duration",
+        default=argparse.SUPPRESS,
+        type=float,
+        metavar="SECONDS",
+        help="Seconds to keep pinging for. {}".format(
+            _default_note(MTR_OPTIONS, "duration")
+        ),
+    )
+    command.add_argument(
+        "--snapshot_interval",
+        default=argparse.SUPPRESS,
+        type=float,
+        metavar="SECONDS",
+        help="Seconds between the results reported and logged, each covering "
+        "the latest --window packets of every hop. {}".format(
+            _default_note(MTR_OPTIONS, "snapshot_interval")
+        ),
+    )
+    command.add_argument(
+        "--window",
+        default=argparse.SUPPRESS,
+        type=int,
+        metavar="PACKETS",
+        help="Latest packets of each hop that its results cover. {}".format(
+            _default_note(MTR_OPTIONS, "window")
+        ),
+    )
+    _add_native_arguments(command)
+    _add_output_arguments(command)
+
+
+def _build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Test internet connection.")
+    parser.add_argument(
+        "--version",
+        action="version",
+        version="%(prog)s {}".format(__version__),
+        help="Print the version and exit.",
+    )
+    parser.add_argument(
+        "--debug",
+        action="store_true",
+        help="Print progress and raw command output to stderr.",
+    )
+    parser.add_argument(
+        "--config",
+        default=None,
+        metavar="PATH",
+        help="Config file of defaults to read instead of {}. Values in it are "
+        "used for the options that are not passed on the command line.".format(
+            default_config_path()
+        ),
+    )
+
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_cmd = subparsers.add_parser("run", help="Run the tests once.")
+
+    _add_test_arguments(run_cmd, RUN_OPTIONS)
     run_cmd.add_argument(
-        "--yaml_file",
+        "--parallel_tests",
+        action="store_true",
         default=argparse.SUPPRESS,
-        type=str,
-        help="File to append this run's results to, for later display.",
+        help="Run the speed test while the ping test and traceroute run, "
+        "instead of after them. The speed test saturates the link, which "
+        "can inflate the packet loss and round trip times measured meanwhile.",
     )
 
     run_cmd.set_defaults(func=run)
 
+    daemon_cmd = subparsers.add_parser(
+        "daemon", help="Keep running the tests on a schedule until stopped."
+    )
+
+    _add_test_arguments(daemon_cmd, DAEMON_OPTIONS)
+    daemon_cmd.add_argument(
+        "--interval",
+        default=argparse.SUPPRESS,
+        type=float,
+        metavar="SECONDS",
+        help="Seconds between ping tests. {}".format(
+            _default_note(DAEMON_OPTIONS, "interval")
+        ),
+    )
+    daemon_cmd.add_argument(
+        "--speed_interval",
+        default=argparse.SUPPRESS,
+        type=float,
+        metavar="SECONDS",
+        help="Seconds between speed tests. (default: --interval)",
+    )
+    daemon_cmd.add_argument(
+        "--trace_interval",
+        default=argparse.SUPPRESS,
+        type=float,
+        metavar="SECONDS",
+        help="Seconds between traceroutes, run whatever the packet loss. "
+        "Without it, a traceroute only follows a ping test that lost more "
+        "than --max_packet_loss.",
+    )
+    daemon_cmd.add_argument(
+        "--jitter",
+        default=argparse.SUPPRESS,
+        type=float,
+        metavar="FRACTION",
+        help="Put each test off by up to this fraction of its interval, picked "
+        "at random every time. {}".format(_default_note(DAEMON_OPTIONS, "jitter")),
+    )
+
+    daemon_cmd.set_defaults(func=daemon)
+
+    mtr_cmd = subparsers.add_parser(
+        "mtr",
+        help="Keep pinging every hop on the way to a target for a while, "
+        "logging how each is doing as it goes.",
+    )
+    _add_mtr_arguments(mtr_cmd)
+    mtr_cmd.set_defaults(func=mtr)
+
     display_cmd = subparsers.add_parser(
         "display", help="Summarize results logged by previous runs."
     )
@@ -160,7 +445,14 @@ def _build_parser() -> argparse.ArgumentParser:
         "--yaml_file",
         default=argparse.SUPPRESS,
         help="File of logged results to read, or '{}' to read them from stdin. "
-        "Required unless the config file sets it.".format(STDIN_YAML_FILE),
+        "Required unless --store is given or the config file sets either "
+        "one.".format(STDIN_YAML_FILE),
+    )
+    display_cmd.add_argument(
+        "--store",
+        default=argparse.SUPPRESS,
+        type=str,
+        help="SQLite results store to read instead of --yaml_file.",
     )
     display_cmd.add_argument(
         "--format",
@@ -185,6 +477,30 @@ def _build_parser() -> argparse.ArgumentParser:
         help="Inline plotly.js in the HTML report so it opens offline, "
         "instead of loading it from the plotly CDN.",
     )
+    display_cmd.add_argument(
+        "--since",
+        default=argparse.SUPPRESS,
+        type=_date_time_arg,
+        metavar="DATETIME",
+        help="Only show results from this local date and time on, such as "
+        "2024-01-31 or '2024-01-31 18:00'.",
+    )
+    display_cmd.add_argument(
+        "--until",
+        default=argparse.SUPPRESS,
+        type=_date_time_arg,
+        metavar="DATETIME",
+        help="Only show results up to this local date and time. A date alone "
+        "is midnight at its start, so it leaves that whole day out.",
+    )
+    display_cmd.add_argument(
+        "--last",
+        default=argparse.SUPPRESS,
+        type=float,
+        metavar="DAYS",
+        help="Only show results from the last DAYS days, which may be "
+        "fractional. Combined with --since, the later of the two applies.",
+    )
     display_cmd.add_argument(
         "--target_download_mbps",
         default=argparse.SUPPRESS,
@@ -217,9 +533,55 @@ def _build_parser() -> argparse.ArgumentParser:
             _default_note(DISPLAY_OPTIONS, "target_packet_loss_pct")
         ),
     )
+    display_cmd.add_argument(
+        "--max_points",
+        default=argparse.SUPPRESS,
+        type=int,
+        metavar="POINTS",
+        help="Most points to draw per line of the HTML charts. With more runs "
+        "than this, the charts start out with a point per hour, day, or as "
+        "many days as it takes, and draw every run once zoomed in to few "
+        "enough. 0 draws every run. "
+        "{}".format(_default_note(DISPLAY_OPTIONS, "max_points")),
+    )
 
     display_cmd.set_defaults(func=display)
 
+    migrate_cmd = subparsers.add_parser(
+        "migrate", help="Copy the results of a YAML results file into a store."
+    )
+
+    migrate_cmd.add_argument(
+        "--yaml_file",
+        default=argparse.SUPPRESS,
+        help="File of logged results to read, or '{}' to read them from stdin.".format(
+            STDIN_YAML_FILE
+        ),
+    )
+    migrate_cmd.add_argument(
+        "--store",
+        default=argparse.SUPPRESS,
+        type=str,
+        help="SQLite results store to copy them into. Created if it does not "
+        "exist, and results it already holds are not added twice.",
+    )
+
+    migrate_cmd.set_defaults(func=migrate)
+
+    reindex_cmd = subparsers.add_parser(
+        "reindex",
+        help="Rebuild the index display uses to read part of a YAML results file.",
+    )
+
+    reindex_cmd.add_argument(
+        "--yaml_file",
+        default=argparse.SUPPRESS,
+        help="File of logged results to index. The index is written next to "
+        "it, named after it with '{}' added.".format(log_index.INDEX_SUFFIX),
+    )
+
+    reindex_cmd.set_defaults(func=reindex)
+
     return parser
 
 
@@ -244,18 +606,33 @@ def _apply_config_defaults(args: argparse.Namespace) -> None:
 def _require_display_yaml_file(args: argparse.Namespace) -> None:
     if args.command != "display" or args.yaml_file is not None:
         return
+    if args.store is not None:
+        return
     print(
-        "ERROR: display requires --yaml_file, or 'yaml_file' in the display "
-        "section of the config file.",
+        "ERROR: display requires --yaml_file or --store, or 'yaml_file' or "
+        "'store' in the display section of the config file.",
         file=sys.stderr,
     )
     raise SystemExit(2)
 
 
+def _require_options(args: argparse.Namespace) -> None:
+    for name in REQUIRED_OPTIONS.get(args.command, ()):
+        if getattr(args, name) is not None:
+            continue
+        print(
+            "ERROR: {0} requires --{1}, or '{1}' in the {0} section of "
+            "the config file.".format(args.command, name),
+            file=sys.stderr,
+        )
+        raise SystemExit(2)
+
+
 def cli_input() -> argparse.Namespace:
     args = _build_parser().parse_args()
     _apply_config_defaults(args)
     _require_display_yaml_file(args)
+    _require_options(args)
     return args
 
 
@@ -292,6 +669,35 @@ def _validate_trace_hop_ping_count(count: Optional[int]) -> bool:
     return False
 
 
+def _validate_trace_parallelism(parallelism: int) -> bool:
+    if parallelism >= 1:
+        return True
+    print(
+        "ERROR: Invalid --trace_parallelism value '{}', "
+        "expected a positive number of hops.".format(parallelism),
+        file=sys.stderr,
+    )
+    return False
+
+
+def _validate_trace_cache_ttl(ttl: float) -> bool:
+    if ttl >= 0:
+        return True
+    print(
+        "ERROR: Invalid --trace_cache_ttl value '{}', "
+        "expected a number of seconds, or 0 to always trace.".format(ttl),
+        file=sys.stderr,
+    )
+    return False
+
+
+def _path_cache(args: argparse.Namespace) -> Optional[PathCache]:
+    """The cache of traced paths to use, or None when tracing every time."""
+    if args.trace_cache_ttl == 0:
+        return None
+    return PathCache(ttl=args.trace_cache_ttl)
+
+
 def _resolve_trace_hop_ping_count(count: Optional[int]) -> int:
     """Hop packet count to use, filling in the root-aware default if unset."""
     if count is None:
@@ -299,6 +705,11 @@ def _resolve_trace_hop_ping_count(count: Optional[int]) -> int:
     return count
 
 
+def _adaptive_loss(args: argparse.Namespace) -> Optional[float]:
+    """The packet loss adaptive pings decide about, or None when not adaptive."""
+    return args.max_packet_loss if args.adaptive_ping else None
+
+
 def _run_ping_tests(
     args: argparse.Namespace, test_result: TestResult
 ) -> Tuple[int, int]:
@@ -306,14 +717,33 @@ def _run_ping_tests(
         return 0, 0
 
     logger.debug("Running PingTest")
-    attempted = 1
-    succeeded = 0
-
-    test_result.ping_result = PingResult.run_test(args.ping_ip, args.ping_count)
+    targets = args.ping_ip
+    ping_results = PingResult.run_tests(
+        targets,
+        args.ping_count,
+        per_packet=args.ping_per_packet,
+        native=args.native_ping,
+        adaptive_loss=_adaptive_loss(args),
+    )
+    attempted = len(targets)
+    succeeded = sum(result is not None for result in ping_results)
+
+    test_result.ping_result = ping_results[0]
+    test_result.extra_ping_results = [
+        result for result in ping_results[1:] if result is not None
+    ]
+    test_result.failed_extra_pings = [
+        target
+        for target, result in zip(targets[1:], ping_results[1:])
+        if result is None
+    ]
+    if test_result.ping_result is None or test_result.failed_extra_pings:
+        test_result.failed_tests.append(PING_TEST)
     logger.debug("Ping Result: %s", test_result.ping_result)
-
-    if test_result.ping_result is not None:
-        succeeded = 1
+    for extra in test_result.extra_ping_results:
+        logger.debug("Ping Result: %s", extra)
+    for target in test_result.failed_extra_pings:
+        logger.debug("Ping to %s failed", target)
 
     if (
         test_result.ping_result is None
@@ -321,7 +751,15 @@ def _run_ping_tests(
     ):
         logger.debug("Running TraceTest")
         hop_count = _resolve_trace_hop_ping_count(args.trace_hop_ping_count)
-        test_result.trace_result = TraceResult.run_test(args.ping_ip, hop_count)
+        test_result.trace_result = TraceResult.run_test(
+            targets[0],
+            hop_count,
+            parallelism=args.trace_parallelism,
+            native=args.native_ping,
+            native_trace=args.native_trace,
+            path_cache=_path_cache(args),
+            adaptive_loss=_adaptive_loss(args),
+        )
 
     return attempted, succeeded
 
@@ -337,13 +775,71 @@ def _run_speedtest(
     if not SpeedResult.check():
         return 0, 0
 
+    return _measure_speed(args, test_result)
+
+
+def _measure_speed(
+    args: argparse.Namespace, test_result: TestResult
+) -> Tuple[int, int]:
+    """Run the speed test, once check() has found the speedtest CLI."""
     logger.debug("Running SpeedTest")
     test_result.speed_result = SpeedResult.run_test()
     if test_result.speed_result is None:
+        test_result.failed_tests.append(SPEED_TEST)
         return 1, 0
     return 1, 1
 
 
+# A test phase of run, returning how many tests it attempted and how many of
+# those succeeded.
+TestPhase = Callable[[argparse.Namespace, TestResult], Tuple[int, int]]
+
+
+def _timed_phase(
+    phase: TestPhase, args: argparse.Namespace, test_result: TestResult
+) -> Tuple[Tuple[int, int], float, float]:
+    """The phase's counts, along with the monotonic times it started and ended."""
+    started = monotonic()
+    counts = phase(args, test_result)
+    return counts, started, monotonic()
+
+
+def _run_tests_in_parallel(
+    args: argparse.Namespace, test_result: TestResult
+) -> Tuple[int, int]:
+    """Run the speed test in the background while the ping tests run.
+
+    Each fills in its own part of test_result, so they share nothing else. How
+    long the two actually overlapped is logged, since the speed test loading
+    the link is what a ping measured meanwhile has to be read against.
+    """
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        speed = executor.submit(_timed_phase, _run_speedtest, args, test_result)
+        ping_counts, ping_started, ping_ended = _timed_phase(
+            _run_ping_tests, args, test_result
+        )
+        speed_counts, speed_started, speed_ended = speed.result()
+
+    overlap = max(0.0, min(ping_ended, speed_ended) - max(ping_started, speed_started))
+    logger.debug(
+        "Ping tests took %.1fs, speed test took %.1fs, overlapping for %.1fs",
+        ping_ended - ping_started,
+        speed_ended - speed_started,
+        overlap,
+    )
+    return ping_counts[0] + speed_counts[0], ping_counts[1] + speed_counts[1]
+
+
+def _run_tests(args: argparse.Namespace, test_result: TestResult) -> Tuple[int, int]:
+    """Run every requested test, returning how many were attempted and passed."""
+    if args.parallel_tests:
+        return _run_tests_in_parallel(args, test_result)
+
+    attempted, succeeded = _run_ping_tests(args, test_result)
+    speed_attempted, speed_succeeded = _run_speedtest(args, test_result)
+    return attempted + speed_attempted, succeeded + speed_succeeded
+
+
 def _log_yaml_results(args: argparse.Namespace, test_result: TestResult) -> int:
     if args.yaml_file is None:
         return 0
@@ -351,6 +847,7 @@ def _log_yaml_results(args: argparse.Namespace, test_result: TestResult) -> int:
     logger.debug("Logging results to: %s", args.yaml_file)
     try:
         with open(args.yaml_file, "a", encoding="utf-8") as yaml_file:
+            new_log = yaml_file.tell() == 0
             print("---\n{}\n...\n".format(test_result.to_yaml()), file=yaml_file)
     except OSError as error:
         print(
@@ -358,34 +855,65 @@ def _log_yaml_results(args: argparse.Namespace, test_result: TestResult) -> int:
             file=sys.stderr,
         )
         return 1
+
+    # The results are logged by now, and display reads them without an index,
+    # just more slowly, so failing to update it is not worth failing the run.
+    try:
+        log_index.update_index(args.yaml_file, create=new_log)
+    except (OSError, UnicodeDecodeError) as error:
+        print(
+            "WARNING: Unable to update the index of '{}': {}".format(
+                args.yaml_file, error
+            ),
+            file=sys.stderr,
+        )
     return 0
 
 
-def run(args: argparse.Namespace) -> int:
-    logger.debug("%s", datetime.now())
+def _log_store_results(args: argparse.Namespace, test_result: TestResult) -> int:
+    if args.store is None:
+        return 0
 
-    if not _validate_ping_ip(args.ping_ip):
-        return 1
+    from internet_troubleshooter import store
 
-    if not _validate_ping_count(args.ping_count):
+    logger.debug("Adding results to store: %s", args.store)
+    try:
+        store.append_results(args.store, [test_result])
+    except store.StoreError as error:
+        print("ERROR: {}".format(error), file=sys.stderr)
         return 1
+    return 0
+
+
+def _validate_test_args(args: argparse.Namespace) -> bool:
+    return (
+        all(_validate_ping_ip(ping_ip) for ping_ip in args.ping_ip)
+        and _validate_ping_count(args.ping_count)
+        and _validate_trace_hop_ping_count(args.trace_hop_ping_count)
+        and _validate_trace_parallelism(args.trace_parallelism)
+        and _validate_trace_cache_ttl(args.trace_cache_ttl)
+    )
+
+
+def run(args: argparse.Namespace) -> int:
+    logger.debug("%s", datetime.now())
 
-    if not _validate_trace_hop_ping_count(args.trace_hop_ping_count):
+    if not _validate_test_args(args):
         return 1
 
     logger.debug("Running Tests")
     test_result = TestResult(ping_result=None, trace_result=None, speed_result=None)
 
-    attempted, succeeded = _run_ping_tests(args, test_result)
-    speed_attempted, speed_succeeded = _run_speedtest(args, test_result)
-    attempted += speed_attempted
-    succeeded += speed_succeeded
+    attempted, succeeded = _run_tests(args, test_result)
 
     test_result.human_readable(sys.stdout)
 
     if _log_yaml_results(args, test_result) != 0:
         return 1
 
+    if _log_store_results(args, test_result) != 0:
+        return 1
+
     if attempted > 0 and succeeded == 0:
         print("ERROR: All requested tests failed.", file=sys.stderr)
         return 1
@@ -393,8 +921,193 @@ def run(args: argparse.Namespace) -> int:
     return 0
 
 
+def _validate_interval(name: str, seconds: Optional[float]) -> bool:
+    if seconds is None or seconds > 0:
+        return True
+    print(
+        "ERROR: Invalid --{} value '{}', expected a positive number of seconds.".format(
+            name, seconds
+        ),
+        file=sys.stderr,
+    )
+    return False
+
+
+def _validate_jitter(jitter: float) -> bool:
+    if 0 <= jitter < 1:
+        return True
+    print(
+        "ERROR: Invalid --jitter value '{}', expected a fraction of the interval "
+        "from 0 up to 1.".format(jitter),
+        file=sys.stderr,
+    )
+    return False
+
+
+def _validate_schedule_args(args: argparse.Namespace) -> bool:
+    return all(
+        _validate_interval(name, getattr(args, name))
+        for name in ("interval", "speed_interval", "trace_interval")
+    ) and _validate_jitter(args.jitter)
+
+
+def _daemon_task(
+    args: argparse.Namespace, lock: threading.Lock, tests: Sequence[TestPhase]
+) -> Callable[[], None]:
+    """A scheduled task running tests one after another into one result.
+
+    The result is then reported and logged. Tasks run on threads of their own,
+    so they take turns, as otherwise a speed test saturating the link would skew
+    any ping measured meanwhile, and results would be interleaved in the output
+    or the log.
+    """
+
+    def task() -> None:
+        test_result = TestResult(ping_result=None, trace_result=None, speed_result=None)
+        with lock:
+            for test in tests:
+                test(args, test_result)
+            test_result.human_readable(sys.stdout)
+            sys.stdout.flush()
+            _log_yaml_results(args, test_result)
+            _log_store_results(args, test_result)
+
+    return task
+
+
+def _run_trace_test(
+    args: argparse.Namespace, test_result: TestResult
+) -> Tuple[int, int]:
+    # A ping test due at the same time may have traced already, having lost
+    # too many packets.
+    if test_result.trace_result is not None:
+        return 0, 0
+    logger.debug("Running TraceTest")
+    hop_count = _resolve_trace_hop_ping_count(args.trace_hop_ping_count)
+    test_result.trace_result = TraceResult.run_test(
+        args.ping_ip[0],
+        hop_count,
+        parallelism=args.trace_parallelism,
+        native=args.native_ping,
+        native_trace=args.native_trace,
+        path_cache=_path_cache(args),
+        adaptive_loss=_adaptive_loss(args),
+    )
+    return 1, int(test_result.trace_result is not None)
+
+
+def _daemon_schedules(args: argparse.Namespace) -> List[Schedule]:
+    """What the daemon runs, and how often.
+
+    Tests on the same interval are one schedule, which logs them as one result,
+    just as run would. Whether the speedtest CLI is installed is only checked
+    once, here, rather than before every speed test.
+    """
+    lock = threading.Lock()
+    tests: List[Tuple[str, float, TestPhase]] = []
+    if not args.skip_pingtest:
+        tests.append(("ping test", args.interval, _run_ping_tests))
+        if args.trace_interval is not None:
+            tests.append(("traceroute", args.trace_interval, _run_trace_test))
+    if not args.skip_speedtest and SpeedResult.check():
+        speed_interval = args.speed_interval
+        if speed_interval is None:
+            speed_interval = args.interval
+        tests.append(("speed test", speed_interval, _measure_speed))
+
+    by_interval: Dict[float, List[Tuple[str, float, TestPhase]]] = {}
+    for test in tests:
+        by_interval.setdefault(test[1], []).append(test)
+    return [
+        Schedule(
+            name=" and ".join(name for name, _, _ in grouped),
+            interval=interval,
+            task=_daemon_task(args, lock, [test for _, _, test in grouped]),
+            jitter=args.jitter,
+        )
+        for interval, grouped in by_interval.items()
+    ]
+
+
+def daemon(args: argparse.Namespace) -> int:
+    if not _validate_test_args(args) or not _validate_schedule_args(args):
+        return 1
+
+    schedules = _daemon_schedules(args)
+    if not schedules:
+        print(
+            "ERROR: Nothing to schedule, every test is skipped or unavailable.",
+            file=sys.stderr,
+        )
+        return 1
+
+    for schedule in schedules:
+        logger.debug("Scheduling %s every %gs", schedule.name, schedule.interval)
+
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda signum, frame: stop.set())
+    try:
+        run_schedules(schedules, stop)
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+def _validate_window(window: int) -> bool:
+    if window >= 1:
+        return True
+    print(
+        "ERROR: Invalid --window value '{}', "
+        "expected a positive number of packets.".format(window),
+        file=sys.stderr,
+    )
+    return False
+
+
+def _validate_mtr_args(args: argparse.Namespace) -> bool:
+    return (
+        _validate_ping_ip(args.ping_ip)
+        and _validate_interval("duration", args.duration)
+        and _validate_interval("snapshot_interval", args.snapshot_interval)
+        and _validate_window(args.window)
+    )
+
+
+def mtr(args: argparse.Namespace) -> int:
+    if not _validate_mtr_args(args):
+        return 1
+
+    logger.debug("Tracing the path to %s", args.ping_ip)
+    hop_ips = TraceResult.trace_hops(args.ping_ip, args.native_trace)
+    if hop_ips is None:
+        return 1
+    logger.debug("Watching %s and %d hop(s)", args.ping_ip, len(hop_ips))
+    monitor = PathMonitor(args.ping_ip, hop_ips, args.window)
+
+    def ping_round(addresses: Sequence[str]) -> List[Optional[PingResult]]:
+        return PingResult.run_tests(
+            addresses, MTR_ROUND_COUNT, per_packet=True, native=args.native_ping
+        )
+
+    def report(snapshot: TestResult) -> None:
+        snapshot.human_readable(sys.stdout)
+        sys.stdout.flush()
+        _log_yaml_results(args, snapshot)
+        _log_store_results(args, snapshot)
+
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda signum, frame: stop.set())
+    try:
+        watch(monitor, ping_round, report, args.duration, args.snapshot_interval, stop)
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
 def _display_thresholds(args: argparse.Namespace) -> RenderThresholds:
     """The healthy thresholds the HTML report draws and colors against."""
+    from internet_troubleshooter.render import RenderThresholds
+
     return RenderThresholds(
         download_mbps=args.target_download_mbps,
         upload_mbps=args.target_upload_mbps,
@@ -403,21 +1116,80 @@ def _display_thresholds(args: argparse.Namespace) -> RenderThresholds:
     )
 
 
-def _load_display_results(yaml_file: str) -> Optional[List[TestResult]]:
-    """Results to show, or None once the reason they are unreadable is reported."""
+def _stdin_lines() -> Optional[Iterator[str]]:
+    """The lines piped into stdin, or None once an empty stdin is reported.
+
+    Only the blank lines ahead of the first result are read before deciding, so
+    the rest of the input is still read lazily.
+    """
+    lines = iter(sys.stdin)
+    leading: List[str] = []
+    for line in lines:
+        leading.append(line)
+        if line.strip():
+            return chain(leading, lines)
+
+    print(
+        "ERROR: No results on stdin, expected logged results piped into "
+        "'--yaml_file {}'.".format(STDIN_YAML_FILE),
+        file=sys.stderr,
+    )
+    return None
+
+
+def _validate_last(days: Optional[float]) -> bool:
+    if days is None or (days > 0 and math.isfinite(days)):
+        return True
+    print(
+        "ERROR: Invalid --last value '{}', expected a positive number of days.".format(
+            days
+        ),
+        file=sys.stderr,
+    )
+    return False
+
+
+def _validate_max_points(points: int) -> bool:
+    if points >= 0:
+        return True
+    print(
+        "ERROR: Invalid --max_points value '{}', expected 0 or more.".format(points),
+        file=sys.stderr,
+    )
+    return False
+
+
+def _display_window(args: argparse.Namespace) -> Optional[TimeWindow]:
+    """The span of time --since, --until and --last limit display to, if any."""
+    since = None if args.since is None else args.since.timestamp()
+    until = None if args.until is None else args.until.timestamp()
+    if args.last is not None:
+        try:
+            start = (datetime.now() - timedelta(days=args.last)).timestamp()
+        except OverflowError:
+            # More days than a datetime reaches back, which leaves out nothing.
+            start = None
+        if start is not None:
+            since = start if since is None else max(since, start)
+    if since is None and until is None:
+        return None
+    return TimeWindow(since=since, until=until)
+
+
+def _load_yaml_results(
+    yaml_file: str, window: Optional[TimeWindow] = None
+) -> Optional[Iterable[TestResult]]:
+    """Results logged to yaml_file, read lazily as they are iterated over.
+
+    Only those inside window are parsed. None once the reason they are
+    unreadable is reported.
+    """
     if yaml_file == STDIN_YAML_FILE:
-        content = sys.stdin.read()
-        if not content.strip():
-            print(
-                "ERROR: No results on stdin, expected logged results piped into "
-                "'--yaml_file {}'.".format(STDIN_YAML_FILE),
-                file=sys.stderr,
-            )
-            return None
-        return TestResult.load_yaml(content)
+        lines = _stdin_lines()
+        return None if lines is None else TestResult.iter_yaml(lines, window)
 
     try:
-        return TestResult.load_results(yaml_file)
+        return log_index.iter_results(yaml_file, window)
     except OSError as error:
         print(
             "ERROR: Unable to read results from '{}': {}".format(yaml_file, error),
@@ -426,14 +1198,40 @@ def _load_display_results(yaml_file: str) -> Optional[List[TestResult]]:
         return None
 
 
+def _load_display_results(
+    args: argparse.Namespace,
+) -> Optional[Iterable[TestResult]]:
+    """Results to show, or None once the reason they are unreadable is reported.
+
+    A store is read in preference to a YAML file. The text summary only needs
+    the plotted figures, so it leaves the traces and speedtest payloads unread.
+    """
+    window = _display_window(args)
+    if args.store is None:
+        return _load_yaml_results(args.yaml_file, window)
+
+    from internet_troubleshooter import store
+
+    try:
+        return store.load_results(
+            args.store, details=args.format == "html", window=window
+        )
+    except store.StoreError as error:
+        print("ERROR: {}".format(error), file=sys.stderr)
+        return None
+
+
 def _write_html_report(args: argparse.Namespace, results: List[TestResult]) -> int:
     """Write the report to --html_file, or to stdout when it names no file."""
+    from internet_troubleshooter.render import to_html
+
     if args.html_file is None:
         to_html(
             results,
             sys.stdout,
             _display_thresholds(args),
             embed_plotly=args.embed_plotly,
+            max_points=args.max_points,
         )
         return 0
 
@@ -444,6 +1242,7 @@ def _write_html_report(args: argparse.Namespace, results: List[TestResult]) -> i
             args.html_file,
             _display_thresholds(args),
             embed_plotly=args.embed_plotly,
+            max_points=args.max_points,
         )
     except OSError as error:
         print(
@@ -455,12 +1254,15 @@ def _write_html_report(args: argparse.Namespace, results: List[TestResult]) -> i
 
 
 def display(args: argparse.Namespace) -> int:
-    results = _load_display_results(args.yaml_file)
+    if not _validate_last(args.last) or not _validate_max_points(args.max_points):
+        return 1
+
+    results = _load_display_results(args)
     if results is None:
         return 1
 
     if args.format == "html":
-        return _write_html_report(args, results)
+        return _write_html_report(args, list(results))
 
     # The text summary has nowhere to go but stdout, so an html_file left over
     # from the config file is not worth failing over, only mentioning.
@@ -470,11 +1272,70 @@ def display(args: argparse.Namespace) -> int:
             "'--format html'.".format(args.html_file),
             file=sys.stderr,
         )
+    from internet_troubleshooter.render import to_human
+
     to_human(results, sys.stdout)
 
     return 0
 
 
+def migrate(args: argparse.Namespace) -> int:
+    from internet_troubleshooter import store
+
+    loaded = _load_yaml_results(args.yaml_file)
+    if loaded is None:
+        return 1
+    read = 0
+
+    def counted() -> Iterator[TestResult]:
+        # Results are counted as they are written, never held all at once.
+        nonlocal read
+        for result in loaded:
+            read += 1
+            yield result
+
+    logger.debug("Migrating %s to store: %s", args.yaml_file, args.store)
+    try:
+        added = store.append_results(args.store, counted())
+    except store.StoreError as error:
+        print("ERROR: {}".format(error), file=sys.stderr)
+        return 1
+
+    print(
+        "Migrated {} result(s) from '{}' to '{}', {} already stored.".format(
+            added, args.yaml_file, args.store, read - added
+        )
+    )
+    return 0
+
+
+def reindex(args: argparse.Namespace) -> int:
+    if args.yaml_file == STDIN_YAML_FILE:
+        print(
+            "ERROR: reindex requires a file, not '{}', since the index records "
+            "where each result is in it.".format(STDIN_YAML_FILE),
+            file=sys.stderr,
+        )
+        return 1
+
+    logger.debug("Indexing: %s", args.yaml_file)
+    try:
+        count = log_index.reindex(args.yaml_file)
+    except (OSError, UnicodeDecodeError) as error:
+        print(
+            "ERROR: Unable to index '{}': {}".format(args.yaml_file, error),
+            file=sys.stderr,
+        )
+        return 1
+
+    print(
+        "Indexed {} result(s) of '{}' in '{}'.".format(
+            count, args.yaml_file, log_index.index_path(args.yaml_file)
+        )
+    )
+    return 0
+
+
 def main() -> None:
     args = cli_input()
     configure_logging(args.debug)
@@ -16,10 +16,9 @@ from __future__ import annotations
 
 import os
 from dataclasses import dataclass
+from datetime import date, datetime
 from pathlib import Path
-from typing import Any, Callable, Dict, Mapping, Optional, Sequence
-
-import yaml
+from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence
 
 CONFIG_DIR_NAME = "checkinternet"
 CONFIG_FILE_NAME = "config.yaml"
@@ -57,6 +56,19 @@ def as_str(value: Any) -> str:
     raise ValueError("expected a string")
 
 
+def as_str_list(value: Any) -> List[str]:
+    """A list of strings, where a lone string is a list of one."""
+    if isinstance(value, str):
+        return [value]
+    if (
+        isinstance(value, list)
+        and value
+        and all(isinstance(item, str) for item in value)
+    ):
+        return list(value)
+    raise ValueError("expected a string or a list of strings")
+
+
 def as_int(value: Any) -> int:
     # bool is a subclass of int, but `true` is never a sensible packet count.
     if isinstance(value, int) and not isinstance(value, bool):
@@ -76,6 +88,34 @@ def as_bool(value: Any) -> bool:
     raise ValueError("expected true or false")
 
 
+def parse_datetime(value: str) -> datetime:
+    """A local date and time written as on the command line, like 2024-01-31 18:00.
+
+    Raises ValueError, describing what was expected, when value is not one.
+    """
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(
+            "expected a date, or a date and time, such as 2024-01-31 or "
+            "2024-01-31 18:00"
+        ) from None
+
+
+def as_datetime(value: Any) -> datetime:
+    # YAML reads an unquoted date or date and time into a date or datetime of
+    # its own, so only a quoted one arrives as a string.
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, date):
+        return datetime(value.year, value.month, value.day)
+    if isinstance(value, str):
+        return parse_datetime(value)
+    raise ValueError(
+        "expected a date, or a date and time, such as 2024-01-31 or 2024-01-31 18:00"
+    )
+
+
 def as_choice(choices: Sequence[str]) -> Callable[[Any], str]:
     """Reader accepting only one of choices, for options argparse restricts."""
 
@@ -94,6 +134,13 @@ def default_config_path() -> Path:
     return config_home / CONFIG_DIR_NAME / CONFIG_FILE_NAME
 
 
+def default_cache_dir() -> Path:
+    """Where what checkinternet learns and keeps between runs is written."""
+    xdg_cache_home = os.environ.get("XDG_CACHE_HOME")
+    cache_home = Path(xdg_cache_home) if xdg_cache_home else Path.home() / ".cache"
+    return cache_home / CONFIG_DIR_NAME
+
+
 def load_config(path: Optional[str], schema: Schema) -> ConfigDefaults:
     """The defaults the config file sets, as {command: {option: value}}.
 
@@ -121,6 +168,9 @@ def _config_path(path: Optional[str]) -> Optional[Path]:
 
 
 def _read_config(config_path: Path, schema: Schema) -> ConfigDefaults:
+    # Only imported here, so that a run without a config file never loads it.
+    import yaml
+
     try:
         with open(config_path, encoding="utf-8") as config_file:
             document = yaml.safe_load(config_file)
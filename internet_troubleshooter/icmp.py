@@ -0,0 +1,400 @@
+"""Pings sent from this process, rather than by running ping.
+
+Every packet to every target goes out over one ICMP socket, and the replies are
+read back by a single selector loop, so pinging dozens of hosts at once costs
+no more processes than pinging one. Round trips are timed with the nanosecond
+performance counter.
+
+Linux lets users in net.ipv4.ping_group_range open ICMP datagram sockets, as
+macOS lets anyone, which is tried first; otherwise a raw socket is used, which
+needs root. Only IPv4 is spoken, so a target without an IPv4 address is left for
+ping to handle.
+
+The path to a target is traced the same way, sending the probes for every hop
+at once rather than one hop after another. A router load balancing by flow
+sends every probe with the same ICMP header fields down the same path, so the
+probes are made to share their checksum, as paris-traceroute does, and only
+tell each other apart by their sequence number. Reading the routers' replies
+takes a raw socket, so tracing needs root.
+"""
+
+from __future__ import annotations
+
+import logging
+import math
+import os
+import random
+import selectors
+import socket
+import struct
+import time
+from array import array
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+ICMP_ECHO_REPLY = 0
+ICMP_ECHO_REQUEST = 8
+ICMP_TIME_EXCEEDED = 11
+
+# Type, code, checksum, identifier, and sequence number.
+ICMP_HEADER = struct.Struct("!BBHHH")
+
+# The same 56 bytes of data ping sends by default.
+PAYLOAD = bytes(range(56))
+
+RECEIVE_SIZE = 2048
+
+# How long to wait, in seconds, for the replies still outstanding once the last
+# packet has been sent, before counting them as lost.
+REPLY_TIMEOUT = 3.0
+
+# A trace sends TRACE_PROBES probes to every hop up to TRACE_MAX_HOPS, as
+# traceroute does by default, a round of one probe per hop every
+# TRACE_ROUND_INTERVAL seconds so that routers rate limiting their replies are
+# not asked for them all at once.
+TRACE_MAX_HOPS = 30
+TRACE_PROBES = 3
+TRACE_ROUND_INTERVAL = 0.05
+
+# The checksum every probe of a trace carries, whatever its sequence number.
+TRACE_FLOW_CHECKSUM = 0x5A5A
+
+
+class IcmpError(Exception):
+    """No ICMP socket could be opened, or it could not be used."""
+
+
+def _ones_complement_sum(data: bytes) -> int:
+    """The sum of the 16 bit big endian words of data, with the carries added."""
+    if len(data) % 2:
+        data += b"\0"
+    words: Tuple[int, ...] = struct.unpack("!{}H".format(len(data) // 2), data)
+    total = sum(words)
+    while total >> 16:
+        total = (total & 0xFFFF) + (total >> 16)
+    return total
+
+
+def checksum(data: bytes) -> int:
+    """The Internet checksum of RFC 1071, as ICMP headers carry it."""
+    return ~_ones_complement_sum(data) & 0xFFFF
+
+
+def echo_request(identifier: int, sequence: int, payload: bytes = PAYLOAD) -> bytes:
+    header = ICMP_HEADER.pack(ICMP_ECHO_REQUEST, 0, 0, identifier, sequence)
+    return (
+        ICMP_HEADER.pack(
+            ICMP_ECHO_REQUEST, 0, checksum(header + payload), identifier, sequence
+        )
+        + payload
+    )
+
+
+def parse_reply(packet: bytes) -> Optional[Tuple[int, int]]:
+    """The identifier and sequence number of an echo reply, or None otherwise.
+
+    A raw socket hands over the IP header too, as a datagram socket does on
+    macOS but not on Linux, so it is skipped wherever the packet starts with one.
+    """
+    if packet and packet[0] >> 4 == 4:
+        packet = packet[(packet[0] & 0x0F) * 4 :]
+    if len(packet) < ICMP_HEADER.size:
+        return None
+    kind, code, _, identifier, sequence = ICMP_HEADER.unpack_from(packet)
+    if kind != ICMP_ECHO_REPLY or code != 0:
+        return None
+    return identifier, sequence
+
+
+def open_socket() -> Tuple[socket.socket, bool]:
+    """An ICMP socket, and whether it is raw, preferring an unprivileged one."""
+    try:
+        return (
+            socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_ICMP),
+            False,
+        )
+    except OSError as error:
+        logger.debug("No ICMP datagram socket: %s", error)
+    try:
+        return open_raw_socket(), True
+    except IcmpError as error:
+        raise IcmpError(
+            "unable to open an ICMP socket, which needs root or a group in "
+            "net.ipv4.ping_group_range: {}".format(error.__cause__)
+        ) from error.__cause__
+
+
+def open_raw_socket() -> socket.socket:
+    try:
+        return socket.socket(socket.AF_INET, socket.SOCK_RAW, socket.IPPROTO_ICMP)
+    except OSError as error:
+        raise IcmpError(
+            "unable to open a raw ICMP socket, which needs root: {}".format(error)
+        ) from error
+
+
+def resolve(target: str) -> Optional[str]:
+    """The IPv4 address of target, or None when it has none."""
+    try:
+        addresses = socket.getaddrinfo(target, None, socket.AF_INET)
+    except (OSError, UnicodeError) as error:
+        logger.debug("Unable to resolve %s: %s", target, error)
+        return None
+    return str(addresses[0][4][0]) if addresses else None
+
+
+class _Probe:
+    """The packets of one probe, and the round trips of those answered."""
+
+    def __init__(
+        self,
+        connection: socket.socket,
+        raw: bool,
+        addresses: Dict[str, str],
+        count: int,
+        clock: Callable[[], int],
+    ) -> None:
+        self.connection = connection
+        self.raw = raw
+        self.clock = clock
+        # A datagram socket has the kernel fill in its own identifier, and only
+        # delivers the replies to it, so it is only checked on a raw socket.
+        self.identifier = (os.getpid() ^ random.getrandbits(16)) & 0xFFFF
+        self.targets_by_address: Dict[str, List[str]] = {}
+        for target, address in addresses.items():
+            self.targets_by_address.setdefault(address, []).append(target)
+        self.rtts_ms = {target: array("d", [math.nan]) * count for target in addresses}
+        # When each packet still awaiting a reply was sent, by its address and
+        # sequence number, with the position it was sent in.
+        self.outstanding: Dict[Tuple[str, int], Tuple[int, int]] = {}
+
+    def send(self, position: int) -> None:
+        sequence = position & 0xFFFF
+        packet = echo_request(self.identifier, sequence)
+        for address in self.targets_by_address:
+            try:
+                self.connection.sendto(packet, (address, 0))
+            except OSError as error:
+                # Counted as lost, as ping counts a packet it could not send.
+                logger.debug("Unable to ping %s: %s", address, error)
+                continue
+            self.outstanding[(address, sequence)] = (position, self.clock())
+
+    def receive(self) -> None:
+        """Read every reply waiting on the socket."""
+        while True:
+            try:
+                packet, (address, _) = self.connection.recvfrom(RECEIVE_SIZE)
+            except (BlockingIOError, InterruptedError):
+                return
+            received = self.clock()
+            reply = parse_reply(packet)
+            if reply is None or (self.raw and reply[0] != self.identifier):
+                continue
+            sent = self.outstanding.pop((address, reply[1]), None)
+            if sent is None:
+                continue
+            position, sent_at = sent
+            for target in self.targets_by_address[address]:
+                self.rtts_ms[target][position] = (received - sent_at) / 1e6
+
+
+def probe(
+    targets: Sequence[str],
+    count: int,
+    interval: float,
+    timeout: float = REPLY_TIMEOUT,
+    clock: Callable[[], int] = time.perf_counter_ns,
+) -> Dict[str, "array[float]"]:
+    """Ping every target count times, a packet to each every interval seconds.
+
+    Returns the round trip in milliseconds of every packet sent to each target,
+    NaN where it was never answered, for the targets that have an IPv4 address;
+    the rest are left out. Raises IcmpError when no ICMP socket can be opened.
+    """
+    addresses = {}
+    for target in targets:
+        address = resolve(target)
+        if address is not None:
+            addresses[target] = address
+    if not addresses:
+        return {}
+
+    connection, raw = open_socket()
+    with connection, selectors.DefaultSelector() as selector:
+        connection.setblocking(False)
+        selector.register(connection, selectors.EVENT_READ)
+        state = _Probe(connection, raw, addresses, count, clock)
+
+        interval_ns = int(interval * 1e9)
+        next_send = clock()
+        deadline = None
+        position = 0
+        while True:
+            now = clock()
+            if position < count and now >= next_send:
+                state.send(position)
+                position += 1
+                next_send += interval_ns
+                if position == count:
+                    deadline = now + int(timeout * 1e9)
+                continue
+            if deadline is not None and (not state.outstanding or now >= deadline):
+                break
+            wake = next_send if deadline is None else deadline
+            if selector.select(max(0, wake - now) / 1e9):
+                state.receive()
+
+    return state.rtts_ms
+
+
+def flow_probe(identifier: int, sequence: int) -> bytes:
+    """An echo request whose checksum is TRACE_FLOW_CHECKSUM whatever its sequence.
+
+    The first two bytes of the payload are picked to make up the difference.
+    """
+    header = ICMP_HEADER.pack(ICMP_ECHO_REQUEST, 0, 0, identifier, sequence)
+    rest = PAYLOAD[2:]
+    wanted = ~TRACE_FLOW_CHECKSUM & 0xFFFF
+    # Subtracting in ones' complement is adding the complement.
+    filler = _ones_complement_sum(
+        struct.pack("!HH", wanted, ~_ones_complement_sum(header + rest) & 0xFFFF)
+    )
+    return (
+        ICMP_HEADER.pack(
+            ICMP_ECHO_REQUEST, 0, TRACE_FLOW_CHECKSUM, identifier, sequence
+        )
+        + struct.pack("!H", filler)
+        + rest
+    )
+
+
+def parse_trace_reply(packet: bytes) -> Optional[Tuple[int, int, bool]]:
+    """The identifier and sequence of the probe a packet from a raw socket answers.
+
+    Also whether it came from the target itself, as an echo reply, rather than
+    from a router on the way whose time exceeded message quotes the probe.
+    """
+    if not packet:
+        return None
+    message = packet[(packet[0] & 0x0F) * 4 :]
+    if len(message) < ICMP_HEADER.size:
+        return None
+    kind, code, _, identifier, sequence = ICMP_HEADER.unpack_from(message)
+    if kind == ICMP_ECHO_REPLY and code == 0:
+        return identifier, sequence, True
+    if kind != ICMP_TIME_EXCEEDED:
+        return None
+    # The quoted probe: its IP header, and at least the first 8 bytes past it.
+    quoted = message[ICMP_HEADER.size :]
+    if not quoted:
+        return None
+    quoted = quoted[(quoted[0] & 0x0F) * 4 :]
+    if len(quoted) < ICMP_HEADER.size:
+        return None
+    kind, _, _, identifier, sequence = ICMP_HEADER.unpack_from(quoted)
+    if kind != ICMP_ECHO_REQUEST:
+        return None
+    return identifier, sequence, False
+
+
+class _Trace:
+    """The probes of one trace, and the hops that answered them, by TTL."""
+
+    def __init__(self, connection: socket.socket, address: str, max_hops: int):
+        self.connection = connection
+        self.address = address
+        self.max_hops = max_hops
+        self.identifier = (os.getpid() ^ random.getrandbits(16)) & 0xFFFF
+        self.hops: Dict[int, str] = {}
+        # The nearest TTL the target itself answered at, once it has.
+        self.target_ttl: Optional[int] = None
+
+    def send(self, round_number: int) -> None:
+        for ttl in range(1, self.max_hops + 1):
+            if self.target_ttl is not None and ttl > self.target_ttl:
+                return
+            self.connection.setsockopt(socket.IPPROTO_IP, socket.IP_TTL, ttl)
+            try:
+                self.connection.sendto(
+                    flow_probe(self.identifier, round_number << 8 | ttl),
+                    (self.address, 0),
+                )
+            except OSError as error:
+                logger.debug("Unable to send the probe for hop %d: %s", ttl, error)
+
+    def receive(self) -> None:
+        while True:
+            try:
+                packet, (address, _) = self.connection.recvfrom(RECEIVE_SIZE)
+            except (BlockingIOError, InterruptedError):
+                return
+            reply = parse_trace_reply(packet)
+            if reply is None or reply[0] != self.identifier:
+                continue
+            ttl = reply[1] & 0xFF
+            if reply[2]:
+                if address == self.address and (
+                    self.target_ttl is None or ttl < self.target_ttl
+                ):
+                    self.target_ttl = ttl
+            elif 0 < ttl <= self.max_hops:
+                self.hops.setdefault(ttl, address)
+
+    def complete(self) -> bool:
+        """True once the target and every hop on the way to it have answered."""
+        return self.target_ttl is not None and all(
+            ttl in self.hops for ttl in range(1, self.target_ttl)
+        )
+
+    def path(self) -> List[Optional[str]]:
+        """The address of every hop before the target, in order."""
+        if self.target_ttl is not None:
+            last = self.target_ttl - 1
+        else:
+            last = max(self.hops, default=0)
+        return [self.hops.get(ttl) for ttl in range(1, last + 1)]
+
+
+def trace(
+    target: str,
+    max_hops: int = TRACE_MAX_HOPS,
+    probes: int = TRACE_PROBES,
+    timeout: float = REPLY_TIMEOUT,
+    round_interval: float = TRACE_ROUND_INTERVAL,
+) -> List[Optional[str]]:
+    """The address of every hop on the way to target, None where none answered.
+
+    Every hop is probed at once, probes times over, stopping early once the
+    target and every hop before it have answered. Raises IcmpError when target
+    has no IPv4 address or no raw socket can be opened.
+    """
+    address = resolve(target)
+    if address is None:
+        raise IcmpError("'{}' has no IPv4 address".format(target))
+
+    connection = open_raw_socket()
+    with connection, selectors.DefaultSelector() as selector:
+        connection.setblocking(False)
+        selector.register(connection, selectors.EVENT_READ)
+        state = _Trace(connection, address, max_hops)
+
+        clock = time.monotonic
+        round_number = 0
+        next_round = clock()
+        deadline = next_round + (probes - 1) * round_interval + timeout
+        while not state.complete():
+            now = clock()
+            if now >= deadline:
+                break
+            if round_number < probes and now >= next_round:
+                state.send(round_number)
+                round_number += 1
+                next_round += round_interval
+                continue
+            wake = next_round if round_number < probes else deadline
+            if selector.select(max(0.0, wake - now)):
+                state.receive()
+
+    return state.path()
@@ -0,0 +1,300 @@
+"""A sidecar index of where each run is in a YAML results log.
+
+The index sits next to the log, named after it with INDEX_SUFFIX, and holds the
+time stamp and byte offset of every document in the log, in the order they were
+logged. Its records are of a fixed size, so while the log is in time order the
+first and last run of a window can be found by a binary search that seeks
+through the index, and display reads only the part of the log between them.
+
+The header records how much of the log the index covers. Runs appended to the
+log since, by a version that did not keep an index for instance, are still
+read, just by scanning past the indexed part of the log. An index whose log
+has been truncated or replaced since is not used at all.
+"""
+
+from __future__ import annotations
+
+import fcntl
+import logging
+import os
+import struct
+from contextlib import contextmanager
+from typing import (
+    BinaryIO,
+    Callable,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    Union,
+)
+
+from internet_troubleshooter.result import (
+    DOCUMENT_END,
+    DOCUMENT_START,
+    TestResult,
+    TimeWindow,
+    document_time_stamp,
+    is_marker,
+    map_file,
+)
+
+logger = logging.getLogger(__name__)
+
+LogPath = Union[str, "os.PathLike[str]"]
+
+INDEX_SUFFIX = ".idx"
+
+# The header is the magic, the number of bytes of the log the index covers, and
+# whether its time stamps are in order. Each record is a document's time stamp
+# and the byte offset it starts at.
+MAGIC = b"CIIDX\x00\x00\x01"
+HEADER = struct.Struct("<8sQQ")
+RECORD = struct.Struct("<dQ")
+
+# A byte range of the log, read to its end when the end is None.
+Span = Tuple[int, Optional[int]]
+
+
+class LogIndexError(Exception):
+    """The index could not be read, or does not describe its log."""
+
+
+def index_path(yaml_filename: LogPath) -> str:
+    return os.fspath(yaml_filename) + INDEX_SUFFIX
+
+
+def _scan(log: BinaryIO, offset: int) -> Iterator[Tuple[Optional[float], int, int]]:
+    """The time stamp, start, and end of each complete document from offset on.
+
+    A document is complete once the marker ending it, or the next one starting,
+    has been written, so a run still being appended is left for a later update.
+    Documents holding nothing but their markers are not reported.
+    """
+    log.seek(offset)
+    position = offset
+    start: Optional[int] = None
+    document: List[str] = []
+
+    for raw in log:
+        line = raw.decode("utf-8")
+        if is_marker(line, DOCUMENT_START) or is_marker(line, DOCUMENT_END):
+            if start is not None and any(part.strip() for part in document):
+                yield document_time_stamp("".join(document)), start, position
+            document = []
+            start = position if is_marker(line, DOCUMENT_START) else None
+        else:
+            if start is None and line.strip():
+                start = position
+            document.append(line)
+        position += len(raw)
+
+
+def _read_header(index: BinaryIO) -> Tuple[int, bool]:
+    header = index.read(HEADER.size)
+    if len(header) != HEADER.size:
+        raise LogIndexError("the index is truncated")
+    magic, indexed_size, in_order = HEADER.unpack(header)
+    if magic != MAGIC:
+        raise LogIndexError("the index was not written by checkinternet")
+    return indexed_size, bool(in_order)
+
+
+def _write_records(
+    index: BinaryIO,
+    log: BinaryIO,
+    indexed_size: int,
+    in_order: bool,
+    last_time_stamp: Optional[float],
+) -> int:
+    """Index the documents of the log past indexed_size, returning how many."""
+    count = 0
+    for time_stamp, start, end in _scan(log, indexed_size):
+        if time_stamp is None or (
+            last_time_stamp is not None and time_stamp < last_time_stamp
+        ):
+            in_order = False
+        if time_stamp is not None:
+            index.write(RECORD.pack(time_stamp, start))
+            last_time_stamp = time_stamp
+        indexed_size = end
+        count += 1
+
+    index.seek(0)
+    index.write(HEADER.pack(MAGIC, indexed_size, in_order))
+    return count
+
+
+@contextmanager
+def _locked(log: BinaryIO) -> Iterator[None]:
+    """Hold an exclusive lock on log while its index is written.
+
+    Without it, two processes appending to the same log, such as the daemon and
+    a manual run, could each write the index from what they read of it, and
+    the one writing last would drop the records of the other.
+    """
+    fcntl.flock(log.fileno(), fcntl.LOCK_EX)
+    try:
+        yield
+    finally:
+        fcntl.flock(log.fileno(), fcntl.LOCK_UN)
+
+
+def _reindex(log: BinaryIO, path: str) -> int:
+    """Build the index of log at path from scratch, returning how many runs it holds.
+
+    The index is written aside and moved into place, so a reader never sees it
+    half written.
+    """
+    partial = path + ".tmp"
+    with open(partial, "wb") as index:
+        index.write(HEADER.pack(MAGIC, 0, True))
+        count = _write_records(index, log, 0, True, None)
+    os.replace(partial, path)
+    return count
+
+
+def reindex(yaml_filename: LogPath) -> int:
+    """Build the index of a log from scratch, returning how many runs it holds."""
+    with open(yaml_filename, "rb") as log, _locked(log):
+        return _reindex(log, index_path(yaml_filename))
+
+
+def update_index(yaml_filename: LogPath, create: bool = False) -> None:
+    """Index the runs appended to a log since its index was last updated.
+
+    A log without an index is only indexed from scratch when create is set,
+    since that reads the whole log. An index that no longer describes its log is
+    left alone for reindex to replace.
+    """
+    path = index_path(yaml_filename)
+    with open(yaml_filename, "rb") as log, _locked(log):
+        if not os.path.exists(path):
+            if create:
+                _reindex(log, path)
+            return
+
+        with open(path, "r+b") as index:
+            try:
+                indexed_size, in_order = _read_header(index)
+                _check_log(log, index, indexed_size)
+            except LogIndexError as error:
+                logger.debug("Not updating the index of %s: %s", yaml_filename, error)
+                return
+            count = _record_count(index)
+            last_time_stamp = _record(index, count - 1)[0] if count else None
+            index.seek(0, os.SEEK_END)
+            _write_records(index, log, indexed_size, in_order, last_time_stamp)
+
+
+def _record_count(index: BinaryIO) -> int:
+    size = index.seek(0, os.SEEK_END)
+    count, remainder = divmod(size - HEADER.size, RECORD.size)
+    if remainder:
+        raise LogIndexError("the index is truncated")
+    return count
+
+
+def _record(index: BinaryIO, position: int) -> Tuple[float, int]:
+    index.seek(HEADER.size + position * RECORD.size)
+    time_stamp, offset = RECORD.unpack(index.read(RECORD.size))
+    return time_stamp, offset
+
+
+def _first_record(index: BinaryIO, count: int, after: Callable[[float], bool]) -> int:
+    """The position of the first record whose time stamp after holds for.
+
+    after must hold for every time stamp following one it holds for, which it
+    does for the time stamps of an index in order.
+    """
+    low, high = 0, count
+    while low < high:
+        middle = (low + high) // 2
+        if after(_record(index, middle)[0]):
+            high = middle
+        else:
+            low = middle + 1
+    return low
+
+
+def _check_log(log: BinaryIO, index: BinaryIO, indexed_size: int) -> None:
+    """Raise LogIndexError unless the log still starts with what was indexed.
+
+    Only the last indexed run is checked, which is enough to tell a log that
+    was truncated, rotated, or replaced since.
+    """
+    if log.seek(0, os.SEEK_END) < indexed_size:
+        raise LogIndexError("the log is shorter than the part of it indexed")
+    count = _record_count(index)
+    if count == 0:
+        return
+    time_stamp, offset = _record(index, count - 1)
+    found = next(_scan(log, offset), None)
+    if found is None or found[:2] != (time_stamp, offset):
+        raise LogIndexError("the log no longer matches its index")
+
+
+def _window_spans(log: BinaryIO, index: BinaryIO, window: TimeWindow) -> List[Span]:
+    """The parts of the log that hold every run inside window."""
+    indexed_size, in_order = _read_header(index)
+    if not in_order:
+        raise LogIndexError("the log is not in time order")
+    _check_log(log, index, indexed_size)
+
+    count = _record_count(index)
+    first = 0
+    if window.since is not None:
+        since = window.since
+        first = _first_record(index, count, lambda time_stamp: time_stamp >= since)
+    last = count
+    if window.until is not None:
+        until = window.until
+        last = _first_record(index, count, lambda time_stamp: time_stamp > until)
+
+    start = indexed_size if first == count else _record(index, first)[1]
+    if last == count:
+        return [(start, None)]
+
+    # Runs appended since the index was updated are not in it, and need not be
+    # in order, so they are read whatever the window.
+    spans: List[Span] = [(indexed_size, None)]
+    if first < last:
+        spans.insert(0, (start, _record(index, last)[1]))
+    return spans
+
+
+def _iter_spans(
+    log: BinaryIO, spans: Iterable[Span], window: TimeWindow
+) -> Iterator[TestResult]:
+    with log:
+        mapped = map_file(log)
+        if mapped is None:
+            return
+        with mapped:
+            for start, end in spans:
+                yield from TestResult.iter_mapped(mapped, window, start, end)
+
+
+def iter_results(
+    yaml_filename: LogPath, window: Optional[TimeWindow] = None
+) -> Iterator[TestResult]:
+    """Read the results of a log inside window, using its index where it can.
+
+    Without a usable index, or a window, this is TestResult.iter_results, so a
+    log that cannot be opened likewise raises OSError straight away.
+    """
+    if window is None or (window.since is None and window.until is None):
+        return TestResult.iter_results(yaml_filename, window)
+
+    log = open(yaml_filename, "rb")
+    try:
+        with open(index_path(yaml_filename), "rb") as index:
+            spans = _window_spans(log, index, window)
+    except (OSError, LogIndexError, UnicodeDecodeError) as error:
+        log.close()
+        logger.debug("Not using the index of %s: %s", yaml_filename, error)
+        return TestResult.iter_results(yaml_filename, window)
+
+    logger.debug("Reading %s from the index: %s", yaml_filename, spans)
+    return _iter_spans(log, spans, window)
@@ -0,0 +1,154 @@
+"""Watches every hop on the way to a target for a while, as mtr does.
+
+The path is traced once, then the target and every hop on it are pinged in
+rounds for as long as the watch lasts. The round trip of each packet goes into
+a window of fixed size per address that holds only the latest of them, so the
+watch takes the same memory however long it runs, and a snapshot of every
+window, logged like the result of a run, can be taken at any point.
+"""
+
+from __future__ import annotations
+
+import logging
+import math
+import threading
+from array import array
+from time import monotonic
+from typing import Callable, Dict, Iterable, List, Optional, Sequence
+
+from internet_troubleshooter.ping_test import PingResult, PingSamples
+from internet_troubleshooter.result import TestResult
+from internet_troubleshooter.trace_test import TraceResult
+
+logger = logging.getLogger(__name__)
+
+# Each round sends this many packets to every address, at the rate ping sends
+# them, and rounds start no more often than every MTR_ROUND_INTERVAL seconds.
+# That is about a packet a second to each address, as mtr sends by default,
+# without forking a ping per address for every single packet.
+MTR_ROUND_COUNT = 10
+MTR_ROUND_INTERVAL = 10.0
+
+DEFAULT_MTR_DURATION = 600.0
+DEFAULT_MTR_SNAPSHOT_INTERVAL = 60.0
+DEFAULT_MTR_WINDOW = 600
+
+# Pings every address given once, returning their results in the same order.
+PingRound = Callable[[Sequence[str]], List[Optional[PingResult]]]
+
+
+class RingBuffer:
+    """The last size values appended, in an array of doubles of that size."""
+
+    __slots__ = ("_values", "_next", "_count")
+
+    def __init__(self, size: int) -> None:
+        self._values = array("d", [math.nan]) * size
+        self._next = 0
+        self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def extend(self, values: Iterable[float]) -> None:
+        size = len(self._values)
+        for value in values:
+            self._values[self._next] = value
+            self._next = (self._next + 1) % size
+            self._count = min(self._count + 1, size)
+
+    def values(self) -> "array[float]":
+        """The values held, oldest first."""
+        if self._count < len(self._values):
+            return self._values[: self._count]
+        return self._values[self._next :] + self._values[: self._next]
+
+
+class PathMonitor:
+    """The latest round trips of the target and of every hop on the way to it."""
+
+    def __init__(self, target: str, hop_ips: Sequence[str], window: int) -> None:
+        self.target = target
+        self.hop_ips = list(hop_ips)
+        self.windows: Dict[str, RingBuffer] = {
+            ip: RingBuffer(window) for ip in self.addresses()
+        }
+
+    def addresses(self) -> List[str]:
+        """Every address pinged in a round, the target first."""
+        return [self.target] + self.hop_ips
+
+    def record(self, results: Sequence[Optional[PingResult]]) -> None:
+        """Add the packets of a round, one result per address, to the windows.
+
+        An address whose ping failed, or did not record its packets, adds
+        nothing to its window.
+        """
+        for ip, result in zip(self.addresses(), results):
+            if result is not None and result.samples is not None:
+                self.windows[ip].extend(result.samples.rtts_ms)
+
+    def _window_result(self, ip: str) -> Optional[PingResult]:
+        window = self.windows[ip]
+        if not window:
+            return None
+        return PingResult.from_samples(ip, PingSamples(window.values()))
+
+    def snapshot(self) -> TestResult:
+        """The windows as the result of a run that pinged and traced target.
+
+        Hops with nothing in their window yet are left out.
+        """
+        hop_results = [self._window_result(ip) for ip in self.hop_ips]
+        return TestResult(
+            ping_result=self._window_result(self.target),
+            trace_result=TraceResult(
+                ping_results=[result for result in hop_results if result]
+            ),
+            speed_result=None,
+        )
+
+
+def watch(
+    monitor: PathMonitor,
+    ping_round: PingRound,
+    on_snapshot: Callable[[TestResult], None],
+    duration: float,
+    snapshot_interval: float,
+    stop: threading.Event,
+    clock: Callable[[], float] = monotonic,
+    round_interval: float = MTR_ROUND_INTERVAL,
+) -> int:
+    """Ping monitor's addresses in rounds for duration seconds, or until stop.
+
+    on_snapshot is handed a snapshot every snapshot_interval seconds, and once
+    more at the end for the rounds since the last one. A round is never cut
+    short, so the watch can outlast duration by up to one round. Returns how
+    many rounds were run.
+    """
+    start = clock()
+    next_snapshot = start + snapshot_interval
+    rounds = 0
+    unreported = False
+    try:
+        while not stop.is_set() and clock() - start < duration:
+            round_start = clock()
+            monitor.record(ping_round(monitor.addresses()))
+            rounds += 1
+            unreported = True
+            logger.debug("Finished round %d in %.1fs", rounds, clock() - round_start)
+
+            if clock() >= next_snapshot:
+                on_snapshot(monitor.snapshot())
+                unreported = False
+                # Snapshots missed during a long round are not caught up on.
+                while next_snapshot <= clock():
+                    next_snapshot += snapshot_interval
+
+            remaining = start + duration - clock()
+            stop.wait(max(0.0, min(round_start + round_interval - clock(), remaining)))
+    finally:
+        # Also reached when interrupted, so the last rounds are not lost.
+        if unreported:
+            on_snapshot(monitor.snapshot())
+    return rounds
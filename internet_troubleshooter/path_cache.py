@@ -0,0 +1,99 @@
+"""Remembers the hops on the way to each target from one run to the next.
+
+A path rarely changes from one day to the next, while tracing it takes tens of
+seconds, most of them spent waiting out hops that never answer. The cache is a
+small JSON file in the cache directory, mapping each target to the hops last
+traced to it and when:
+
+    {"8.8.8.8": {"hops": ["192.168.1.1", "10.0.0.1"], "traced_at": 1700000000.0}}
+
+A missing or unreadable cache is simply empty, since every path in it can be
+traced again.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+from pathlib import Path
+from time import time
+from typing import Any, Callable, Dict, List, Optional
+
+from internet_troubleshooter.cache_file import load_cache_file, save_cache_file
+from internet_troubleshooter.config import default_cache_dir
+
+logger = logging.getLogger(__name__)
+
+PATH_CACHE_FILE_NAME = "paths.json"
+
+# Paths are traced again once they are a day old.
+DEFAULT_TRACE_CACHE_TTL = 86400.0
+
+# The daemon traces from threads of its own, which take turns at the file.
+_lock = threading.Lock()
+
+
+def default_path_cache_path() -> Path:
+    return default_cache_dir() / PATH_CACHE_FILE_NAME
+
+
+def _is_entry(entry: Any) -> bool:
+    return (
+        isinstance(entry, dict)
+        and isinstance(entry.get("hops"), list)
+        and all(isinstance(hop, str) for hop in entry["hops"])
+        and isinstance(entry.get("traced_at"), (int, float))
+    )
+
+
+class PathCache:
+    """The hops traced to each target, each kept for ttl seconds."""
+
+    def __init__(
+        self,
+        path: Optional[Path] = None,
+        ttl: float = DEFAULT_TRACE_CACHE_TTL,
+        clock: Callable[[], float] = time,
+    ) -> None:
+        self.path = default_path_cache_path() if path is None else path
+        self.ttl = ttl
+        self.clock = clock
+
+    def get(self, target: str) -> Optional[List[str]]:
+        """The hops to target, or None when there are none traced, or are stale."""
+        with _lock:
+            entry = self._load().get(target)
+        if entry is None:
+            return None
+        if not entry["hops"]:
+            # No hops to ping would leave a run nothing to find a loss in.
+            return None
+        age = self.clock() - entry["traced_at"]
+        if not 0 <= age < self.ttl:
+            logger.debug("Cached path to %s is %.0fs old, ignoring it", target, age)
+            return None
+        return list(entry["hops"])
+
+    def put(self, target: str, hops: List[str]) -> None:
+        """Remember hops as the path to target, as traced just now."""
+        with _lock:
+            entries = self._load()
+            entries[target] = {"hops": list(hops), "traced_at": self.clock()}
+            self._save(entries)
+
+    def invalidate(self, target: str) -> None:
+        """Forget the path to target, so the next run traces it again."""
+        with _lock:
+            entries = self._load()
+            if entries.pop(target, None) is not None:
+                self._save(entries)
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        return {
+            target: entry
+            for target, entry in load_cache_file(self.path).items()
+            if isinstance(target, str) and _is_entry(entry)
+        }
+
+    def _save(self, entries: Dict[str, Dict[str, Any]]) -> None:
+        save_cache_file(self.path, entries, "path cache")
@@ -1,12 +1,20 @@
 from __future__ import annotations
 
+import logging
+import math
 import os
 import re
 import sys
-from dataclasses import dataclass
-from typing import Any, Dict, Mapping, Optional, Sequence
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
 
-from internet_troubleshooter.utils import run_command, summarize
+from internet_troubleshooter import icmp
+from internet_troubleshooter.stats import Column, percentile
+from internet_troubleshooter.utils import run_command, stream_command, summarize
+
+logger = logging.getLogger(__name__)
 
 PACKET_LOSS_REGEX = re.compile(r"([\d.]+)%\s+packet\s+loss")
 
@@ -19,11 +27,37 @@ RTT_REGEX = re.compile(
     r"([\d.]+)/([\d.]+)/([\d.]+)(?:/([\d.]+))?\s*ms"
 )
 
+# A reply as a ping that is not quiet prints it, for instance
+# "64 bytes from 8.8.8.8: icmp_seq=3 ttl=117 time=20.3 ms". Busybox writes seq=
+# rather than icmp_seq=, and BSD writes time<1 for a reply within a millisecond.
+REPLY_REGEX = re.compile(r"\b(?:icmp_)?seq=(\d+)\b.*?\btime[=<]([\d.]+)\s*ms")
+TRANSMITTED_REGEX = re.compile(r"(\d+)\s+packets\s+transmitted")
+
 PING_TIMEOUT = 120
 
+# A flood ping prints a dot per packet rather than its replies, so root pings
+# every packet at this interval instead, in seconds, when recording each one.
+PER_PACKET_INTERVAL_ROOT = 0.01
+
+# Pings sent from this process go out at the rate ping would send them at: every
+# PER_PACKET_INTERVAL_ROOT as root, and otherwise ping's default of a second.
+NATIVE_INTERVAL_NON_ROOT = 1.0
+
 DEFAULT_PING_COUNT_ROOT = 400
 DEFAULT_PING_COUNT_NON_ROOT = 10
 
+# An adaptive ping sends its packets in batches of this many, and stops early
+# once the packet loss is known well enough: when the confidence interval on it
+# is no more than ADAPTIVE_LOSS_MARGIN percentage points either side, or lies
+# wholly above or below the packet loss that would call for a traceroute. The
+# count asked for is then only the most it sends.
+ADAPTIVE_BATCH_ROOT = 50
+ADAPTIVE_BATCH_NON_ROOT = 5
+ADAPTIVE_LOSS_MARGIN = 1.0
+
+# The normal quantile of the confidence the interval on packet loss is at, 95%.
+LOSS_CONFIDENCE_Z = 1.96
+
 
 def default_ping_count_for_uid(root_count: int, non_root_count: int) -> int:
     """Packet count to use when none was requested.
@@ -33,17 +67,134 @@ def default_ping_count_for_uid(root_count: int, non_root_count: int) -> int:
     return root_count if os.geteuid() == 0 else non_root_count
 
 
+def loss_interval(lost: int, sent: int) -> Tuple[float, float]:
+    """The confidence interval on the packet loss of sent packets, in percent.
+
+    This is the Wilson score interval, which unlike the textbook one stays
+    within 0 to 100% and is not collapsed to a point by a sample without loss.
+    """
+    if sent == 0:
+        return 0.0, 100.0
+    z2 = LOSS_CONFIDENCE_Z**2
+    loss = lost / sent
+    scale = 1 + z2 / sent
+    centre = (loss + z2 / (2 * sent)) / scale
+    margin = (
+        LOSS_CONFIDENCE_Z
+        * math.sqrt(loss * (1 - loss) / sent + z2 / (4 * sent * sent))
+        / scale
+    )
+    return 100.0 * max(0.0, centre - margin), 100.0 * min(1.0, centre + margin)
+
+
+def loss_decided(low: float, high: float, max_packet_loss: float) -> bool:
+    """Whether an interval on packet loss is as narrow as an adaptive ping needs."""
+    return (
+        high < max_packet_loss
+        or low > max_packet_loss
+        or (high - low) / 2 <= ADAPTIVE_LOSS_MARGIN
+    )
+
+
 def _optional_float(value: Any) -> Optional[float]:
     """A measurement as a float, or None where none was recorded."""
     return None if value is None else float(value)
 
 
+def _optional_int(value: Any) -> Optional[int]:
+    return None if value is None else int(value)
+
+
+class PingSamples:
+    """The round trip time of every packet of one ping, in the order sent.
+
+    They are kept in an array of doubles, eight bytes a packet however many
+    were sent, with NaN standing for a packet that was never answered.
+    """
+
+    __slots__ = ("rtts_ms",)
+
+    def __init__(self, rtts_ms: Iterable[float] = ()) -> None:
+        self.rtts_ms = array("d", rtts_ms)
+
+    def __len__(self) -> int:
+        return len(self.rtts_ms)
+
+    def record(self, sequence: int, rtt_ms: float) -> None:
+        """Record the reply to the packet numbered sequence."""
+        missing = sequence + 1 - len(self.rtts_ms)
+        if missing > 0:
+            self.rtts_ms.extend(array("d", [math.nan]) * missing)
+        self.rtts_ms[sequence] = rtt_ms
+
+    def finish(self, transmitted: int, first_sequence: int) -> None:
+        """Renumber the packets from 0, and count any left unanswered as lost.
+
+        first_sequence is the number ping gave the first packet it sent.
+        """
+        del self.rtts_ms[:first_sequence]
+        missing = transmitted - len(self.rtts_ms)
+        if missing > 0:
+            self.rtts_ms.extend(array("d", [math.nan]) * missing)
+
+    def received(self) -> List[float]:
+        """The round trip times of the packets that were answered."""
+        return [rtt for rtt in self.rtts_ms if not math.isnan(rtt)]
+
+    def packet_loss(self) -> float:
+        """The percentage of packets that were never answered."""
+        if not self.rtts_ms:
+            return 0.0
+        return 100.0 * (1 - len(self.received()) / len(self.rtts_ms))
+
+    def jitter_ms(self) -> Optional[float]:
+        """The mean difference between the round trips of successive replies."""
+        received = self.received()
+        if len(received) < 2:
+            return None
+        return sum(abs(b - a) for a, b in zip(received, received[1:])) / (
+            len(received) - 1
+        )
+
+    def percentile(self, percent: float) -> Optional[float]:
+        """The round trip time percent of the replies took no longer than.
+
+        Interpolated between the two nearest replies, as a spreadsheet does.
+        """
+        received = sorted(self.received())
+        if not received:
+            return None
+        return percentile(received, percent)
+
+    def loss_bursts(self) -> List[int]:
+        """How many packets in a row were lost, for each run of lost packets.
+
+        A few long bursts point at an outage, many bursts of one at a noisy
+        link, for the same packet loss.
+        """
+        bursts: List[int] = []
+        length = 0
+        for rtt in self.rtts_ms:
+            if math.isnan(rtt):
+                length += 1
+            elif length:
+                bursts.append(length)
+                length = 0
+        if length:
+            bursts.append(length)
+        return bursts
+
+
 @dataclass
 class PingResult:
     """Packet loss to an address, with the round trip times ping measured.
 
     The round trip figures are optional: a ping that lost every packet reports
     no statistics line, and results logged before they were recorded have none.
+    The jitter, percentiles, and loss bursts are only measured by a ping that
+    recorded every packet, whose samples are kept on the result but not logged.
+    An adaptive ping also records how many packets it sent before stopping,
+    and the confidence interval on its packet loss that it stopped at.
     """
 
     ip: str
@@ -52,17 +203,36 @@ class PingResult:
     rtt_avg_ms: Optional[float] = None
     rtt_max_ms: Optional[float] = None
     rtt_mdev_ms: Optional[float] = None
+    jitter_ms: Optional[float] = None
+    rtt_p50_ms: Optional[float] = None
+    rtt_p95_ms: Optional[float] = None
+    rtt_p99_ms: Optional[float] = None
+    loss_bursts: Optional[int] = None
+    longest_loss_burst: Optional[int] = None
+    packets_sent: Optional[int] = None
+    packet_loss_ci_low: Optional[float] = None
+    packet_loss_ci_high: Optional[float] = None
+    samples: Optional[PingSamples] = field(default=None, compare=False, repr=False)
 
     def __str__(self) -> str:
         return "{:.2f}%: {}".format(self.packet_loss, self.ip)
 
-    def _rtt_dict(self) -> Dict[str, float]:
-        """The round trip figures that were measured, keyed as they are logged."""
+    def _measured_dict(self) -> Dict[str, float]:
+        """The figures that were measured, keyed as they are logged."""
         measured = {
             "rtt_min_ms": self.rtt_min_ms,
             "rtt_avg_ms": self.rtt_avg_ms,
             "rtt_max_ms": self.rtt_max_ms,
             "rtt_mdev_ms": self.rtt_mdev_ms,
+            "jitter_ms": self.jitter_ms,
+            "rtt_p50_ms": self.rtt_p50_ms,
+            "rtt_p95_ms": self.rtt_p95_ms,
+            "rtt_p99_ms": self.rtt_p99_ms,
+            "loss_bursts": self.loss_bursts,
+            "longest_loss_burst": self.longest_loss_burst,
+            "packets_sent": self.packets_sent,
+            "packet_loss_ci_low": self.packet_loss_ci_low,
+            "packet_loss_ci_high": self.packet_loss_ci_high,
         }
         return {key: value for key, value in measured.items() if value is not None}
 
@@ -70,7 +240,7 @@ class PingResult:
         data: Dict[str, Any] = {"ip": self.ip, "packet_loss": self.packet_loss}
         # An unmeasured figure is left out rather than written as null, which
         # would only pad every logged document.
-        data.update(self._rtt_dict())
+        data.update(self._measured_dict())
         return data
 
     @classmethod
@@ -82,8 +252,45 @@ class PingResult:
             rtt_avg_ms=_optional_float(data.get("rtt_avg_ms")),
             rtt_max_ms=_optional_float(data.get("rtt_max_ms")),
             rtt_mdev_ms=_optional_float(data.get("rtt_mdev_ms")),
+            jitter_ms=_optional_float(data.get("jitter_ms")),
+            rtt_p50_ms=_optional_float(data.get("rtt_p50_ms")),
+            rtt_p95_ms=_optional_float(data.get("rtt_p95_ms")),
+            rtt_p99_ms=_optional_float(data.get("rtt_p99_ms")),
+            loss_bursts=_optional_int(data.get("loss_bursts")),
+            longest_loss_burst=_optional_int(data.get("longest_loss_burst")),
+            packets_sent=_optional_int(data.get("packets_sent")),
+            packet_loss_ci_low=_optional_float(data.get("packet_loss_ci_low")),
+            packet_loss_ci_high=_optional_float(data.get("packet_loss_ci_high")),
         )
 
+    @classmethod
+    def from_samples(cls, ip: str, samples: PingSamples) -> PingResult:
+        """The result ping would have reported for samples, and more besides."""
+        received = samples.received()
+        result = cls(ip=ip, packet_loss=samples.packet_loss())
+        if received:
+            mean = sum(received) / len(received)
+            result.rtt_min_ms = min(received)
+            result.rtt_avg_ms = mean
+            result.rtt_max_ms = max(received)
+            # ping's mdev is the population standard deviation.
+            result.rtt_mdev_ms = math.sqrt(
+                max(0.0, sum(rtt * rtt for rtt in received) / len(received) - mean**2)
+            )
+        result.add_samples(samples)
+        return result
+
+    def add_samples(self, samples: PingSamples) -> None:
+        """Keep every packet's round trip, and the figures derived from them."""
+        self.samples = samples
+        self.jitter_ms = samples.jitter_ms()
+        self.rtt_p50_ms = samples.percentile(50)
+        self.rtt_p95_ms = samples.percentile(95)
+        self.rtt_p99_ms = samples.percentile(99)
+        bursts = samples.loss_bursts()
+        self.loss_bursts = len(bursts)
+        self.longest_loss_burst = max(bursts, default=0)
+
     @staticmethod
     def parse_result(ip: str, result: str) -> Optional[PingResult]:
         packet_loss_match = PACKET_LOSS_REGEX.search(result)
@@ -105,37 +312,91 @@ class PingResult:
         )
 
     @staticmethod
-    def summarize(results: Sequence[Optional[PingResult]]) -> str:
-        packet_loss = [result.packet_loss for result in results if result is not None]
-        rtt_avg = [
-            result.rtt_avg_ms
-            for result in results
-            if result is not None and result.rtt_avg_ms is not None
-        ]
-        return "{}\n\n{}".format(
-            summarize(packet_loss, "Packet Loss", "%"),
-            summarize(rtt_avg, "Ping RTT", "ms"),
+    def parse_stream(ip: str, lines: Iterable[str]) -> Optional[PingResult]:
+        """Parse a ping that is not quiet, one line at a time as it prints them.
+
+        Each reply goes straight into the samples, and only the lines that are
+        not replies are kept, for parse_result to find ping's summary in. The
+        packet loss is still the figure ping reported.
+        """
+        samples = PingSamples()
+        others: List[str] = []
+        first_sequence = 1
+        for line in lines:
+            reply = REPLY_REGEX.search(line)
+            if reply is None:
+                others.append(line)
+            elif "DUP!" not in line:
+                sequence = int(reply.group(1))
+                samples.record(sequence, float(reply.group(2)))
+                # iputils numbers packets from 1, and BSD and busybox from 0,
+                # which only shows once packet 0 is answered.
+                if sequence == 0:
+                    first_sequence = 0
+
+        summary = "".join(others)
+        result = PingResult.parse_result(ip, summary)
+        if result is None:
+            return None
+        transmitted = TRANSMITTED_REGEX.search(summary)
+        samples.finish(
+            len(samples) if transmitted is None else int(transmitted.group(1)),
+            first_sequence,
         )
+        result.add_samples(samples)
+        return result
 
     @staticmethod
-    def execute_test(ip: str, count: Optional[int] = None) -> Optional[str]:
-        uid = os.geteuid()
+    def summarize(
+        packet_loss: Column, rtt_avg_ms: Column, target: Optional[str] = None
+    ) -> str:
+        """Summaries of the packet loss and average round trip times of the pings.
+
+        Each column holds a value per ping that measured it. Titled after target
+        when given, for the pings to one of several.
+        """
+        suffix = "" if target is None else " to {}".format(target)
+        return "{}\n\n{}".format(
+            summarize(packet_loss, "Packet Loss" + suffix, "%"),
+            summarize(rtt_avg_ms, "Ping RTT" + suffix, "ms"),
+        )
 
+    @staticmethod
+    def _command(
+        ip: str, count: Optional[int], per_packet: bool, warn: bool = True
+    ) -> List[str]:
         if count is None:
             count = default_ping_count_for_uid(
                 DEFAULT_PING_COUNT_ROOT, DEFAULT_PING_COUNT_NON_ROOT
             )
 
-        if uid == 0:
-            command = ["ping", "-f", "-q", "-c", str(count), ip]
+        if os.geteuid() != 0:
+            if warn:
+                print(
+                    "WARNING: Script not run as root, unable to flood ping.",
+                    "Packet loss may not be accurate.",
+                    file=sys.stderr,
+                )
+            mode = ["-n"] if per_packet else ["-q"]
+        elif per_packet:
+            mode = ["-n", "-i", str(PER_PACKET_INTERVAL_ROOT)]
         else:
-            print(
-                "WARNING: Script not run as root, unable to flood ping.",
-                "Packet loss may not be accurate.",
-                file=sys.stderr,
-            )
-            command = ["ping", "-q", "-c", str(count), ip]
+            mode = ["-f", "-q"]
+        return ["ping", *mode, "-c", str(count), ip]
 
+    @staticmethod
+    def execute_stream(
+        ip: str, count: Optional[int] = None, warn: bool = True
+    ) -> Optional[Iterable[str]]:
+        """Ping without -q, returning each line of its output as it is printed."""
+        return stream_command(
+            PingResult._command(ip, count, per_packet=True, warn=warn),
+            timeout=PING_TIMEOUT,
+        )
+
+    @staticmethod
+    def execute_test(ip: str, count: Optional[int] = None) -> Optional[str]:
+        command = PingResult._command(ip, count, per_packet=False)
         ping_result = run_command(command, timeout=PING_TIMEOUT)
 
         if ping_result is None:
@@ -144,7 +405,23 @@ class PingResult:
         return ping_result.stdout
 
     @staticmethod
-    def run_test(ip: str, count: Optional[int] = None) -> Optional[PingResult]:
+    def run_test(
+        ip: str,
+        count: Optional[int] = None,
+        per_packet: bool = False,
+        adaptive_loss: Optional[float] = None,
+    ) -> Optional[PingResult]:
+        """Ping ip, recording the round trip of every packet when per_packet.
+
+        With adaptive_loss, the packet loss that would call for a traceroute,
+        the ping is adaptive: every packet is recorded, and at most count are
+        sent, in batches until its packet loss is known well enough.
+        """
+        if adaptive_loss is not None:
+            return PingResult._run_adaptive(ip, count, adaptive_loss)
+        if per_packet:
+            return PingResult._run_per_packet(ip, count)
+
         output = PingResult.execute_test(ip, count)
         if output is None:
             return None
@@ -157,3 +434,122 @@ class PingResult:
             )
 
         return result
+
+    @staticmethod
+    def run_tests(
+        ips: Sequence[str],
+        count: Optional[int] = None,
+        per_packet: bool = False,
+        native: bool = False,
+        parallelism: Optional[int] = None,
+        adaptive_loss: Optional[float] = None,
+    ) -> List[Optional[PingResult]]:
+        """Ping every ip at the same time, returning their results in order.
+
+        ping is run up to parallelism at a time, by default all of them at
+        once. With native, the pings are sent from this process instead, all
+        over one socket, which also records every packet; any ip that cannot be
+        pinged that way, or all of them when no ICMP socket can be opened, is
+        pinged by running ping after all. adaptive_loss makes the pings run
+        with ping adaptive, as run_test does.
+        """
+        results: Dict[str, Optional[PingResult]] = {}
+        if native:
+            results.update(PingResult._run_native(ips, count))
+        remaining = [ip for ip in ips if ip not in results]
+        if remaining:
+            workers = max(1, min(parallelism or len(remaining), len(remaining)))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                results.update(
+                    zip(
+                        remaining,
+                        executor.map(
+                            lambda ip: PingResult.run_test(
+                                ip,
+                                count,
+                                per_packet=per_packet,
+                                adaptive_loss=adaptive_loss,
+                            ),
+                            remaining,
+                        ),
+                    )
+                )
+        return [results[ip] for ip in ips]
+
+    @staticmethod
+    def _run_native(
+        ips: Sequence[str], count: Optional[int]
+    ) -> Dict[str, Optional[PingResult]]:
+        if count is None:
+            count = default_ping_count_for_uid(
+                DEFAULT_PING_COUNT_ROOT, DEFAULT_PING_COUNT_NON_ROOT
+            )
+        interval = (
+            PER_PACKET_INTERVAL_ROOT if os.geteuid() == 0 else NATIVE_INTERVAL_NON_ROOT
+        )
+        try:
+            rtts_by_ip = icmp.probe(list(dict.fromkeys(ips)), count, interval)
+        except icmp.IcmpError as error:
+            print(
+                "WARNING: Running ping instead, {}.".format(error),
+                file=sys.stderr,
+            )
+            return {}
+        logger.debug("Pinged %s from this process", list(rtts_by_ip))
+        return {
+            ip: PingResult.from_samples(ip, PingSamples(rtts_ms))
+            for ip, rtts_ms in rtts_by_ip.items()
+        }
+
+    @staticmethod
+    def _run_per_packet(
+        ip: str, count: Optional[int], warn: bool = True
+    ) -> Optional[PingResult]:
+        lines = PingResult.execute_stream(ip, count, warn)
+        if lines is None:
+            return None
+
+        result = PingResult.parse_stream(ip, lines)
+        if result is None:
+            print("ERROR: Cannot find packet loss in ping test.", file=sys.stderr)
+
+        return result
+
+    @staticmethod
+    def _run_adaptive(
+        ip: str, count: Optional[int], max_packet_loss: float
+    ) -> Optional[PingResult]:
+        if count is None:
+            count = default_ping_count_for_uid(
+                DEFAULT_PING_COUNT_ROOT, DEFAULT_PING_COUNT_NON_ROOT
+            )
+        batch = default_ping_count_for_uid(ADAPTIVE_BATCH_ROOT, ADAPTIVE_BATCH_NON_ROOT)
+
+        samples = PingSamples()
+        low, high = loss_interval(0, 0)
+        while len(samples) < count:
+            result = PingResult._run_per_packet(
+                ip, min(batch, count - len(samples)), warn=not samples
+            )
+            if result is None or result.samples is None:
+                break
+            samples.rtts_ms.extend(result.samples.rtts_ms)
+            sent = len(samples)
+            low, high = loss_interval(sent - len(samples.received()), sent)
+            logger.debug(
+                "Adaptive ping to %s: %.2f%% to %.2f%% loss after %d packet(s)",
+                ip,
+                low,
+                high,
+                sent,
+            )
+            if loss_decided(low, high, max_packet_loss):
+                break
+
+        if not samples:
+            return None
+        result = PingResult.from_samples(ip, samples)
+        result.packets_sent = len(samples)
+        result.packet_loss_ci_low = low
+        result.packet_loss_ci_high = high
+        return result
@@ -2,8 +2,10 @@
 
 from __future__ import annotations
 
+import json
 import os
 import sys
+from array import array
 from dataclasses import dataclass
 from datetime import datetime
 from html import escape
@@ -21,21 +23,37 @@ from typing import (
     cast,
 )
 
+from internet_troubleshooter.chart_levels import (
+    DAY_SECONDS,
+    Level,
+    build_levels,
+    choose_level,
+    raw_level,
+)
 from internet_troubleshooter.ping_test import PingResult
 from internet_troubleshooter.result import TestResult
 from internet_troubleshooter.speed_test import SpeedResult
 from internet_troubleshooter.trace_test import TraceResult
-from internet_troubleshooter.utils import safe_mean
+from internet_troubleshooter.typed_arrays import (
+    date_milliseconds,
+    date_offsets,
+    epoch_milliseconds,
+    float32_array,
+    typed_array,
+)
+from internet_troubleshooter.utils import (
+    PLOT_DOWNLOAD_MBPS,
+    PLOT_LATENCY_MS,
+    PLOT_PACKET_LOSS_PCT,
+    PLOT_UPLOAD_MBPS,
+    safe_mean,
+)
 
 # Either an open text stream or a path to write the report to.
 HtmlTarget = Union[TextIO, str, "os.PathLike[str]"]
 
-# Reference lines drawn on the HTML plots, marking the thresholds below which a
-# connection is considered to be underperforming.
-PLOT_DOWNLOAD_MBPS = 50
-PLOT_UPLOAD_MBPS = 15
-PLOT_LATENCY_MS = 20
-PLOT_PACKET_LOSS_PCT = 3
+# The round trip times and packet loss of one ping target, aligned to the runs.
+PingSeries = Tuple[List[Optional[float]], List[Optional[float]]]
 
 # Chart colors, matching the CSS variables below so the plots and the document
 # around them read as one dark themed report.
@@ -50,9 +68,319 @@ COLOR_LATENCY = "#fbbf24"
 COLOR_PING = "#5eead4"
 COLOR_LOSS = "#f472b6"
 COLOR_BAD = "#f87171"
+# The pings of any targets besides the first, in the order they were first seen,
+# starting over when there are more targets than colors.
+COLORS_EXTRA_PINGS = ("#a3e635", "#fb923c", "#e879f9", "#94a3b8")
 
 CHART_HEIGHT = 780
 
+# The first plotly major version to accept typed arrays, as {"dtype", "bdata"},
+# for the data of a trace. Older ones are given plain lists instead.
+PLOTLY_TYPED_ARRAYS_MAJOR = 6
+
+# Lines with at least this many points are drawn with WebGL, which keeps a long
+# history responsive where SVG would lay out an element per point.
+WEBGL_MIN_POINTS = 1000
+
+# The rows of the charts, top to bottom: speed, latency, and packet loss.
+CHART_ROWS = (1, 2, 3)
+
+# The keys of the series the charts draw. Each trace is named by its key, which
+# the script swapping in finer levels as the charts are zoomed finds it by.
+SERIES_DOWNLOAD = "download"
+SERIES_UPLOAD = "upload"
+SERIES_LATENCY = "latency"
+SERIES_PING_RTT = "ping_rtt"
+SERIES_PACKET_LOSS = "packet_loss"
+
+# What each hover block lists, in order: the label, series, and unit of each.
+HOVER_METRICS = (
+    ("Download", SERIES_DOWNLOAD, " Mbps"),
+    ("Upload", SERIES_UPLOAD, " Mbps"),
+    ("Latency", SERIES_LATENCY, " ms"),
+    ("Ping RTT", SERIES_PING_RTT, " ms"),
+    ("Packet loss", SERIES_PACKET_LOSS, "%"),
+)
+
+# The series whose traces carry the hover block of their row.
+HOVER_SERIES = (SERIES_DOWNLOAD, SERIES_LATENCY, SERIES_PACKET_LOSS)
+
+# The traces marking incomplete runs are named this, followed by their row.
+INCOMPLETE_RUN_MARKERS = "incomplete-"
+
+# What a point of each coarser level spans, as the charts panel words it.
+LEVEL_SPANS = {60 * 60: "hour", DAY_SECONDS: "day"}
+
+# Swaps in the finest level of the chart series that draws at most maxPoints
+# points across the range zoomed into, sliced to that range. The levels are
+# embedded as typed arrays, which are decoded the first time they are drawn,
+# and the hover blocks of the points drawn are then written as _level_hover_texts
+# writes them.
+LEVEL_SCRIPT = """
+var chart = document.getElementById("{plot_id}");
+var chartLevels = {levels};
+function decode(packed) {
+  var text = atob(packed.bdata), bytes = new Uint8Array(text.length);
+  for (var i = 0; i < text.length; i++) {
+    bytes[i] = text.charCodeAt(i);
+  }
+  var types = {i4: Int32Array, f4: Float32Array, f8: Float64Array};
+  return new types[packed.dtype](bytes.buffer);
+}
+function decodeLevel(level) {
+  if (level.decoded) {
+    return level.decoded;
+  }
+  var offsets = decode(level.x), x = new Float64Array(offsets.length);
+  for (var i = 0; i < offsets.length; i++) {
+    x[i] = level.start + offsets[i] * 1000;
+  }
+  var series = {};
+  Object.keys(level.series).forEach(function (key) {
+    var packed = level.series[key];
+    series[key] = {
+      y: decode(packed.y),
+      low: packed.low && decode(packed.low),
+      high: packed.high && decode(packed.high)
+    };
+  });
+  level.decoded = {
+    x: x,
+    runs: level.runs && decode(level.runs),
+    series: series,
+    incomplete: decode(level.incomplete)
+  };
+  return level.decoded;
+}
+function rangeTime(value) {
+  if (typeof value === "number") {
+    return value;
+  }
+  var parts = String(value).match(
+    /^([0-9]+)-([0-9]+)-([0-9]+)(?:[ T]([0-9]+):([0-9]+)(?::([0-9.]+))?)?/
+  );
+  return Date.UTC(+parts[1], parts[2] - 1, +parts[3], +(parts[4] || 0),
+    +(parts[5] || 0)) + parseFloat(parts[6] || "0") * 1000;
+}
+function countBefore(times, time, inclusive) {
+  var low = 0, high = times.length;
+  while (low < high) {
+    var middle = (low + high) >> 1;
+    if (times[middle] < time || (inclusive && times[middle] === time)) {
+      low = middle + 1;
+    } else {
+      high = middle;
+    }
+  }
+  return low;
+}
+function inRange(times, range) {
+  return [countBefore(times, range[0], false), countBefore(times, range[1], true)];
+}
+function hoverValue(value, unit) {
+  return isNaN(value) ? chartLevels.missing : value.toFixed(2) + unit;
+}
+function hoverRange(series, i, unit) {
+  var mean = series.y[i];
+  if (!series.low || isNaN(mean) || series.low[i] === series.high[i]) {
+    return hoverValue(mean, unit);
+  }
+  return hoverValue(mean, unit) + " (" + series.low[i].toFixed(2) + " to " +
+    series.high[i].toFixed(2) + ")";
+}
+function hoverText(level, i) {
+  var lines = [];
+  if (level.runs) {
+    lines.push(level.runs[i] + (level.runs[i] === 1 ? " run" : " runs"));
+  }
+  chartLevels.metrics.forEach(function (metric) {
+    lines.push(metric[0] + ": " + hoverRange(level.series[metric[1]], i, metric[2]));
+  });
+  chartLevels.targets.forEach(function (target) {
+    lines.push(target[0] + ": " + hoverRange(level.series[target[1]], i, " ms") +
+      ", " + hoverRange(level.series[target[2]], i, "%") + " loss");
+  });
+  return lines.join("<br>");
+}
+function errorBars(series, start, end) {
+  if (!series.low) {
+    return {visible: false};
+  }
+  var above = [], below = [];
+  for (var i = start; i < end; i++) {
+    above.push(series.high[i] - series.y[i]);
+    below.push(series.y[i] - series.low[i]);
+  }
+  return {
+    type: "data", symmetric: false, array: above, arrayminus: below,
+    thickness: 1, width: 0, visible: true
+  };
+}
+function showLevel(level, range) {
+  var bounds = inRange(level.x, range);
+  // A point either side of the range carries the lines on to its edges.
+  var start = Math.max(bounds[0] - 1, 0), end = Math.min(bounds[1] + 1, level.x.length);
+  var lines = [], hovers = [], markers = [], texts = [];
+  var update = {x: [], y: [], error_y: []};
+  for (var i = start; i < end; i++) {
+    texts.push(hoverText(level, i));
+  }
+  chart.data.forEach(function (trace, index) {
+    var series = level.series[trace.uid];
+    if (series) {
+      lines.push(index);
+      update.x.push(level.x.slice(start, end));
+      update.y.push(series.y.slice(start, end));
+      update.error_y.push(errorBars(series, start, end));
+      if (chartLevels.hover.indexOf(trace.uid) >= 0) {
+        hovers.push(index);
+      }
+    } else if (String(trace.uid).indexOf(chartLevels.markers) === 0) {
+      markers.push(index);
+    }
+  });
+  Plotly.restyle(chart, update, lines);
+  Plotly.restyle(chart, {text: [texts]}, hovers);
+  if (markers.length) {
+    var marked = inRange(level.incomplete, range), markerX = [], markerY = [];
+    level.incomplete.slice(marked[0], marked[1]).forEach(function (time) {
+      markerX.push(time, time, null);
+      markerY.push(0, 1, null);
+    });
+    Plotly.restyle(chart, {x: [markerX], y: [markerY]}, markers);
+  }
+}
+// Resetting the axes autoranges them over the points drawn, which are only
+// those of the range last zoomed into, so a reset draws every point again.
+function isReset(event) {
+  return Object.keys(event || {}).some(function (key) {
+    return /^xaxis[0-9]*\\.autorange$/.test(key) && event[key];
+  });
+}
+chart.on("plotly_relayout", function (event) {
+  var levels = chartLevels.levels.map(decodeLevel);
+  var everything = levels[0].x, range;
+  if (isReset(event)) {
+    range = [everything[0], everything[everything.length - 1]];
+  } else {
+    range = chart.layout.xaxis.range.map(rangeTime);
+  }
+  var chosen = levels[levels.length - 1];
+  for (var i = 0; i < levels.length; i++) {
+    var bounds = inRange(levels[i].x, range);
+    if (bounds[1] - bounds[0] <= chartLevels.maxPoints) {
+      chosen = levels[i];
+      break;
+    }
+  }
+  showLevel(chosen, range);
+});
+"""
+
+# Every row of the traceroute table is this many pixels tall, as PAGE_CSS sets
+# it, and the column of each run and of the hop numbers this many wide.
+TRACE_ROW_HEIGHT = 37
+TRACE_COLUMN_WIDTH = 220
+TRACE_HOP_WIDTH = 64
+
+# Where a hop is missing from a trace, or was not pinged, the table holds this
+# in place of the position of its address.
+TRACE_MISSING_HOP = -1
+
+# Draws only the rows and run columns of the traceroute table scrolled into
+# view, plus a few either side, so a month of traces keeps the page to a few
+# hundred cells. The rest of the table is taken up by empty spacer cells, which
+# keep the scrollbars true to the whole of it, and cells are only redrawn once
+# a different range of them is in view, which keeps a selection across them.
+TRACE_TABLE_SCRIPT = """
+(function () {
+  var traces = {traces};
+  var scroller = document.getElementById("trace-table");
+  var table = scroller.querySelector("table.trace");
+  var columns = traces.times.length, rows = traces.hops.length;
+  var width = traces.columnWidth, height = traces.rowHeight;
+  var overscan = 4, drawn = null, pending = false;
+  table.style.width = traces.hopWidth + columns * width + "px";
+  function escapeText(text) {
+    return text.replace(/[&<>"]/g, function (character) {
+      return {"&": "&amp;", "<": "&lt;", ">": "&gt;", '"': "&quot;"}[character];
+    });
+  }
+  function inView(offset, extent, size, count) {
+    return [
+      Math.max(0, Math.floor(offset / size) - overscan),
+      Math.min(count, Math.ceil((offset + extent) / size) + overscan)
+    ];
+  }
+  function col(pixels) {
+    return '<col style="width:' + pixels + 'px">';
+  }
+  function gap(pixels, span) {
+    if (!pixels) {
+      return "";
+    }
+    return '<tr class="gap"><td colspan="' + span + '" style="height:' +
+      pixels + 'px"></td></tr>';
+  }
+  function cell(row, column) {
+    var address = traces.hops[row][column];
+    if (address < 0) {
+      return '<td class="cell--missing">' + traces.missing + "</td>";
+    }
+    var loss = traces.losses[row][column];
+    var lossClass = traces.bad[row][column] ? "loss loss--bad" : "loss";
+    var ip = escapeText(traces.addresses[address]);
+    return '<td title="' + ip + '"><span class="hop-ip">' + ip + "</span> " +
+      '<span class="' + lossClass + '">' + loss.toFixed(2) + "%</span></td>";
+  }
+  function render() {
+    pending = false;
+    var across = inView(scroller.scrollLeft, scroller.clientWidth, width, columns);
+    var down = inView(scroller.scrollTop, scroller.clientHeight, height, rows);
+    var key = across.concat(down).join();
+    if (key === drawn) {
+      return;
+    }
+    drawn = key;
+    var first = across[0], last = across[1], top = down[0], bottom = down[1];
+    var before = first * width, after = (columns - last) * width;
+    var cols = col(traces.hopWidth) + (before ? col(before) : "");
+    var header = '<th scope="col" class="col-hop">Hop</th>' +
+      (before ? "<th></th>" : "");
+    for (var column = first; column < last; column++) {
+      cols += col(width);
+      header += '<th scope="col">' + escapeText(traces.times[column]) + "</th>";
+    }
+    if (after) {
+      cols += col(after);
+      header += "<th></th>";
+    }
+    var span = last - first + 1 + (before ? 1 : 0) + (after ? 1 : 0);
+    var body = gap(top * height, span);
+    for (var row = top; row < bottom; row++) {
+      body += '<tr><th scope="row" class="col-hop">' + (row + 1) + "</th>" +
+        (before ? "<td></td>" : "");
+      for (var column = first; column < last; column++) {
+        body += cell(row, column);
+      }
+      body += (after ? "<td></td>" : "") + "</tr>";
+    }
+    body += gap((rows - bottom) * height, span);
+    table.innerHTML = "<colgroup>" + cols + "</colgroup><thead><tr>" + header +
+      "</tr></thead><tbody>" + body + "</tbody>";
+  }
+  function schedule() {
+    if (!pending) {
+      pending = true;
+      window.requestAnimationFrame(render);
+    }
+  }
+  scroller.addEventListener("scroll", schedule, {passive: true});
+  window.addEventListener("resize", schedule);
+  render();
+})();
+"""
+
 DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
 
 MISSING_VALUE = "&mdash;"
@@ -158,18 +486,21 @@ body {
   max-height: 460px; overflow: auto; border: 1px solid var(--border);
   border-radius: 10px; background: #131620;
 }
-table.trace { border-collapse: separate; border-spacing: 0; width: 100%; }
+table.trace { border-collapse: separate; border-spacing: 0; table-layout: fixed; }
 table.trace th, table.trace td {
   padding: 8px 14px; text-align: left; white-space: nowrap;
   border-bottom: 1px solid var(--border); font-size: 0.85rem;
+  overflow: hidden; text-overflow: ellipsis;
 }
+table.trace tbody tr { height: 37px; }
+table.trace tr.gap td { padding: 0; border: 0; }
 table.trace thead th {
   position: sticky; top: 0; z-index: 2; background: var(--panel-alt);
   color: var(--text); font-weight: 600;
 }
 table.trace th.col-hop {
   position: sticky; left: 0; z-index: 1; background: var(--panel-alt);
-  color: var(--muted); font-variant-numeric: tabular-nums; width: 1%;
+  color: var(--muted); font-variant-numeric: tabular-nums;
 }
 table.trace thead th.col-hop { z-index: 3; }
 table.trace tbody tr:hover td { background: rgba(56, 189, 248, 0.07); }
@@ -227,15 +558,51 @@ where a test did not complete.</p>
 """
 
 
-def to_human(results: Sequence[TestResult], io_target: TextIO = sys.stdout) -> None:
-    speed_results = [result.speed_result for result in results]
-    ping_results = [result.ping_result for result in results]
-    print(
-        "{}\n\n{}".format(
-            SpeedResult.summarize(speed_results), PingResult.summarize(ping_results)
-        ),
-        file=io_target,
+class _PingColumns:
+    """The packet loss and average round trip time of every ping that has them."""
+
+    def __init__(self) -> None:
+        self.packet_loss = array("d")
+        self.rtt_avg_ms = array("d")
+
+    def add(self, ping: Optional[PingResult]) -> None:
+        if ping is None:
+            return
+        self.packet_loss.append(ping.packet_loss)
+        if ping.rtt_avg_ms is not None:
+            self.rtt_avg_ms.append(ping.rtt_avg_ms)
+
+
+def to_human(results: Iterable[TestResult], io_target: TextIO = sys.stdout) -> None:
+    """Print the text summary, consuming results one at a time.
+
+    Only the figures the summary reports are kept from each result, packed into
+    a column of floats per figure, so results read lazily from a file are never
+    all held at once.
+    """
+    download, upload, latency = array("d"), array("d"), array("d")
+    pings = _PingColumns()
+    extra_pings: Dict[str, _PingColumns] = {}
+    for result in results:
+        speed = result.speed_result
+        if speed is not None:
+            download.append(speed.download)
+            upload.append(speed.upload)
+            latency.append(speed.latency)
+        pings.add(result.ping_result)
+        for extra in result.extra_ping_results:
+            extra_pings.setdefault(extra.ip, _PingColumns()).add(extra)
+        for ip in result.failed_extra_pings:
+            extra_pings.setdefault(ip, _PingColumns())
+    summaries = [
+        SpeedResult.summarize(download, upload, latency),
+        PingResult.summarize(pings.packet_loss, pings.rtt_avg_ms),
+    ]
+    summaries.extend(
+        PingResult.summarize(columns.packet_loss, columns.rtt_avg_ms, target=ip)
+        for ip, columns in extra_pings.items()
     )
+    print("\n\n".join(summaries), file=io_target)
 
 
 def _import_plotly() -> Tuple[Any, Any]:
@@ -252,6 +619,28 @@ def _import_plotly() -> Tuple[Any, Any]:
     return go, make_subplots
 
 
+def _plotly_takes_typed_arrays() -> bool:
+    """Whether the plotly installed accepts typed arrays for the data of a trace."""
+    import plotly
+
+    major = str(plotly.__version__).split(".")[0]
+    return major.isdigit() and int(major) >= PLOTLY_TYPED_ARRAYS_MAJOR
+
+
+def _trace_values(values: Sequence[Optional[float]]) -> Any:
+    """values for a trace, as a typed array wherever plotly takes one."""
+    if _plotly_takes_typed_arrays():
+        return float32_array(values)
+    return list(values)
+
+
+def _trace_dates(dates: Sequence[datetime]) -> Any:
+    """dates for a trace, as a typed array wherever plotly takes one."""
+    if _plotly_takes_typed_arrays():
+        return date_milliseconds(dates)
+    return [epoch_milliseconds(date) for date in dates]
+
+
 def _aligned_series(
     results: Sequence[TestResult],
 ) -> Tuple[
@@ -285,11 +674,43 @@ def _aligned_series(
     return dates, download, upload, latency, ping_rtt, packet_loss
 
 
+def _extra_ping_series(
+    results: Sequence[TestResult],
+) -> Dict[str, PingSeries]:
+    """The round trip times and packet loss of each extra target, by its IP.
+
+    Like _aligned_series, each list is aligned to every run's date, holding
+    None for the runs that did not ping that target, or failed to. A target
+    whose every ping failed still has its series, all None.
+    """
+    pings_by_target: Dict[str, List[Optional[PingResult]]] = {}
+    for position, result in enumerate(results):
+        for extra in result.extra_ping_results:
+            pings = pings_by_target.setdefault(extra.ip, [None] * len(results))
+            pings[position] = extra
+        for ip in result.failed_extra_pings:
+            pings_by_target.setdefault(ip, [None] * len(results))
+    return {
+        ip: (
+            [None if ping is None else ping.rtt_avg_ms for ping in pings],
+            [None if ping is None else ping.packet_loss for ping in pings],
+        )
+        for ip, pings in pings_by_target.items()
+    }
+
+
 def _measured(values: Sequence[Optional[float]]) -> List[float]:
     """The values that were actually recorded, dropping the missing ones."""
     return [value for value in values if value is not None]
 
 
+def _level_span(seconds: int) -> str:
+    """What a point of a coarser level spans, as the charts panel words it."""
+    if seconds in LEVEL_SPANS:
+        return LEVEL_SPANS[seconds]
+    return "{}-day span".format(seconds // DAY_SECONDS)
+
+
 def _format_threshold(value: float) -> str:
     """A threshold as written in labels, without a pointless trailing zero."""
     return "{:g}".format(value)
@@ -330,6 +751,20 @@ def _hover_texts(
     ]
 
 
+def _extra_ping_hover_texts(
+    hover_texts: Sequence[str],
+    extra_series: Mapping[str, PingSeries],
+) -> List[str]:
+    """The hover blocks, with a line per run for each extra target."""
+    texts = list(hover_texts)
+    for ip, (ping_rtt, packet_loss) in extra_series.items():
+        for position, (run_rtt, run_loss) in enumerate(zip(ping_rtt, packet_loss)):
+            texts[position] += "<br>{}: {}, {} loss".format(
+                ip, _hover_value(run_rtt, " ms"), _hover_value(run_loss, "%")
+            )
+    return texts
+
+
 def _packet_loss_axis_max(
     values: Sequence[Optional[float]],
     thresholds: RenderThresholds = DEFAULT_THRESHOLDS,
@@ -364,33 +799,159 @@ def _add_threshold_line(
     )
 
 
+def _series_key(metric: str, ip: str) -> str:
+    """The key of an extra target's series of metric."""
+    return "{} {}".format(metric, ip)
+
+
+def _extra_ping_ips(level: Level) -> List[str]:
+    """The extra targets level holds series for, in the order first seen."""
+    prefix = _series_key(SERIES_PING_RTT, "")
+    return [key[len(prefix) :] for key in level.means if key.startswith(prefix)]
+
+
+def _chart_levels(
+    results: Sequence[TestResult], max_points: Optional[int]
+) -> List[Level]:
+    """The levels the charts can be drawn at, finest first.
+
+    There are coarser levels than every run only when there are more runs than
+    max_points, as none are needed otherwise.
+    """
+    dates, download, upload, latency, ping_rtt, packet_loss = _aligned_series(results)
+    series = {
+        SERIES_DOWNLOAD: download,
+        SERIES_UPLOAD: upload,
+        SERIES_LATENCY: latency,
+        SERIES_PING_RTT: ping_rtt,
+        SERIES_PACKET_LOSS: packet_loss,
+    }
+    for ip, (extra_rtt, extra_loss) in _extra_ping_series(results).items():
+        series[_series_key(SERIES_PING_RTT, ip)] = extra_rtt
+        series[_series_key(SERIES_PACKET_LOSS, ip)] = extra_loss
+    incomplete = [result.incomplete for result in results]
+    raw = raw_level(dates, series, incomplete)
+    if not max_points or len(dates) <= max_points:
+        return [raw]
+    return build_levels(raw, max_points)
+
+
+def _range_hover_value(level: Level, key: str, position: int, unit: str) -> str:
+    """The mean of a point, followed by its range when the runs differ."""
+    mean = level.means[key][position]
+    low, high = level.lows[key][position], level.highs[key][position]
+    if mean is None or low is None or high is None or low == high:
+        return _hover_value(mean, unit)
+    return "{} ({:.2f} to {:.2f})".format(_hover_value(mean, unit), low, high)
+
+
+def _level_hover_texts(level: Level) -> List[str]:
+    """One hover block per point of level, as _hover_texts is per run.
+
+    A point spanning several runs reports how many, and the mean and range of
+    each metric over them.
+    """
+    ips = _extra_ping_ips(level)
+    if level.seconds == 0:
+        extra_series = {
+            ip: (
+                level.means[_series_key(SERIES_PING_RTT, ip)],
+                level.means[_series_key(SERIES_PACKET_LOSS, ip)],
+            )
+            for ip in ips
+        }
+        return _extra_ping_hover_texts(
+            _hover_texts(*(level.means[key] for _, key, _ in HOVER_METRICS)),
+            extra_series,
+        )
+
+    texts = []
+    for position, runs in enumerate(level.runs):
+        lines = ["{} run{}".format(runs, "" if runs == 1 else "s")]
+        lines.extend(
+            "{}: {}".format(label, _range_hover_value(level, key, position, unit))
+            for label, key, unit in HOVER_METRICS
+        )
+        lines.extend(
+            "{}: {}, {} loss".format(
+                ip,
+                _range_hover_value(
+                    level, _series_key(SERIES_PING_RTT, ip), position, " ms"
+                ),
+                _range_hover_value(
+                    level, _series_key(SERIES_PACKET_LOSS, ip), position, "%"
+                ),
+            )
+            for ip in ips
+        )
+        texts.append("<br>".join(lines))
+    return texts
+
+
+def _spread(
+    start: Sequence[Optional[float]], end: Sequence[Optional[float]]
+) -> List[Optional[float]]:
+    return [
+        None if first is None or last is None else last - first
+        for first, last in zip(start, end)
+    ]
+
+
+def _error_bars(level: Level, key: str) -> Dict[str, Any]:
+    """Whiskers from each point's mean down to its lowest run and up to its highest.
+
+    A point of a single run has none. Plotly colors them as the line.
+    """
+    if level.seconds == 0:
+        return dict(visible=False)
+    return dict(
+        type="data",
+        symmetric=False,
+        array=_trace_values(_spread(level.means[key], level.highs[key])),
+        arrayminus=_trace_values(_spread(level.lows[key], level.means[key])),
+        thickness=1,
+        width=0,
+        visible=True,
+    )
+
+
 def _add_metric_trace(
     fig: Any,
     go: Any,
     row: int,
-    xs: Sequence[datetime],
-    values: Sequence[Optional[float]],
+    level: Level,
+    key: str,
     label: str,
     color: str,
     hover_texts: Optional[Sequence[str]],
     **extra: Any,
 ) -> None:
-    """One metric line, hovering as the full run when hover_texts is given."""
+    """One metric line, hovering as the full point when hover_texts is given.
+
+    The trace is named by its series key, which the script swapping in the
+    other levels as the charts are zoomed finds it by. Its dates and values
+    are packed as typed arrays where plotly takes them.
+    """
     hover: Dict[str, Any]
     if hover_texts is None:
         hover = dict(hoverinfo="skip")
     else:
         hover = dict(text=hover_texts, hovertemplate="%{text}<extra></extra>")
+    # Single runs have no whiskers, which small reports then carry no trace of.
+    bars = dict(error_y=_error_bars(level, key)) if level.seconds else {}
+    scatter = go.Scattergl if len(level.dates) >= WEBGL_MIN_POINTS else go.Scatter
     fig.add_trace(
-        go.Scatter(
-            x=xs,
-            y=values,
+        scatter(
+            x=_trace_dates(level.dates),
+            y=_trace_values(level.means[key]),
+            uid=key,
             name=label,
             mode="lines+markers",
             line=dict(color=color, width=2),
             marker=dict(size=5),
             connectgaps=False,
             **hover,
+            **bars,
             **extra,
         ),
         row=row,
@@ -401,17 +962,17 @@ def _add_metric_trace(
 def _add_speed_chart(
     fig: Any,
     go: Any,
-    xs: Sequence[datetime],
-    download: Sequence[Optional[float]],
-    upload: Sequence[Optional[float]],
+    level: Level,
     hover_texts: Sequence[str],
     thresholds: RenderThresholds,
 ) -> None:
     """Download and upload, sharing the Mbps axis on the first row."""
-    _add_metric_trace(fig, go, 1, xs, download, "Download", COLOR_DOWNLOAD, hover_texts)
+    _add_metric_trace(
+        fig, go, 1, level, SERIES_DOWNLOAD, "Download", COLOR_DOWNLOAD, hover_texts
+    )
     # Download already carries the hover block for this row, and repeating it
     # for upload would print every metric twice in the unified hover.
-    _add_metric_trace(fig, go, 1, xs, upload, "Upload", COLOR_UPLOAD, None)
+    _add_metric_trace(fig, go, 1, level, SERIES_UPLOAD, "Upload", COLOR_UPLOAD, None)
 
     _add_threshold_line(
         fig,
@@ -439,9 +1000,7 @@ def _add_speed_chart(
 def _add_latency_chart(
     fig: Any,
     go: Any,
-    xs: Sequence[datetime],
-    latency: Sequence[Optional[float]],
-    ping_rtt: Sequence[Optional[float]],
+    level: Level,
     hover_texts: Sequence[str],
     thresholds: RenderThresholds,
 ) -> None:
@@ -450,10 +1009,12 @@ def _add_latency_chart(
     The average round trip time of the ping test shares the row, since it
     measures the same thing against a different target on the same ms scale.
     """
-    _add_metric_trace(fig, go, 2, xs, latency, "Latency", COLOR_LATENCY, hover_texts)
+    _add_metric_trace(
+        fig, go, 2, level, SERIES_LATENCY, "Latency", COLOR_LATENCY, hover_texts
+    )
     # Latency already carries the hover block for this row, and repeating it
     # would print every metric twice in the unified hover.
-    _add_metric_trace(fig, go, 2, xs, ping_rtt, "Ping RTT", COLOR_PING, None)
+    _add_metric_trace(fig, go, 2, level, SERIES_PING_RTT, "Ping RTT", COLOR_PING, None)
 
     _add_threshold_line(
         fig,
@@ -469,8 +1030,7 @@ def _add_latency_chart(
 def _add_packet_loss_chart(
     fig: Any,
     go: Any,
-    xs: Sequence[datetime],
-    packet_loss: Sequence[Optional[float]],
+    level: Level,
     hover_texts: Sequence[str],
     thresholds: RenderThresholds,
 ) -> None:
@@ -479,8 +1039,8 @@ def _add_packet_loss_chart(
         fig,
         go,
         3,
-        xs,
-        packet_loss,
+        level,
+        SERIES_PACKET_LOSS,
         "Packet Loss",
         COLOR_LOSS,
         hover_texts,
@@ -497,39 +1057,122 @@ def _add_packet_loss_chart(
     )
 
     fig.update_xaxes(title_text="Test Time", row=3, col=1)
+
+
+def _add_packet_loss_axis(fig: Any, level: Level, thresholds: RenderThresholds) -> None:
+    """The packet loss axis, stretched as far as the loss to any target needs.
+
+    That is to the highest loss of any run, which a coarser level's whiskers
+    reach up to.
+    """
+    every_loss = list(level.highs[SERIES_PACKET_LOSS])
+    for ip in _extra_ping_ips(level):
+        every_loss.extend(level.highs[_series_key(SERIES_PACKET_LOSS, ip)])
     fig.update_yaxes(
         title_text="% Packet Loss",
         rangemode="tozero",
-        range=[0, _packet_loss_axis_max(packet_loss, thresholds)],
+        range=[0, _packet_loss_axis_max(every_loss, thresholds)],
         row=3,
         col=1,
     )
 
 
-def _add_incomplete_run_markers(fig: Any, results: Sequence[TestResult]) -> None:
-    """Mark runs where the ping or speed test failed to produce a value."""
-    for result in results:
-        if result.speed_result is not None and result.ping_result is not None:
-            continue
-        for row in (1, 2, 3):
-            fig.add_vline(
-                x=result.get_date(),
-                line_dash="dot",
-                line_color=COLOR_BAD,
-                line_width=1,
-                row=row,
-                col=1,
+def _add_extra_ping_charts(
+    fig: Any,
+    go: Any,
+    level: Level,
+) -> None:
+    """The round trip time and packet loss of each extra target.
+
+    They share the rows of the primary target's, where the hover blocks already
+    list every target, so these lines carry none of their own.
+    """
+    for number, ip in enumerate(_extra_ping_ips(level)):
+        color = COLORS_EXTRA_PINGS[number % len(COLORS_EXTRA_PINGS)]
+        _add_metric_trace(
+            fig,
+            go,
+            2,
+            level,
+            _series_key(SERIES_PING_RTT, ip),
+            "Ping RTT {}".format(ip),
+            color,
+            None,
+            legendgroup=ip,
+        )
+        _add_metric_trace(
+            fig,
+            go,
+            3,
+            level,
+            _series_key(SERIES_PACKET_LOSS, ip),
+            "Packet Loss {}".format(ip),
+            color,
+            None,
+            legendgroup=ip,
+        )
+
+
+def _add_incomplete_run_markers(fig: Any, go: Any, level: Level) -> None:
+    """Mark runs where the ping or speed test failed to produce a value.
+
+    The markers of a row are one trace of vertical segments, broken apart by
+    None, rather than a layout shape each, which plotly lays out one by one.
+    They are drawn against a hidden axis over each row that runs from 0 to 1,
+    so they span the row whatever its own axis does. A coarser level marks
+    the start of each point spanning such a run.
+    """
+    if not level.incomplete:
+        return
+    xs: List[Optional[datetime]] = []
+    ys: List[Optional[int]] = []
+    for date in level.incomplete:
+        xs.extend((date, date, None))
+        ys.extend((0, 1, None))
+
+    for row in CHART_ROWS:
+        axis = _axis_suffix(row)
+        marker_axis = _axis_suffix(row + len(CHART_ROWS))
+        fig.update_layout(
+            {
+                "yaxis" + marker_axis: dict(
+                    overlaying="y" + axis,
+                    anchor="x" + axis,
+                    range=[0, 1],
+                    fixedrange=True,
+                    visible=False,
+                )
+            }
+        )
+        fig.add_trace(
+            go.Scatter(
+                x=xs,
+                y=ys,
+                xaxis="x" + axis,
+                yaxis="y" + marker_axis,
+                uid="{}{}".format(INCOMPLETE_RUN_MARKERS, row),
+                name="Incomplete run",
+                mode="lines",
+                line=dict(color=COLOR_BAD, width=1, dash="dot"),
+                hoverinfo="skip",
+                legendgroup="incomplete",
+                showlegend=row == CHART_ROWS[0],
             )
+        )
+
+
+def _axis_suffix(row: int) -> str:
+    """What plotly appends to x and y to name the axes of row, "" for the first."""
+    return "" if row == 1 else str(row)
 
 
 def _build_charts_figure(
-    results: Sequence[TestResult], thresholds: RenderThresholds = DEFAULT_THRESHOLDS
+    level: Level, thresholds: RenderThresholds = DEFAULT_THRESHOLDS
 ) -> Any:
     """Dark themed figure with the speed, latency, and packet loss charts."""
     go, make_subplots = _import_plotly()
 
-    dates, download, upload, latency, ping_rtt, packet_loss = _aligned_series(results)
-    hover_texts = _hover_texts(download, upload, latency, ping_rtt, packet_loss)
+    hover_texts = _level_hover_texts(level)
 
     fig = make_subplots(
         shared_xaxes=True,
@@ -539,10 +1182,12 @@ def _build_charts_figure(
         vertical_spacing=0.06,
     )
 
-    _add_speed_chart(fig, go, dates, download, upload, hover_texts, thresholds)
-    _add_latency_chart(fig, go, dates, latency, ping_rtt, hover_texts, thresholds)
-    _add_packet_loss_chart(fig, go, dates, packet_loss, hover_texts, thresholds)
-    _add_incomplete_run_markers(fig, results)
+    _add_speed_chart(fig, go, level, hover_texts, thresholds)
+    _add_latency_chart(fig, go, level, hover_texts, thresholds)
+    _add_packet_loss_chart(fig, go, level, hover_texts, thresholds)
+    _add_extra_ping_charts(fig, go, level)
+    _add_packet_loss_axis(fig, level, thresholds)
+    _add_incomplete_run_markers(fig, go, level)
 
     fig.update_layout(
         template="plotly_dark",
@@ -561,7 +1206,8 @@ def _build_charts_figure(
             bgcolor="rgba(0,0,0,0)",
         ),
     )
-    fig.update_xaxes(gridcolor=COLOR_GRID, zerolinecolor=COLOR_GRID)
+    # The dates are numbers, which plotly would otherwise plot as they are.
+    fig.update_xaxes(type="date", gridcolor=COLOR_GRID, zerolinecolor=COLOR_GRID)
     fig.update_yaxes(gridcolor=COLOR_GRID, zerolinecolor=COLOR_GRID)
 
     return fig
@@ -640,11 +1286,7 @@ def _format_summary_stats(
     """
     _, download, upload, latency, ping_rtt, packet_loss = _aligned_series(results)
 
-    incomplete = [
-        result
-        for result in results
-        if result.speed_result is None or result.ping_result is None
-    ]
+    incomplete = [result for result in results if result.incomplete]
 
     return {
         "metrics": [
@@ -760,10 +1402,28 @@ def _build_summary_html(summary: Mapping[str, Any]) -> str:
     return _panel_html("summary", "Summary", _chips_html(_summary_chips(summary)), body)
 
 
+@dataclass
+class TraceRows:
+    """The hops of the traced runs, a row per hop deep and a column per run.
+
+    Each hop address is kept once, in addresses, and each row holds where its
+    address is in them for every run, or TRACE_MISSING_HOP, next to its loss
+    rounded for display. bad marks, with 1, the losses over the threshold before
+    they were rounded.
+    """
+
+    times: List[str]
+    addresses: List[str]
+    hops: List[List[int]]
+    losses: List[List[Optional[float]]]
+    bad: List[List[int]]
+
+
 def _trace_rows(
     trace_results: Sequence[TestResult],
-) -> List[Tuple[int, List[Optional[PingResult]]]]:
-    """One row per hop index, holding the ping for each traced run.
+    thresholds: RenderThresholds = DEFAULT_THRESHOLDS,
+) -> TraceRows:
+    """The hops of trace_results, padded out to the deepest trace.
 
     Callers pass only the runs that recorded a trace.
     """
@@ -771,55 +1431,55 @@ def _trace_rows(
         cast(TraceResult, result.trace_result).ping_results for result in trace_results
     ]
     hop_count = max(len(hops) for hops in hop_lists)
-    rows = []
-    for index in range(hop_count):
-        pings = [hops[index] if index < len(hops) else None for hops in hop_lists]
-        rows.append((index + 1, pings))
-    return rows
-
-
-def _trace_cell_html(
-    ping: Optional[PingResult], thresholds: RenderThresholds = DEFAULT_THRESHOLDS
-) -> str:
-    if ping is None:
-        return '<td class="cell--missing">{}</td>'.format(MISSING_VALUE)
-    bad = ping.packet_loss > thresholds.packet_loss_pct
-    loss_class = "loss loss--bad" if bad else "loss"
-    # The space between the spans keeps the cell readable once it is copied,
-    # where the margin between them is lost.
-    return (
-        '<td><span class="hop-ip">{ip}</span> '
-        '<span class="{loss_class}">{loss:.2f}%</span></td>'
-    ).format(
-        ip=escape(str(ping.ip)),
-        loss_class=loss_class,
-        loss=ping.packet_loss,
+    addresses: Dict[str, int] = {}
+    hops = [[TRACE_MISSING_HOP] * len(hop_lists) for _ in range(hop_count)]
+    losses: List[List[Optional[float]]] = [
+        [None] * len(hop_lists) for _ in range(hop_count)
+    ]
+    bad = [[0] * len(hop_lists) for _ in range(hop_count)]
+    for column, pings in enumerate(hop_lists):
+        for row, ping in enumerate(pings):
+            if ping is None:
+                continue
+            hops[row][column] = addresses.setdefault(str(ping.ip), len(addresses))
+            losses[row][column] = round(ping.packet_loss, 2)
+            bad[row][column] = int(ping.packet_loss > thresholds.packet_loss_pct)
+    return TraceRows(
+        times=[_format_run_time(result) for result in trace_results],
+        addresses=list(addresses),
+        hops=hops,
+        losses=losses,
+        bad=bad,
     )
 
 
-def _trace_table_html(
-    trace_results: Sequence[TestResult],
-    thresholds: RenderThresholds = DEFAULT_THRESHOLDS,
-) -> str:
-    header = "".join(
-        '<th scope="col">{}</th>'.format(escape(_format_run_time(result)))
-        for result in trace_results
-    )
-    rows = "".join(
-        '<tr><th scope="row" class="col-hop">{}</th>{}</tr>'.format(
-            hop_number,
-            "".join(_trace_cell_html(ping, thresholds) for ping in pings),
-        )
-        for hop_number, pings in _trace_rows(trace_results)
-    )
+def _script_json(data: Any) -> str:
+    """data as compact JSON that is safe to embed in a script element.
+
+    A closing tag inside it would otherwise end the script early.
+    """
+    return json.dumps(data, separators=(",", ":")).replace("<", "\\u003c")
+
+
+def _trace_table_html(rows: TraceRows) -> str:
+    """The table of rows, which TRACE_TABLE_SCRIPT fills in as it is scrolled."""
+    traces = {
+        "times": rows.times,
+        "addresses": rows.addresses,
+        "hops": rows.hops,
+        "losses": rows.losses,
+        "bad": rows.bad,
+        "missing": MISSING_VALUE,
+        "rowHeight": TRACE_ROW_HEIGHT,
+        "columnWidth": TRACE_COLUMN_WIDTH,
+        "hopWidth": TRACE_HOP_WIDTH,
+    }
     return (
-        '<div class="table-scroll">'
-        '<table class="trace">'
-        '<thead><tr><th scope="col" class="col-hop">Hop</th>{header}</tr></thead>'
-        "<tbody>{rows}</tbody>"
-        "</table>"
+        '<div class="table-scroll" id="trace-table">'
+        '<table class="trace"></table>'
         "</div>"
-    ).format(header=header, rows=rows)
+        "<script>{}</script>"
+    ).format(TRACE_TABLE_SCRIPT.replace("{traces}", _script_json(traces)))
 
 
 def _build_trace_tables_html(
@@ -837,32 +1497,87 @@ def _build_trace_tables_html(
             "and none were recorded for these results.</p>",
         )
 
-    rows = _trace_rows(trace_results)
+    rows = _trace_rows(trace_results, thresholds)
     chips = [
         "{} traced run(s)".format(len(trace_results)),
-        "{} hop(s) deep".format(len(rows)),
+        "{} hop(s) deep".format(len(rows.hops)),
     ]
     return _panel_html(
         "traces",
         "Traceroute Hops",
         _chips_html(chips),
-        _trace_table_html(trace_results, thresholds),
+        _trace_table_html(rows),
     )
 
 
+def _level_json(level: Level) -> Dict[str, Any]:
+    """What the level script needs of level to draw it, packed as typed arrays.
+
+    A point spanning a single run has no range, nor a count of runs.
+    """
+    start, offsets = date_offsets(level.dates)
+    series: Dict[str, Dict[str, Any]] = {}
+    for key, means in level.means.items():
+        series[key] = {"y": float32_array(means)}
+        if level.seconds:
+            series[key]["low"] = float32_array(level.lows[key])
+            series[key]["high"] = float32_array(level.highs[key])
+    packed: Dict[str, Any] = {
+        "start": start,
+        "x": offsets,
+        "series": series,
+        "incomplete": date_milliseconds(level.incomplete),
+    }
+    if level.seconds:
+        packed["runs"] = typed_array("i", level.runs)
+    return packed
+
+
+def _level_script(levels: Sequence[Level], max_points: int) -> str:
+    """LEVEL_SCRIPT, with every level embedded."""
+    ips = _extra_ping_ips(levels[0])
+    data = {
+        "levels": [_level_json(level) for level in levels],
+        "maxPoints": max_points,
+        "hover": HOVER_SERIES,
+        "markers": INCOMPLETE_RUN_MARKERS,
+        "metrics": HOVER_METRICS,
+        "targets": [
+            (
+                ip,
+                _series_key(SERIES_PING_RTT, ip),
+                _series_key(SERIES_PACKET_LOSS, ip),
+            )
+            for ip in ips
+        ],
+        "missing": HOVER_MISSING,
+    }
+    return LEVEL_SCRIPT.replace("{levels}", _script_json(data))
+
+
 def _build_charts_html(
-    results: Sequence[TestResult],
+    levels: Sequence[Level],
+    initial: int,
     thresholds: RenderThresholds = DEFAULT_THRESHOLDS,
     embed_plotly: bool = False,
+    max_points: Optional[int] = None,
 ) -> str:
-    """The charts, loading plotly.js from the CDN or inlining it when asked."""
-    fig = _build_charts_figure(results, thresholds)
+    """The charts, loading plotly.js from the CDN or inlining it when asked.
+
+    They show levels[initial], along with the script swapping in the others as
+    the charts are zoomed when there are others.
+    """
+    fig = _build_charts_figure(levels[initial], thresholds)
+    post_script = None
+    if len(levels) > 1 and max_points:
+        post_script = _level_script(levels, max_points)
     return cast(
         str,
         fig.to_html(
             full_html=False,
             include_plotlyjs=True if embed_plotly else "cdn",
             config={"displayModeBar": True, "responsive": True},
+            post_script=post_script,
         ),
     )
 
@@ -872,11 +1587,20 @@ def _assemble_html_document(
     summary_html: str,
     trace_html: str,
     thresholds: RenderThresholds = DEFAULT_THRESHOLDS,
+    level_seconds: int = 0,
 ) -> str:
+    chips = ["Drag to zoom", "Double click to reset"]
+    if level_seconds:
+        chips.insert(
+            0,
+            "Mean and range of each {} until zoomed in".format(
+                _level_span(level_seconds)
+            ),
+        )
     charts_panel = _panel_html(
         "charts",
         "Performance Over Time",
-        _chips_html(["Drag to zoom", "Double click to reset"]),
+        _chips_html(chips),
         '<div class="chart">{}</div>'.format(charts_html),
     )
     return HTML_DOCUMENT.format(
@@ -904,20 +1628,27 @@ def to_html(
     io_target: HtmlTarget = sys.stdout,
     thresholds: Optional[RenderThresholds] = None,
     embed_plotly: bool = False,
+    max_points: Optional[int] = None,
 ) -> None:
     """Write the HTML report, inlining plotly.js when embed_plotly is set.
 
     The inlined report is several megabytes larger but needs no network access
     to open, where the default only carries a script tag for the plotly CDN.
+    With more runs than max_points, the charts start out with a point per hour
+    or per day, and draw every run again once zoomed in to few enough of them.
+    The summary covers every run either way.
     """
     thresholds = DEFAULT_THRESHOLDS if thresholds is None else thresholds
     results = sorted(results, key=lambda x: x.time_stamp)
+    levels = _chart_levels(results, max_points)
+    initial = choose_level(levels, max_points) if max_points else 0
 
     document = _assemble_html_document(
-        _build_charts_html(results, thresholds, embed_plotly),
+        _build_charts_html(levels, initial, thresholds, embed_plotly, max_points),
         _build_summary_html(_format_summary_stats(results, thresholds)),
         _build_trace_tables_html(results, thresholds),
         thresholds,
+        levels[initial].seconds,
     )
 
     _write_html(document, io_target)
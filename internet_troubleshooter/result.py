@@ -1,13 +1,28 @@
 from __future__ import annotations
 
+import io
+import mmap
 import os
+import re
 import sys
 from time import time
 from datetime import datetime
 from dataclasses import dataclass, field
-from typing import Any, Dict, List, Mapping, Optional, TextIO, Union
-
-import yaml
+from typing import (
+    Any,
+    AnyStr,
+    BinaryIO,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    Match,
+    Optional,
+    TextIO,
+    Tuple,
+    Union,
+)
 
 from internet_troubleshooter.ping_test import PingResult
 from internet_troubleshooter.trace_test import TraceResult
@@ -15,12 +30,216 @@ from internet_troubleshooter.speed_test import SpeedResult
 from internet_troubleshooter.utils import LABEL_WIDTH
 
 
+# PyYAML is only imported once results are actually read or written, since it
+# takes longer to import than the rest of a run that logs nowhere takes to start.
+def yaml_loader() -> Any:
+    """The loader results are read with.
+
+    PyYAML's libyaml bindings parse and emit many times faster than its pure
+    Python implementation, and are just as safe, but are only present when
+    PyYAML was built against libyaml.
+    """
+    import yaml
+
+    return getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+
+def yaml_dumper() -> Any:
+    """The dumper results are written with, libyaml's where there is one."""
+    import yaml
+
+    return getattr(yaml, "CSafeDumper", yaml.SafeDumper)
+
+
+# The markers a results file puts around each document, as written by `run`.
+# YAML only treats them as markers at the very start of a line, where they
+# cannot be part of a value, so a file can be split on them without parsing it.
+DOCUMENT_START = "---"
+DOCUMENT_END = "..."
+
+
+def is_marker(line: str, marker: str) -> bool:
+    return line.startswith(marker) and line[len(marker) : len(marker) + 1] in (
+        "",
+        " ",
+        "\t",
+        "\r",
+        "\n",
+    )
+
+
+def split_documents(lines: Iterable[str]) -> Iterator[str]:
+    """The text of each YAML document in lines, one at a time.
+
+    Only the document being read is held in memory. A start marker line is kept
+    with its document, since YAML allows content to follow it on the same line.
+    """
+    document: List[str] = []
+    for line in lines:
+        if is_marker(line, DOCUMENT_START):
+            # Blank lines between one end marker and the next start marker are
+            # not a document of their own.
+            if any(part.strip() for part in document):
+                yield "".join(document)
+            document = [line]
+        elif is_marker(line, DOCUMENT_END):
+            yield "".join(document)
+            document = []
+        else:
+            document.append(line)
+    if any(part.strip() for part in document):
+        yield "".join(document)
+
+
+# The contents of a results file, read or mapped into memory.
+Buffer = Union[bytes, mmap.mmap]
+
+# The same markers as is_marker matches, for finding them in the bytes of a
+# mapped results file without decoding it.
+MARKER_REGEX = re.compile(rb"^(---|\.\.\.)(?=[ \t\r\n]|\Z)", re.M)
+NON_BLANK_REGEX = re.compile(rb"\S")
+
+
+def document_spans(
+    buffer: Buffer, start: int = 0, end: Optional[int] = None
+) -> Iterator[Tuple[int, int]]:
+    """The start and end offsets of each document between start and end.
+
+    These are the documents split_documents finds in the same text, located
+    in the bytes of buffer, so the ones that are not needed are never decoded.
+    start and end must fall at the start of a line.
+    """
+    if end is None:
+        end = len(buffer)
+    document = start
+    for marker in MARKER_REGEX.finditer(buffer, start, end):
+        if NON_BLANK_REGEX.search(buffer, document, marker.start()):
+            yield document, marker.start()
+        if marker.group(1) == DOCUMENT_START.encode():
+            document = marker.start()
+            continue
+        newline = buffer.find(b"\n", marker.end(), end)
+        document = end if newline == -1 else newline + 1
+    if NON_BLANK_REGEX.search(buffer, document, end):
+        yield document, end
+
+
+def map_file(yaml_file: BinaryIO) -> Optional[mmap.mmap]:
+    """yaml_file mapped read only, or None when it cannot be, as with a pipe.
+
+    An empty file cannot be mapped either, and has nothing to read anyway.
+    """
+    try:
+        return mmap.mmap(yaml_file.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+
+
+# The time stamp of a logged document, as written at the top level of it. Only
+# top level keys start at the beginning of a line, so the key cannot be matched
+# inside one of the nested results.
+TIME_STAMP_PATTERN = r"^time_stamp:[ \t]*([-+]?[\d.]+(?:[eE][-+]?\d+)?)\s*$"
+TIME_STAMP_REGEX = re.compile(TIME_STAMP_PATTERN, re.M)
+TIME_STAMP_BYTES_REGEX = re.compile(TIME_STAMP_PATTERN.encode(), re.M)
+
+
+@dataclass(frozen=True)
+class TimeWindow:
+    """The span of time stamps to read results from, open ended where None."""
+
+    since: Optional[float] = None
+    until: Optional[float] = None
+
+    def __contains__(self, time_stamp: float) -> bool:
+        if self.since is not None and time_stamp < self.since:
+            return False
+        return self.until is None or time_stamp <= self.until
+
+
+def document_time_stamp(text: str) -> Optional[float]:
+    """The time stamp of a logged document, read without parsing the document.
+
+    None when it is not written the way run writes it, in which case only
+    parsing the whole document can tell.
+    """
+    return _matched_time_stamp(TIME_STAMP_REGEX.search(text))
+
+
+def _matched_time_stamp(match: Optional[Match[AnyStr]]) -> Optional[float]:
+    if match is None:
+        return None
+    try:
+        return float(match.group(1))
+    except ValueError:
+        return None
+
+
+def _print_round_trips(ping_result: PingResult, io_target: TextIO) -> None:
+    """The round trip figures of a ping, and how its loss was spread out."""
+    figures = [
+        ("Ping RTT:", ping_result.rtt_avg_ms),
+        ("Ping p95:", ping_result.rtt_p95_ms),
+        ("Ping Jitter:", ping_result.jitter_ms),
+    ]
+    for label, value in figures:
+        if value is not None:
+            print("{:<{}}{:.2f}ms".format(label, LABEL_WIDTH, value), file=io_target)
+    if ping_result.loss_bursts:
+        print(
+            "{:<{}}{}, the longest {} packet(s)".format(
+                "Loss Bursts:",
+                LABEL_WIDTH,
+                ping_result.loss_bursts,
+                ping_result.longest_loss_burst,
+            ),
+            file=io_target,
+        )
+    if (
+        ping_result.packet_loss_ci_low is not None
+        and ping_result.packet_loss_ci_high is not None
+    ):
+        print(
+            "{:<{}}{:.2f}% to {:.2f}% over {} packet(s)".format(
+                "Loss 95% CI:",
+                LABEL_WIDTH,
+                ping_result.packet_loss_ci_low,
+                ping_result.packet_loss_ci_high,
+                ping_result.packets_sent,
+            ),
+            file=io_target,
+        )
+
+
+# The names failed_tests records each test a run attempted that failed by.
+PING_TEST = "ping"
+SPEED_TEST = "speed"
+
+
 @dataclass
 class TestResult:
+    """The results of one run.
+
+    ping_result is the ping to the first target, which decides whether the run
+    traceroutes. The pings to any further targets that succeeded are in
+    extra_ping_results, in the order the targets were given, and the addresses
+    of those whose ping failed in failed_extra_pings.
+
+    failed_tests names the tests the run attempted that failed, so that a test
+    it skipped, or that was not due, is not taken for a failed one.
+    """
+
     ping_result: Optional[PingResult]
     trace_result: Optional[TraceResult]
     speed_result: Optional[SpeedResult]
     time_stamp: float = field(default_factory=time)
+    extra_ping_results: List[PingResult] = field(default_factory=list)
+    failed_tests: List[str] = field(default_factory=list)
+    failed_extra_pings: List[str] = field(default_factory=list)
+
+    @property
+    def incomplete(self) -> bool:
+        """Whether a test the run attempted failed."""
+        return bool(self.failed_tests)
 
     def human_readable(self, io_target: TextIO = sys.stdout) -> None:
         if self.ping_result is not None:
@@ -30,13 +249,26 @@ class TestResult:
                 ),
                 file=io_target,
             )
-            if self.ping_result.rtt_avg_ms is not None:
-                print(
-                    "{:<{}}{:.2f}ms".format(
-                        "Ping RTT:", LABEL_WIDTH, self.ping_result.rtt_avg_ms
-                    ),
-                    file=io_target,
-                )
+            _print_round_trips(self.ping_result, io_target)
+
+        for extra in self.extra_ping_results:
+            print(
+                "{:<{}}{:.2f}%{}".format(
+                    "{}:".format(extra.ip),
+                    LABEL_WIDTH,
+                    extra.packet_loss,
+                    ""
+                    if extra.rtt_avg_ms is None
+                    else ", {:.2f}ms".format(extra.rtt_avg_ms),
+                ),
+                file=io_target,
+            )
+
+        for ip in self.failed_extra_pings:
+            print(
+                "{:<{}}Ping failed".format("{}:".format(ip), LABEL_WIDTH),
+                file=io_target,
+            )
 
         if self.trace_result is not None:
             for hop_result in self.trace_result.ping_results:
@@ -54,7 +286,7 @@ class TestResult:
             )
 
     def to_dict(self) -> Dict[str, Any]:
-        return {
+        data: Dict[str, Any] = {
             "ping_result": (
                 None if self.ping_result is None else self.ping_result.to_dict()
             ),
@@ -66,6 +298,17 @@ class TestResult:
             ),
             "time_stamp": self.time_stamp,
         }
+        # Most runs ping a single target, and writing an empty list would only
+        # pad every logged document.
+        if self.extra_ping_results:
+            data["extra_ping_results"] = [
+                result.to_dict() for result in self.extra_ping_results
+            ]
+        if self.failed_tests:
+            data["failed_tests"] = list(self.failed_tests)
+        if self.failed_extra_pings:
+            data["failed_extra_pings"] = list(self.failed_extra_pings)
+        return data
 
     @classmethod
     def from_dict(cls, data: Mapping[str, Any]) -> TestResult:
@@ -73,6 +316,9 @@ class TestResult:
         trace_result = data.get("trace_result")
         speed_result = data.get("speed_result")
         time_stamp = data.get("time_stamp")
+        extra_ping_results = data.get("extra_ping_results") or []
+        failed_tests = data.get("failed_tests") or []
+        failed_extra_pings = data.get("failed_extra_pings") or []
 
         return cls(
             ping_result=(
@@ -84,29 +330,117 @@ class TestResult:
             speed_result=(
                 None if speed_result is None else SpeedResult.from_dict(speed_result)
             ),
+            extra_ping_results=[
+                PingResult.from_dict(result) for result in extra_ping_results
+            ],
+            failed_tests=[str(test) for test in failed_tests],
+            failed_extra_pings=[str(ip) for ip in failed_extra_pings],
             **({} if time_stamp is None else {"time_stamp": float(time_stamp)}),
         )
 
     def to_yaml(self) -> str:
-        return yaml.safe_dump(self.to_dict(), default_flow_style=False)
+        import yaml
+
+        return yaml.dump(self.to_dict(), Dumper=yaml_dumper(), default_flow_style=False)
+
+    @staticmethod
+    def iter_yaml(
+        lines: Iterable[str], window: Optional[TimeWindow] = None
+    ) -> Iterator[TestResult]:
+        """Parse results one document at a time from the lines of a results file.
+
+        With a window, only the results inside it are returned, and a document
+        whose time stamp falls outside it is skipped without being parsed.
+        """
+        for text in split_documents(lines):
+            if window is not None:
+                time_stamp = document_time_stamp(text)
+                if time_stamp is not None and time_stamp not in window:
+                    continue
+            result = TestResult._parse_document(text, window)
+            if result is not None:
+                yield result
+
+    @staticmethod
+    def iter_mapped(
+        buffer: Buffer,
+        window: Optional[TimeWindow] = None,
+        start: int = 0,
+        end: Optional[int] = None,
+    ) -> Iterator[TestResult]:
+        """Parse results one document at a time from the bytes of a results file.
+
+        This is iter_yaml for a file mapped into memory, between the offsets
+        start and end. Only the documents that are parsed are decoded, and only
+        one at a time, so reading the file never holds more than one of them.
+        """
+        for document_start, document_end in document_spans(buffer, start, end):
+            if window is not None:
+                time_stamp = _matched_time_stamp(
+                    TIME_STAMP_BYTES_REGEX.search(buffer, document_start, document_end)
+                )
+                if time_stamp is not None and time_stamp not in window:
+                    continue
+            text = buffer[document_start:document_end].decode("utf-8")
+            result = TestResult._parse_document(text, window)
+            if result is not None:
+                yield result
+
+    @staticmethod
+    def _parse_document(
+        text: str, window: Optional[TimeWindow]
+    ) -> Optional[TestResult]:
+        import yaml
+
+        document = yaml.load(text, Loader=yaml_loader())
+        if not isinstance(document, dict):
+            return None
+        result = TestResult.from_dict(document)
+        if window is not None and result.time_stamp not in window:
+            return None
+        return result
 
     @staticmethod
     def load_yaml(content: str) -> List[TestResult]:
         """Parse the contents of a results file into TestResult objects."""
-        documents = yaml.safe_load_all(content)
+        return list(TestResult.iter_yaml(content.splitlines(keepends=True)))
 
-        return [
-            TestResult.from_dict(document)
-            for document in documents
-            if isinstance(document, dict)
-        ]
+    @staticmethod
+    def iter_results(
+        yaml_filename: Union[str, "os.PathLike[str]"],
+        window: Optional[TimeWindow] = None,
+    ) -> Iterator[TestResult]:
+        """Read the results in a file lazily, holding one document at a time.
+
+        The file is mapped into memory rather than read into it, so only the
+        documents that are parsed are ever copied out of it, and the pages of
+        it that were read can be dropped again whenever memory is short.
+
+        The file is opened straight away, so a file that cannot be opened raises
+        OSError here rather than once iteration starts. It is closed once every
+        result has been read.
+        """
+        yaml_file = open(yaml_filename, "rb")
+        return TestResult._iter_file(yaml_file, window)
+
+    @staticmethod
+    def _iter_file(
+        yaml_file: BinaryIO, window: Optional[TimeWindow]
+    ) -> Iterator[TestResult]:
+        with yaml_file:
+            mapped = map_file(yaml_file)
+            if mapped is None:
+                lines = io.TextIOWrapper(yaml_file, encoding="utf-8")
+                yield from TestResult.iter_yaml(lines, window)
+                return
+            with mapped:
+                yield from TestResult.iter_mapped(mapped, window)
 
     @staticmethod
     def load_results(
         yaml_filename: Union[str, "os.PathLike[str]"],
     ) -> List[TestResult]:
-        with open(yaml_filename, encoding="utf-8") as f:
-            return TestResult.load_yaml(f.read())
+        return list(TestResult.iter_results(yaml_filename))
 
     def get_date(self) -> datetime:
         return datetime.fromtimestamp(self.time_stamp)
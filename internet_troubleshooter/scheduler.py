@@ -0,0 +1,98 @@
+"""Runs tasks on fixed intervals until told to stop, for the daemon command.
+
+Each schedule runs in a thread of its own, so a speed test that takes a minute
+does not hold up the pings due meanwhile. Run times are counted from when the
+schedule started rather than from when the last run finished, so they do not
+drift later by however long each run took.
+"""
+
+from __future__ import annotations
+
+import logging
+import random
+import sys
+import threading
+from dataclasses import dataclass
+from time import monotonic
+from typing import Callable, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Schedule:
+    """A task to run every interval seconds.
+
+    Each run is put off by up to jitter times the interval, picked at random
+    for every run, so that machines started together do not all test at once.
+    """
+
+    name: str
+    interval: float
+    task: Callable[[], None]
+    jitter: float = 0.0
+
+    def due(self, start: float, slot: int, rng: random.Random) -> float:
+        """When the run in the given slot is due, on the clock start is from."""
+        return start + (slot + rng.uniform(0.0, self.jitter)) * self.interval
+
+
+def _run_schedule(
+    schedule: Schedule,
+    start: float,
+    stop: threading.Event,
+    clock: Callable[[], float],
+    rng: random.Random,
+) -> None:
+    slot = 0
+    while not stop.wait(max(0.0, schedule.due(start, slot, rng) - clock())):
+        logger.debug("Running scheduled %s", schedule.name)
+        try:
+            schedule.task()
+        except Exception:
+            # One failed run is no reason to stop testing.
+            logger.exception("Scheduled %s failed", schedule.name)
+
+        # A run that outlasted its interval skips the slots that went by
+        # meanwhile, rather than running them back to back to catch up.
+        next_slot = max(slot + 1, int((clock() - start) // schedule.interval) + 1)
+        if next_slot > slot + 1:
+            print(
+                "WARNING: The {} took longer than its {:g}s interval, skipping "
+                "{} run(s).".format(
+                    schedule.name, schedule.interval, next_slot - slot - 1
+                ),
+                file=sys.stderr,
+            )
+        slot = next_slot
+
+
+def run_schedules(
+    schedules: Sequence[Schedule],
+    stop: threading.Event,
+    clock: Callable[[], float] = monotonic,
+    rng: Optional[random.Random] = None,
+) -> None:
+    """Run every schedule until stop is set, or this thread is interrupted.
+
+    Runs in progress when that happens are finished before this returns.
+    """
+    rng = random.Random() if rng is None else rng
+    start = clock()
+    threads = [
+        threading.Thread(
+            target=_run_schedule,
+            args=(schedule, start, stop, clock, rng),
+            name=schedule.name,
+            daemon=True,
+        )
+        for schedule in schedules
+    ]
+    for thread in threads:
+        thread.start()
+    try:
+        stop.wait()
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join()
@@ -3,13 +3,20 @@ from __future__ import annotations
 import json
 import sys
 from dataclasses import dataclass
-from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple, cast
+from typing import Any, Dict, List, Mapping, Optional, Tuple, cast
 
+from internet_troubleshooter.capabilities import CapabilityCache
+from internet_troubleshooter.stats import Column
 from internet_troubleshooter.utils import LABEL_WIDTH, run_command, summarize
 
+SPEEDTEST = "speedtest"
 SPEEDTEST_TIMEOUT = 300
 SPEEDTEST_HELP_TIMEOUT = 10
 
+# Whether speedtest answered -h, kept in the capability cache so that a run
+# does not wait on it every time.
+RUNS_CAPABILITY = "runs"
+
 # The speedtest CLI reports bandwidth in bytes per second; Mbps is
 # bytes/sec * 8 / 1e6, which is the same as dividing by 125,000.
 BYTES_PER_SEC_TO_MBPS = 125_000
@@ -143,11 +150,25 @@ class SpeedResult:
         return "\n".join(lines)
 
     @staticmethod
-    def check() -> bool:
+    def _probe() -> Optional[bool]:
+        """Whether speedtest -h succeeds, or None when it could not be run."""
         speedtest_exists = run_command(
-            ["speedtest", "-h"], timeout=SPEEDTEST_HELP_TIMEOUT
+            [SPEEDTEST, "-h"], timeout=SPEEDTEST_HELP_TIMEOUT
         )
-        if speedtest_exists is None or speedtest_exists.returncode != 0:
+        if speedtest_exists is None:
+            return None
+        return speedtest_exists.returncode == 0
+
+    @staticmethod
+    def check() -> bool:
+        """Whether the speedtest CLI is installed, warning when it is not."""
+        cache = CapabilityCache()
+        runs = cache.get(SPEEDTEST, RUNS_CAPABILITY)
+        if runs is None:
+            runs = SpeedResult._probe()
+            if runs is not None:
+                cache.put(SPEEDTEST, RUNS_CAPABILITY, runs)
+        if not runs:
             print(
                 (
                     "WARNING: speedtest cli not installed.\n"
@@ -160,10 +181,8 @@ class SpeedResult:
         return True
 
     @staticmethod
-    def summarize(results: Sequence[Optional[SpeedResult]]) -> str:
-        download = [result.download for result in results if result is not None]
-        upload = [result.upload for result in results if result is not None]
-        latency = [result.latency for result in results if result is not None]
+    def summarize(download: Column, upload: Column, latency: Column) -> str:
+        """Summaries of the figures of the speedtests, a value per test in each."""
         return "{}\n\n{}\n\n{}".format(
             summarize(download, "Download", "Mbps"),
             summarize(upload, "Upload", "Mbps"),
@@ -173,7 +192,7 @@ class SpeedResult:
     @staticmethod
     def execute_test() -> Optional[str]:
         speedtest_result = run_command(
-            ["speedtest", "-f", "json"], timeout=SPEEDTEST_TIMEOUT
+            [SPEEDTEST, "-f", "json"], timeout=SPEEDTEST_TIMEOUT
         )
         if speedtest_result is None:
             return None
@@ -0,0 +1,147 @@
+"""Summary statistics over columns of measurements.
+
+A summary covers every run in a results log, which can hold hundreds of
+thousands of them, so the figures are worked out in one pass over an array of
+doubles rather than one exact, and slow, pass per figure as the statistics
+module does. When NumPy is installed, long columns are handed to it instead.
+"""
+
+from __future__ import annotations
+
+import math
+from array import array
+from dataclasses import dataclass
+from typing import Any, Iterable, Optional, Sequence, Union
+
+# Columns shorter than this are summarized in Python even when NumPy is
+# installed: copying them into NumPy costs more than it saves, and a short
+# column then sums the same way whichever is installed.
+NUMPY_MIN_VALUES = 1000
+
+# The percentiles a summary reports.
+SUMMARY_PERCENTILES = (50.0, 95.0, 99.0)
+
+# A column of measurements, ideally an array of doubles, which NumPy reads
+# without copying it.
+Column = Union["array[float]", Sequence[float]]
+
+
+@dataclass
+class Summary:
+    """The figures a summary reports for a column of at least one value.
+
+    variance is the sample variance, and is None for a single value.
+    """
+
+    count: int
+    mean: float
+    variance: Optional[float]
+    minimum: float
+    maximum: float
+    p50: float
+    p95: float
+    p99: float
+
+
+class RunningStats:
+    """The count, mean, variance, and range of values, updated one at a time.
+
+    This is Welford's algorithm, which unlike summing the values and their
+    squares does not lose the variance to rounding when it is small next to
+    the mean.
+    """
+
+    __slots__ = ("count", "mean", "_squares", "minimum", "maximum")
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.mean = 0.0
+        self._squares = 0.0
+        self.minimum = math.inf
+        self.maximum = -math.inf
+
+    def extend(self, values: Iterable[float]) -> None:
+        # Kept in locals, since attribute lookups per value would dominate.
+        count, mean, squares = self.count, self.mean, self._squares
+        minimum, maximum = self.minimum, self.maximum
+        for value in values:
+            count += 1
+            delta = value - mean
+            mean += delta / count
+            squares += delta * (value - mean)
+            if value < minimum:
+                minimum = value
+            if value > maximum:
+                maximum = value
+        self.count, self.mean, self._squares = count, mean, squares
+        self.minimum, self.maximum = minimum, maximum
+
+    @property
+    def variance(self) -> Optional[float]:
+        """The sample variance, or None with fewer than two values."""
+        if self.count < 2:
+            return None
+        return self._squares / (self.count - 1)
+
+
+def percentile(ordered: Sequence[float], percent: float) -> float:
+    """The value percent of ordered, which must not be empty, are no more than.
+
+    Interpolated between the two nearest values, as a spreadsheet does.
+    """
+    position = (len(ordered) - 1) * percent / 100
+    lower = math.floor(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def _numpy() -> Any:
+    """NumPy, or None when it is not installed."""
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+def describe(values: Column) -> Optional[Summary]:
+    """The summary of values, or None when there are none."""
+    if not values:
+        return None
+    numpy = _numpy() if len(values) >= NUMPY_MIN_VALUES else None
+    if numpy is not None:
+        return _describe_with_numpy(numpy, values)
+
+    stats = RunningStats()
+    stats.extend(values)
+    ordered = sorted(values)
+    p50, p95, p99 = (percentile(ordered, percent) for percent in SUMMARY_PERCENTILES)
+    return Summary(
+        count=stats.count,
+        mean=stats.mean,
+        variance=stats.variance,
+        minimum=stats.minimum,
+        maximum=stats.maximum,
+        p50=p50,
+        p95=p95,
+        p99=p99,
+    )
+
+
+def _describe_with_numpy(numpy: Any, values: Column) -> Summary:
+    column = (
+        numpy.frombuffer(values, dtype=numpy.float64)
+        if isinstance(values, array) and values.typecode == "d"
+        else numpy.asarray(values, dtype=numpy.float64)
+    )
+    p50, p95, p99 = numpy.percentile(column, SUMMARY_PERCENTILES)
+    return Summary(
+        count=len(column),
+        mean=float(column.mean()),
+        variance=float(column.var(ddof=1)),
+        minimum=float(column.min()),
+        maximum=float(column.max()),
+        p50=float(p50),
+        p95=float(p95),
+        p99=float(p99),
+    )
@@ -0,0 +1,277 @@
+"""An SQLite results store, kept as an alternative to the YAML results log.
+
+Every run is one row. The figures the summaries and charts plot each get a
+column of their own, so reading them back touches neither the traceroute hops
+nor the speedtest's full JSON payload, which are kept as JSON text in columns
+of their own and only decoded when a report asks for them. The pings of any
+targets besides the first are likewise kept as JSON text, in a column added to
+stores created before there was one, as are the tests and targets that failed.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+from contextlib import closing
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+from internet_troubleshooter.ping_test import PingResult
+from internet_troubleshooter.result import TestResult, TimeWindow
+from internet_troubleshooter.speed_test import SpeedResult
+from internet_troubleshooter.trace_test import TraceResult
+
+StorePath = Union[str, "os.PathLike[str]"]
+
+# time_stamp is unique so that migrating the same YAML log twice, or a log that
+# overlaps what is already stored, does not record any run twice.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    time_stamp REAL NOT NULL UNIQUE,
+    ping_ip TEXT,
+    packet_loss REAL,
+    rtt_min_ms REAL,
+    rtt_avg_ms REAL,
+    rtt_max_ms REAL,
+    rtt_mdev_ms REAL,
+    download REAL,
+    upload REAL,
+    latency REAL,
+    speed_raw_result TEXT,
+    trace_result TEXT
+)
+"""
+
+# Columns added since the first version of SCHEMA, with their types. They are
+# added to every store that lacks them when it is opened to be written, new
+# stores included, so a store is the same whichever version created it.
+ADDED_COLUMNS = {
+    "extra_ping_results": "TEXT",
+    "jitter_ms": "REAL",
+    "rtt_p50_ms": "REAL",
+    "rtt_p95_ms": "REAL",
+    "rtt_p99_ms": "REAL",
+    "loss_bursts": "INTEGER",
+    "longest_loss_burst": "INTEGER",
+    "packets_sent": "INTEGER",
+    "packet_loss_ci_low": "REAL",
+    "packet_loss_ci_high": "REAL",
+    "failed_tests": "TEXT",
+    "failed_extra_pings": "TEXT",
+}
+
+# The columns holding the figures of the first target's ping, named after the
+# PingResult fields they hold, which ping_ip and packet_loss come first of.
+PING_FIGURE_COLUMNS = (
+    "rtt_min_ms",
+    "rtt_avg_ms",
+    "rtt_max_ms",
+    "rtt_mdev_ms",
+    "jitter_ms",
+    "rtt_p50_ms",
+    "rtt_p95_ms",
+    "rtt_p99_ms",
+    "loss_bursts",
+    "longest_loss_burst",
+    "packets_sent",
+    "packet_loss_ci_low",
+    "packet_loss_ci_high",
+)
+
+SUMMARY_COLUMNS = (
+    ("time_stamp", "ping_ip", "packet_loss")
+    + PING_FIGURE_COLUMNS
+    + ("download", "upload", "latency", "extra_ping_results")
+    + ("failed_tests", "failed_extra_pings")
+)
+DETAIL_COLUMNS = ("speed_raw_result", "trace_result")
+
+INSERT = "INSERT OR IGNORE INTO results ({}) VALUES ({})".format(
+    ", ".join(SUMMARY_COLUMNS + DETAIL_COLUMNS),
+    ", ".join("?" for _ in SUMMARY_COLUMNS + DETAIL_COLUMNS),
+)
+
+
+class StoreError(Exception):
+    """The results store could not be opened, read, or written."""
+
+
+def _to_json(value: Optional[Dict[str, Any]]) -> Optional[str]:
+    return None if value is None else json.dumps(value, sort_keys=True)
+
+
+def _extra_pings_to_json(extra_ping_results: List[PingResult]) -> Optional[str]:
+    if not extra_ping_results:
+        return None
+    return json.dumps([ping.to_dict() for ping in extra_ping_results])
+
+
+def _extra_pings_from_json(value: Optional[str]) -> List[PingResult]:
+    if value is None:
+        return []
+    return [PingResult.from_dict(ping) for ping in json.loads(value)]
+
+
+def _list_to_json(values: List[str]) -> Optional[str]:
+    return json.dumps(values) if values else None
+
+
+def _list_from_json(value: Optional[str]) -> List[str]:
+    return [] if value is None else [str(item) for item in json.loads(value)]
+
+
+def _ping_row(ping: Optional[PingResult]) -> Tuple[Any, ...]:
+    """The ping_ip, packet_loss, and PING_FIGURE_COLUMNS of a row."""
+    if ping is None:
+        return (None,) * (2 + len(PING_FIGURE_COLUMNS))
+    data = ping.to_dict()
+    return (ping.ip, ping.packet_loss) + tuple(
+        data.get(column) for column in PING_FIGURE_COLUMNS
+    )
+
+
+def _to_row(result: TestResult) -> Tuple[Any, ...]:
+    speed = result.speed_result
+    trace = result.trace_result
+    return (
+        (result.time_stamp,)
+        + _ping_row(result.ping_result)
+        + (
+            None if speed is None else speed.download,
+            None if speed is None else speed.upload,
+            None if speed is None else speed.latency,
+            _extra_pings_to_json(result.extra_ping_results),
+            _list_to_json(result.failed_tests),
+            _list_to_json(result.failed_extra_pings),
+            None if speed is None else _to_json(speed.raw_result),
+            None if trace is None else _to_json(trace.to_dict()),
+        )
+    )
+
+
+def _from_row(row: Sequence[Any]) -> TestResult:
+    """A TestResult from a row of SUMMARY_COLUMNS, optionally DETAIL_COLUMNS too."""
+    columns = dict(zip(SUMMARY_COLUMNS, row))
+    raw_result, trace = row[len(SUMMARY_COLUMNS) :] or (None, None)
+
+    ping_result = None
+    if columns["ping_ip"] is not None:
+        ping_result = PingResult.from_dict(
+            dict(
+                {column: columns[column] for column in PING_FIGURE_COLUMNS},
+                ip=columns["ping_ip"],
+                packet_loss=columns["packet_loss"],
+            )
+        )
+
+    speed_result = None
+    if columns["download"] is not None:
+        speed_result = SpeedResult(
+            upload=columns["upload"],
+            download=columns["download"],
+            latency=columns["latency"],
+            raw_result=None if raw_result is None else json.loads(raw_result),
+        )
+
+    return TestResult(
+        ping_result=ping_result,
+        trace_result=(
+            None if trace is None else TraceResult.from_dict(json.loads(trace))
+        ),
+        speed_result=speed_result,
+        time_stamp=columns["time_stamp"],
+        extra_ping_results=_extra_pings_from_json(columns["extra_ping_results"]),
+        failed_tests=_list_from_json(columns["failed_tests"]),
+        failed_extra_pings=_list_from_json(columns["failed_extra_pings"]),
+    )
+
+
+def _missing_columns(connection: sqlite3.Connection) -> List[str]:
+    """The ADDED_COLUMNS that a store created before them does not have."""
+    present = {row[1] for row in connection.execute("PRAGMA table_info(results)")}
+    return [column for column in ADDED_COLUMNS if column not in present]
+
+
+def _connect(path: StorePath, create: bool) -> sqlite3.Connection:
+    """Open the store, creating it only when create is set.
+
+    sqlite creates any file it is asked to open, which would turn a mistyped
+    path given to display into an empty report rather than an error.
+    """
+    try:
+        if create:
+            connection = sqlite3.connect(os.fspath(path))
+            connection.execute(SCHEMA)
+            with connection:
+                for column in _missing_columns(connection):
+                    connection.execute(
+                        "ALTER TABLE results ADD COLUMN {} {}".format(
+                            column, ADDED_COLUMNS[column]
+                        )
+                    )
+            return connection
+        uri = "{}?mode=ro".format(Path(path).absolute().as_uri())
+        return sqlite3.connect(uri, uri=True)
+    except sqlite3.Error as error:
+        raise StoreError(
+            "Unable to open results store '{}': {}".format(os.fspath(path), error)
+        ) from error
+
+
+def append_results(path: StorePath, results: Iterable[TestResult]) -> int:
+    """Add results to the store, returning how many were not already in it."""
+    connection = _connect(path, create=True)
+    try:
+        with closing(connection), connection:
+            before = connection.total_changes
+            connection.executemany(INSERT, (_to_row(result) for result in results))
+            return connection.total_changes - before
+    except sqlite3.Error as error:
+        raise StoreError(
+            "Unable to write results to store '{}': {}".format(os.fspath(path), error)
+        ) from error
+
+
+def _window_clause(window: Optional[TimeWindow]) -> Tuple[str, List[float]]:
+    """The WHERE clause selecting the rows inside window, and its parameters."""
+    conditions = []
+    parameters = []
+    if window is not None and window.since is not None:
+        conditions.append("time_stamp >= ?")
+        parameters.append(window.since)
+    if window is not None and window.until is not None:
+        conditions.append("time_stamp <= ?")
+        parameters.append(window.until)
+    if not conditions:
+        return "", parameters
+    return " WHERE {}".format(" AND ".join(conditions)), parameters
+
+
+def load_results(
+    path: StorePath, details: bool = True, window: Optional[TimeWindow] = None
+) -> List[TestResult]:
+    """Every stored result, or every one inside window, oldest first.
+
+    Without details, the traceroute hops and the speedtest's full payload are
+    not read, which is all a text summary needs.
+    """
+    where, parameters = _window_clause(window)
+    connection = _connect(path, create=False)
+    try:
+        with closing(connection):
+            # A store written by an older version is read as it is, rather than
+            # migrated, since display opens it read only.
+            missing = _missing_columns(connection)
+            columns = [
+                "NULL" if column in missing else column
+                for column in SUMMARY_COLUMNS + (DETAIL_COLUMNS if details else ())
+            ]
+            query = "SELECT {} FROM results{} ORDER BY time_stamp".format(
+                ", ".join(columns), where
+            )
+            return [_from_row(row) for row in connection.execute(query, parameters)]
+    except sqlite3.Error as error:
+        raise StoreError(
+            "Unable to read results from store '{}': {}".format(os.fspath(path), error)
+        ) from error
@@ -4,11 +4,25 @@ import logging
 import re
 import subprocess
 import sys
+from concurrent.futures import Future, ThreadPoolExecutor
 from dataclasses import dataclass
-from typing import Any, Dict, List, Mapping, Optional
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Mapping,
+    Optional,
+    Tuple,
+    Union,
+)
 
+from internet_troubleshooter import icmp
+from internet_troubleshooter.capabilities import CapabilityCache
+from internet_troubleshooter.path_cache import PathCache
 from internet_troubleshooter.ping_test import PingResult, default_ping_count_for_uid
-from internet_troubleshooter.utils import run_command
+from internet_troubleshooter.utils import StreamedCommand, run_command, stream_command
 
 logger = logging.getLogger(__name__)
 
@@ -39,6 +53,8 @@ NUMERIC_REJECTED_REGEX = re.compile(
     re.IGNORECASE,
 )
 
+NUMERIC_CAPABILITY = "numeric"
+
 # True when -n is accepted, False when it is not, and None while unprobed or
 # when traceroute could not be run at all.
 _numeric_supported: Optional[bool] = None
@@ -50,6 +66,14 @@ _numeric_supported: Optional[bool] = None
 DEFAULT_TRACE_HOP_PING_COUNT_ROOT = 50
 DEFAULT_TRACE_HOP_PING_COUNT_NON_ROOT = 10
 
+# Hops are pinged this many at a time. Each ping is its own process that spends
+# nearly all of its time waiting on the network, so a trace takes about as long
+# as its slowest hop rather than the sum of them, while the bound keeps a long
+# path from forking a ping per hop all at once. Each hop is pinged as soon as
+# traceroute prints it, so the pings also overlap the rest of the trace, which
+# can spend most of its two minutes waiting out hops that never answer.
+DEFAULT_TRACE_PARALLELISM = 8
+
 
 def parse_trace_line(line: str) -> Optional[str]:
     """Return the IP address of a traceroute hop line, or None if there is none."""
@@ -72,19 +96,26 @@ def _probe_numeric_support() -> Optional[bool]:
     return NUMERIC_HELP_REGEX.search(help_text) is not None
 
 
-def _cache_numeric_support(supported: Optional[bool]) -> None:
+def _cache_numeric_support(supported: Optional[bool], persist: bool = True) -> None:
     global _numeric_supported
     _numeric_supported = supported
+    if supported is not None and persist:
+        CapabilityCache().put(TRACEROUTE, NUMERIC_CAPABILITY, supported)
 
 
 def _traceroute_supports_numeric() -> Optional[bool]:
     """Whether the installed traceroute accepts -n, probing at most once.
 
-    Which traceroute is installed cannot change while the process runs, and a
-    trace pings every hop it finds, so the answer is cached.
+    Which traceroute is installed rarely changes, and a trace pings every hop it
+    finds, so the answer is cached for the process and in the capability cache
+    for the runs after it.
     """
     if _numeric_supported is None:
-        _cache_numeric_support(_probe_numeric_support())
+        cached = CapabilityCache().get(TRACEROUTE, NUMERIC_CAPABILITY)
+        if cached is None:
+            _cache_numeric_support(_probe_numeric_support())
+        else:
+            _cache_numeric_support(cached, persist=False)
         logger.debug("traceroute -n supported: %s", _numeric_supported)
     return _numeric_supported
 
@@ -96,7 +127,9 @@ def _traceroute_command(ip: str) -> List[str]:
     return [TRACEROUTE, ip]
 
 
-def _numeric_option_rejected(result: "subprocess.CompletedProcess[str]") -> bool:
+def _numeric_option_rejected(
+    result: Union["subprocess.CompletedProcess[str]", StreamedCommand],
+) -> bool:
     """True when traceroute failed because it does not know the -n option."""
     return (
         result.returncode != 0
@@ -104,7 +137,28 @@ def _numeric_option_rejected(result: "subprocess.CompletedProcess[str]") -> bool
     )
 
 
-def _run_traceroute(ip: str) -> Optional["subprocess.CompletedProcess[str]"]:
+def _stream_traceroute(
+    command: List[str], on_line: Optional[Callable[[str], None]]
+) -> Optional["subprocess.CompletedProcess[str]"]:
+    """Run command as run_command would, handing on_line each line it prints."""
+    streamed = stream_command(command, timeout=TRACE_TIMEOUT)
+    if streamed is None:
+        return None
+    lines: List[str] = []
+    for line in streamed:
+        lines.append(line)
+        if on_line is not None:
+            on_line(line)
+    if streamed.returncode is None:
+        return None
+    return subprocess.CompletedProcess(
+        command, streamed.returncode, "".join(lines), streamed.stderr
+    )
+
+
+def _run_traceroute(
+    ip: str, on_line: Optional[Callable[[str], None]] = None
+) -> Optional["subprocess.CompletedProcess[str]"]:
     """Trace to ip, retrying without -n if the binary turns out to reject it.
 
     The help text and the binary that ends up running can disagree, so a
@@ -115,14 +169,14 @@ def _run_traceroute(ip: str) -> Optional["subprocess.CompletedProcess[str]"]:
 
     command = _traceroute_command(ip)
     logger.debug("Traceroute command: %s", command)
-    result = run_command(command, timeout=TRACE_TIMEOUT)
+    result = _stream_traceroute(command, on_line)
     if result is None or "-n" not in command or not _numeric_option_rejected(result):
         return result
 
     _cache_numeric_support(False)
     retry = _traceroute_command(ip)
     logger.debug("traceroute rejected -n, retrying as: %s", retry)
-    return run_command(retry, timeout=TRACE_TIMEOUT)
+    return _stream_traceroute(retry, on_line)
 
 
 def default_hop_ping_count() -> int:
@@ -153,8 +207,14 @@ class TraceResult:
         )
 
     @staticmethod
-    def execute_test(ip: str) -> Optional[str]:
-        trace_result = _run_traceroute(ip)
+    def execute_test(
+        ip: str, on_line: Optional[Callable[[str], None]] = None
+    ) -> Optional[str]:
+        """The output of traceroute to ip, or None when it could not be traced.
+
+        on_line is called with every line of it as soon as it is printed.
+        """
+        trace_result = _run_traceroute(ip, on_line)
         if trace_result is None:
             return None
         if trace_result.returncode != 0:
@@ -173,9 +233,15 @@ class TraceResult:
         deduplicated, keeping the order in which they first appear. The target
         itself is excluded because it is covered by the primary ping test.
         """
+        return TraceResult.unique_hops(
+            (parse_trace_line(line) for line in trace_output.splitlines()), target_ip
+        )
+
+    @staticmethod
+    def unique_hops(trace_ips: Iterable[Optional[str]], target_ip: str) -> List[str]:
+        """The hops of a path, as hop_ips picks them, skipping the silent ones."""
         hops: List[str] = list()
-        for line in trace_output.splitlines():
-            trace_ip = parse_trace_line(line)
+        for trace_ip in trace_ips:
             logger.debug("trace_ip: %s", trace_ip)
             if trace_ip is None or trace_ip == target_ip or trace_ip in hops:
                 continue
@@ -183,18 +249,239 @@ class TraceResult:
         return hops
 
     @staticmethod
-    def run_test(ip: str, hop_count: Optional[int] = None) -> Optional[TraceResult]:
-        logger.debug("Running Traceroute")
+    def reached(trace_ips: Iterable[Optional[str]], target_ip: str) -> bool:
+        """Whether the target answered at the end of a traced path.
+
+        traceroute prints the target's address, so a target given by name is
+        looked up to be found in the path.
+        """
+        answered = {trace_ip for trace_ip in trace_ips if trace_ip is not None}
+        return target_ip in answered or icmp.resolve(target_ip) in answered
+
+    @staticmethod
+    def trace_hops(ip: str, native: bool = False) -> Optional[List[str]]:
+        """The hops on the way to ip, or None when it could not be traced.
+
+        With native, the trace is run from this process, falling back to
+        traceroute when it cannot be.
+        """
+        traced = TraceResult._trace_path(ip, native)
+        return None if traced is None else traced[0]
+
+    @staticmethod
+    def _trace_path(ip: str, native: bool) -> Optional[Tuple[List[str], bool]]:
+        """The hops trace_hops traces to ip, and whether the trace reached it."""
+        if native:
+            traced = TraceResult._trace_natively(ip)
+            if traced is not None:
+                return traced
+
         results = TraceResult.execute_test(ip)
         logger.debug("Traceroute: %s", results)
         if results is None:
             return None
+        return TraceResult.hop_ips(results, ip), TraceResult._reached_in(results, ip)
+
+    @staticmethod
+    def _reached_in(trace_output: str, target_ip: str) -> bool:
+        return TraceResult.reached(
+            (parse_trace_line(line) for line in trace_output.splitlines()), target_ip
+        )
+
+    @staticmethod
+    def _trace_natively(ip: str) -> Optional[Tuple[List[str], bool]]:
+        try:
+            path = icmp.trace(ip)
+        except icmp.IcmpError as error:
+            print(
+                "WARNING: Running traceroute instead, {}.".format(error),
+                file=sys.stderr,
+            )
+            return None
+        logger.debug("Traced from this process: %s", path)
+        return TraceResult.unique_hops(path, ip), TraceResult.reached(path, ip)
+
+    @staticmethod
+    def ping_hops(
+        hop_ips: List[str],
+        hop_count: int,
+        parallelism: int,
+        native: bool = False,
+        adaptive_loss: Optional[float] = None,
+    ) -> List[Optional[PingResult]]:
+        """Ping every hop, up to parallelism at once, keeping them in hop order.
+
+        With native, every hop is pinged at once from this process instead.
+        adaptive_loss makes the pings adaptive, as PingResult.run_test does.
+        Hops that could not be pinged are left out.
+        """
+        if not hop_ips:
+            return []
+
+        logger.debug("Pinging %d hop(s), %d at a time", len(hop_ips), parallelism)
+        hop_results = PingResult.run_tests(
+            hop_ips,
+            hop_count,
+            native=native,
+            parallelism=parallelism,
+            adaptive_loss=adaptive_loss,
+        )
+        return [result for result in hop_results if result is not None]
+
+    @staticmethod
+    def trace_and_ping_hops(
+        ip: str,
+        hop_count: int,
+        parallelism: int,
+        adaptive_loss: Optional[float] = None,
+    ) -> Optional[Tuple[List[str], List[Optional[PingResult]], bool]]:
+        """Run traceroute to ip, pinging each hop as soon as it is printed.
+
+        Up to parallelism hops are pinged at once, as ping_hops does. Returns
+        the hops, the results of those that could be pinged in hop order, and
+        whether the trace reached ip, or None when ip could not be traced.
+        """
+        pings: Dict[str, "Future[Optional[PingResult]]"] = {}
+        with ThreadPoolExecutor(max_workers=parallelism) as executor:
+
+            def ping(hop_ip: str) -> None:
+                if hop_ip != ip and hop_ip not in pings:
+                    logger.debug("Pinging hop %s", hop_ip)
+                    pings[hop_ip] = executor.submit(
+                        PingResult.run_test,
+                        hop_ip,
+                        hop_count,
+                        adaptive_loss=adaptive_loss,
+                    )
+
+            def on_line(line: str) -> None:
+                hop_ip = parse_trace_line(line)
+                if hop_ip is not None:
+                    ping(hop_ip)
+
+            results = TraceResult.execute_test(ip, on_line)
+            logger.debug("Traceroute: %s", results)
+            if results is None:
+                for pending in pings.values():
+                    pending.cancel()
+                return None
+            hop_ips = TraceResult.hop_ips(results, ip)
+            for hop_ip in hop_ips:
+                ping(hop_ip)
+
+        hop_results = (pings[hop_ip].result() for hop_ip in hop_ips)
+        return (
+            hop_ips,
+            [result for result in hop_results if result is not None],
+            TraceResult._reached_in(results, ip),
+        )
+
+    @staticmethod
+    def _trace(
+        ip: str,
+        hop_count: int,
+        parallelism: int,
+        native: bool,
+        native_trace: bool,
+        adaptive_loss: Optional[float],
+    ) -> Optional[Tuple[List[str], List[Optional[PingResult]], bool]]:
+        traced = TraceResult._trace_natively(ip) if native_trace else None
+        if traced is None and not native:
+            return TraceResult.trace_and_ping_hops(
+                ip, hop_count, parallelism, adaptive_loss
+            )
 
+        if traced is None:
+            traced = TraceResult._trace_path(ip, native=False)
+            if traced is None:
+                return None
+        hop_ips, reached = traced
+        return (
+            hop_ips,
+            TraceResult.ping_hops(
+                hop_ips, hop_count, parallelism, native, adaptive_loss
+            ),
+            reached,
+        )
+
+    @staticmethod
+    def _ping_cached_path(
+        ip: str,
+        hop_count: int,
+        parallelism: int,
+        native: bool,
+        adaptive_loss: Optional[float],
+        path_cache: PathCache,
+    ) -> Optional[TraceResult]:
+        """Ping the hops path_cache has for ip, unless the path has changed.
+
+        A path whose first or last hop no longer answers has most likely
+        changed, so it is dropped from the cache, and None is returned for ip
+        to be traced again.
+        """
+        hop_ips = path_cache.get(ip)
+        if hop_ips is None:
+            return None
+
+        logger.debug("Pinging the cached path to %s: %s", ip, hop_ips)
+        ping_results = TraceResult.ping_hops(
+            hop_ips, hop_count, parallelism, native, adaptive_loss
+        )
+        answered = {
+            result.ip
+            for result in ping_results
+            if result is not None and result.packet_loss < 100
+        }
+        if all(hop_ip in answered for hop_ip in hop_ips[:1] + hop_ips[-1:]):
+            return TraceResult(ping_results=ping_results)
+
+        logger.debug("The cached path to %s stopped answering, tracing it again", ip)
+        path_cache.invalidate(ip)
+        return None
+
+    @staticmethod
+    def run_test(
+        ip: str,
+        hop_count: Optional[int] = None,
+        parallelism: int = DEFAULT_TRACE_PARALLELISM,
+        native: bool = False,
+        native_trace: bool = False,
+        path_cache: Optional[PathCache] = None,
+        adaptive_loss: Optional[float] = None,
+    ) -> Optional[TraceResult]:
+        """Trace to ip and ping every hop on the way.
+
+        native pings the hops from this process, and native_trace traces from
+        it, rather than running ping and traceroute. Hops pinged with ping are
+        pinged while traceroute is still running; a native trace or native
+        pings take no longer for sending to every hop at once afterwards.
+
+        With a path_cache, the hops it holds for ip are pinged without tracing
+        at all, and a path that had to be traced is added to it, once it is
+        known to lead to ip.
+
+        adaptive_loss makes the pings of the hops adaptive, as
+        PingResult.run_test does.
+        """
+        logger.debug("Running Traceroute")
         if hop_count is None:
             hop_count = default_hop_ping_count()
-        trace_ping_results: List[Optional[PingResult]] = list()
-        for trace_ip in TraceResult.hop_ips(results, ip):
-            trace_ping_result = PingResult.run_test(trace_ip, hop_count)
-            if trace_ping_result is not None:
-                trace_ping_results.append(trace_ping_result)
-        return TraceResult(ping_results=trace_ping_results)
+
+        if path_cache is not None:
+            cached = TraceResult._ping_cached_path(
+                ip, hop_count, parallelism, native, adaptive_loss, path_cache
+            )
+            if cached is not None:
+                return cached
+
+        traced = TraceResult._trace(
+            ip, hop_count, parallelism, native, native_trace, adaptive_loss
+        )
+        if traced is None:
+            return None
+        hop_ips, ping_results, reached = traced
+        # A path that stops short of ip, as one traced during an outage does,
+        # would keep a run from tracing again while the outage lasts.
+        if path_cache is not None and hop_ips and reached:
+            path_cache.put(ip, hop_ips)
+        return TraceResult(ping_results=ping_results)
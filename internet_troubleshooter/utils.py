@@ -2,11 +2,15 @@ from __future__ import annotations
 
 import ipaddress
 import logging
+import math
 import re
 import subprocess
 import sys
-from statistics import mean, variance
-from typing import Optional, Sequence
+import tempfile
+import threading
+from typing import IO, Iterator, Optional, Sequence
+
+from internet_troubleshooter.stats import Column, describe
 
 DEFAULT_TIMEOUT = 120
 
@@ -16,6 +20,19 @@ LOG_FORMAT = "%(levelname)s: %(message)s"
 # line up, whichever test each line came from.
 LABEL_WIDTH = 13
 
+# Reference lines drawn on the HTML plots, marking the thresholds below which a
+# connection is considered to be underperforming. They are the defaults of the
+# display options, so they live here rather than with the rendering code, which
+# only display loads.
+PLOT_DOWNLOAD_MBPS = 50
+PLOT_UPLOAD_MBPS = 15
+PLOT_LATENCY_MS = 20
+PLOT_PACKET_LOSS_PCT = 3
+
+# Points drawn per line of the HTML charts before runs are bucketed, which
+# keeps a report of a long history quick to open in a browser.
+PLOT_MAX_POINTS = 5000
+
 MAX_HOSTNAME_LENGTH = 253
 HOSTNAME_LABEL_REGEX = re.compile(r"^[A-Za-z0-9](?:[A-Za-z0-9-]{0,61}[A-Za-z0-9])?$")
 
@@ -64,40 +81,151 @@ def run_command(
             timeout=timeout,
         )
     except subprocess.TimeoutExpired:
-        print(
-            "ERROR: '{}' timed out after {} seconds.".format(command[0], timeout),
-            file=sys.stderr,
-        )
-    except FileNotFoundError:
+        _print_timed_out(command, timeout)
+    except OSError as error:
+        _print_not_run(command, error)
+    return None
+
+
+def _print_timed_out(command: Sequence[str], timeout: float) -> None:
+    print(
+        "ERROR: '{}' timed out after {} seconds.".format(command[0], timeout),
+        file=sys.stderr,
+    )
+
+
+def _print_not_run(command: Sequence[str], error: OSError) -> None:
+    if isinstance(error, FileNotFoundError):
         print(
             "ERROR: '{}' command not found, is it installed and on PATH?".format(
                 command[0]
             ),
             file=sys.stderr,
         )
-    except OSError as error:
+    else:
         print(
             "ERROR: Unable to run '{}': {}".format(command[0], error),
             file=sys.stderr,
         )
-    return None
+
+
+def stream_command(
+    command: Sequence[str], timeout: float = DEFAULT_TIMEOUT
+) -> Optional[StreamedCommand]:
+    """Run command, returning its output line by line as it is written.
+
+    Like run_command, this returns None when the command could not be run at
+    all. A command still running after timeout seconds is killed, which ends
+    its output early.
+    """
+    # stderr goes to a file rather than a pipe, so a command writing plenty
+    # to it cannot stall waiting for it to be read while stdout is.
+    errors = tempfile.TemporaryFile("w+")
+    try:
+        process = subprocess.Popen(
+            command,
+            stdout=subprocess.PIPE,
+            stderr=errors,
+            text=True,
+            bufsize=1,
+        )
+    except OSError as error:
+        errors.close()
+        _print_not_run(command, error)
+        return None
+    return StreamedCommand(process, command, timeout, errors)
+
+
+class StreamedCommand:
+    """The lines a running command writes, as stream_command returns them.
+
+    Once every line has been read, returncode is the exit status of the
+    command, or None when it was killed for running too long, and stderr is
+    everything it wrote there.
+    """
+
+    def __init__(
+        self,
+        process: "subprocess.Popen[str]",
+        command: Sequence[str],
+        timeout: float,
+        errors: IO[str],
+    ) -> None:
+        self.returncode: Optional[int] = None
+        self.stderr = ""
+        self._lines = self._stream(process, command, timeout, errors)
+
+    def __iter__(self) -> Iterator[str]:
+        return self
+
+    def __next__(self) -> str:
+        return next(self._lines)
+
+    def _stream(
+        self,
+        process: "subprocess.Popen[str]",
+        command: Sequence[str],
+        timeout: float,
+        errors: IO[str],
+    ) -> Iterator[str]:
+        expired = threading.Event()
+
+        def expire() -> None:
+            expired.set()
+            process.kill()
+
+        timer = threading.Timer(timeout, expire)
+        timer.start()
+        try:
+            if process.stdout is not None:
+                yield from process.stdout
+            # Output can end a moment before the command exits.
+            process.wait()
+        finally:
+            # Also reached when the caller stops reading early.
+            timer.cancel()
+            if process.poll() is None:
+                process.kill()
+            returncode = process.wait()
+            if process.stdout is not None:
+                process.stdout.close()
+            errors.seek(0)
+            self.stderr = errors.read()
+            errors.close()
+        if expired.is_set():
+            _print_timed_out(command, timeout)
+        else:
+            self.returncode = returncode
 
 
 def safe_mean(values: Sequence[float]) -> Optional[float]:
     """Mean of values, or None when there is no data to average."""
     if not values:
         return None
-    return mean(values)
-
-
-def summarize(values: Sequence[float], title: str = "", unit: str = "") -> str:
-    if len(values) >= 2:
-        return (
-            "{0}:\n"
-            "  Mean: {2:.2f}{1}\n"
-            "  Variance: {3:.2f}{1}\n"
-            "  Min: {4:.2f}{1}\n"
-            "  Max: {5:.2f}{1}"
-        ).format(title, unit, mean(values), variance(values), min(values), max(values))
-    else:
+    return math.fsum(values) / len(values)
+
+
+def summarize(values: Column, title: str = "", unit: str = "") -> str:
+    summary = describe(values)
+    if summary is None or summary.variance is None:
         return "{0}: Not enough data.".format(title)
+    return (
+        "{0}:\n"
+        "  Mean: {2:.2f}{1}\n"
+        "  Variance: {3:.2f}{1}\n"
+        "  Min: {4:.2f}{1}\n"
+        "  Max: {5:.2f}{1}\n"
+        "  p50: {6:.2f}{1}\n"
+        "  p95: {7:.2f}{1}\n"
+        "  p99: {8:.2f}{1}"
+    ).format(
+        title,
+        unit,
+        summary.mean,
+        summary.variance,
+        summary.minimum,
+        summary.maximum,
+        summary.p50,
+        summary.p95,
+        summary.p99,
+    )
@@ -3,9 +3,11 @@ import pytest
 
 @pytest.fixture(autouse=True)
 def isolated_config_home(tmp_path, monkeypatch):
-    """Point the default config file location at an empty directory.
+    """Point the default config file and cache locations at empty directories.
 
     Without this, a config file in the home directory of whoever runs the
-    tests would supply defaults to every CLI test in the suite.
+    tests would supply defaults to every CLI test in the suite, and the tests
+    would read and write the real cache.
     """
     monkeypatch.setenv("XDG_CONFIG_HOME", str(tmp_path / "config_home"))
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache_home"))
@@ -0,0 +1,69 @@
+import json
+import os
+
+from internet_troubleshooter.capabilities import CapabilityCache
+
+
+def install(mocker, tmp_path, name="traceroute"):
+    """A stand-in for an installed binary, found wherever it is looked for."""
+    binary = tmp_path / "bin" / name
+    binary.parent.mkdir(exist_ok=True)
+    binary.write_text("#!/bin/sh\n", encoding="utf-8")
+    mocker.patch("shutil.which", return_value=str(binary))
+    return binary
+
+
+def test_put_then_get_returns_the_capability(mocker, tmp_path):
+    install(mocker, tmp_path)
+    cache = CapabilityCache(tmp_path / "capabilities.json")
+
+    assert cache.get("traceroute", "numeric") is None
+    cache.put("traceroute", "numeric", False)
+
+    assert cache.get("traceroute", "numeric") is False
+    assert cache.get("traceroute", "something else") is None
+    # And in the runs after this one.
+    assert (
+        CapabilityCache(tmp_path / "capabilities.json").get("traceroute", "numeric")
+        is False
+    )
+
+
+def test_a_binary_that_changed_is_probed_again(mocker, tmp_path):
+    binary = install(mocker, tmp_path)
+    cache = CapabilityCache(tmp_path / "capabilities.json")
+    cache.put("traceroute", "numeric", True)
+
+    status = os.stat(binary)
+    os.utime(binary, ns=(status.st_atime_ns, status.st_mtime_ns + 1_000_000_000))
+    assert cache.get("traceroute", "numeric") is None
+
+    # What the old binary could do is forgotten along with it.
+    cache.put("traceroute", "other", True)
+    (entry,) = json.loads((tmp_path / "capabilities.json").read_text()).values()
+    assert entry["capabilities"] == {"other": True}
+
+
+def test_a_binary_that_is_not_installed_is_not_cached(mocker, tmp_path):
+    mocker.patch("shutil.which", return_value=None)
+    cache = CapabilityCache(tmp_path / "capabilities.json")
+
+    cache.put("speedtest", "runs", False)
+
+    assert cache.get("speedtest", "runs") is None
+    assert not (tmp_path / "capabilities.json").exists()
+
+
+def test_an_unreadable_cache_is_empty(mocker, tmp_path):
+    binary = install(mocker, tmp_path)
+    path = tmp_path / "capabilities.json"
+    cache = CapabilityCache(path)
+
+    path.write_text("not json", encoding="utf-8")
+    assert cache.get("traceroute", "numeric") is None
+
+    path.write_text(json.dumps({str(binary): "numeric"}), encoding="utf-8")
+    assert cache.get("traceroute", "numeric") is None
+
+    cache.put("traceroute", "numeric", True)
+    assert cache.get("traceroute", "numeric") is True
@@ -0,0 +1,74 @@
+from datetime import datetime, timedelta
+
+from internet_troubleshooter.chart_levels import (
+    aggregate,
+    build_levels,
+    choose_level,
+    raw_level,
+)
+
+
+def at(hour, minute=0):
+    return datetime(2024, 1, 31, hour, minute)
+
+
+def test_aggregate_spans_each_hour_with_its_mean_and_range():
+    raw = raw_level(
+        [at(9, 10), at(9, 40), at(10, 5), at(12, 0)],
+        {"loss": [0.0, 60.0, None, 2.0], "rtt": [None, None, None, 20.0]},
+        [False, False, True, True],
+    )
+
+    hourly = aggregate(raw, 60 * 60)
+
+    # An hour without runs has no point at all.
+    assert hourly.dates == [at(9), at(10), at(12)]
+    assert hourly.runs == [2, 1, 1]
+    assert hourly.means["loss"] == [30.0, None, 2.0]
+    assert hourly.lows["loss"] == [0.0, None, 2.0]
+    assert hourly.highs["loss"] == [60.0, None, 2.0]
+    assert hourly.means["rtt"] == [None, None, 20.0]
+    assert hourly.incomplete == [at(10), at(12)]
+
+
+def test_aggregate_starts_days_at_midnight():
+    raw = raw_level([at(0, 30), at(23, 59)], {"loss": [1.0, 3.0]}, [True, True])
+
+    daily = aggregate(raw, 24 * 60 * 60)
+
+    assert daily.dates == [datetime(2024, 1, 31)]
+    assert daily.means["loss"] == [2.0]
+    assert daily.incomplete == [datetime(2024, 1, 31)]
+
+
+def test_build_levels_keeps_only_levels_with_fewer_points():
+    hourly_runs = [at(hour) for hour in range(24)]
+    raw = raw_level(hourly_runs, {"loss": [0.0] * 24}, [False] * 24)
+
+    levels = build_levels(raw)
+
+    # A run an hour has no hourly level, which would be the same as the runs.
+    assert [level.seconds for level in levels] == [0, 24 * 60 * 60]
+    assert levels[0] is raw
+
+
+def test_build_levels_spans_days_until_the_points_fit():
+    dates = [datetime(2024, 1, 1) + timedelta(days=day) for day in range(30)]
+    raw = raw_level(dates, {"loss": [float(day) for day in range(30)]}, [False] * 30)
+
+    levels = build_levels(raw, max_points=10)
+
+    assert [level.seconds for level in levels] == [0, 3 * 24 * 60 * 60]
+    assert len(levels[-1].dates) == 10
+    assert levels[-1].means["loss"][0] == 1.0
+    assert build_levels(raw, max_points=30) == [raw]
+
+
+def test_choose_level():
+    raw = raw_level([at(9, minute) for minute in range(60)], {}, [False] * 60)
+    levels = build_levels(raw)
+
+    assert choose_level(levels, 60) == 0
+    assert choose_level(levels, 10) == 1
+    # Even the coarsest level is drawn when nothing fits.
+    assert choose_level(levels, 0) == len(levels) - 1
@@ -1,31 +1,75 @@
 import io
 import logging
+import subprocess
+import sys
+import threading
 from argparse import Namespace
+from datetime import datetime, timedelta
 
 import pytest
 
-from internet_troubleshooter import __version__, checkinternet
-from internet_troubleshooter.config import default_config_path
-from internet_troubleshooter.ping_test import PingResult
+from internet_troubleshooter import __version__, checkinternet, log_index, mtr, store
+from internet_troubleshooter.config import default_cache_dir, default_config_path
+from internet_troubleshooter.ping_test import PingResult, PingSamples
 from internet_troubleshooter.render import RenderThresholds
 from internet_troubleshooter.result import TestResult as InternetTestResult
 from internet_troubleshooter.speed_test import SpeedResult
 from internet_troubleshooter.trace_test import (
     DEFAULT_TRACE_HOP_PING_COUNT_NON_ROOT,
     DEFAULT_TRACE_HOP_PING_COUNT_ROOT,
+    TraceResult,
 )
 
 
 def make_args(**overrides):
     args = {
         "debug": False,
-        "ping_ip": "8.8.8.8",
+        "ping_ip": ["8.8.8.8"],
         "ping_count": 1,
+        "ping_per_packet": False,
+        "adaptive_ping": False,
+        "native_ping": False,
+        "native_trace": False,
         "trace_hop_ping_count": None,
+        "trace_parallelism": 8,
+        "trace_cache_ttl": 0.0,
         "max_packet_loss": 3.0,
         "skip_speedtest": True,
         "skip_pingtest": False,
+        "parallel_tests": False,
+        "yaml_file": None,
+        "store": None,
+    }
+    args.update(overrides)
+    return Namespace(**args)
+
+
+def daemon_args(**overrides):
+    args = {
+        "interval": 300.0,
+        "speed_interval": None,
+        "trace_interval": None,
+        "jitter": 0.1,
+    }
+    args.update(overrides)
+    return make_args(**args)
+
+
+def display_args(**overrides):
+    args = {
         "yaml_file": None,
+        "store": None,
+        "format": "human",
+        "html_file": None,
+        "embed_plotly": False,
+        "since": None,
+        "until": None,
+        "last": None,
+        "target_download_mbps": 50.0,
+        "target_upload_mbps": 15.0,
+        "target_latency_ms": 20.0,
+        "target_packet_loss_pct": 3.0,
+        "max_points": 5000,
     }
     args.update(overrides)
     return Namespace(**args)
@@ -69,7 +113,7 @@ def test_run_rejects_invalid_ping_ip(mocker, capsys, ping_ip):
         return_value=None,
     )
 
-    assert checkinternet.run(make_args(ping_ip=ping_ip)) == 1
+    assert checkinternet.run(make_args(ping_ip=["1.1.1.1", ping_ip])) == 1
 
     captured = capsys.readouterr()
     assert "ERROR:" in captured.err
@@ -155,8 +199,8 @@ def test_run_pings_hops_with_hop_count_not_ping_count(mocker, capsys):
     )
     ping = mocker.patch(
         "internet_troubleshooter.checkinternet.PingResult.run_test",
-        side_effect=lambda ip, count=None: PingResult(
-            ip=ip, packet_loss=50.0 if ip == "8.8.8.8" else 0.0
+        side_effect=lambda ip, count=None, per_packet=False, adaptive_loss=None: (
+            PingResult(ip=ip, packet_loss=50.0 if ip == "8.8.8.8" else 0.0)
         ),
     )
 
@@ -164,11 +208,64 @@ def test_run_pings_hops_with_hop_count_not_ping_count(mocker, capsys):
     assert checkinternet.run(args) == 0
     capsys.readouterr()
 
-    assert [call.args for call in ping.call_args_list] == [
-        ("8.8.8.8", 400),
-        ("192.168.1.1", 25),
-        ("10.0.0.1", 25),
-    ]
+    calls = [call.args for call in ping.call_args_list]
+    assert calls[0] == ("8.8.8.8", 400)
+    # The hops are pinged concurrently, so they may start in either order.
+    assert sorted(calls[1:]) == [("10.0.0.1", 25), ("192.168.1.1", 25)]
+
+
+@pytest.mark.parametrize("trace_parallelism", [0, -1])
+def test_run_rejects_invalid_trace_parallelism(mocker, capsys, trace_parallelism):
+    ping = mocker.patch(
+        "internet_troubleshooter.checkinternet.PingResult.run_test",
+        return_value=None,
+    )
+
+    assert checkinternet.run(make_args(trace_parallelism=trace_parallelism)) == 1
+
+    captured = capsys.readouterr()
+    assert "ERROR:" in captured.err
+    assert "--trace_parallelism" in captured.err
+    assert not ping.called
+
+
+def test_run_passes_trace_parallelism_to_the_trace(mocker, capsys):
+    trace = run_with_ping(
+        mocker,
+        PingResult(ip="8.8.8.8", packet_loss=50.0),
+        trace_hop_ping_count=7,
+        trace_parallelism=3,
+    )
+    capsys.readouterr()
+
+    assert trace.call_args.args == ("8.8.8.8", 7)
+    assert trace.call_args.kwargs == {
+        "parallelism": 3,
+        "native": False,
+        "native_trace": False,
+        "path_cache": None,
+        "adaptive_loss": None,
+    }
+
+
+def test_run_hands_the_trace_a_path_cache_of_the_ttl(mocker, capsys):
+    trace = run_with_ping(
+        mocker, PingResult(ip="8.8.8.8", packet_loss=50.0), trace_cache_ttl=600.0
+    )
+    capsys.readouterr()
+
+    path_cache = trace.call_args.kwargs["path_cache"]
+    assert path_cache.ttl == 600.0
+    assert path_cache.path == default_cache_dir() / "paths.json"
+
+
+@pytest.mark.parametrize("trace_cache_ttl", [-1.0, -0.5])
+def test_run_rejects_invalid_trace_cache_ttl(mocker, capsys, trace_cache_ttl):
+    ping = mocker.patch("internet_troubleshooter.checkinternet.PingResult.run_test")
+
+    assert checkinternet.run(make_args(trace_cache_ttl=trace_cache_ttl)) == 1
+    assert "Invalid --trace_cache_ttl value" in capsys.readouterr().err
+    assert not ping.called
 
 
 def test_run_accepts_unset_ping_count(mocker, capsys):
@@ -335,6 +432,16 @@ def test_run_fails_when_every_test_fails(mocker, capsys):
     assert "ERROR: All requested tests failed." in capsys.readouterr().err
 
 
+def test_run_logs_which_tests_failed(mocker, tmp_path, capsys):
+    yaml_file = tmp_path / "results.yaml"
+    run_with_ping(mocker, None, yaml_file=str(yaml_file))
+    capsys.readouterr()
+
+    # The speed test was skipped, which is no failure.
+    (logged,) = InternetTestResult.load_results(str(yaml_file))
+    assert logged.failed_tests == ["ping"]
+
+
 def test_run_succeeds_when_one_test_works(mocker, capsys):
     mocker.patch(
         "internet_troubleshooter.checkinternet.PingResult.run_test",
@@ -357,6 +464,81 @@ def test_run_succeeds_when_one_test_works(mocker, capsys):
     capsys.readouterr()
 
 
+def test_run_parallel_tests_runs_the_speed_test_during_the_ping_test(
+    mocker, capsys, caplog
+):
+    speed_started = threading.Event()
+
+    def ping(ip, count=None, per_packet=False, adaptive_loss=None):
+        # Only returns once the speed test has started, which it could not
+        # have done yet if it were waiting for the ping test to finish.
+        assert speed_started.wait(timeout=5)
+        return PingResult(ip=ip, packet_loss=0.0)
+
+    def speed():
+        speed_started.set()
+        return SpeedResult(upload=1.0, download=2.0, latency=3.0)
+
+    mocker.patch(
+        "internet_troubleshooter.checkinternet.PingResult.run_test", side_effect=ping
+    )
+    mocker.patch(
+        "internet_troubleshooter.checkinternet.SpeedResult.check",
+        return_value=True,
+    )
+    mocker.patch(
+        "internet_troubleshooter.checkinternet.SpeedResult.run_test",
+        side_effect=speed,
+    )
+
+    args = make_args(skip_speedtest=False, parallel_tests=True)
+    with caplog.at_level(logging.DEBUG):
+        assert checkinternet.run(args) == 0
+
+    captured = capsys.readouterr()
+    assert "Packet Loss: 0.00%" in captured.out
+    assert "Download:" in captured.out
+    assert "overlapping for" in caplog.text
+
+
+def test_run_parallel_tests_fails_when_every_test_fails(mocker, capsys):
+    mocker.patch(
+        "internet_troubleshooter.checkinternet.PingResult.run_test",
+        return_value=None,
+    )
+    mocker.patch(
+        "internet_troubleshooter.checkinternet.TraceResult.run_test",
+        return_value=None,
+    )
+    mocker.patch(
+        "internet_troubleshooter.checkinternet.SpeedResult.check",
+        return_value=True,
+    )
+    mocker.patch(
+        "internet_troubleshooter.checkinternet.SpeedResult.run_test",
+        return_value=None,
+    )
+
+    args = make_args(skip_speedtest=False, parallel_tests=True)
+    assert checkinternet.run(args) == 1
+    assert "ERROR: All requested tests failed." in capsys.readouterr().err
+
+
+def test_run_parallel_tests_with_speed_test_skipped(mocker, capsys):
+    mocker.patch(
+        "internet_troubleshooter.checkinternet.PingResult.run_test",
+        return_value=PingResult(ip="8.8.8.8", packet_loss=0.0),
+    )
+    speed = mocker.patch(
+        "internet_troubleshooter.checkinternet.SpeedResult.run_test",
+        return_value=None,
+    )
+
+    assert checkinternet.run(make_args(parallel_tests=True)) == 0
+    assert not speed.called
+    assert "Packet Loss: 0.00%" in capsys.readouterr().out
+
+
 def test_run_succeeds_when_all_tests_skipped(capsys):
     args = make_args(skip_pingtest=True, skip_speedtest=True)
     assert checkinternet.run(args) == 0
@@ -393,22 +575,563 @@ def test_run_writes_yaml_file(mocker, tmp_path, capsys):
     text = yaml_file.read_text(encoding="utf-8")
     assert "!!python/object" not in text
 
-    results = InternetTestResult.load_results(str(yaml_file))
-    assert len(results) == 2
-    assert all(result.ping_result.packet_loss == 2.0 for result in results)
+    results = InternetTestResult.load_results(str(yaml_file))
+    assert len(results) == 2
+    assert all(result.ping_result.packet_loss == 2.0 for result in results)
+
+
+def test_run_indexes_a_new_yaml_file(mocker, tmp_path, capsys):
+    yaml_file = tmp_path / "results.yaml"
+    mocker.patch(
+        "internet_troubleshooter.checkinternet.PingResult.run_test",
+        return_value=PingResult(ip="8.8.8.8", packet_loss=2.0),
+    )
+
+    assert checkinternet.run(make_args(yaml_file=str(yaml_file))) == 0
+    assert checkinternet.run(make_args(yaml_file=str(yaml_file))) == 0
+    capsys.readouterr()
+
+    with open(log_index.index_path(yaml_file), "rb") as index:
+        assert log_index._record_count(index) == 2
+
+
+def test_run_leaves_an_unindexed_yaml_file_unindexed(mocker, tmp_path, capsys):
+    yaml_file = tmp_path / "results.yaml"
+    yaml_file.write_text(results_yaml(1.0), encoding="utf-8")
+    mocker.patch(
+        "internet_troubleshooter.checkinternet.PingResult.run_test",
+        return_value=PingResult(ip="8.8.8.8", packet_loss=2.0),
+    )
+
+    assert checkinternet.run(make_args(yaml_file=str(yaml_file))) == 0
+    capsys.readouterr()
+
+    assert not (tmp_path / "results.yaml.idx").exists()
+
+
+def test_run_warns_when_the_index_cannot_be_updated(mocker, tmp_path, capsys):
+    yaml_file = tmp_path / "results.yaml"
+    mocker.patch(
+        "internet_troubleshooter.checkinternet.PingResult.run_test",
+        return_value=PingResult(ip="8.8.8.8", packet_loss=2.0),
+    )
+    mocker.patch(
+        "internet_troubleshooter.checkinternet.log_index.update_index",
+        side_effect=PermissionError("Permission denied"),
+    )
+
+    assert checkinternet.run(make_args(yaml_file=str(yaml_file))) == 0
+
+    assert "WARNING: Unable to update the index" in capsys.readouterr().err
+    assert len(InternetTestResult.load_results(str(yaml_file))) == 1
+
+
+def schedule_names(schedules):
+    return {schedule.name: schedule.interval for schedule in schedules}
+
+
+def test_daemon_schedules_ping_and_speed_tests(mocker):
+    check = mocker.patch(
+        "internet_troubleshooter.checkinternet.SpeedResult.check", return_value=True
+    )
+
+    schedules = checkinternet._daemon_schedules(
+        daemon_args(interval=60.0, skip_speedtest=False)
+    )
+
+    assert schedule_names(schedules) == {"ping test and speed test": 60.0}
+    assert all(schedule.jitter == 0.1 for schedule in schedules)
+    assert check.call_count == 1
+
+
+def test_daemon_schedules_independent_intervals(mocker):
+    mocker.patch(
+        "internet_troubleshooter.checkinternet.SpeedResult.check", return_value=True
+    )
+
+    args = daemon_args(
+        interval=60.0, speed_interval=3600.0, trace_interval=900.0, skip_speedtest=False
+    )
+
+    assert schedule_names(checkinternet._daemon_schedules(args)) == {
+        "ping test": 60.0,
+        "traceroute": 900.0,
+        "speed test": 3600.0,
+    }
+
+
+def test_daemon_does_not_schedule_a_missing_speedtest(mocker):
+    mocker.patch(
+        "internet_troubleshooter.checkinternet.SpeedResult.check", return_value=False
+    )
+
+    schedules = checkinternet._daemon_schedules(daemon_args(skip_speedtest=False))
+
+    assert schedule_names(schedules) == {"ping test": 300.0}
+
+
+def test_daemon_skip_pingtest_skips_traceroutes_too(mocker):
+    mocker.patch(
+        "internet_troubleshooter.checkinternet.SpeedResult.check", return_value=True
+    )
+
+    args = daemon_args(skip_pingtest=True, skip_speedtest=False, trace_interval=60.0)
+
+    assert schedule_names(checkinternet._daemon_schedules(args)) == {
+        "speed test": 300.0
+    }
+
+
+def test_daemon_tasks_log_tests_due_together_as_one_result(mocker, tmp_path, capsys):
+    yaml_file = tmp_path / "results.yaml"
+    mocker.patch(
+        "internet_troubleshooter.checkinternet.SpeedResult.check", return_value=True
+    )
+    mocker.patch(
+        "internet_troubleshooter.checkinternet.PingResult.run_test",
+        return_value=PingResult(ip="8.8.8.8", packet_loss=0.0),
+    )
+    speed = SpeedResult(upload=10.0, download=50.0, latency=20.0)
+    mocker.patch(
+        "internet_troubleshooter.checkinternet.SpeedResult.run_test",
+        return_value=speed,
+    )
+    (schedule,) = checkinternet._daemon_schedules(
+        daemon_args(yaml_file=str(yaml_file), skip_speedtest=False)
+    )
+
+    schedule.task()
+
+    assert "Packet Loss:" in capsys.readouterr().out
+    (logged,) = InternetTestResult.load_results(str(yaml_file))
+    assert logged.ping_result.packet_loss == 0.0
+    assert logged.speed_result == speed
+    assert not logged.incomplete
+
+
+def test_daemon_tasks_on_other_intervals_log_results_of_their_own(
+    mocker, tmp_path, capsys
+):
+    yaml_file = tmp_path / "results.yaml"
+    mocker.patch(
+        "internet_troubleshooter.checkinternet.SpeedResult.check", return_value=True
+    )
+    mocker.patch(
+        "internet_troubleshooter.checkinternet.PingResult.run_test",
+        return_value=PingResult(ip="8.8.8.8", packet_loss=0.0),
+    )
+    mocker.patch(
+        "internet_troubleshooter.checkinternet.SpeedResult.run_test",
+        return_value=None,
+    )
+    schedules = checkinternet._daemon_schedules(
+        daemon_args(
+            yaml_file=str(yaml_file), speed_interval=3600.0, skip_speedtest=False
+        )
+    )
+
+    for schedule in schedules:
+        schedule.task()
+    capsys.readouterr()
+
+    ping_result, speed_result = InternetTestResult.load_results(str(yaml_file))
+    assert ping_result.speed_result is None
+    # Only the speed test was due, and failed, in the second.
+    assert not ping_result.incomplete
+    assert speed_result.failed_tests == ["speed"]
+
+
+def test_daemon_tasks_take_turns_running_their_tests(mocker, tmp_path, capsys):
+    pinging = threading.Event()
+    release = threading.Event()
+
+    def ping(*args, **kwargs):
+        pinging.set()
+        release.wait(5)
+        return PingResult(ip="8.8.8.8", packet_loss=0.0)
+
+    mocker.patch(
+        "internet_troubleshooter.checkinternet.SpeedResult.check", return_value=True
+    )
+    mocker.patch(
+        "internet_troubleshooter.checkinternet.PingResult.run_test", side_effect=ping
+    )
+    speed_test = mocker.patch(
+        "internet_troubleshooter.checkinternet.SpeedResult.run_test",
+        return_value=None,
+    )
+    ping_schedule, speed_schedule = checkinternet._daemon_schedules(
+        daemon_args(speed_interval=3600.0, skip_speedtest=False)
+    )
+
+    threads = [
+        threading.Thread(target=ping_schedule.task),
+        threading.Thread(target=speed_schedule.task),
+    ]
+    threads[0].start()
+    assert pinging.wait(5)
+    threads[1].start()
+    threads[1].join(0.2)
+    assert speed_test.call_count == 0
+
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    assert speed_test.call_count == 1
+    capsys.readouterr()
+
+
+def test_daemon_traceroute_task_traces_whatever_the_loss(mocker, tmp_path, capsys):
+    yaml_file = tmp_path / "results.yaml"
+    trace = mocker.patch(
+        "internet_troubleshooter.checkinternet.TraceResult.run_test",
+        return_value=TraceResult(ping_results=[]),
+    )
+    schedules = checkinternet._daemon_schedules(
+        daemon_args(yaml_file=str(yaml_file), trace_interval=600.0)
+    )
+
+    traceroute = next(s for s in schedules if s.name == "traceroute")
+    traceroute.task()
+    capsys.readouterr()
+
+    trace.assert_called_once_with(
+        "8.8.8.8",
+        mocker.ANY,
+        parallelism=8,
+        native=False,
+        native_trace=False,
+        path_cache=None,
+        adaptive_loss=None,
+    )
+    (logged,) = InternetTestResult.load_results(str(yaml_file))
+    assert logged.trace_result == TraceResult(ping_results=[])
+
+
+def test_daemon_runs_the_schedules(mocker):
+    run_schedules = mocker.patch("internet_troubleshooter.checkinternet.run_schedules")
+    mocker.patch("signal.signal")
+
+    assert checkinternet.daemon(daemon_args()) == 0
+
+    schedules, stop = run_schedules.call_args.args
+    assert schedule_names(schedules) == {"ping test": 300.0}
+    assert not stop.is_set()
+
+
+def test_daemon_stops_on_keyboard_interrupt(mocker):
+    mocker.patch(
+        "internet_troubleshooter.checkinternet.run_schedules",
+        side_effect=KeyboardInterrupt,
+    )
+    mocker.patch("signal.signal")
+
+    assert checkinternet.daemon(daemon_args()) == 0
+
+
+def test_daemon_reports_nothing_to_schedule(capsys):
+    args = daemon_args(skip_pingtest=True, skip_speedtest=True)
+
+    assert checkinternet.daemon(args) == 1
+    assert "ERROR: Nothing to schedule" in capsys.readouterr().err
+
+
+@pytest.mark.parametrize(
+    "overrides, expected",
+    [
+        ({"interval": 0.0}, "Invalid --interval value '0.0'"),
+        ({"speed_interval": -5.0}, "Invalid --speed_interval value '-5.0'"),
+        ({"trace_interval": 0.0}, "Invalid --trace_interval value '0.0'"),
+        ({"jitter": 1.0}, "Invalid --jitter value '1.0'"),
+        ({"jitter": -0.1}, "Invalid --jitter value '-0.1'"),
+        ({"ping_ip": ["not a host!"]}, "Invalid --ping_ip value"),
+    ],
+)
+def test_daemon_rejects_invalid_options(mocker, capsys, overrides, expected):
+    run_schedules = mocker.patch("internet_troubleshooter.checkinternet.run_schedules")
+
+    assert checkinternet.daemon(daemon_args(**overrides)) == 1
+    assert expected in capsys.readouterr().err
+    assert not run_schedules.called
+
+
+def mtr_args(**overrides):
+    args = {
+        "debug": False,
+        "ping_ip": "8.8.8.8",
+        "duration": 600.0,
+        "snapshot_interval": 60.0,
+        "window": 600,
+        "native_ping": False,
+        "native_trace": False,
+        "yaml_file": None,
+        "store": None,
+    }
+    args.update(overrides)
+    return Namespace(**args)
+
+
+def test_mtr_logs_snapshots_of_every_hop(mocker, tmp_path, capsys):
+    yaml_file = tmp_path / "results.yaml"
+    mocker.patch("signal.signal")
+    mocker.patch.object(
+        TraceResult, "trace_hops", return_value=["192.168.1.1", "10.0.0.1"]
+    )
+    run_tests = mocker.patch.object(
+        PingResult,
+        "run_tests",
+        side_effect=lambda ips, count, per_packet, native: [
+            PingResult.from_samples(ip, PingSamples([10.0] * count)) for ip in ips
+        ],
+    )
+
+    def watch_two_rounds(monitor, ping_round, report, duration, interval, stop):
+        for _ in range(2):
+            monitor.record(ping_round(monitor.addresses()))
+            report(monitor.snapshot())
+
+    watch = mocker.patch(
+        "internet_troubleshooter.checkinternet.watch", side_effect=watch_two_rounds
+    )
+
+    assert checkinternet.mtr(mtr_args(yaml_file=str(yaml_file))) == 0
+
+    assert watch.call_args.args[3:5] == (600.0, 60.0)
+    run_tests.assert_called_with(
+        ["8.8.8.8", "192.168.1.1", "10.0.0.1"],
+        mtr.MTR_ROUND_COUNT,
+        per_packet=True,
+        native=False,
+    )
+    assert capsys.readouterr().out.count("Packet Loss:") == 2
+    first, second = InternetTestResult.load_results(str(yaml_file))
+    assert [hop.ip for hop in second.trace_result.ping_results] == [
+        "192.168.1.1",
+        "10.0.0.1",
+    ]
+    assert first.ping_result.rtt_avg_ms == 10.0
+    assert second.ping_result.packet_loss == 0.0
+
+
+def test_mtr_fails_when_the_path_cannot_be_traced(mocker):
+    mocker.patch.object(TraceResult, "trace_hops", return_value=None)
+    watch = mocker.patch("internet_troubleshooter.checkinternet.watch")
+
+    assert checkinternet.mtr(mtr_args()) == 1
+    assert not watch.called
+
+
+def test_mtr_stops_on_keyboard_interrupt(mocker):
+    mocker.patch("signal.signal")
+    mocker.patch.object(TraceResult, "trace_hops", return_value=[])
+    mocker.patch(
+        "internet_troubleshooter.checkinternet.watch", side_effect=KeyboardInterrupt
+    )
+
+    assert checkinternet.mtr(mtr_args()) == 0
+
+
+@pytest.mark.parametrize(
+    "overrides, expected",
+    [
+        ({"duration": 0.0}, "Invalid --duration value '0.0'"),
+        ({"snapshot_interval": -1.0}, "Invalid --snapshot_interval value '-1.0'"),
+        ({"window": 0}, "Invalid --window value '0'"),
+        ({"ping_ip": "not a host!"}, "Invalid --ping_ip value"),
+    ],
+)
+def test_mtr_rejects_invalid_options(mocker, capsys, overrides, expected):
+    trace = mocker.patch.object(TraceResult, "trace_hops")
+
+    assert checkinternet.mtr(mtr_args(**overrides)) == 1
+    assert expected in capsys.readouterr().err
+    assert not trace.called
+
+
+def test_run_reports_unwritable_yaml_file(mocker, tmp_path, capsys):
+    mocker.patch(
+        "internet_troubleshooter.checkinternet.PingResult.run_test",
+        return_value=PingResult(ip="8.8.8.8", packet_loss=0.0),
+    )
+
+    args = make_args(yaml_file=str(tmp_path / "missing" / "results.yaml"))
+    assert checkinternet.run(args) == 1
+
+    captured = capsys.readouterr()
+    assert "ERROR: Unable to write results" in captured.err
+
+
+def test_run_adds_results_to_the_store(mocker, tmp_path, capsys):
+    store_file = tmp_path / "results.sqlite"
+    mocker.patch(
+        "internet_troubleshooter.checkinternet.PingResult.run_test",
+        return_value=PingResult(ip="8.8.8.8", packet_loss=2.0),
+    )
+
+    assert checkinternet.run(make_args(store=str(store_file))) == 0
+    assert checkinternet.run(make_args(store=str(store_file))) == 0
+    capsys.readouterr()
+
+    results = store.load_results(str(store_file))
+    assert len(results) == 2
+    assert all(result.ping_result.packet_loss == 2.0 for result in results)
+
+
+def test_run_reports_unwritable_store(mocker, tmp_path, capsys):
+    mocker.patch(
+        "internet_troubleshooter.checkinternet.PingResult.run_test",
+        return_value=PingResult(ip="8.8.8.8", packet_loss=0.0),
+    )
+
+    args = make_args(store=str(tmp_path / "missing" / "results.sqlite"))
+    assert checkinternet.run(args) == 1
+
+    assert "ERROR: Unable to open results store" in capsys.readouterr().err
+
+
+def stored_results(tmp_path, *packet_losses):
+    store_file = tmp_path / "results.sqlite"
+    store.append_results(
+        store_file,
+        [
+            InternetTestResult(
+                ping_result=PingResult(ip="8.8.8.8", packet_loss=packet_loss),
+                trace_result=None,
+                speed_result=None,
+                time_stamp=float(time_stamp),
+            )
+            for time_stamp, packet_loss in enumerate(packet_losses, start=1)
+        ],
+    )
+    return str(store_file)
+
+
+def test_display_human_from_store(tmp_path, capsys):
+    args = display_args(store=stored_results(tmp_path, 10.0, 20.0))
+    assert checkinternet.display(args) == 0
+
+    assert "Mean: 15.00%" in capsys.readouterr().out
+
+
+def test_display_reads_the_store_instead_of_the_yaml_file(tmp_path, capsys):
+    yaml_file = tmp_path / "results.yaml"
+    yaml_file.write_text(results_yaml(90.0, 90.0), encoding="utf-8")
+
+    args = display_args(
+        yaml_file=str(yaml_file), store=stored_results(tmp_path, 10.0, 20.0)
+    )
+    assert checkinternet.display(args) == 0
+
+    assert "Mean: 15.00%" in capsys.readouterr().out
+
+
+def test_display_html_from_store_reads_the_details(mocker, tmp_path, capsys):
+    load = mocker.spy(store, "load_results")
+    to_html = mocker.patch("internet_troubleshooter.render.to_html")
+
+    args = display_args(store=stored_results(tmp_path, 1.0), format="html")
+    assert checkinternet.display(args) == 0
+
+    assert to_html.call_args.args[0][0].ping_result.packet_loss == 1.0
+    assert load.call_args.kwargs["details"] is True
+    capsys.readouterr()
+
+
+def test_display_reports_missing_store(tmp_path, capsys):
+    args = display_args(store=str(tmp_path / "missing.sqlite"))
+    assert checkinternet.display(args) == 1
+    assert "ERROR: Unable to open results store" in capsys.readouterr().err
+
+
+def test_migrate_copies_yaml_results_into_the_store(tmp_path, capsys):
+    yaml_file = tmp_path / "results.yaml"
+    yaml_file.write_text(results_yaml(10.0, 20.0), encoding="utf-8")
+    store_file = tmp_path / "results.sqlite"
+    args = Namespace(yaml_file=str(yaml_file), store=str(store_file))
+
+    assert checkinternet.migrate(args) == 0
+    assert "Migrated 2 result(s)" in capsys.readouterr().out
+
+    # Migrating the same file again adds nothing new.
+    assert checkinternet.migrate(args) == 0
+    out = capsys.readouterr().out
+    assert "Migrated 0 result(s)" in out
+    assert "2 already stored" in out
+
+    loaded = store.load_results(str(store_file))
+    assert [result.ping_result.packet_loss for result in loaded] == [10.0, 20.0]
+    assert loaded == InternetTestResult.load_results(str(yaml_file))
+
+
+def test_migrate_streams_the_results_into_the_store(tmp_path, mocker, capsys):
+    yaml_file = tmp_path / "results.yaml"
+    yaml_file.write_text(results_yaml(10.0, 20.0, 30.0), encoding="utf-8")
+    store_file = tmp_path / "results.sqlite"
+    store.append_results(
+        str(store_file), InternetTestResult.load_results(str(yaml_file))[:1]
+    )
+    append_results = mocker.spy(store, "append_results")
+    args = Namespace(yaml_file=str(yaml_file), store=str(store_file))
+
+    assert checkinternet.migrate(args) == 0
+
+    # The results are counted as they are written rather than read up front.
+    assert not isinstance(append_results.call_args.args[1], list)
+    out = capsys.readouterr().out
+    assert "Migrated 2 result(s)" in out
+    assert "1 already stored" in out
+
+
+def test_migrate_reports_missing_yaml_file(tmp_path, capsys):
+    store_file = tmp_path / "results.sqlite"
+    args = Namespace(yaml_file=str(tmp_path / "missing.yaml"), store=str(store_file))
+
+    assert checkinternet.migrate(args) == 1
+    assert "ERROR: Unable to read results" in capsys.readouterr().err
+    assert not store_file.exists()
+
+
+def test_reindex_indexes_the_yaml_file(tmp_path, capsys):
+    yaml_file = tmp_path / "results.yaml"
+    yaml_file.write_text(results_yaml(10.0, 20.0), encoding="utf-8")
+
+    assert checkinternet.reindex(Namespace(yaml_file=str(yaml_file))) == 0
+
+    assert "Indexed 2 result(s)" in capsys.readouterr().out
+    with open(log_index.index_path(yaml_file), "rb") as index:
+        assert log_index._record_count(index) == 2
+
+
+def test_reindex_reports_missing_yaml_file(tmp_path, capsys):
+    args = Namespace(yaml_file=str(tmp_path / "missing.yaml"))
+
+    assert checkinternet.reindex(args) == 1
+    assert "ERROR: Unable to index" in capsys.readouterr().err
+
+
+def test_reindex_rejects_stdin(capsys):
+    assert checkinternet.reindex(Namespace(yaml_file="-")) == 1
+    assert "ERROR: reindex requires a file" in capsys.readouterr().err
 
 
-def test_run_reports_unwritable_yaml_file(mocker, tmp_path, capsys):
-    mocker.patch(
-        "internet_troubleshooter.checkinternet.PingResult.run_test",
-        return_value=PingResult(ip="8.8.8.8", packet_loss=0.0),
+def test_display_reads_the_window_through_the_index(mocker, tmp_path, capsys):
+    yaml_file = tmp_path / "results.yaml"
+    yaml_file.write_text(
+        dated_results_yaml(
+            (datetime(2024, 1, 30), 90.0),
+            (datetime(2024, 1, 31), 10.0),
+            (datetime(2024, 2, 1), 20.0),
+        ),
+        encoding="utf-8",
     )
+    log_index.reindex(yaml_file)
+    spans = mocker.spy(log_index, "_window_spans")
 
-    args = make_args(yaml_file=str(tmp_path / "missing" / "results.yaml"))
-    assert checkinternet.run(args) == 1
+    args = display_args(yaml_file=str(yaml_file), since=datetime(2024, 1, 31))
+    assert checkinternet.display(args) == 0
 
-    captured = capsys.readouterr()
-    assert "ERROR: Unable to write results" in captured.err
+    assert "Mean: 15.00%" in capsys.readouterr().out
+    assert spans.spy_return[0][0] > 0
 
 
 def test_display_human(tmp_path, capsys):
@@ -422,7 +1145,7 @@ def test_display_human(tmp_path, capsys):
             )
             print("---\n{}\n...\n".format(result.to_yaml()), file=f)
 
-    args = Namespace(yaml_file=str(yaml_file), format="human", html_file=None)
+    args = display_args(yaml_file=str(yaml_file), format="human", html_file=None)
     assert checkinternet.display(args) == 0
 
     captured = capsys.readouterr()
@@ -439,9 +1162,9 @@ def test_display_html(mocker, tmp_path, capsys):
     )
     yaml_file.write_text("---\n{}\n...\n".format(result.to_yaml()), encoding="utf-8")
 
-    to_html = mocker.patch("internet_troubleshooter.checkinternet.to_html")
+    to_html = mocker.patch("internet_troubleshooter.render.to_html")
 
-    args = Namespace(
+    args = display_args(
         yaml_file=str(yaml_file),
         format="html",
         html_file=None,
@@ -461,6 +1184,7 @@ def test_display_html(mocker, tmp_path, capsys):
         packet_loss_pct=1.5,
     )
     assert to_html.call_args.kwargs["embed_plotly"] is False
+    assert to_html.call_args.kwargs["max_points"] == 5000
     capsys.readouterr()
 
 
@@ -473,9 +1197,9 @@ def test_display_html_embeds_plotly_when_asked(mocker, tmp_path, capsys):
     )
     yaml_file.write_text("---\n{}\n...\n".format(result.to_yaml()), encoding="utf-8")
 
-    to_html = mocker.patch("internet_troubleshooter.checkinternet.to_html")
+    to_html = mocker.patch("internet_troubleshooter.render.to_html")
 
-    args = Namespace(
+    args = display_args(
         yaml_file=str(yaml_file),
         format="html",
         html_file=None,
@@ -492,7 +1216,7 @@ def test_display_html_embeds_plotly_when_asked(mocker, tmp_path, capsys):
 
 
 def display_html_args(yaml_file, html_file):
-    return Namespace(
+    return display_args(
         yaml_file=str(yaml_file),
         format="html",
         html_file=html_file,
@@ -518,7 +1242,7 @@ def test_display_html_writes_the_report_to_html_file(tmp_path, capsys):
 def test_display_html_file_takes_precedence_over_stdout(mocker, tmp_path, capsys):
     yaml_file = tmp_path / "results.yaml"
     yaml_file.write_text(results_yaml(1.0), encoding="utf-8")
-    to_html = mocker.patch("internet_troubleshooter.checkinternet.to_html")
+    to_html = mocker.patch("internet_troubleshooter.render.to_html")
     html_file = str(tmp_path / "report.html")
 
     assert checkinternet.display(display_html_args(yaml_file, html_file)) == 0
@@ -556,7 +1280,9 @@ def test_display_human_warns_about_html_file_and_still_summarizes(tmp_path, caps
     yaml_file.write_text(results_yaml(10.0, 20.0), encoding="utf-8")
     html_file = tmp_path / "report.html"
 
-    args = Namespace(yaml_file=str(yaml_file), format="human", html_file=str(html_file))
+    args = display_args(
+        yaml_file=str(yaml_file), format="human", html_file=str(html_file)
+    )
     assert checkinternet.display(args) == 0
 
     captured = capsys.readouterr()
@@ -566,7 +1292,7 @@ def test_display_human_warns_about_html_file_and_still_summarizes(tmp_path, caps
 
 
 def test_display_reports_missing_file(tmp_path, capsys):
-    args = Namespace(
+    args = display_args(
         yaml_file=str(tmp_path / "missing.yaml"), format="human", html_file=None
     )
     assert checkinternet.display(args) == 1
@@ -585,10 +1311,123 @@ def results_yaml(*packet_losses):
     return "".join(documents)
 
 
+def dated_results_yaml(*dated_packet_losses):
+    return "".join(
+        "---\n{}\n...\n".format(
+            InternetTestResult(
+                ping_result=PingResult(ip="8.8.8.8", packet_loss=packet_loss),
+                trace_result=None,
+                speed_result=None,
+                time_stamp=when.timestamp(),
+            ).to_yaml()
+        )
+        for when, packet_loss in dated_packet_losses
+    )
+
+
+def test_display_since_and_until_limit_the_results(tmp_path, capsys):
+    yaml_file = tmp_path / "results.yaml"
+    yaml_file.write_text(
+        dated_results_yaml(
+            (datetime(2024, 1, 30, 12), 90.0),
+            (datetime(2024, 1, 31, 12), 10.0),
+            (datetime(2024, 2, 1, 12), 20.0),
+            (datetime(2024, 2, 2, 12), 90.0),
+        ),
+        encoding="utf-8",
+    )
+
+    args = display_args(
+        yaml_file=str(yaml_file),
+        since=datetime(2024, 1, 31),
+        until=datetime(2024, 2, 2),
+    )
+    assert checkinternet.display(args) == 0
+
+    assert "Mean: 15.00%" in capsys.readouterr().out
+
+
+def test_display_last_limits_the_results_from_stdin(mocker, capsys):
+    now = datetime.now()
+    mocker.patch(
+        "sys.stdin",
+        io.StringIO(
+            dated_results_yaml(
+                (now - timedelta(days=10), 90.0),
+                (now - timedelta(days=2), 10.0),
+                (now - timedelta(hours=1), 20.0),
+            )
+        ),
+    )
+
+    assert checkinternet.display(display_args(yaml_file="-", last=7.0)) == 0
+
+    assert "Mean: 15.00%" in capsys.readouterr().out
+
+
+def test_display_last_keeps_the_later_since(tmp_path, capsys):
+    now = datetime.now()
+    yaml_file = tmp_path / "results.yaml"
+    yaml_file.write_text(
+        dated_results_yaml(
+            (now - timedelta(days=5), 90.0),
+            (now - timedelta(days=2), 10.0),
+            (now - timedelta(days=1), 20.0),
+        ),
+        encoding="utf-8",
+    )
+
+    args = display_args(
+        yaml_file=str(yaml_file), since=now - timedelta(days=30), last=3.0
+    )
+    assert checkinternet.display(args) == 0
+
+    assert "Mean: 15.00%" in capsys.readouterr().out
+
+
+def test_display_passes_the_window_to_the_store(mocker, tmp_path, capsys):
+    load = mocker.spy(store, "load_results")
+
+    args = display_args(
+        store=stored_results(tmp_path, 10.0, 20.0, 30.0),
+        since=datetime.fromtimestamp(2.0),
+    )
+    assert checkinternet.display(args) == 0
+
+    assert load.call_args.kwargs["window"].since == 2.0
+    assert "Mean: 25.00%" in capsys.readouterr().out
+
+
+@pytest.mark.parametrize("days", [0.0, -1.0, float("inf"), float("nan")])
+def test_display_rejects_a_last_that_is_not_positive(tmp_path, capsys, days):
+    yaml_file = tmp_path / "results.yaml"
+    yaml_file.write_text(results_yaml(10.0), encoding="utf-8")
+
+    assert checkinternet.display(display_args(yaml_file=str(yaml_file), last=days)) == 1
+    assert "ERROR: Invalid --last value" in capsys.readouterr().err
+
+
+def test_display_last_beyond_the_earliest_date_keeps_everything(tmp_path, capsys):
+    yaml_file = tmp_path / "results.yaml"
+    yaml_file.write_text(results_yaml(10.0, 20.0), encoding="utf-8")
+
+    assert checkinternet.display(display_args(yaml_file=str(yaml_file), last=1e9)) == 0
+    assert "Mean: 15.00%" in capsys.readouterr().out
+
+
+def test_display_rejects_a_negative_max_points(tmp_path, capsys):
+    yaml_file = tmp_path / "results.yaml"
+    yaml_file.write_text(results_yaml(10.0), encoding="utf-8")
+
+    args = display_args(yaml_file=str(yaml_file), max_points=-1)
+    assert checkinternet.display(args) == 1
+    assert "ERROR: Invalid --max_points value '-1'" in capsys.readouterr().err
+
+
 def test_display_human_from_stdin(mocker, capsys):
     mocker.patch("sys.stdin", io.StringIO(results_yaml(10.0, 20.0)))
 
-    args = Namespace(yaml_file="-", format="human", html_file=None)
+    args = display_args(yaml_file="-", format="human", html_file=None)
     assert checkinternet.display(args) == 0
 
     captured = capsys.readouterr()
@@ -598,9 +1437,9 @@ def test_display_human_from_stdin(mocker, capsys):
 
 def test_display_html_from_stdin(mocker, capsys):
     mocker.patch("sys.stdin", io.StringIO(results_yaml(1.0)))
-    to_html = mocker.patch("internet_troubleshooter.checkinternet.to_html")
+    to_html = mocker.patch("internet_troubleshooter.render.to_html")
 
-    args = Namespace(
+    args = display_args(
         yaml_file="-",
         format="html",
         html_file=None,
@@ -620,7 +1459,7 @@ def test_display_html_from_stdin(mocker, capsys):
 def test_display_reports_empty_stdin(mocker, capsys, content):
     mocker.patch("sys.stdin", io.StringIO(content))
 
-    args = Namespace(yaml_file="-", format="human", html_file=None)
+    args = display_args(yaml_file="-", format="human", html_file=None)
     assert checkinternet.display(args) == 1
 
     captured = capsys.readouterr()
@@ -628,19 +1467,116 @@ def test_display_reports_empty_stdin(mocker, capsys, content):
     assert captured.out == ""
 
 
+def test_display_human_streams_results_from_stdin(mocker, capsys):
+    mocker.patch("sys.stdin", io.StringIO("\n\n" + results_yaml(10.0, 20.0)))
+    to_human = mocker.patch("internet_troubleshooter.render.to_human")
+
+    assert checkinternet.display(display_args(yaml_file="-")) == 0
+
+    # The summary is handed the results to read as it goes, not a list of all
+    # of them, and leading blank lines are not mistaken for an empty stdin.
+    results = to_human.call_args.args[0]
+    assert not isinstance(results, list)
+    assert [result.ping_result.packet_loss for result in results] == [10.0, 20.0]
+    capsys.readouterr()
+
+
 def test_display_does_not_read_stdin_for_a_file(mocker, tmp_path, capsys):
     yaml_file = tmp_path / "results.yaml"
     yaml_file.write_text(results_yaml(10.0, 20.0), encoding="utf-8")
     piped = results_yaml(90.0)
     stdin = mocker.patch("sys.stdin", io.StringIO(piped))
 
-    args = Namespace(yaml_file=str(yaml_file), format="human", html_file=None)
+    args = display_args(yaml_file=str(yaml_file), format="human", html_file=None)
     assert checkinternet.display(args) == 0
 
     assert "Mean: 15.00%" in capsys.readouterr().out
     assert stdin.read() == piped
 
 
+def test_run_pings_every_target_at_once(mocker):
+    pinged = []
+    waiting = threading.Barrier(3, timeout=5)
+
+    def run_test(ip, count, per_packet=False, adaptive_loss=None):
+        pinged.append(ip)
+        # Only returns once all three are pinging at the same time.
+        waiting.wait()
+        return None if ip == "192.168.1.1" else PingResult(ip=ip, packet_loss=0.0)
+
+    mocker.patch(
+        "internet_troubleshooter.checkinternet.PingResult.run_test",
+        side_effect=run_test,
+    )
+    printed = mocker.patch.object(InternetTestResult, "human_readable", autospec=True)
+
+    assert (
+        checkinternet.run(make_args(ping_ip=["8.8.8.8", "192.168.1.1", "1.1.1.1"])) == 0
+    )
+
+    assert sorted(pinged) == ["1.1.1.1", "192.168.1.1", "8.8.8.8"]
+    result = printed.call_args[0][0]
+    assert result.ping_result == PingResult(ip="8.8.8.8", packet_loss=0.0)
+    # The target that could not be pinged is recorded as failed instead.
+    assert result.extra_ping_results == [PingResult(ip="1.1.1.1", packet_loss=0.0)]
+    assert result.failed_extra_pings == ["192.168.1.1"]
+    assert result.failed_tests == ["ping"]
+
+
+def test_run_pings_every_packet_when_asked(mocker, capsys):
+    ping = mocker.patch(
+        "internet_troubleshooter.checkinternet.PingResult.run_test",
+        return_value=PingResult(ip="8.8.8.8", packet_loss=0.0),
+    )
+
+    assert checkinternet.run(make_args(ping_per_packet=True)) == 0
+    capsys.readouterr()
+
+    assert ping.call_args.kwargs["per_packet"] is True
+
+
+def test_run_pings_and_traces_adaptively_when_asked(mocker, capsys):
+    ping = mocker.patch(
+        "internet_troubleshooter.checkinternet.PingResult.run_test",
+        return_value=PingResult(ip="8.8.8.8", packet_loss=50.0),
+    )
+    trace = mocker.patch(
+        "internet_troubleshooter.checkinternet.TraceResult.run_test",
+        return_value=None,
+    )
+
+    checkinternet.run(make_args(adaptive_ping=True, max_packet_loss=5.0))
+    capsys.readouterr()
+
+    assert ping.call_args.kwargs["adaptive_loss"] == 5.0
+    assert trace.call_args.kwargs["adaptive_loss"] == 5.0
+
+
+def test_run_pings_and_traces_natively_when_asked(mocker, capsys):
+    ping = mocker.patch(
+        "internet_troubleshooter.checkinternet.PingResult.run_tests",
+        return_value=[PingResult(ip="8.8.8.8", packet_loss=50.0)],
+    )
+    trace = mocker.patch(
+        "internet_troubleshooter.checkinternet.TraceResult.run_test",
+        return_value=None,
+    )
+
+    checkinternet.run(make_args(native_ping=True, native_trace=True))
+    capsys.readouterr()
+
+    assert ping.call_args.kwargs["native"] is True
+    assert trace.call_args.kwargs["native"] is True
+    assert trace.call_args.kwargs["native_trace"] is True
+
+
+def test_run_traces_the_first_target(mocker, capsys):
+    trace = run_with_ping(mocker, None, ping_ip=["1.1.1.1", "8.8.8.8"])
+    capsys.readouterr()
+
+    assert trace.call_args[0][0] == "1.1.1.1"
+
+
 def test_cli_input_run(mocker):
     mocker.patch(
         "sys.argv",
@@ -652,11 +1588,17 @@ def test_cli_input_run(mocker):
             "1.1.1.1",
             "--ping_count",
             "5",
+            "--ping_per_packet",
+            "--native_ping",
+            "--native_trace",
             "--trace_hop_ping_count",
             "4",
+            "--trace_parallelism",
+            "2",
             "--max_packet_loss",
             "10",
             "--skip_speedtest",
+            "--parallel_tests",
             "--yaml_file",
             "out.yaml",
         ],
@@ -665,16 +1607,101 @@ def test_cli_input_run(mocker):
     args = checkinternet.cli_input()
     assert args.debug
     assert args.command == "run"
-    assert args.ping_ip == "1.1.1.1"
+    assert args.ping_ip == ["1.1.1.1"]
     assert args.ping_count == 5
+    assert args.ping_per_packet
+    assert args.native_ping
+    assert args.native_trace
     assert args.trace_hop_ping_count == 4
+    assert args.trace_parallelism == 2
     assert args.max_packet_loss == 10.0
     assert args.skip_speedtest
     assert not args.skip_pingtest
+    assert args.parallel_tests
     assert args.yaml_file == "out.yaml"
     assert args.func is checkinternet.run
 
 
+def test_cli_input_daemon(mocker):
+    mocker.patch(
+        "sys.argv",
+        [
+            "checkinternet",
+            "daemon",
+            "--ping_ip",
+            "1.1.1.1",
+            "--interval",
+            "60",
+            "--speed_interval",
+            "3600",
+            "--trace_interval",
+            "900",
+            "--jitter",
+            "0.25",
+            "--yaml_file",
+            "out.yaml",
+        ],
+    )
+
+    args = checkinternet.cli_input()
+    assert args.ping_ip == ["1.1.1.1"]
+    assert args.interval == 60.0
+    assert args.speed_interval == 3600.0
+    assert args.trace_interval == 900.0
+    assert args.jitter == 0.25
+    assert args.yaml_file == "out.yaml"
+    assert args.trace_parallelism == 8
+    assert args.func is checkinternet.daemon
+
+
+def test_cli_input_daemon_defaults(mocker):
+    mocker.patch("sys.argv", ["checkinternet", "daemon"])
+
+    args = checkinternet.cli_input()
+    assert args.interval == 300.0
+    assert args.speed_interval is None
+    assert args.trace_interval is None
+    assert args.jitter == 0.1
+    assert not hasattr(args, "parallel_tests")
+
+
+def test_cli_input_daemon_takes_defaults_from_config(mocker, tmp_path):
+    config_path = write_config(
+        tmp_path,
+        "daemon:\n  interval: 120\n  speed_interval: 7200\n  yaml_file: d.yaml\n",
+    )
+
+    args = cli_input_with_config(mocker, config_path, "daemon")
+    assert args.interval == 120.0
+    assert args.speed_interval == 7200.0
+    assert args.yaml_file == "d.yaml"
+
+
+def test_cli_input_mtr(mocker):
+    mocker.patch(
+        "sys.argv",
+        [
+            "checkinternet",
+            "mtr",
+            "--ping_ip",
+            "1.1.1.1",
+            "--duration",
+            "120",
+            "--window",
+            "50",
+        ],
+    )
+
+    args = checkinternet.cli_input()
+    assert args.ping_ip == "1.1.1.1"
+    assert args.duration == 120.0
+    assert args.snapshot_interval == 60.0
+    assert args.window == 50
+    assert not args.native_ping
+    assert args.yaml_file is None
+    assert args.func is checkinternet.mtr
+
+
 def test_cli_input_display_defaults(mocker):
     mocker.patch("sys.argv", ["checkinternet", "display", "--yaml_file", "in.yaml"])
 
@@ -687,9 +1714,107 @@ def test_cli_input_display_defaults(mocker):
     assert args.target_upload_mbps == 15
     assert args.target_latency_ms == 20
     assert args.target_packet_loss_pct == 3
+    assert args.since is None
+    assert args.until is None
+    assert args.last is None
     assert args.func is checkinternet.display
 
 
+def test_cli_input_display_accepts_a_time_window(mocker):
+    mocker.patch(
+        "sys.argv",
+        [
+            "checkinternet",
+            "display",
+            "--yaml_file",
+            "in.yaml",
+            "--since",
+            "2024-01-31",
+            "--until",
+            "2024-02-07 18:30",
+            "--last",
+            "1.5",
+        ],
+    )
+
+    args = checkinternet.cli_input()
+    assert args.since == datetime(2024, 1, 31)
+    assert args.until == datetime(2024, 2, 7, 18, 30)
+    assert args.last == 1.5
+
+
+def test_cli_input_display_rejects_an_invalid_since(mocker, capsys):
+    mocker.patch(
+        "sys.argv",
+        ["checkinternet", "display", "--yaml_file", "in.yaml", "--since", "yesterday"],
+    )
+
+    with pytest.raises(SystemExit) as excinfo:
+        checkinternet.cli_input()
+    assert excinfo.value.code == 2
+    assert "expected a date" in capsys.readouterr().err
+
+
+def test_cli_input_display_accepts_a_store_without_a_yaml_file(mocker):
+    mocker.patch("sys.argv", ["checkinternet", "display", "--store", "in.sqlite"])
+
+    args = checkinternet.cli_input()
+    assert args.store == "in.sqlite"
+    assert args.yaml_file is None
+
+
+def test_cli_input_migrate(mocker):
+    mocker.patch(
+        "sys.argv",
+        [
+            "checkinternet",
+            "migrate",
+            "--yaml_file",
+            "in.yaml",
+            "--store",
+            "out.sqlite",
+        ],
+    )
+
+    args = checkinternet.cli_input()
+    assert args.yaml_file == "in.yaml"
+    assert args.store == "out.sqlite"
+    assert args.func is checkinternet.migrate
+
+
+@pytest.mark.parametrize(
+    "argv, missing",
+    [
+        (["--yaml_file", "in.yaml"], "--store"),
+        (["--store", "out.sqlite"], "--yaml_file"),
+    ],
+)
+def test_cli_input_migrate_requires_both_files(mocker, capsys, argv, missing):
+    mocker.patch("sys.argv", ["checkinternet", "migrate"] + argv)
+
+    with pytest.raises(SystemExit) as excinfo:
+        checkinternet.cli_input()
+    assert excinfo.value.code == 2
+    assert "ERROR: migrate requires {}".format(missing) in capsys.readouterr().err
+
+
+def test_cli_input_reindex(mocker):
+    mocker.patch("sys.argv", ["checkinternet", "reindex", "--yaml_file", "in.yaml"])
+
+    args = checkinternet.cli_input()
+    assert args.yaml_file == "in.yaml"
+    assert args.func is checkinternet.reindex
+
+
+def test_cli_input_reindex_requires_a_yaml_file(mocker, capsys):
+    mocker.patch("sys.argv", ["checkinternet", "reindex"])
+
+    with pytest.raises(SystemExit) as excinfo:
+        checkinternet.cli_input()
+    assert excinfo.value.code == 2
+    assert "ERROR: reindex requires --yaml_file" in capsys.readouterr().err
+
+
 def test_cli_input_display_accepts_stdin_sentinel(mocker):
     mocker.patch("sys.argv", ["checkinternet", "display", "--yaml_file", "-"])
 
@@ -805,14 +1930,16 @@ def test_cli_input_run_takes_defaults_from_config(mocker, tmp_path):
         "  ping_ip: 1.1.1.1\n"
         "  ping_count: 25\n"
         "  trace_hop_ping_count: 7\n"
+        "  trace_parallelism: 4\n"
         "  max_packet_loss: 2.0\n"
         "  yaml_file: /var/log/results.yaml\n",
     )
 
     args = cli_input_with_config(mocker, config_path, "run")
-    assert args.ping_ip == "1.1.1.1"
+    assert args.ping_ip == ["1.1.1.1"]
     assert args.ping_count == 25
     assert args.trace_hop_ping_count == 7
+    assert args.trace_parallelism == 4
     assert args.max_packet_loss == 2.0
     assert args.yaml_file == "/var/log/results.yaml"
     assert args.skip_speedtest is False
@@ -834,7 +1961,7 @@ def test_cli_input_run_flags_override_config(mocker, tmp_path):
         "--yaml_file",
         "cli.yaml",
     )
-    assert args.ping_ip == "9.9.9.9"
+    assert args.ping_ip == ["9.9.9.9"]
     assert args.yaml_file == "cli.yaml"
     assert args.ping_count == 25
 
@@ -853,10 +1980,24 @@ def test_cli_input_flag_matching_the_builtin_default_overrides_config(mocker, tm
         "--max_packet_loss",
         "3.0",
     )
-    assert args.ping_ip == "8.8.8.8"
+    assert args.ping_ip == ["8.8.8.8"]
     assert args.max_packet_loss == 3.0
 
 
+def test_cli_input_takes_several_ping_targets(mocker, tmp_path):
+    config_path = write_config(
+        tmp_path, "run:\n  ping_ip: [192.168.1.1, 1.1.1.1, 8.8.8.8]\n"
+    )
+
+    args = cli_input_with_config(mocker, config_path, "run")
+    assert args.ping_ip == ["192.168.1.1", "1.1.1.1", "8.8.8.8"]
+
+    args = cli_input_with_config(
+        mocker, config_path, "run", "--ping_ip", "9.9.9.9", "1.0.0.1"
+    )
+    assert args.ping_ip == ["9.9.9.9", "1.0.0.1"]
+
+
 def test_cli_input_run_skip_flags_from_config(mocker, tmp_path):
     config_path = write_config(
         tmp_path, "run:\n  skip_speedtest: true\n  skip_pingtest: true\n"
@@ -885,10 +2026,16 @@ def test_cli_input_display_takes_defaults_from_config(mocker, tmp_path):
         "  target_download_mbps: 500\n"
         "  target_upload_mbps: 100\n"
         "  target_latency_ms: 15\n"
-        "  target_packet_loss_pct: 0.5\n",
+        "  target_packet_loss_pct: 0.5\n"
+        "  since: 2024-01-31\n"
+        "  until: '2024-02-07 18:30'\n"
+        "  last: 7\n",
     )
 
     args = cli_input_with_config(mocker, config_path, "display")
+    assert args.since == datetime(2024, 1, 31)
+    assert args.until == datetime(2024, 2, 7, 18, 30)
+    assert args.last == 7.0
     assert args.yaml_file == "/var/log/results.yaml"
     assert args.format == "html"
     assert args.html_file == "/var/www/report.html"
@@ -944,15 +2091,17 @@ def test_cli_input_reads_the_default_config_file(mocker):
     config_path.write_text("run:\n  ping_ip: 1.1.1.1\n", encoding="utf-8")
 
     args = cli_input_with_config(mocker, None, "run")
-    assert args.ping_ip == "1.1.1.1"
+    assert args.ping_ip == ["1.1.1.1"]
 
 
 def test_cli_input_without_a_config_file_uses_builtin_defaults(mocker):
     args = cli_input_with_config(mocker, None, "run")
-    assert args.ping_ip == "8.8.8.8"
+    assert args.ping_ip == ["8.8.8.8"]
     assert args.ping_count is None
+    assert args.trace_parallelism == 8
     assert args.max_packet_loss == 3.0
     assert args.skip_speedtest is False
+    assert args.parallel_tests is False
     assert args.yaml_file is None
 
 
@@ -962,7 +2111,7 @@ def test_cli_input_ignores_the_section_of_another_command(mocker, tmp_path):
     )
 
     args = cli_input_with_config(mocker, config_path, "run")
-    assert args.ping_ip == "8.8.8.8"
+    assert args.ping_ip == ["8.8.8.8"]
     assert args.yaml_file is None
 
 
@@ -1061,3 +2210,87 @@ def test_main_exits_with_command_status(mocker):
     with pytest.raises(SystemExit) as excinfo:
         checkinternet.main()
     assert excinfo.value.code == 3
+
+
+# Runs a command the way cron would, with nothing configured and logging
+# nowhere, and reports the import time python measured for every module.
+IMPORTTIME_SCRIPT = """
+import sys
+from internet_troubleshooter import checkinternet
+sys.argv = ["checkinternet"] + sys.argv[1:]
+try:
+    checkinternet.main()
+except SystemExit:
+    pass
+"""
+
+# How long importing checkinternet may take, in microseconds. It took about
+# 80ms with the rendering code and PyYAML, and about 60ms without.
+STARTUP_BUDGET_US = 70_000
+
+
+def imported_modules(*command):
+    """The cumulative import time of every module a command loads, by name."""
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", IMPORTTIME_SCRIPT, *command],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = {}
+    for line in completed.stderr.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            _, cumulative, name = line.split("|")
+            if cumulative.strip().isdigit():
+                times[name.strip()] = int(cumulative)
+    return times
+
+
+def test_run_loads_neither_rendering_nor_yaml():
+    modules = imported_modules("run", "--skip_pingtest", "--skip_speedtest")
+
+    assert "internet_troubleshooter.checkinternet" in modules
+    assert "internet_troubleshooter.render" not in modules
+    assert "yaml" not in modules
+
+
+def test_run_loads_sqlite_only_to_log_to_a_store(tmp_path):
+    # The startup budget is only checked by a benchmark, which is deselected
+    # by default, so this keeps the store from being imported up front.
+    modules = imported_modules("run", "--skip_pingtest", "--skip_speedtest")
+    assert "internet_troubleshooter.store" not in modules
+    assert "sqlite3" not in modules
+
+    modules = imported_modules(
+        "run",
+        "--skip_pingtest",
+        "--skip_speedtest",
+        "--store",
+        str(tmp_path / "results.sqlite"),
+    )
+    assert "sqlite3" in modules
+
+
+def test_run_loads_yaml_only_to_log_to_a_yaml_file(tmp_path):
+    yaml_file = tmp_path / "results.yaml"
+
+    modules = imported_modules(
+        "run", "--skip_pingtest", "--skip_speedtest", "--yaml_file", str(yaml_file)
+    )
+
+    assert "yaml" in modules
+    assert "internet_troubleshooter.render" not in modules
+
+
+@pytest.mark.benchmark
+def test_benchmark_startup_time():
+    """Import time of checkinternet, best of a few runs to ride out noise.
+
+    Run with `pytest -m benchmark -s` to see the figure.
+    """
+    best = min(
+        imported_modules("--version")["internet_troubleshooter.checkinternet"]
+        for _ in range(5)
+    )
+    print("\nimporting checkinternet: {:,}us".format(best))
+    assert best < STARTUP_BUDGET_US
@@ -1,3 +1,4 @@
+from datetime import date, datetime
 from pathlib import Path
 
 import pytest
@@ -7,9 +8,12 @@ from internet_troubleshooter.config import (
     Option,
     as_bool,
     as_choice,
+    as_datetime,
     as_float,
     as_int,
     as_str,
+    as_str_list,
+    default_cache_dir,
     default_config_path,
     load_config,
 )
@@ -50,6 +54,19 @@ def test_default_config_path_falls_back_to_home(monkeypatch):
     )
 
 
+def test_default_cache_dir_uses_xdg_cache_home(monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", "/somewhere/cache")
+
+    assert default_cache_dir() == Path("/somewhere/cache/checkinternet")
+
+
+def test_default_cache_dir_falls_back_to_home(monkeypatch):
+    monkeypatch.delenv("XDG_CACHE_HOME", raising=False)
+    monkeypatch.setenv("HOME", "/home/someone")
+
+    assert default_cache_dir() == Path("/home/someone/.cache/checkinternet")
+
+
 def test_load_config_without_a_file_is_empty():
     assert load_config(None, SCHEMA) == {}
 
@@ -202,6 +219,20 @@ def test_as_str_returns_the_value():
     assert as_str("8.8.8.8") == "8.8.8.8"
 
 
+@pytest.mark.parametrize(
+    "value, expected",
+    [("8.8.8.8", ["8.8.8.8"]), (["1.1.1.1", "8.8.8.8"], ["1.1.1.1", "8.8.8.8"])],
+)
+def test_as_str_list_returns_a_list(value, expected):
+    assert as_str_list(value) == expected
+
+
+@pytest.mark.parametrize("value", [[], ["1.1.1.1", 2], 8, None])
+def test_as_str_list_rejects_anything_else(value):
+    with pytest.raises(ValueError, match="expected a string or a list of strings"):
+        as_str_list(value)
+
+
 def test_as_int_returns_the_value():
     assert as_int(400) == 400
 
@@ -226,3 +257,21 @@ def test_as_choice_returns_an_allowed_value():
 def test_as_choice_rejects_anything_else(value):
     with pytest.raises(ValueError):
         as_choice(("human", "html"))(value)
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [
+        (date(2024, 1, 31), datetime(2024, 1, 31)),
+        (datetime(2024, 1, 31, 18), datetime(2024, 1, 31, 18)),
+        ("2024-01-31 18:30", datetime(2024, 1, 31, 18, 30)),
+    ],
+)
+def test_as_datetime_returns_a_datetime(value, expected):
+    assert as_datetime(value) == expected
+
+
+@pytest.mark.parametrize("value", ["last week", 1706700000, None])
+def test_as_datetime_rejects_anything_else(value):
+    with pytest.raises(ValueError, match="expected a date"):
+        as_datetime(value)
@@ -0,0 +1,224 @@
+import math
+import socket
+import struct
+import time
+
+import pytest
+
+from internet_troubleshooter import icmp
+
+
+def can_open_an_icmp_socket():
+    try:
+        connection, _ = icmp.open_socket()
+    except icmp.IcmpError:
+        return False
+    connection.close()
+    return True
+
+
+needs_icmp = pytest.mark.skipif(
+    not can_open_an_icmp_socket(),
+    reason="needs root, or a group in net.ipv4.ping_group_range",
+)
+
+
+def test_checksum_of_a_packet_holding_its_checksum_is_zero():
+    assert icmp.checksum(icmp.echo_request(0x1234, 7)) == 0
+    assert icmp.checksum(icmp.echo_request(0x1234, 8, b"odd")) == 0
+
+
+def test_checksum_of_a_known_header():
+    # An IPv4 header, whose checksum is the same one ICMP uses.
+    header = bytes.fromhex("450000730000400040110000c0a80001c0a800c7")
+
+    assert icmp.checksum(header) == 0xB861
+
+
+def test_echo_request_layout():
+    packet = icmp.echo_request(0x1234, 7)
+
+    kind, code, _, identifier, sequence = struct.unpack_from("!BBHHH", packet)
+    assert (kind, code, identifier, sequence) == (8, 0, 0x1234, 7)
+    assert packet[8:] == icmp.PAYLOAD
+
+
+def echo_reply(identifier, sequence):
+    return struct.pack("!BBHHH", 0, 0, 0, identifier, sequence) + icmp.PAYLOAD
+
+
+def test_parse_reply_from_a_datagram_socket():
+    assert icmp.parse_reply(echo_reply(0x1234, 7)) == (0x1234, 7)
+
+
+@pytest.mark.parametrize("header_length", [5, 6])
+def test_parse_reply_skips_an_ip_header(header_length):
+    ip_header = bytes([0x40 | header_length]) + bytes(header_length * 4 - 1)
+
+    assert icmp.parse_reply(ip_header + echo_reply(0x1234, 7)) == (0x1234, 7)
+
+
+def test_parse_reply_ignores_anything_but_an_echo_reply():
+    assert icmp.parse_reply(icmp.echo_request(0x1234, 7)) is None
+    assert icmp.parse_reply(b"\0\0") is None
+    assert icmp.parse_reply(b"") is None
+    assert icmp.parse_reply(bytes([0x45]) + bytes(19)) is None
+
+
+def test_open_socket_reports_when_neither_socket_is_allowed(mocker):
+    mocker.patch("socket.socket", side_effect=PermissionError("denied"))
+
+    with pytest.raises(icmp.IcmpError, match="ping_group_range"):
+        icmp.open_socket()
+
+
+def test_resolve_only_returns_ipv4_addresses():
+    assert icmp.resolve("127.0.0.1") == "127.0.0.1"
+    assert icmp.resolve("::1") is None
+    assert icmp.resolve("no-such-host.invalid") is None
+
+
+def test_probe_without_any_ipv4_target_opens_no_socket(mocker):
+    opened = mocker.patch("internet_troubleshooter.icmp.open_socket")
+
+    assert icmp.probe(["::1"], 3, 0.01) == {}
+    assert not opened.called
+
+
+@needs_icmp
+def test_probe_pings_the_loopback_address():
+    rtts = icmp.probe(["127.0.0.1"], 5, 0.01)
+
+    assert list(rtts) == ["127.0.0.1"]
+    assert len(rtts["127.0.0.1"]) == 5
+    assert all(0 < rtt < 1000 for rtt in rtts["127.0.0.1"])
+
+
+@needs_icmp
+def test_probe_pings_many_targets_at_once():
+    targets = ["127.0.0.{}".format(host) for host in range(1, 31)]
+
+    rtts = icmp.probe(targets + ["no-such-host.invalid"], 3, 0.01)
+
+    assert list(rtts) == targets
+    assert all(not math.isnan(rtt) for values in rtts.values() for rtt in values)
+
+
+@needs_icmp
+def test_probe_counts_the_unanswered_packets_as_lost(mocker):
+    # Nothing is read back, so every packet goes unanswered.
+    mocker.patch.object(icmp._Probe, "receive")
+
+    rtts = icmp.probe(["127.0.0.1"], 3, 0.01, timeout=0.05)
+
+    assert all(math.isnan(rtt) for rtt in rtts["127.0.0.1"])
+
+
+@needs_icmp
+def test_probe_targets_of_the_same_address_share_its_replies():
+    rtts = icmp.probe(["127.0.0.1", "localhost"], 2, 0.01)
+
+    if socket.gethostbyname("localhost") == "127.0.0.1":
+        assert list(rtts["localhost"]) == list(rtts["127.0.0.1"])
+
+
+def test_probe_reads_a_datagram_socket_that_keeps_the_ip_header(mocker):
+    # As a datagram socket on macOS hands over its replies.
+    connection = mocker.Mock()
+    ip_header = bytes([0x45]) + bytes(19)
+    connection.recvfrom.side_effect = [
+        (ip_header + echo_reply(0x1234, 0), ("127.0.0.1", 0)),
+        BlockingIOError(),
+    ]
+    clock = iter([1_000_000, 3_500_000]).__next__
+    state = icmp._Probe(connection, False, {"127.0.0.1": "127.0.0.1"}, 1, clock)
+
+    state.send(0)
+    state.receive()
+
+    assert list(state.rtts_ms["127.0.0.1"]) == [2.5]
+    assert not state.outstanding
+
+
+def test_flow_probes_share_their_checksum():
+    probes = [icmp.flow_probe(0x1234, sequence) for sequence in (1, 2, 258, 65535)]
+
+    assert {probe[2:4] for probe in probes} == {
+        icmp.TRACE_FLOW_CHECKSUM.to_bytes(2, "big")
+    }
+    assert all(icmp.checksum(probe) == 0 for probe in probes)
+    assert [struct.unpack_from("!H", probe, 6)[0] for probe in probes] == [
+        1,
+        2,
+        258,
+        65535,
+    ]
+
+
+def time_exceeded(probe):
+    ip_header = bytes([0x45]) + bytes(19)
+    return (
+        ip_header
+        + struct.pack("!BBHHH", 11, 0, 0, 0, 0)
+        + ip_header
+        + probe[: icmp.ICMP_HEADER.size]
+    )
+
+
+def test_parse_trace_reply_reads_the_probe_a_router_quotes():
+    packet = time_exceeded(icmp.flow_probe(0x1234, 0x0205))
+
+    assert icmp.parse_trace_reply(packet) == (0x1234, 0x0205, False)
+
+
+def test_parse_trace_reply_of_the_target_itself():
+    packet = bytes([0x45]) + bytes(19) + echo_reply(0x1234, 7)
+
+    assert icmp.parse_trace_reply(packet) == (0x1234, 7, True)
+
+
+def test_parse_trace_reply_ignores_anything_else():
+    ip_header = bytes([0x45]) + bytes(19)
+    unreachable = ip_header + struct.pack("!BBHHH", 3, 1, 0, 0, 0) + ip_header
+
+    assert icmp.parse_trace_reply(unreachable) is None
+    assert icmp.parse_trace_reply(time_exceeded(echo_reply(0x1234, 7))) is None
+    assert icmp.parse_trace_reply(ip_header) is None
+    assert icmp.parse_trace_reply(b"") is None
+
+
+def test_trace_of_a_target_without_an_ipv4_address():
+    with pytest.raises(icmp.IcmpError, match="no IPv4 address"):
+        icmp.trace("::1")
+
+
+def test_trace_path_marks_the_silent_hops():
+    state = icmp._Trace(None, "8.8.8.8", 30)
+    state.hops = {1: "192.168.1.1", 3: "10.0.0.1"}
+
+    assert state.path() == ["192.168.1.1", None, "10.0.0.1"]
+    assert not state.complete()
+
+    state.target_ttl = 3
+    assert state.path() == ["192.168.1.1", None]
+    assert not state.complete()
+
+    state.hops[2] = "10.0.0.2"
+    assert state.complete()
+
+
+def can_open_a_raw_socket():
+    try:
+        icmp.open_raw_socket().close()
+    except icmp.IcmpError:
+        return False
+    return True
+
+
+@pytest.mark.skipif(not can_open_a_raw_socket(), reason="needs root")
+def test_trace_reaches_the_loopback_address_straight_away():
+    start = time.monotonic()
+
+    assert icmp.trace("127.0.0.1") == []
+    # Well within the timeout, since the target answered every probe.
+    assert time.monotonic() - start < icmp.REPLY_TIMEOUT
@@ -0,0 +1,203 @@
+import threading
+
+import pytest
+
+from internet_troubleshooter import log_index
+from internet_troubleshooter.ping_test import PingResult
+from internet_troubleshooter.result import TestResult as InternetTestResult
+from internet_troubleshooter.result import TimeWindow
+
+
+def make_result(time_stamp):
+    return InternetTestResult(
+        ping_result=PingResult(ip="8.8.8.8", packet_loss=time_stamp),
+        trace_result=None,
+        speed_result=None,
+        time_stamp=time_stamp,
+    )
+
+
+def append_results(path, *time_stamps):
+    with open(path, "a", encoding="utf-8") as yaml_file:
+        for time_stamp in time_stamps:
+            result = make_result(float(time_stamp))
+            print("---\n{}\n...\n".format(result.to_yaml()), file=yaml_file)
+
+
+def time_stamps(results):
+    return [result.time_stamp for result in results]
+
+
+def test_reindex_records_every_run(tmp_path):
+    yaml_file = tmp_path / "results.yaml"
+    append_results(yaml_file, 1, 2, 3)
+
+    assert log_index.reindex(yaml_file) == 3
+    assert (tmp_path / "results.yaml.idx").exists()
+
+
+@pytest.mark.parametrize(
+    "window, expected",
+    [
+        (TimeWindow(since=3.0), [3.0, 4.0, 5.0]),
+        (TimeWindow(until=2.0), [1.0, 2.0]),
+        (TimeWindow(since=2.0, until=4.0), [2.0, 3.0, 4.0]),
+        (TimeWindow(since=2.5, until=2.7), []),
+        (TimeWindow(since=9.0), []),
+        (TimeWindow(until=0.0), []),
+    ],
+)
+def test_iter_results_reads_the_window(tmp_path, window, expected):
+    yaml_file = tmp_path / "results.yaml"
+    append_results(yaml_file, 1, 2, 3, 4, 5)
+    log_index.reindex(yaml_file)
+
+    assert time_stamps(log_index.iter_results(yaml_file, window)) == expected
+
+
+def test_iter_results_seeks_past_the_runs_before_the_window(tmp_path, mocker):
+    yaml_file = tmp_path / "results.yaml"
+    append_results(yaml_file, 1, 2, 3, 4, 5)
+    log_index.reindex(yaml_file)
+    from_dict = mocker.spy(InternetTestResult, "from_dict")
+    mapped = mocker.spy(InternetTestResult, "iter_mapped")
+
+    loaded = log_index.iter_results(yaml_file, TimeWindow(since=4.0, until=4.0))
+
+    assert time_stamps(loaded) == [4.0]
+    assert from_dict.call_count == 1
+    # Only run 4 is read, and then the unindexed end of the log, which is empty.
+    assert len(mapped.call_args_list) == 2
+
+
+def test_iter_results_reads_runs_appended_since_the_index(tmp_path):
+    yaml_file = tmp_path / "results.yaml"
+    append_results(yaml_file, 1, 2, 3)
+    log_index.reindex(yaml_file)
+    append_results(yaml_file, 4, 0.5)
+
+    loaded = log_index.iter_results(yaml_file, TimeWindow(until=2.0))
+
+    assert time_stamps(loaded) == [1.0, 2.0, 0.5]
+
+
+def test_update_index_indexes_appended_runs(tmp_path):
+    yaml_file = tmp_path / "results.yaml"
+    append_results(yaml_file, 1, 2)
+    log_index.reindex(yaml_file)
+    append_results(yaml_file, 3, 4)
+
+    log_index.update_index(yaml_file)
+
+    with open(tmp_path / "results.yaml.idx", "rb") as index:
+        assert log_index._record_count(index) == 4
+    loaded = log_index.iter_results(yaml_file, TimeWindow(since=3.0))
+    assert time_stamps(loaded) == [3.0, 4.0]
+
+
+def test_update_index_waits_for_another_update_of_the_same_log(tmp_path):
+    yaml_file = tmp_path / "results.yaml"
+    append_results(yaml_file, 1, 2)
+    log_index.reindex(yaml_file)
+    append_results(yaml_file, 3)
+
+    # As another process would hold it, updating the index for its own run.
+    with open(yaml_file, "rb") as log, log_index._locked(log):
+        update = threading.Thread(target=log_index.update_index, args=(yaml_file,))
+        update.start()
+        update.join(0.2)
+        assert update.is_alive()
+        log_index._reindex(log, log_index.index_path(yaml_file))
+        append_results(yaml_file, 4)
+    update.join()
+
+    with open(tmp_path / "results.yaml.idx", "rb") as index:
+        assert log_index._record_count(index) == 4
+    loaded = log_index.iter_results(yaml_file, TimeWindow(since=3.0))
+    assert time_stamps(loaded) == [3.0, 4.0]
+
+
+def test_update_index_only_creates_an_index_when_asked(tmp_path):
+    yaml_file = tmp_path / "results.yaml"
+    append_results(yaml_file, 1)
+
+    log_index.update_index(yaml_file)
+    assert not (tmp_path / "results.yaml.idx").exists()
+
+    log_index.update_index(yaml_file, create=True)
+    assert (tmp_path / "results.yaml.idx").exists()
+
+
+def test_a_run_out_of_order_stops_the_index_being_used(tmp_path, mocker):
+    yaml_file = tmp_path / "results.yaml"
+    append_results(yaml_file, 1, 3)
+    log_index.reindex(yaml_file)
+    append_results(yaml_file, 2)
+    log_index.update_index(yaml_file)
+    fallback = mocker.spy(InternetTestResult, "iter_results")
+
+    loaded = log_index.iter_results(yaml_file, TimeWindow(since=2.0))
+
+    assert time_stamps(loaded) == [3.0, 2.0]
+    assert fallback.called
+
+
+def test_an_index_of_a_replaced_log_is_not_used(tmp_path, mocker):
+    yaml_file = tmp_path / "results.yaml"
+    append_results(yaml_file, 1, 2, 3)
+    log_index.reindex(yaml_file)
+    yaml_file.unlink()
+    # Runs of the same length, so that a run starts where the last indexed one
+    # did, but a different one.
+    append_results(yaml_file, 7, 8, 9, 10)
+    fallback = mocker.spy(InternetTestResult, "iter_results")
+
+    log_index.update_index(yaml_file)
+    loaded = log_index.iter_results(yaml_file, TimeWindow(since=8.0))
+
+    assert time_stamps(loaded) == [8.0, 9.0, 10.0]
+    assert fallback.called
+
+
+def test_an_index_that_is_not_one_is_not_used(tmp_path):
+    yaml_file = tmp_path / "results.yaml"
+    append_results(yaml_file, 1, 2)
+    (tmp_path / "results.yaml.idx").write_bytes(b"not an index")
+
+    loaded = log_index.iter_results(yaml_file, TimeWindow(since=2.0))
+
+    assert time_stamps(loaded) == [2.0]
+
+
+def test_iter_results_without_an_index(tmp_path):
+    yaml_file = tmp_path / "results.yaml"
+    append_results(yaml_file, 1, 2)
+
+    loaded = log_index.iter_results(yaml_file, TimeWindow(since=2.0))
+
+    assert time_stamps(loaded) == [2.0]
+
+
+def test_iter_results_reports_a_missing_log_straight_away(tmp_path):
+    with pytest.raises(OSError):
+        log_index.iter_results(tmp_path / "missing.yaml", TimeWindow(since=1.0))
+
+
+def test_a_run_still_being_written_is_left_unindexed(tmp_path):
+    yaml_file = tmp_path / "results.yaml"
+    append_results(yaml_file, 1)
+    complete = yaml_file.stat().st_size
+    with open(yaml_file, "a", encoding="utf-8") as partial:
+        partial.write("---\ntime_stamp: 2.0\n")
+
+    assert log_index.reindex(yaml_file) == 1
+    with open(tmp_path / "results.yaml.idx", "rb") as index:
+        indexed_size, _ = log_index._read_header(index)
+    assert indexed_size <= complete
+
+    # Once it is finished, the next update picks it up.
+    with open(yaml_file, "a", encoding="utf-8") as partial:
+        partial.write("ping_result: null\n...\n")
+    log_index.update_index(yaml_file)
+    loaded = log_index.iter_results(yaml_file, TimeWindow(since=2.0))
+    assert time_stamps(loaded) == [2.0]
@@ -0,0 +1,176 @@
+import math
+import threading
+
+import pytest
+
+from internet_troubleshooter.mtr import PathMonitor, RingBuffer, watch
+from internet_troubleshooter.ping_test import PingResult, PingSamples
+from internet_troubleshooter.trace_test import TraceResult
+
+
+def test_ring_buffer_keeps_the_latest_values_oldest_first():
+    ring = RingBuffer(3)
+    assert len(ring) == 0
+    assert list(ring.values()) == []
+
+    ring.extend([1.0, 2.0])
+    assert list(ring.values()) == [1.0, 2.0]
+
+    ring.extend([3.0, 4.0, 5.0])
+    assert len(ring) == 3
+    assert list(ring.values()) == [3.0, 4.0, 5.0]
+
+    ring.extend([6.0])
+    assert list(ring.values()) == [4.0, 5.0, 6.0]
+
+
+def round_result(ip, *rtts):
+    return PingResult.from_samples(ip, PingSamples(rtts))
+
+
+def test_path_monitor_snapshot_covers_the_window():
+    monitor = PathMonitor("8.8.8.8", ["192.168.1.1", "10.0.0.1"], window=3)
+
+    monitor.record(
+        [
+            round_result("8.8.8.8", 20.0, math.nan),
+            round_result("192.168.1.1", 1.0, 1.0),
+            None,
+        ]
+    )
+    monitor.record(
+        [
+            round_result("8.8.8.8", 22.0, 24.0, 26.0),
+            # Only recorded packets go into the window.
+            PingResult(ip="192.168.1.1", packet_loss=50.0),
+            None,
+        ]
+    )
+    snapshot = monitor.snapshot()
+
+    assert monitor.addresses() == ["8.8.8.8", "192.168.1.1", "10.0.0.1"]
+    # The first reply and the lost packet have dropped out of the window.
+    assert snapshot.ping_result.packet_loss == 0.0
+    assert snapshot.ping_result.rtt_avg_ms == 24.0
+    # The hop that never answered a round is left out.
+    assert snapshot.trace_result == TraceResult(
+        ping_results=[round_result("192.168.1.1", 1.0, 1.0)]
+    )
+    assert snapshot.speed_result is None
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeStop:
+    """Advances the fake clock through each wait."""
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.stopped = False
+
+    def is_set(self):
+        return self.stopped
+
+    def wait(self, timeout):
+        self.clock.now += timeout
+        return self.stopped
+
+
+def watch_for(duration, snapshot_interval, round_seconds, round_interval=10.0):
+    clock = FakeClock()
+    monitor = PathMonitor("8.8.8.8", ["192.168.1.1"], window=100)
+    rounds = []
+    snapshots = []
+
+    def ping_round(addresses):
+        rounds.append(clock.now)
+        clock.now += round_seconds
+        return [round_result(ip, 10.0) for ip in addresses]
+
+    count = watch(
+        monitor,
+        ping_round,
+        lambda snapshot: snapshots.append((clock.now, snapshot)),
+        duration,
+        snapshot_interval,
+        FakeStop(clock),
+        clock=clock,
+        round_interval=round_interval,
+    )
+    assert count == len(rounds)
+    return rounds, snapshots
+
+
+def test_watch_runs_rounds_for_the_duration():
+    rounds, snapshots = watch_for(60.0, 30.0, round_seconds=1.0)
+
+    assert rounds == [0.0, 10.0, 20.0, 30.0, 40.0, 50.0]
+    assert [at for at, _ in snapshots] == [31.0, 60.0]
+    # Each snapshot covers every round so far.
+    assert [len(s.ping_result.samples) for _, s in snapshots] == [4, 6]
+
+
+def test_watch_reports_the_rounds_since_the_last_snapshot_at_the_end():
+    _, snapshots = watch_for(25.0, 30.0, round_seconds=1.0)
+
+    assert [at for at, _ in snapshots] == [25.0]
+
+
+def test_watch_runs_slow_rounds_back_to_back():
+    rounds, snapshots = watch_for(60.0, 10.0, round_seconds=25.0)
+
+    assert rounds == [0.0, 25.0, 50.0]
+    # The snapshots missed during a round are not caught up on.
+    assert [at for at, _ in snapshots] == [25.0, 50.0, 75.0]
+
+
+def test_watch_stops_when_told_to():
+    stop = threading.Event()
+    snapshots = []
+
+    def ping_round(addresses):
+        stop.set()
+        return [round_result(ip, 10.0) for ip in addresses]
+
+    rounds = watch(
+        PathMonitor("8.8.8.8", [], window=10),
+        ping_round,
+        snapshots.append,
+        600.0,
+        60.0,
+        stop,
+    )
+
+    assert rounds == 1
+    assert len(snapshots) == 1
+
+
+def test_watch_reports_the_last_rounds_when_interrupted():
+    snapshots = []
+    calls = []
+
+    def ping_round(addresses):
+        calls.append(addresses)
+        if len(calls) == 2:
+            raise KeyboardInterrupt
+        return [round_result(ip, 10.0) for ip in addresses]
+
+    with pytest.raises(KeyboardInterrupt):
+        watch(
+            PathMonitor("8.8.8.8", [], window=10),
+            ping_round,
+            snapshots.append,
+            600.0,
+            60.0,
+            threading.Event(),
+            round_interval=0.0,
+        )
+
+    assert len(snapshots) == 1
+    assert len(snapshots[0].ping_result.samples) == 1
@@ -0,0 +1,131 @@
+import json
+import os
+
+from internet_troubleshooter.path_cache import PathCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_put_then_get_returns_the_hops(tmp_path):
+    cache = PathCache(tmp_path / "paths.json", ttl=60.0, clock=FakeClock())
+
+    cache.put("8.8.8.8", ["192.168.1.1", "10.0.0.1"])
+
+    assert cache.get("8.8.8.8") == ["192.168.1.1", "10.0.0.1"]
+    assert cache.get("1.1.1.1") is None
+
+
+def test_the_cache_is_kept_across_runs(tmp_path):
+    clock = FakeClock()
+    PathCache(tmp_path / "paths.json", ttl=60.0, clock=clock).put(
+        "8.8.8.8", ["192.168.1.1"]
+    )
+
+    cache = PathCache(tmp_path / "paths.json", ttl=60.0, clock=clock)
+    assert cache.get("8.8.8.8") == ["192.168.1.1"]
+
+
+def test_an_empty_path_is_stale(tmp_path):
+    cache = PathCache(tmp_path / "paths.json", clock=FakeClock())
+    cache.put("8.8.8.8", [])
+
+    assert cache.get("8.8.8.8") is None
+
+
+def test_a_path_older_than_the_ttl_is_stale(tmp_path):
+    clock = FakeClock()
+    cache = PathCache(tmp_path / "paths.json", ttl=60.0, clock=clock)
+    cache.put("8.8.8.8", ["192.168.1.1"])
+
+    clock.now += 59.0
+    assert cache.get("8.8.8.8") == ["192.168.1.1"]
+    clock.now += 1.0
+    assert cache.get("8.8.8.8") is None
+
+
+def test_a_path_traced_in_the_future_is_stale(tmp_path):
+    clock = FakeClock()
+    cache = PathCache(tmp_path / "paths.json", ttl=60.0, clock=clock)
+    cache.put("8.8.8.8", ["192.168.1.1"])
+
+    # The clock was set back since.
+    clock.now -= 3600.0
+    assert cache.get("8.8.8.8") is None
+
+
+def test_invalidate_forgets_only_that_target(tmp_path):
+    cache = PathCache(tmp_path / "paths.json", ttl=60.0, clock=FakeClock())
+    cache.put("8.8.8.8", ["192.168.1.1"])
+    cache.put("1.1.1.1", ["192.168.1.1", "10.0.0.1"])
+
+    cache.invalidate("8.8.8.8")
+    cache.invalidate("9.9.9.9")
+
+    assert cache.get("8.8.8.8") is None
+    assert cache.get("1.1.1.1") == ["192.168.1.1", "10.0.0.1"]
+
+
+def test_an_unreadable_cache_is_empty(tmp_path):
+    path = tmp_path / "paths.json"
+    cache = PathCache(path, ttl=60.0, clock=FakeClock())
+
+    path.write_text("not json", encoding="utf-8")
+    assert cache.get("8.8.8.8") is None
+
+    path.write_text(
+        json.dumps(
+            {
+                "8.8.8.8": {"hops": "192.168.1.1", "traced_at": 1000.0},
+                "1.1.1.1": {"hops": ["10.0.0.1"], "traced_at": 1000.0},
+            }
+        ),
+        encoding="utf-8",
+    )
+    assert cache.get("8.8.8.8") is None
+    assert cache.get("1.1.1.1") == ["10.0.0.1"]
+
+    # And is simply replaced the next time a path is traced.
+    cache.put("8.8.8.8", ["192.168.1.1"])
+    assert cache.get("8.8.8.8") == ["192.168.1.1"]
+
+
+def test_put_creates_the_cache_directory(tmp_path):
+    path = tmp_path / "cache_home" / "checkinternet" / "paths.json"
+
+    PathCache(path, ttl=60.0, clock=FakeClock()).put("8.8.8.8", [])
+
+    assert json.loads(path.read_text(encoding="utf-8")) == {
+        "8.8.8.8": {"hops": [], "traced_at": 1000.0}
+    }
+    assert [entry.name for entry in path.parent.iterdir()] == ["paths.json"]
+
+
+def test_put_writes_each_save_aside_to_a_file_of_its_own(tmp_path, mocker):
+    path = tmp_path / "paths.json"
+    cache = PathCache(path, ttl=60.0, clock=FakeClock())
+    replace = mocker.spy(os, "replace")
+
+    cache.put("8.8.8.8", ["10.0.0.1"])
+    cache.put("1.1.1.1", ["10.0.0.2"])
+
+    # So two runs saving at once never write into the same file.
+    (first, _), (second, _) = [call.args for call in replace.call_args_list]
+    assert first != second
+    assert all(name.endswith(".tmp") for name in (first, second))
+    assert [entry.name for entry in tmp_path.iterdir()] == ["paths.json"]
+
+
+def test_put_warns_when_the_cache_cannot_be_written(tmp_path, capsys):
+    blocker = tmp_path / "not_a_directory"
+    blocker.write_text("", encoding="utf-8")
+    cache = PathCache(blocker / "paths.json", ttl=60.0, clock=FakeClock())
+
+    cache.put("8.8.8.8", [])
+
+    assert "WARNING: Unable to update the path cache" in capsys.readouterr().err
@@ -1,5 +1,16 @@
+import math
+from array import array
 from subprocess import CompletedProcess
-from internet_troubleshooter.ping_test import PingResult
+
+import pytest
+
+from internet_troubleshooter import icmp
+from internet_troubleshooter.ping_test import (
+    PingResult,
+    PingSamples,
+    loss_decided,
+    loss_interval,
+)
 
 
 # What `ping -f -q -c 400` prints as root; the flood ping appends its own
@@ -24,6 +35,37 @@ TOTAL_LOSS_PING_OUTPUT = """PING 8.8.8.8 (8.8.8.8) 56(84) bytes of data.
 10 packets transmitted, 0 received, 100% packet loss, time 9200ms"""
 
 
+# What `ping -n -c 8` prints as it goes. Packets 3, 4, and 7 are never
+# answered, and packet 8 is answered twice.
+STREAMED_PING_LINES = [
+    "PING 8.8.8.8 (8.8.8.8) 56(84) bytes of data.\n",
+    "64 bytes from 8.8.8.8: icmp_seq=1 ttl=117 time=10.0 ms\n",
+    "64 bytes from 8.8.8.8: icmp_seq=2 ttl=117 time=14.0 ms\n",
+    "64 bytes from 8.8.8.8: icmp_seq=5 ttl=117 time=12.0 ms\n",
+    "64 bytes from 8.8.8.8: icmp_seq=6 ttl=117 time=20.0 ms\n",
+    "64 bytes from 8.8.8.8: icmp_seq=8 ttl=117 time=16.0 ms\n",
+    "64 bytes from 8.8.8.8: icmp_seq=8 ttl=117 time=99.0 ms (DUP!)\n",
+    "\n",
+    "--- 8.8.8.8 ping statistics ---\n",
+    "8 packets transmitted, 5 received, +1 duplicates, 37.5% packet loss, "
+    "time 7010ms\n",
+    "rtt min/avg/max/mdev = 10.000/14.400/20.000/3.441 ms\n",
+]
+
+# What BSD ping prints, numbering its packets from 0 and reporting the loss of
+# the last one before its summary.
+BSD_STREAMED_PING_LINES = [
+    "PING 8.8.8.8 (8.8.8.8): 56 data bytes\n",
+    "64 bytes from 8.8.8.8: icmp_seq=0 ttl=117 time=10.000 ms\n",
+    "64 bytes from 8.8.8.8: icmp_seq=1 ttl=117 time=12.000 ms\n",
+    "Request timeout for icmp_seq 2\n",
+    "\n",
+    "--- 8.8.8.8 ping statistics ---\n",
+    "3 packets transmitted, 2 packets received, 33.3% packet loss\n",
+    "round-trip min/avg/max/stddev = 10.000/11.000/12.000/1.000 ms\n",
+]
+
+
 def test_PingResult():
     x = PingResult(ip="1.1.1.1", packet_loss=10)
     assert x.ip == "1.1.1.1"
@@ -36,12 +78,7 @@ def test_PingResult():
 
 
 def test_summarize():
-    x = [
-        PingResult(ip="1.1.1.1", packet_loss=10),
-        PingResult(ip="1.1.1.2", packet_loss=15),
-        PingResult(ip="1.1.1.3", packet_loss=20),
-    ]
-    summary = PingResult.summarize(x)
+    summary = PingResult.summarize(array("d", [10, 15, 20]), array("d"))
     assert "Packet Loss:" in summary
     assert "Mean: 15.00%" in summary
     assert "Variance: 25.00%" in summary
@@ -50,11 +87,7 @@ def test_summarize():
 
 
 def test_summarize_reports_the_round_trip_times():
-    x = [
-        PingResult(ip="1.1.1.1", packet_loss=10, rtt_avg_ms=10.0),
-        PingResult(ip="1.1.1.2", packet_loss=15, rtt_avg_ms=20.0),
-    ]
-    summary = PingResult.summarize(x)
+    summary = PingResult.summarize(array("d", [10, 15]), array("d", [10.0, 20.0]))
     assert "Ping RTT:" in summary
     assert "Mean: 15.00ms" in summary
     assert "Min: 10.00ms" in summary
@@ -62,12 +95,9 @@ def test_summarize_reports_the_round_trip_times():
 
 
 def test_summarize_without_any_round_trip_times():
-    x = [
-        PingResult(ip="1.1.1.1", packet_loss=10),
-        PingResult(ip="1.1.1.2", packet_loss=15),
-    ]
+    summary = PingResult.summarize(array("d", [10, 15]), array("d"))
 
-    assert "Ping RTT: Not enough data." in PingResult.summarize(x)
+    assert "Ping RTT: Not enough data." in summary
 
 
 def test_parseResult():
@@ -222,3 +252,345 @@ def test_execute_test_root(mocker, capsys):
     captured = capsys.readouterr()
     assert captured.out == ""
     assert "WARNING" not in captured.err
+
+
+def samples(*rtts):
+    return PingSamples(math.nan if rtt is None else rtt for rtt in rtts)
+
+
+def test_samples_measure_the_loss_and_its_bursts():
+    x = samples(None, 10.0, None, None, 12.0, None)
+
+    assert x.packet_loss() == pytest.approx(100 * 4 / 6)
+    assert x.loss_bursts() == [1, 2, 1]
+    assert x.received() == [10.0, 12.0]
+
+
+def test_samples_without_any_loss():
+    x = samples(10.0, 12.0)
+
+    assert x.packet_loss() == 0.0
+    assert x.loss_bursts() == []
+
+
+def test_samples_jitter_is_the_mean_change_between_replies():
+    # Lost packets are skipped, so the change is 10 to 14 and 14 to 11.
+    assert samples(10.0, None, 14.0, 11.0).jitter_ms() == 3.5
+    assert samples(10.0, None).jitter_ms() is None
+
+
+@pytest.mark.parametrize(
+    "percent, expected", [(0, 10.0), (50, 25.0), (95, 38.5), (100, 40.0)]
+)
+def test_samples_percentiles_interpolate(percent, expected):
+    x = samples(40.0, 10.0, None, 20.0, 30.0)
+
+    assert x.percentile(percent) == pytest.approx(expected)
+
+
+def test_samples_percentile_of_nothing_received():
+    assert samples(None, None).percentile(50) is None
+
+
+def test_samples_record_by_sequence():
+    x = PingSamples()
+    x.record(1, 10.0)
+    x.record(4, 12.0)
+    x.finish(transmitted=6, first_sequence=1)
+
+    assert len(x) == 6
+    assert x.loss_bursts() == [2, 2]
+    assert x.received() == [10.0, 12.0]
+
+
+def test_parse_stream_records_every_packet():
+    x = PingResult.parse_stream("8.8.8.8", iter(STREAMED_PING_LINES))
+
+    assert x.packet_loss == 37.5
+    assert x.rtt_avg_ms == 14.4
+    assert list(x.samples.rtts_ms[:2]) == [10.0, 14.0]
+    assert x.samples.packet_loss() == 37.5
+    assert x.loss_bursts == 2
+    assert x.longest_loss_burst == 2
+    assert x.jitter_ms == pytest.approx((4 + 2 + 8 + 4) / 4)
+    assert x.rtt_p50_ms == 14.0
+    assert x.rtt_p95_ms == pytest.approx(19.2)
+    assert x.rtt_p99_ms == pytest.approx(19.84)
+
+
+def test_parse_stream_numbers_bsd_packets_from_zero():
+    x = PingResult.parse_stream("8.8.8.8", iter(BSD_STREAMED_PING_LINES))
+
+    assert x.packet_loss == 33.3
+    assert list(x.samples.rtts_ms[:2]) == [10.0, 12.0]
+    assert len(x.samples) == 3
+    assert x.longest_loss_burst == 1
+
+
+def test_parse_stream_of_a_ping_that_lost_everything():
+    lines = [
+        "PING 8.8.8.8 (8.8.8.8) 56(84) bytes of data.\n",
+        "\n",
+        "--- 8.8.8.8 ping statistics ---\n",
+        "4 packets transmitted, 0 received, 100% packet loss, time 3060ms\n",
+    ]
+
+    x = PingResult.parse_stream("8.8.8.8", iter(lines))
+
+    assert x.packet_loss == 100.0
+    assert x.rtt_p50_ms is None
+    assert x.loss_bursts == 1
+    assert x.longest_loss_burst == 4
+
+
+def test_parse_stream_without_a_summary():
+    lines = ["64 bytes from 8.8.8.8: icmp_seq=1 ttl=117 time=10.0 ms\n"]
+
+    assert PingResult.parse_stream("8.8.8.8", iter(lines)) is None
+
+
+def test_samples_are_not_logged_but_their_figures_are():
+    x = PingResult.parse_stream("8.8.8.8", iter(STREAMED_PING_LINES))
+    data = x.to_dict()
+
+    assert "samples" not in data
+    assert data["loss_bursts"] == 2
+    assert data["rtt_p95_ms"] == pytest.approx(19.2)
+    assert PingResult.from_dict(data) == x
+
+
+def test_run_test_per_packet_streams_ping_without_quiet(mocker, capsys):
+    mocker.patch("os.geteuid", return_value=0)
+    stream = mocker.patch(
+        "internet_troubleshooter.ping_test.stream_command",
+        return_value=iter(STREAMED_PING_LINES),
+    )
+
+    x = PingResult.run_test("8.8.8.8", 8, per_packet=True)
+
+    assert x.longest_loss_burst == 2
+    command = stream.call_args.args[0]
+    assert command == ["ping", "-n", "-i", "0.01", "-c", "8", "8.8.8.8"]
+    assert capsys.readouterr().err == ""
+
+
+def test_run_test_per_packet_as_a_normal_user(mocker, capsys):
+    mocker.patch("os.geteuid", return_value=1000)
+    stream = mocker.patch(
+        "internet_troubleshooter.ping_test.stream_command",
+        return_value=iter(STREAMED_PING_LINES),
+    )
+
+    PingResult.run_test("8.8.8.8", per_packet=True)
+
+    assert stream.call_args.args[0] == ["ping", "-n", "-c", "10", "8.8.8.8"]
+    assert "WARNING" in capsys.readouterr().err
+
+
+def test_run_test_per_packet_parse_failure(mocker, capsys):
+    mocker.patch("os.geteuid", return_value=0)
+    mocker.patch(
+        "internet_troubleshooter.ping_test.stream_command",
+        return_value=iter(["MALFORMED\n"]),
+    )
+
+    assert PingResult.run_test("8.8.8.8", per_packet=True) is None
+    assert "Cannot find packet loss" in capsys.readouterr().err
+
+
+def test_run_test_per_packet_missing_binary(mocker, capsys):
+    mocker.patch("os.geteuid", return_value=0)
+    mocker.patch("subprocess.Popen", side_effect=FileNotFoundError)
+
+    assert PingResult.run_test("8.8.8.8", per_packet=True) is None
+    captured = capsys.readouterr()
+    assert "ERROR:" in captured.err
+    assert "Cannot find packet loss" not in captured.err
+
+
+def test_from_samples_reports_what_ping_would():
+    x = PingResult.from_samples("8.8.8.8", samples(10.0, None, 14.0, 12.0))
+
+    assert x.packet_loss == 25.0
+    assert x.rtt_min_ms == 10.0
+    assert x.rtt_avg_ms == 12.0
+    assert x.rtt_max_ms == 14.0
+    assert x.rtt_mdev_ms == pytest.approx(math.sqrt(8 / 3))
+    assert x.longest_loss_burst == 1
+
+
+def test_loss_interval_of_no_loss_is_not_a_point():
+    assert loss_interval(0, 0) == (0.0, 100.0)
+
+    low, high = loss_interval(0, 50)
+    assert low == 0.0
+    assert high == pytest.approx(7.13, abs=0.01)
+
+
+def test_loss_interval_narrows_with_more_packets():
+    low, high = loss_interval(5, 100)
+    assert low < 5.0 < high
+    wider = loss_interval(1, 20)
+    assert wider[0] < low and high < wider[1]
+
+
+@pytest.mark.parametrize(
+    "low, high, decided",
+    [
+        (0.0, 2.9, True),
+        (3.1, 40.0, True),
+        (2.5, 4.5, True),
+        (0.0, 7.1, False),
+    ],
+)
+def test_loss_decided_against_a_max_packet_loss_of_3(low, high, decided):
+    assert loss_decided(low, high, 3.0) == decided
+
+
+def batches(*losses):
+    """A fake _run_per_packet whose batches lose the given packets."""
+    sent = []
+
+    def run_per_packet(ip, count, warn=True):
+        lost = losses[len(sent)] if len(sent) < len(losses) else 0
+        sent.append(count)
+        rtts = [math.nan] * lost + [10.0] * (count - lost)
+        return PingResult.from_samples(ip, PingSamples(rtts))
+
+    return sent, run_per_packet
+
+
+def test_run_test_adaptive_stops_once_the_link_is_clearly_healthy(mocker):
+    mocker.patch("os.geteuid", return_value=0)
+    sent, run_per_packet = batches()
+    mocker.patch.object(PingResult, "_run_per_packet", side_effect=run_per_packet)
+
+    x = PingResult.run_test("8.8.8.8", adaptive_loss=10.0)
+
+    assert sent == [50]
+    assert x.packets_sent == 50
+    assert x.packet_loss == 0.0
+    assert x.packet_loss_ci_low == 0.0
+    assert x.packet_loss_ci_high < 10.0
+    assert len(x.samples) == 50
+
+
+def test_run_test_adaptive_stops_once_the_link_is_clearly_lossy(mocker):
+    mocker.patch("os.geteuid", return_value=0)
+    sent, run_per_packet = batches(25)
+    mocker.patch.object(PingResult, "_run_per_packet", side_effect=run_per_packet)
+
+    x = PingResult.run_test("8.8.8.8", 400, adaptive_loss=3.0)
+
+    assert sent == [50]
+    assert x.packet_loss == 50.0
+    assert x.packet_loss_ci_low > 3.0
+
+
+def test_run_test_adaptive_sends_at_most_count(mocker):
+    mocker.patch("os.geteuid", return_value=1000)
+    # Too few packets to tell whether the loss is under 20%.
+    sent, run_per_packet = batches()
+    mocker.patch.object(PingResult, "_run_per_packet", side_effect=run_per_packet)
+
+    x = PingResult.run_test("8.8.8.8", 12, adaptive_loss=20.0)
+
+    assert sent == [5, 5, 2]
+    assert x.packets_sent == 12
+    assert x.packet_loss_ci_high - x.packet_loss_ci_low > 2.0
+
+
+def test_run_test_adaptive_keeps_the_batches_before_a_failure(mocker):
+    mocker.patch("os.geteuid", return_value=1000)
+    results = iter([PingResult.from_samples("8.8.8.8", PingSamples([10.0] * 5))])
+    run = mocker.patch.object(
+        PingResult, "_run_per_packet", side_effect=lambda *a, **k: next(results, None)
+    )
+
+    x = PingResult.run_test("8.8.8.8", 400, adaptive_loss=3.0)
+
+    assert x.packets_sent == 5
+    # Only the first batch warns of the small sample a normal user can send.
+    assert [c.kwargs["warn"] for c in run.call_args_list] == [True, False]
+
+
+def test_run_test_adaptive_of_a_ping_that_never_ran(mocker):
+    mocker.patch.object(PingResult, "_run_per_packet", return_value=None)
+
+    assert PingResult.run_test("8.8.8.8", 10, adaptive_loss=3.0) is None
+
+
+def test_from_samples_of_a_ping_that_lost_everything():
+    x = PingResult.from_samples("8.8.8.8", samples(None, None))
+
+    assert x.packet_loss == 100.0
+    assert x.rtt_avg_ms is None
+    assert x.longest_loss_burst == 2
+
+
+def test_run_tests_returns_the_results_in_order(mocker):
+    mocker.patch.object(
+        PingResult,
+        "run_test",
+        side_effect=lambda ip, count=None, per_packet=False, adaptive_loss=None: (
+            None if ip == "10.0.0.2" else PingResult(ip=ip, packet_loss=0.0)
+        ),
+    )
+
+    results = PingResult.run_tests(["10.0.0.1", "10.0.0.2", "10.0.0.3"], 5)
+
+    assert [None if x is None else x.ip for x in results] == [
+        "10.0.0.1",
+        None,
+        "10.0.0.3",
+    ]
+
+
+def test_run_tests_native_pings_from_this_process(mocker):
+    mocker.patch("os.geteuid", return_value=0)
+    probe = mocker.patch(
+        "internet_troubleshooter.icmp.probe",
+        return_value={"10.0.0.1": samples(10.0, 12.0).rtts_ms},
+    )
+    run_test = mocker.patch.object(PingResult, "run_test")
+
+    (x,) = PingResult.run_tests(["10.0.0.1"], 2, native=True)
+
+    assert x.rtt_avg_ms == 11.0
+    assert x.samples.received() == [10.0, 12.0]
+    assert probe.call_args.args == (["10.0.0.1"], 2, 0.01)
+    assert not run_test.called
+
+
+def test_run_tests_native_runs_ping_for_what_it_cannot_ping(mocker):
+    mocker.patch("os.geteuid", return_value=1000)
+    probe = mocker.patch(
+        "internet_troubleshooter.icmp.probe",
+        return_value={"10.0.0.1": samples(10.0).rtts_ms},
+    )
+    mocker.patch.object(
+        PingResult,
+        "run_test",
+        side_effect=lambda ip, count=None, per_packet=False, adaptive_loss=None: (
+            PingResult(ip=ip, packet_loss=0.0)
+        ),
+    )
+
+    results = PingResult.run_tests(["10.0.0.1", "::1"], native=True)
+
+    assert [x.samples is None for x in results] == [False, True]
+    assert probe.call_args.args == (["10.0.0.1", "::1"], 10, 1.0)
+
+
+def test_run_tests_native_falls_back_to_ping(mocker, capsys):
+    mocker.patch(
+        "internet_troubleshooter.icmp.probe",
+        side_effect=icmp.IcmpError("unable to open an ICMP socket"),
+    )
+    run_test = mocker.patch.object(
+        PingResult, "run_test", return_value=PingResult(ip="10.0.0.1", packet_loss=0)
+    )
+
+    assert PingResult.run_tests(["10.0.0.1"], 3, native=True)[0].ip == "10.0.0.1"
+    assert run_test.called
+    assert "WARNING: Running ping instead" in capsys.readouterr().err
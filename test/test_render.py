@@ -1,14 +1,25 @@
+import base64
 import builtins
 import io
+import json
+import math
+from array import array
+from datetime import datetime
 
 import pytest
 
+from internet_troubleshooter.chart_levels import choose_level
 from internet_troubleshooter.ping_test import PingResult
 from internet_troubleshooter.render import (
     PLOT_PACKET_LOSS_PCT,
+    TRACE_MISSING_HOP,
+    TRACE_ROW_HEIGHT,
     RenderThresholds,
     _aligned_series,
+    _build_charts_figure,
     _build_trace_tables_html,
+    _chart_levels,
+    _format_run_time,
     _format_summary_stats,
     _hover_texts,
     _metric_status,
@@ -22,8 +33,11 @@ from internet_troubleshooter.render import (
 from internet_troubleshooter.result import TestResult as InternetTestResult
 from internet_troubleshooter.speed_test import SpeedResult
 from internet_troubleshooter.trace_test import TraceResult
+from internet_troubleshooter.typed_arrays import DTYPES, epoch_milliseconds
 
 
+TYPECODES = {dtype: typecode for typecode, dtype in DTYPES.items()}
+
 SPEEDTEST_PAYLOAD = {
     "isp": "MyISP",
     "interface": {"externalIp": "555.555.555.555"},
@@ -39,6 +53,7 @@ def make_result(
     ip="8.8.8.8",
     raw_speed=None,
     ping_rtt=None,
+    failed=(),
 ):
     """A TestResult holding only the pieces a test cares about.
 
@@ -46,6 +61,7 @@ def make_result(
     pairs, where None stands for a hop that could not be pinged. raw_speed is
     the full speedtest JSON payload logged with a speed result. ping_rtt is the
     average round trip time of the ping test, absent unless it was measured.
+    failed names the tests the run attempted that failed.
     """
     ping_result = None
     if packet_loss is not None:
@@ -75,6 +91,7 @@ def make_result(
         trace_result=trace_result,
         speed_result=speed_result,
         time_stamp=time_stamp,
+        failed_tests=list(failed),
     )
 
 
@@ -185,6 +202,26 @@ def test_to_html_plots_the_ping_round_trip_beside_the_speedtest_latency():
     assert '"yaxis4"' not in text
 
 
+def test_to_html_plots_a_series_for_each_ping_target():
+    results = [
+        with_extra_pings(
+            make_result(1.0, packet_loss=0.0, ping_rtt=12.0), ("1.1.1.1", 0.0, 8.0)
+        ),
+        make_result(2.0, packet_loss=1.0, ping_rtt=14.0),
+        with_extra_pings(
+            make_result(3.0, packet_loss=0.0, ping_rtt=13.0), ("1.1.1.1", 40.0, 9.0)
+        ),
+    ]
+
+    text = render(results)
+    assert '"name":"Ping RTT 1.1.1.1"' in text
+    assert '"name":"Packet Loss 1.1.1.1"' in text
+    assert "1.1.1.1: 8.00 ms, 0.00% loss" in text
+    assert "1.1.1.1: no data, no data loss" in text
+    # The axis stretches to the worst loss of any target, not just the first.
+    assert _packet_loss_axis_max([0.0, 1.0, 0.0, None, 40.0]) == 40.0 * 1.15
+
+
 def test_to_html_charts_split_speed_latency_and_loss_across_three_rows():
     results = [
         make_result(1.0, packet_loss=0.0, speed=(80.0, 20.0, 10.0)),
@@ -257,6 +294,175 @@ def test_aligned_series_pads_runs_that_skipped_a_test():
     assert packet_loss == [0.0, 4.0, None]
 
 
+def figure(results, max_points=None):
+    """The charts to_html would draw of results."""
+    levels = _chart_levels(results, max_points)
+    return _build_charts_figure(
+        levels[choose_level(levels, max_points) if max_points else 0]
+    )
+
+
+def unpack(packed):
+    """The values of a plotly typed array."""
+    values = array(TYPECODES[packed["dtype"]])
+    values.frombytes(base64.b64decode(packed["bdata"]))
+    return [None if math.isnan(value) else value for value in values]
+
+
+def trace_named(fig, name):
+    (trace,) = [trace for trace in fig.data if trace.name == name]
+    return trace
+
+
+def render_max_points(results, max_points):
+    output = io.StringIO()
+    to_html(results, output, max_points=max_points)
+    return output.getvalue()
+
+
+def every_ten_minutes(hours, lossy_run=None):
+    """A run every ten minutes for hours, losing 60% of packets on lossy_run."""
+    return [
+        make_result(
+            run * 600.0,
+            packet_loss=60.0 if run == lossy_run else 0.0,
+            speed=(80.0 + run % 7, 20.0, 10.0),
+        )
+        for run in range(hours * 6)
+    ]
+
+
+def test_to_html_starts_a_long_history_at_a_coarser_level():
+    results = every_ten_minutes(72, lossy_run=37)
+
+    fig = figure(results, max_points=100)
+    loss = trace_named(fig, "Packet Loss")
+    assert len(unpack(loss.x)) == 72
+    assert loss.uid == "packet_loss"
+    # The lossy run still shows, as the whisker of its hour.
+    assert max(unpack(loss.error_y.array)) == pytest.approx(50.0)
+    assert loss.text[6].startswith("6 runs<br>Download: 83.50 Mbps (81.00 to 86.00)")
+    assert "Packet loss: 10.00% (0.00 to 60.00)" in loss.text[6]
+
+
+def test_to_html_embeds_every_level_when_there_are_too_many_runs():
+    results = every_ten_minutes(72)
+
+    text = render_max_points(results, 100)
+    assert "Mean and range of each hour until zoomed in" in text
+    assert "chartLevels" in text
+    assert '"maxPoints":100' in text
+    # Every run, the hours, and the days.
+    assert text.count('"incomplete":{"dtype":"f8","bdata":""}') == 3
+
+    text = render_max_points(results, 1000)
+    assert "chartLevels" not in text
+    assert "until zoomed in" not in text
+
+
+def test_to_html_spans_days_when_even_the_days_are_too_many():
+    results = every_ten_minutes(24 * 6)
+
+    text = render_max_points(results, 3)
+    assert "Mean and range of each 2-day span until zoomed in" in text
+    assert len(unpack(trace_named(figure(results, 3), "Download").x)) == 3
+
+
+def test_to_html_draws_every_run_without_max_points():
+    results = every_ten_minutes(72)
+
+    assert len(unpack(trace_named(figure(results), "Download").x)) == len(results)
+    assert "chartLevels" not in render(results)
+
+
+def test_to_html_packs_the_chart_data_as_typed_arrays():
+    results = [
+        make_result(1.0, packet_loss=0.0, speed=(80.0, 20.0, 10.0)),
+        make_result(2.5, packet_loss=4.0),
+    ]
+
+    fig = figure(results)
+    download = trace_named(fig, "Download")
+    assert download.y["dtype"] == "f4"
+    # The run without a speed test is masked, leaving a gap in the line.
+    assert unpack(download.y) == [80.0, None]
+    assert unpack(download.x) == [
+        (result.get_date() - datetime(1970, 1, 1)).total_seconds() * 1000
+        for result in results
+    ]
+    assert fig.layout.xaxis.type == "date"
+    assert "T00:00:01" not in render(results)
+
+
+def incomplete_run_markers(fig):
+    return [trace for trace in fig.data if trace.name == "Incomplete run"]
+
+
+def test_to_html_marks_incomplete_runs_with_a_trace_per_row():
+    results = [
+        make_result(1.0, packet_loss=0.0, speed=(80.0, 20.0, 10.0)),
+        make_result(2.0, packet_loss=4.0, failed=["speed"]),
+        make_result(3.0, speed=(60.0, 10.0, 30.0), failed=["ping"]),
+        # Only the ping test was due, so nothing failed.
+        make_result(4.0, packet_loss=0.0),
+    ]
+
+    fig = figure(results)
+    markers = incomplete_run_markers(fig)
+    assert [(trace.xaxis, trace.yaxis) for trace in markers] == [
+        ("x", "y4"),
+        ("x2", "y5"),
+        ("x3", "y6"),
+    ]
+    assert [trace.uid for trace in markers] == [
+        "incomplete-1",
+        "incomplete-2",
+        "incomplete-3",
+    ]
+    # A segment from the bottom of the row to the top for each incomplete run.
+    assert markers[0].y == (0, 1, None, 0, 1, None)
+    assert markers[0].x[:2] == (results[1].get_date(),) * 2
+    assert fig.layout.yaxis5.overlaying == "y2"
+    assert fig.layout.yaxis5.range == (0, 1)
+    # Only the four threshold lines are layout shapes.
+    assert len(fig.layout.shapes) == 4
+    assert [trace.showlegend for trace in markers] == [True, False, False]
+
+
+def test_to_html_without_incomplete_runs_has_no_markers():
+    fig = figure([make_result(1.0, packet_loss=0.0, speed=(80.0, 20.0, 10.0))])
+
+    assert incomplete_run_markers(fig) == []
+    assert "yaxis4" not in fig.layout.to_plotly_json()
+
+
+def test_to_html_marks_each_hour_with_an_incomplete_run():
+    results = every_ten_minutes(4)
+    for run in (7, 8):
+        results[run] = make_result(
+            results[run].time_stamp, packet_loss=0.0, failed=["speed"]
+        )
+
+    (marker, *_) = incomplete_run_markers(figure(results))
+    assert marker.x.count(None) == 2
+    (marker, *_) = incomplete_run_markers(figure(results, max_points=10))
+    # Both runs were in the second hour, which is marked where it starts.
+    assert marker.x.count(None) == 1
+    assert marker.x[0] == results[6].get_date()
+
+
+def test_to_html_draws_long_lines_with_webgl():
+    short = [make_result(float(run), packet_loss=0.0) for run in range(10)]
+    long = [make_result(float(run), packet_loss=0.0) for run in range(1000)]
+
+    assert trace_named(figure(short), "Packet Loss").type == "scatter"
+    loss = trace_named(figure(long), "Packet Loss")
+    assert loss.type == "scattergl"
+    assert loss.fill == "tozeroy"
+    # A coarser level is drawn with SVG again once it is short enough.
+    assert trace_named(figure(long, max_points=100), "Packet Loss").type == "scatter"
+
+
 def test_to_html_honors_custom_thresholds():
     thresholds = RenderThresholds(
         download_mbps=200,
@@ -281,7 +487,7 @@ def test_to_html_honors_custom_thresholds():
     assert "packet loss &le; 0.5%" in text
     # Every measurement is healthy by default but misses these targets.
     assert '<article class="card card--good">' not in text
-    assert '<span class="loss loss--bad">1.00%</span>' in text
+    assert embedded_traces(text)["bad"] == [[1]]
 
 
 def test_to_html_summary_flags_healthy_and_unhealthy_metrics():
@@ -293,7 +499,7 @@ def test_to_html_summary_flags_healthy_and_unhealthy_metrics():
 
 
 def test_to_html_summary_marks_missing_measurements():
-    text = render([make_result(1.0)])
+    text = render([make_result(1.0, failed=["ping", "speed"])])
 
     assert '<article class="card card--empty">' in text
     assert '<p class="card__value">&mdash;' in text
@@ -307,6 +513,11 @@ def test_to_html_with_no_results_at_all():
     assert '<span class="chip">0 run(s)</span>' in text
 
 
+def embedded_traces(text):
+    script = text.split('<div class="table-scroll" id="trace-table">')[1]
+    return json.loads(script.split("var traces = ")[1].split(";\n")[0])
+
+
 def test_to_html_trace_table_is_scrollable_and_selectable():
     results = [
         make_result(
@@ -318,27 +529,46 @@ def test_to_html_trace_table_is_scrollable_and_selectable():
     ]
 
     text = render(results)
-    assert '<div class="table-scroll">' in text
-    assert '<table class="trace">' in text
+    assert '<div class="table-scroll" id="trace-table">' in text
+    assert '<table class="trace"></table>' in text
     assert "max-height: 460px; overflow: auto;" in text
     assert "position: sticky; top: 0;" in text
-    assert '<th scope="row" class="col-hop">1</th>' in text
-    assert '<span class="hop-ip">192.168.1.1</span>' in text
-    assert '<span class="hop-ip">10.0.0.1</span>' in text
-    assert '<span class="loss loss--bad">12.50%</span>' in text
-    assert '<span class="loss">0.00%</span>' in text
-    # The second run has no second hop, so that cell is blank.
-    assert '<td class="cell--missing">&mdash;</td>' in text
+    assert "table.trace tbody tr {{ height: {}px; }}".format(TRACE_ROW_HEIGHT) in text
+    assert '<th scope="row" class="col-hop">\' + (row + 1)' in text
     assert '<span class="chip">2 traced run(s)</span>' in text
     assert '<span class="chip">2 hop(s) deep</span>' in text
     assert "<go.Table" not in text
 
 
+def test_to_html_embeds_the_trace_table_once_by_column():
+    results = [
+        make_result(
+            1.0,
+            packet_loss=20.0,
+            hops=[("192.168.1.1", 0.0), ("10.0.0.1", 12.5)],
+        ),
+        make_result(2.0, packet_loss=30.0, hops=[("192.168.1.1", 1.0)]),
+    ]
+
+    text = render(results)
+    traces = embedded_traces(text)
+    assert traces["addresses"] == ["192.168.1.1", "10.0.0.1"]
+    # The second run has no second hop, so that cell is blank.
+    assert traces["hops"] == [[0, 0], [1, TRACE_MISSING_HOP]]
+    assert traces["losses"] == [[0.0, 1.0], [12.5, None]]
+    assert traces["bad"] == [[0, 0], [1, 0]]
+    assert traces["missing"] == "&mdash;"
+    # No cell is written out ahead of the script drawing those in view.
+    table = text.split('id="trace-table">')[1].split("<script>")[0]
+    assert table == '<table class="trace"></table></div>'
+
+
 def test_to_html_escapes_hop_addresses():
     text = render([make_result(1.0, packet_loss=5.0, hops=[("<b>evil</b>", 0.0)])])
 
     assert "<b>evil</b>" not in text
-    assert "&lt;b&gt;evil&lt;/b&gt;" in text
+    assert embedded_traces(text)["addresses"] == ["<b>evil</b>"]
+    assert '"addresses":["\\u003cb>evil\\u003c/b>"]' in text
 
 
 def test_to_html_without_traces_explains_the_empty_table():
@@ -397,6 +627,20 @@ def test_to_html_without_plotly(mocker):
     assert isinstance(excinfo.value.__cause__, ImportError)
 
 
+def test_to_html_with_plotly_older_than_typed_arrays(mocker):
+    mocker.patch("plotly.__version__", "5.24.1")
+    results = [
+        make_result(1.0, speed=(80.0, 20.0, 10.0)),
+        make_result(2.0, failed=["speed"]),
+    ]
+
+    download = trace_named(figure(results), "Download")
+    assert list(download.x) == [
+        epoch_milliseconds(result.get_date()) for result in results
+    ]
+    assert list(download.y) == [80.0, None]
+
+
 def test_packet_loss_axis_max():
     assert _packet_loss_axis_max([]) == 6
     assert _packet_loss_axis_max([1.0, 2.0]) == 6
@@ -487,11 +731,12 @@ def test_to_html_escapes_the_speedtest_context():
 def test_format_summary_stats_reports_run_metadata():
     results = [
         make_result(1.0, packet_loss=0.0, speed=(80.0, 20.0, 10.0)),
-        make_result(2.0, packet_loss=4.0),
+        make_result(2.0, packet_loss=4.0, failed=["speed"]),
+        make_result(3.0, packet_loss=0.0),
     ]
 
     summary = _format_summary_stats(results)
-    assert summary["runs"] == 2
+    assert summary["runs"] == 3
     assert summary["incomplete"] == 1
     assert summary["ping_target"] == "8.8.8.8"
     assert summary["first_run"] < summary["last_run"]
@@ -515,27 +760,37 @@ def test_trace_rows_pads_shorter_traces():
     ]
 
     rows = _trace_rows(results)
-    assert [hop_number for hop_number, _ in rows] == [1, 2]
-    assert [ping.ip for ping in rows[0][1]] == ["10.0.0.1", "10.0.0.1"]
-    assert rows[1][1][1] is None
+    assert rows.times == [_format_run_time(result) for result in results]
+    assert rows.addresses == ["10.0.0.1", "10.0.0.2"]
+    assert rows.hops == [[0, 0], [1, TRACE_MISSING_HOP]]
+    assert rows.losses == [[0.0, 2.0], [1.0, None]]
+
+
+def test_trace_rows_leaves_hops_that_were_not_pinged_blank():
+    rows = _trace_rows(
+        [make_result(1.0, hops=[("10.0.0.1", 0.0), None, ("10.0.0.1", 3.456)])]
+    )
+
+    assert rows.addresses == ["10.0.0.1"]
+    assert rows.hops == [[0], [TRACE_MISSING_HOP], [0]]
+    assert rows.losses == [[0.0], [None], [3.46]]
+    assert rows.bad == [[0], [0], [1]]
 
 
 def test_build_trace_tables_html_marks_hops_over_the_threshold():
     results = [
-        make_result(
-            1.0,
-            hops=[
-                ("10.0.0.1", PLOT_PACKET_LOSS_PCT),
-                ("10.0.0.2", PLOT_PACKET_LOSS_PCT + 1),
-                None,
-            ],
-        )
+        make_result(1.0, hops=[("10.0.0.1", PLOT_PACKET_LOSS_PCT)]),
+        # Over the threshold, though it rounds down to it for display.
+        make_result(2.0, hops=[("10.0.0.1", PLOT_PACKET_LOSS_PCT + 0.004)]),
     ]
 
-    table = _build_trace_tables_html(results)
-    assert table.count('class="loss"') == 1
-    assert table.count('class="loss loss--bad"') == 1
-    assert table.count('class="cell--missing"') == 1
+    traces = embedded_traces(_build_trace_tables_html(results))
+    assert traces["losses"] == [[PLOT_PACKET_LOSS_PCT, PLOT_PACKET_LOSS_PCT]]
+    assert traces["bad"] == [[0, 1]]
+
+    lenient = RenderThresholds(packet_loss_pct=PLOT_PACKET_LOSS_PCT + 0.01)
+    traces = embedded_traces(_build_trace_tables_html(results, lenient))
+    assert traces["bad"] == [[0, 0]]
 
 
 def test_to_human():
@@ -551,3 +806,64 @@ def test_to_human():
     assert "Ping RTT:" in text
     assert "Mean: 15.00ms" in text
     assert "Download: Not enough data." in text
+
+
+def with_extra_pings(result, *pings):
+    result.extra_ping_results = [
+        PingResult(ip=ip, packet_loss=loss, rtt_avg_ms=rtt) for ip, loss, rtt in pings
+    ]
+    return result
+
+
+def test_to_html_plots_a_target_whose_every_ping_failed():
+    result = make_result(1.0, packet_loss=0.0, failed=["ping"])
+    result.failed_extra_pings = ["192.168.1.1"]
+
+    fig = figure([result])
+    assert trace_named(fig, "Packet Loss 192.168.1.1")
+    assert '<span class="chip">1 incomplete run(s)</span>' in render([result])
+
+
+def test_to_human_reports_a_target_whose_every_ping_failed():
+    result = make_result(1.0, packet_loss=10.0)
+    result.failed_extra_pings = ["192.168.1.1"]
+
+    output = io.StringIO()
+    to_human([result], output)
+    assert "Packet Loss to 192.168.1.1: Not enough data." in output.getvalue()
+
+
+def test_to_human_summarizes_each_ping_target():
+    results = [
+        with_extra_pings(make_result(1.0, packet_loss=10.0), ("1.1.1.1", 2.0, 5.0)),
+        with_extra_pings(make_result(2.0, packet_loss=20.0), ("1.1.1.1", 4.0, 7.0)),
+    ]
+
+    output = io.StringIO()
+    to_human(results, output)
+    text = output.getvalue()
+    assert "Packet Loss to 1.1.1.1:" in text
+    assert "Mean: 3.00%" in text
+    assert "Mean: 6.00ms" in text
+
+
+def test_to_human_consumes_results_lazily():
+    def results():
+        yield make_result(1.0, packet_loss=10.0, speed=(80.0, 20.0, 10.0))
+        yield make_result(2.0, packet_loss=20.0, speed=(60.0, 10.0, 30.0))
+
+    output = io.StringIO()
+    to_human(results(), output)
+    text = output.getvalue()
+    assert "Mean: 15.00%" in text
+    assert "Mean: 70.00Mbps" in text
+
+
+def test_to_human_does_not_alter_the_results():
+    result = make_result(
+        1.0, speed=(80.0, 20.0, 10.0), raw_speed=SPEEDTEST_PAYLOAD, packet_loss=1.0
+    )
+
+    to_human([result], io.StringIO())
+
+    assert result.speed_result.raw_result == SPEEDTEST_PAYLOAD
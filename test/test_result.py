@@ -1,12 +1,15 @@
 import io
 import logging
-from time import sleep
+import tracemalloc
+from time import perf_counter, sleep
 
 import pytest
 import yaml
 
+from internet_troubleshooter import result as result_module
 from internet_troubleshooter.ping_test import PingResult
 from internet_troubleshooter.result import TestResult as InternetTestResult
+from internet_troubleshooter.result import TimeWindow, document_spans, split_documents
 from internet_troubleshooter.speed_test import SpeedResult
 from internet_troubleshooter.trace_test import TraceResult
 
@@ -97,6 +100,48 @@ def test_human_readable_reports_the_ping_round_trip_time():
     assert "Ping RTT:    20.31ms" in text
 
 
+def test_human_readable_reports_the_figures_of_every_packet():
+    result = InternetTestResult(
+        ping_result=PingResult(
+            ip="8.8.8.8",
+            packet_loss=1.5,
+            rtt_avg_ms=20.312,
+            rtt_p95_ms=31.0,
+            jitter_ms=2.5,
+            loss_bursts=3,
+            longest_loss_burst=4,
+        ),
+        trace_result=None,
+        speed_result=None,
+    )
+
+    output = io.StringIO()
+    result.human_readable(output)
+    text = output.getvalue()
+    assert "Ping p95:    31.00ms" in text
+    assert "Ping Jitter: 2.50ms" in text
+    assert "Loss Bursts: 3, the longest 4 packet(s)" in text
+    assert "Loss 95% CI" not in text
+
+
+def test_human_readable_reports_how_sure_an_adaptive_ping_is():
+    result = InternetTestResult(
+        ping_result=PingResult(
+            ip="8.8.8.8",
+            packet_loss=0.0,
+            packets_sent=50,
+            packet_loss_ci_low=0.0,
+            packet_loss_ci_high=7.13,
+        ),
+        trace_result=None,
+        speed_result=None,
+    )
+
+    output = io.StringIO()
+    result.human_readable(output)
+    assert "Loss 95% CI: 0.00% to 7.13% over 50 packet(s)" in output.getvalue()
+
+
 def test_human_readable_omits_an_unmeasured_round_trip_time():
     result = InternetTestResult(
         ping_result=PingResult(ip="8.8.8.8", packet_loss=100.0),
@@ -180,6 +225,48 @@ def test_from_dict_round_trip():
     assert InternetTestResult.from_dict(result.to_dict()) == result
 
 
+def test_extra_ping_results_round_trip_through_yaml():
+    result = make_full_result()
+    result.extra_ping_results = [
+        PingResult(ip="1.1.1.1", packet_loss=0.0, rtt_avg_ms=9.5),
+        PingResult(ip="192.168.1.1", packet_loss=10.0),
+    ]
+
+    assert InternetTestResult.load_yaml(result.to_yaml()) == [result]
+
+
+def test_to_dict_leaves_out_extra_ping_results_when_there_are_none():
+    assert "extra_ping_results" not in make_full_result().to_dict()
+
+
+def test_failed_tests_round_trip_through_yaml():
+    result = make_result(1.0)
+    result.failed_tests = ["ping", "speed"]
+    result.failed_extra_pings = ["1.1.1.1"]
+
+    (loaded,) = InternetTestResult.load_yaml(result.to_yaml())
+    assert loaded == result
+    assert loaded.incomplete
+    assert "failed_tests" not in make_full_result().to_dict()
+    assert not make_full_result().incomplete
+
+
+def test_human_readable_reports_every_ping_target():
+    result = make_full_result()
+    result.extra_ping_results = [
+        PingResult(ip="1.1.1.1", packet_loss=2.5, rtt_avg_ms=9.5),
+    ]
+    result.failed_extra_pings = ["192.168.1.1"]
+
+    output = io.StringIO()
+    result.human_readable(output)
+    text = output.getvalue()
+    assert "1.1.1.1:" in text
+    assert "2.50%, 9.50ms" in text
+    assert "192.168.1.1:" in text
+    assert "Ping failed" in text
+
+
 def test_from_dict_without_timestamp_uses_now():
     data = make_full_result().to_dict()
     del data["time_stamp"]
@@ -271,3 +358,259 @@ def test_load_yaml_rejects_python_object_tags():
 def test_load_yaml_rejects_malformed_yaml():
     with pytest.raises(yaml.YAMLError):
         InternetTestResult.load_yaml("ping_result: [unclosed")
+
+
+def test_split_documents_yields_each_logged_document():
+    lines = [
+        "---\n",
+        "time_stamp: 1.0\n",
+        "\n",
+        "...\n",
+        "\n",
+        "---\n",
+        "time_stamp: 2.0\n",
+        "...\n",
+    ]
+
+    assert list(split_documents(lines)) == [
+        "---\ntime_stamp: 1.0\n\n",
+        "---\ntime_stamp: 2.0\n",
+    ]
+
+
+def test_split_documents_without_end_markers():
+    lines = ["--- \n", "a: 1\n", "---\n", "a: 2\n"]
+
+    assert list(split_documents(lines)) == ["--- \na: 1\n", "---\na: 2\n"]
+
+
+def test_split_documents_only_splits_on_whole_markers():
+    lines = ["---\n", "ip: ---x\n", "----\n", "...more\n"]
+
+    assert list(split_documents(lines)) == ["".join(lines)]
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "---\ntime_stamp: 1.0\n\n...\n\n---\ntime_stamp: 2.0\n...\n",
+        "--- \na: 1\n---\na: 2\n",
+        "---\nip: ---x\n----\n...more\n",
+        "a: 1\n...\n\n\n---\r\na: 2\r\n...\r\n",
+        "---\n...\n---\n...",
+        "\n\n",
+        "",
+    ],
+)
+def test_document_spans_find_the_documents_split_documents_does(text):
+    data = text.encode("utf-8")
+
+    spans = document_spans(data)
+
+    assert [data[start:end].decode("utf-8") for start, end in spans] == [
+        document
+        for document in split_documents(text.splitlines(keepends=True))
+        if document.strip()
+    ]
+
+
+def test_document_spans_between_offsets():
+    data = b"---\na: 1\n...\n---\na: 2\n...\n---\na: 3\n...\n"
+    start = data.index(b"---\na: 2")
+    end = data.index(b"---\na: 3")
+
+    assert list(document_spans(data, start, end)) == [(start, end - 4)]
+
+
+def test_iter_yaml_parses_one_document_at_a_time():
+    results = [make_full_result(1700000000.0), make_full_result(1700000060.0)]
+    text = "".join("---\n{}\n...\n\n".format(r.to_yaml()) for r in results)
+    consumed = []
+
+    def lines():
+        for line in text.splitlines(keepends=True):
+            consumed.append(line)
+            yield line
+
+    loaded = InternetTestResult.iter_yaml(lines())
+
+    assert next(loaded) == results[0]
+    # Nothing past the end of the first document has been read yet.
+    assert consumed[-1] == "...\n"
+    assert len(consumed) < len(text.splitlines())
+    assert list(loaded) == results[1:]
+
+
+def test_iter_results_reads_the_file_lazily(tmp_path):
+    yaml_file = tmp_path / "results.yaml"
+    results = [make_full_result(1700000000.0), make_full_result(1700000060.0)]
+    write_results(yaml_file, results)
+
+    loaded = InternetTestResult.iter_results(str(yaml_file))
+
+    assert not isinstance(loaded, list)
+    assert list(loaded) == results
+
+
+def test_iter_results_maps_the_file(tmp_path, mocker):
+    yaml_file = tmp_path / "results.yaml"
+    results = [make_full_result(1700000000.0), make_full_result(1700000060.0)]
+    write_results(yaml_file, results)
+    mapped = mocker.spy(InternetTestResult, "iter_mapped")
+
+    assert list(InternetTestResult.iter_results(str(yaml_file))) == results
+    assert mapped.called
+
+
+def test_iter_results_reads_a_file_that_cannot_be_mapped(tmp_path, mocker):
+    yaml_file = tmp_path / "results.yaml"
+    results = [make_full_result(1700000000.0), make_full_result(1700000060.0)]
+    write_results(yaml_file, results)
+    mocker.patch.object(result_module, "map_file", return_value=None)
+
+    assert list(InternetTestResult.iter_results(str(yaml_file))) == results
+
+
+def test_iter_results_of_an_empty_file(tmp_path):
+    yaml_file = tmp_path / "results.yaml"
+    yaml_file.write_bytes(b"")
+
+    assert list(InternetTestResult.iter_results(str(yaml_file))) == []
+
+
+def test_iter_results_only_decodes_documents_inside_the_window(tmp_path):
+    yaml_file = tmp_path / "results.yaml"
+    inside = make_full_result(1700000060.0)
+    # Not UTF-8, so decoding it would fail.
+    yaml_file.write_bytes(
+        b"---\ntime_stamp: 1600000000.0\nip: \xff\xfe\n...\n"
+        + "---\n{}\n...\n".format(inside.to_yaml()).encode("utf-8")
+    )
+
+    loaded = InternetTestResult.iter_results(
+        str(yaml_file), TimeWindow(since=1700000000.0)
+    )
+
+    assert list(loaded) == [inside]
+
+
+def test_iter_results_memory_follows_the_window_not_the_file(tmp_path):
+    yaml_file = tmp_path / "results.yaml"
+    write_results(
+        yaml_file,
+        [make_full_result(1700000000.0 + minute * 60) for minute in range(2000)],
+    )
+    window = TimeWindow(since=1700000000.0 + 1000 * 60, until=1700000000.0 + 1000 * 60)
+
+    tracemalloc.start()
+    try:
+        loaded = list(InternetTestResult.iter_results(str(yaml_file), window))
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert len(loaded) == 1
+    assert peak < yaml_file.stat().st_size / 10
+
+
+def test_iter_results_reports_a_missing_file_straight_away(tmp_path):
+    with pytest.raises(OSError):
+        InternetTestResult.iter_results(str(tmp_path / "missing.yaml"))
+
+
+def test_iter_yaml_only_returns_results_inside_the_window():
+    results = [make_full_result(float(time_stamp)) for time_stamp in (1, 2, 3, 4)]
+    text = "".join("---\n{}\n...\n".format(r.to_yaml()) for r in results)
+
+    loaded = InternetTestResult.iter_yaml(
+        text.splitlines(keepends=True), TimeWindow(since=2.0, until=3.0)
+    )
+
+    assert list(loaded) == results[1:3]
+
+
+def test_iter_yaml_skips_documents_outside_the_window_unparsed(mocker):
+    inside = make_full_result(1700000060.0)
+    text = "---\ntime_stamp: 1600000000.0\nping_result: [unclosed\n...\n"
+    text += "---\n{}\n...\n".format(inside.to_yaml())
+    from_dict = mocker.spy(InternetTestResult, "from_dict")
+
+    loaded = InternetTestResult.iter_yaml(
+        text.splitlines(keepends=True), TimeWindow(since=1700000000.0)
+    )
+
+    assert list(loaded) == [inside]
+    assert from_dict.call_count == 1
+
+
+def test_iter_results_with_an_open_ended_window(tmp_path):
+    yaml_file = tmp_path / "results.yaml"
+    results = [make_full_result(float(time_stamp)) for time_stamp in (1, 2, 3)]
+    write_results(yaml_file, results)
+
+    loaded = InternetTestResult.iter_results(str(yaml_file), TimeWindow(until=2.0))
+
+    assert list(loaded) == results[:2]
+
+
+def test_yaml_uses_libyaml_when_it_is_available():
+    if yaml.__with_libyaml__:
+        assert result_module.yaml_loader() is yaml.CSafeLoader
+        assert result_module.yaml_dumper() is yaml.CSafeDumper
+    else:
+        assert result_module.yaml_loader() is yaml.SafeLoader
+        assert result_module.yaml_dumper() is yaml.SafeDumper
+
+
+def test_yaml_round_trip_without_libyaml(mocker):
+    mocker.patch.object(result_module, "yaml_loader", return_value=yaml.SafeLoader)
+    mocker.patch.object(result_module, "yaml_dumper", return_value=yaml.SafeDumper)
+    result = make_full_result()
+
+    assert InternetTestResult.load_yaml("---\n{}\n...\n".format(result.to_yaml())) == [
+        result
+    ]
+
+
+def test_load_yaml_without_libyaml_rejects_python_object_tags(mocker):
+    mocker.patch.object(result_module, "yaml_loader", return_value=yaml.SafeLoader)
+
+    with pytest.raises(yaml.YAMLError):
+        InternetTestResult.load_yaml('!!python/object/apply:os.system ["echo unsafe"]')
+
+
+BENCHMARK_DOCUMENTS = 50_000
+
+
+def _benchmark_log():
+    """A results log of BENCHMARK_DOCUMENTS runs, each with a speedtest payload."""
+    result = make_full_result()
+    result.speed_result.raw_result = SPEEDTEST_PAYLOAD
+    return "---\n{}\n...\n\n".format(result.to_yaml()) * BENCHMARK_DOCUMENTS
+
+
+def _documents_per_second(mocker, loader, log):
+    mocker.patch.object(result_module, "yaml_loader", return_value=loader)
+    started = perf_counter()
+    loaded = InternetTestResult.load_yaml(log)
+    elapsed = perf_counter() - started
+    assert len(loaded) == BENCHMARK_DOCUMENTS
+    return BENCHMARK_DOCUMENTS / elapsed
+
+
+@pytest.mark.benchmark
+def test_benchmark_load_yaml_throughput(mocker):
+    """Parse throughput of the pure Python and libyaml loaders.
+
+    Run with `pytest -m benchmark -s` to see the figures.
+    """
+    log = _benchmark_log()
+
+    pure = _documents_per_second(mocker, yaml.SafeLoader, log)
+    print("\npure Python SafeLoader: {:,.0f} documents/sec".format(pure))
+    if not yaml.__with_libyaml__:
+        pytest.skip("PyYAML was built without libyaml")
+
+    accelerated = _documents_per_second(mocker, yaml.CSafeLoader, log)
+    print("libyaml CSafeLoader: {:,.0f} documents/sec".format(accelerated))
+    assert accelerated > pure
@@ -0,0 +1,134 @@
+import logging
+import random
+import threading
+
+from internet_troubleshooter.scheduler import Schedule, _run_schedule, run_schedules
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeStop:
+    """Advances the fake clock through each wait, until the time to stop."""
+
+    def __init__(self, clock, until):
+        self.clock = clock
+        self.until = until
+
+    def wait(self, timeout=None):
+        self.clock.now += timeout
+        return self.clock.now >= self.until
+
+
+def run_fake_schedule(interval, until, task_seconds=0.0, jitter=0.0, fail=False):
+    clock = FakeClock()
+    start = clock.now
+    started = []
+
+    def task():
+        started.append(clock.now - start)
+        clock.now += task_seconds
+        if fail:
+            raise RuntimeError("boom")
+
+    schedule = Schedule("ping test", interval, task, jitter=jitter)
+    _run_schedule(
+        schedule, start, FakeStop(clock, start + until), clock, random.Random(1)
+    )
+    return started
+
+
+def test_due_is_counted_from_the_start():
+    schedule = Schedule("ping test", 300.0, lambda: None)
+
+    assert schedule.due(1000.0, 0, random.Random()) == 1000.0
+    assert schedule.due(1000.0, 3, random.Random()) == 1900.0
+
+
+def test_due_is_put_off_by_up_to_the_jitter():
+    schedule = Schedule("ping test", 100.0, lambda: None, jitter=0.2)
+    rng = random.Random(7)
+
+    offsets = [schedule.due(0.0, 5, rng) - 500.0 for _ in range(200)]
+
+    assert all(0.0 <= offset <= 20.0 for offset in offsets)
+    assert len(set(offsets)) > 1
+
+
+def test_runs_do_not_drift_by_how_long_they_take():
+    assert run_fake_schedule(60.0, 250.0, task_seconds=7.0) == [
+        0.0,
+        60.0,
+        120.0,
+        180.0,
+        240.0,
+    ]
+
+
+def test_jittered_runs_stay_in_their_slots():
+    started = run_fake_schedule(60.0, 600.0, jitter=0.5)
+
+    assert len(started) == 10
+    assert all(
+        slot * 60.0 <= run <= slot * 60.0 + 30.0 for slot, run in enumerate(started)
+    )
+
+
+def test_a_run_longer_than_the_interval_skips_the_missed_runs(capsys):
+    assert run_fake_schedule(60.0, 300.0, task_seconds=130.0) == [0.0, 180.0]
+    assert "took longer than its 60s interval, skipping 2 run(s)" in (
+        capsys.readouterr().err
+    )
+
+
+def test_a_failing_run_does_not_stop_the_schedule(caplog):
+    with caplog.at_level(logging.ERROR):
+        assert run_fake_schedule(60.0, 150.0, fail=True) == [0.0, 60.0, 120.0]
+    assert "Scheduled ping test failed" in caplog.text
+
+
+def test_run_schedules_runs_each_schedule_until_stopped():
+    stop = threading.Event()
+    runs = {"ping test": 0, "speed test": 0}
+    lock = threading.Lock()
+
+    def task_for(name):
+        def task():
+            with lock:
+                runs[name] += 1
+                if runs["ping test"] >= 3 and runs["speed test"] >= 1:
+                    stop.set()
+
+        return task
+
+    run_schedules(
+        [
+            Schedule("ping test", 0.01, task_for("ping test")),
+            Schedule("speed test", 0.05, task_for("speed test")),
+        ],
+        stop,
+    )
+
+    assert stop.is_set()
+    assert runs["ping test"] >= 3
+    assert runs["speed test"] >= 1
+
+
+def test_run_schedules_finishes_the_runs_in_progress():
+    stop = threading.Event()
+    finished = threading.Event()
+
+    def task():
+        stop.set()
+        # The run in progress when stop is set still finishes.
+        finished.wait(0.05)
+        finished.set()
+
+    run_schedules([Schedule("ping test", 60.0, task)], stop)
+
+    assert finished.is_set()
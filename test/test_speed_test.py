@@ -1,4 +1,5 @@
 import json
+from array import array
 from subprocess import CompletedProcess
 
 import pytest
@@ -216,12 +217,9 @@ def test_run_test_returns_none_on_bad_json(mocker, capsys):
 
 
 def test_summarize_units():
-    results = [
-        SpeedResult(upload=1.0, download=10.0, latency=20.0),
-        SpeedResult(upload=3.0, download=30.0, latency=40.0),
-    ]
-
-    text = SpeedResult.summarize(results)
+    text = SpeedResult.summarize(
+        array("d", [10.0, 30.0]), array("d", [1.0, 3.0]), array("d", [20.0, 40.0])
+    )
     assert "Download:\n  Mean: 20.00Mbps" in text
     assert "Upload:\n  Mean: 2.00Mbps" in text
     assert "Latency:\n  Mean: 30.00ms" in text
@@ -243,6 +241,22 @@ def test_check(mocker, capsys):
     assert captured.err == ""
 
 
+def test_check_remembers_the_installed_speedtest(mocker, tmp_path, capsys):
+    binary = tmp_path / "speedtest"
+    binary.write_text("#!/bin/sh\n", encoding="utf-8")
+    mocker.patch("shutil.which", return_value=str(binary))
+    run = mocker.patch(
+        "subprocess.run",
+        return_value=CompletedProcess(None, returncode=1, stdout="", stderr=""),
+    )
+
+    assert not SpeedResult.check()
+    assert not SpeedResult.check()
+
+    assert run.call_count == 1
+    assert capsys.readouterr().err.count("speedtest cli not installed") == 2
+
+
 def test_check_missing_binary(mocker, capsys):
     mocker.patch("subprocess.run", side_effect=FileNotFoundError)
 
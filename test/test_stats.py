@@ -0,0 +1,125 @@
+import random
+import statistics
+from array import array
+from time import perf_counter
+
+import pytest
+
+from internet_troubleshooter import stats
+from internet_troubleshooter.stats import RunningStats, describe, percentile
+
+
+def test_running_stats_match_the_statistics_module():
+    values = [random.uniform(10.0, 30.0) for _ in range(500)]
+
+    running = RunningStats()
+    running.extend(values[:200])
+    running.extend(values[200:])
+
+    assert running.count == 500
+    assert running.mean == pytest.approx(statistics.mean(values))
+    assert running.variance == pytest.approx(statistics.variance(values))
+    assert running.minimum == min(values)
+    assert running.maximum == max(values)
+
+
+def test_running_stats_keep_a_small_variance_next_to_a_large_mean():
+    running = RunningStats()
+    running.extend([1e9 + 4.0, 1e9 + 7.0, 1e9 + 13.0, 1e9 + 16.0])
+
+    assert running.variance == pytest.approx(30.0)
+
+
+def test_running_stats_of_a_single_value_have_no_variance():
+    running = RunningStats()
+    running.extend([5.0])
+
+    assert running.mean == 5.0
+    assert running.variance is None
+
+
+@pytest.mark.parametrize(
+    "percent, expected", [(0, 1.0), (50, 2.5), (95, 3.85), (100, 4.0)]
+)
+def test_percentile_interpolates(percent, expected):
+    assert percentile([1.0, 2.0, 3.0, 4.0], percent) == pytest.approx(expected)
+
+
+def test_describe():
+    summary = describe(array("d", [4.0, 1.0, 3.0, 2.0]))
+
+    assert summary.count == 4
+    assert summary.mean == 2.5
+    assert summary.variance == pytest.approx(5 / 3)
+    assert (summary.minimum, summary.maximum) == (1.0, 4.0)
+    assert summary.p50 == 2.5
+    assert summary.p99 == pytest.approx(3.97)
+
+
+def test_describe_of_nothing():
+    assert describe(array("d")) is None
+    assert describe([]) is None
+
+
+def test_describe_without_numpy(mocker):
+    mocker.patch.object(stats, "_numpy", return_value=None)
+    values = array("d", (float(value) for value in range(2000)))
+
+    summary = describe(values)
+
+    assert summary.mean == pytest.approx(999.5)
+    assert summary.p95 == pytest.approx(1899.05)
+
+
+def test_describe_with_numpy_agrees_with_python(mocker):
+    pytest.importorskip("numpy")
+    values = array("d", (random.gauss(20.0, 3.0) for _ in range(5000)))
+
+    accelerated = describe(values)
+    mocker.patch.object(stats, "_numpy", return_value=None)
+    pure = describe(values)
+
+    assert accelerated.count == pure.count
+    for name in ("mean", "variance", "minimum", "maximum", "p50", "p95", "p99"):
+        assert getattr(accelerated, name) == pytest.approx(getattr(pure, name))
+
+
+BENCHMARK_SAMPLES = 1_000_000
+
+
+def _seconds(summarize, values):
+    started = perf_counter()
+    summarize(values)
+    return perf_counter() - started
+
+
+def _statistics_module(values):
+    """How summaries were worked out before, a pass per figure."""
+    return (
+        statistics.mean(values),
+        statistics.variance(values),
+        min(values),
+        max(values),
+    )
+
+
+@pytest.mark.benchmark
+def test_benchmark_describe(mocker):
+    """Time to summarize BENCHMARK_SAMPLES values, the old way and the new.
+
+    Run with `pytest -m benchmark -s` to see the figures.
+    """
+    values = array("d", (random.uniform(10.0, 30.0) for _ in range(BENCHMARK_SAMPLES)))
+
+    old = _seconds(_statistics_module, list(values))
+    print("\nstatistics module: {:.2f}s".format(old))
+    numpy = stats._numpy()
+    if numpy is not None:
+        accelerated = _seconds(describe, values)
+        print("describe with NumPy: {:.2f}s".format(accelerated))
+        assert accelerated < old
+
+    mocker.patch.object(stats, "_numpy", return_value=None)
+    pure = _seconds(describe, values)
+    print("describe in Python: {:.2f}s".format(pure))
+    assert pure < old
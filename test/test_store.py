@@ -0,0 +1,206 @@
+import sqlite3
+
+import pytest
+
+from internet_troubleshooter import store
+from internet_troubleshooter.ping_test import PingResult
+from internet_troubleshooter.result import TestResult as InternetTestResult
+from internet_troubleshooter.result import TimeWindow
+from internet_troubleshooter.speed_test import SpeedResult
+from internet_troubleshooter.trace_test import TraceResult
+
+SPEEDTEST_PAYLOAD = {
+    "isp": "MyISP",
+    "interface": {"externalIp": "555.555.555.555"},
+    "server": {"name": "Conterra", "location": "Stemmons, TX"},
+}
+
+
+def make_full_result(time_stamp=1700000000.0):
+    return InternetTestResult(
+        ping_result=PingResult(
+            ip="8.8.8.8",
+            packet_loss=1.5,
+            rtt_min_ms=16.544,
+            rtt_avg_ms=20.312,
+            rtt_max_ms=35.193,
+            rtt_mdev_ms=2.061,
+        ),
+        trace_result=TraceResult(
+            ping_results=[PingResult(ip="10.0.0.1", packet_loss=0.0), None]
+        ),
+        speed_result=SpeedResult(
+            upload=17.1212,
+            download=58.542856,
+            latency=19.266,
+            raw_result=SPEEDTEST_PAYLOAD,
+        ),
+        time_stamp=time_stamp,
+    )
+
+
+def test_results_round_trip_through_the_store(tmp_path):
+    path = tmp_path / "results.sqlite"
+    results = [make_full_result(1700000000.0), make_full_result(1700000060.0)]
+
+    assert store.append_results(path, results) == 2
+
+    assert store.load_results(path) == results
+
+
+def test_extra_ping_results_round_trip_through_the_store(tmp_path):
+    path = tmp_path / "results.sqlite"
+    result = make_full_result()
+    result.extra_ping_results = [PingResult(ip="1.1.1.1", packet_loss=0.5)]
+
+    store.append_results(path, [result])
+
+    assert store.load_results(path) == [result]
+    assert store.load_results(path, details=False)[0].extra_ping_results == [
+        PingResult(ip="1.1.1.1", packet_loss=0.5)
+    ]
+
+
+def test_the_figures_of_every_packet_round_trip_through_the_store(tmp_path):
+    path = tmp_path / "results.sqlite"
+    result = make_full_result()
+    result.ping_result = PingResult(
+        ip="8.8.8.8",
+        packet_loss=1.5,
+        jitter_ms=2.5,
+        rtt_p50_ms=19.0,
+        rtt_p95_ms=31.0,
+        rtt_p99_ms=34.5,
+        loss_bursts=3,
+        longest_loss_burst=4,
+        packets_sent=50,
+        packet_loss_ci_low=0.4,
+        packet_loss_ci_high=7.5,
+    )
+
+    store.append_results(path, [result])
+
+    assert store.load_results(path, details=False)[0].ping_result == (
+        result.ping_result
+    )
+
+
+def make_first_version_store(path):
+    """A store as the first version wrote it, without any of ADDED_COLUMNS."""
+    with sqlite3.connect(path) as connection:
+        connection.execute(store.SCHEMA)
+    connection.close()
+
+
+def test_a_store_from_an_older_version_is_still_read(tmp_path):
+    path = tmp_path / "results.sqlite"
+    make_first_version_store(path)
+
+    assert store.load_results(path) == []
+
+
+def test_a_store_from_an_older_version_is_migrated(tmp_path):
+    path = tmp_path / "results.sqlite"
+    make_first_version_store(path)
+    result = make_full_result()
+    result.extra_ping_results = [PingResult(ip="1.1.1.1", packet_loss=0.5)]
+
+    store.append_results(path, [result])
+
+    assert store.load_results(path) == [result]
+
+
+def test_results_without_tests_round_trip_through_the_store(tmp_path):
+    path = tmp_path / "results.sqlite"
+    result = InternetTestResult(
+        ping_result=PingResult(ip="8.8.8.8", packet_loss=100.0),
+        trace_result=None,
+        speed_result=None,
+        time_stamp=1.0,
+        failed_tests=["ping", "speed"],
+        failed_extra_pings=["1.1.1.1"],
+    )
+
+    store.append_results(path, [result])
+
+    assert store.load_results(path) == [result]
+
+
+def test_load_results_is_oldest_first(tmp_path):
+    path = tmp_path / "results.sqlite"
+    store.append_results(path, [make_full_result(3.0), make_full_result(1.0)])
+    store.append_results(path, [make_full_result(2.0)])
+
+    assert [result.time_stamp for result in store.load_results(path)] == [
+        1.0,
+        2.0,
+        3.0,
+    ]
+
+
+@pytest.mark.parametrize(
+    "window, expected",
+    [
+        (TimeWindow(since=2.0), [2.0, 3.0]),
+        (TimeWindow(until=2.0), [1.0, 2.0]),
+        (TimeWindow(since=2.0, until=2.0), [2.0]),
+        (TimeWindow(), [1.0, 2.0, 3.0]),
+    ],
+)
+def test_load_results_inside_a_window(tmp_path, window, expected):
+    path = tmp_path / "results.sqlite"
+    store.append_results(path, [make_full_result(float(t)) for t in (1, 2, 3)])
+
+    loaded = store.load_results(path, window=window)
+
+    assert [result.time_stamp for result in loaded] == expected
+
+
+def test_load_results_without_details_skips_traces_and_payloads(tmp_path):
+    path = tmp_path / "results.sqlite"
+    store.append_results(path, [make_full_result()])
+
+    (loaded,) = store.load_results(path, details=False)
+
+    assert loaded.trace_result is None
+    assert loaded.speed_result.raw_result is None
+    assert loaded.speed_result.download == 58.542856
+    assert loaded.ping_result == make_full_result().ping_result
+
+
+def test_append_results_does_not_store_a_run_twice(tmp_path):
+    path = tmp_path / "results.sqlite"
+    store.append_results(path, [make_full_result(1.0)])
+
+    added = store.append_results(path, [make_full_result(1.0), make_full_result(2.0)])
+
+    assert added == 1
+    assert len(store.load_results(path)) == 2
+
+
+def test_load_results_does_not_create_a_missing_store(tmp_path):
+    path = tmp_path / "missing.sqlite"
+
+    with pytest.raises(store.StoreError) as excinfo:
+        store.load_results(path)
+
+    assert "Unable to open results store" in str(excinfo.value)
+    assert isinstance(excinfo.value.__cause__, sqlite3.Error)
+    assert not path.exists()
+
+
+def test_load_results_reports_a_file_that_is_not_a_store(tmp_path):
+    path = tmp_path / "results.yaml"
+    path.write_text("---\nping_result: null\n...\n", encoding="utf-8")
+
+    with pytest.raises(store.StoreError) as excinfo:
+        store.load_results(path)
+
+    assert "Unable to read results from store" in str(excinfo.value)
+
+
+def test_append_results_reports_an_unwritable_store(tmp_path):
+    with pytest.raises(store.StoreError) as excinfo:
+        store.append_results(tmp_path / "missing" / "results.sqlite", [])
+
+    assert "Unable to open results store" in str(excinfo.value)
@@ -1,8 +1,12 @@
 import logging
+import threading
+import time
 from subprocess import CompletedProcess, TimeoutExpired
 
 import pytest
 
+from internet_troubleshooter import icmp
+from internet_troubleshooter.path_cache import PathCache
 from internet_troubleshooter.ping_test import PingResult
 from internet_troubleshooter.trace_test import (
     DEFAULT_TRACE_HOP_PING_COUNT_NON_ROOT,
@@ -49,9 +53,41 @@ def unprobed_traceroute(mocker):
     mocker.patch("internet_troubleshooter.trace_test._numeric_supported", None)
 
 
-def _help_then(*results):
-    """subprocess.run results for the -n probe followed by the traces after it."""
-    return [CompletedProcess(None, returncode=0, stdout=CLASSIC_HELP), *results]
+class FakeStream:
+    """What stream_command returns for a traceroute that ran like result did."""
+
+    def __init__(self, result):
+        self.returncode = result.returncode
+        self.stderr = result.stderr or ""
+        self._lines = iter((result.stdout or "").splitlines(keepends=True))
+
+    def __iter__(self):
+        return self._lines
+
+
+def patch_traceroute(mocker, *results, help_output=CLASSIC_HELP):
+    """Answer the -n probe with help_output and the traces after it with results.
+
+    Returns a function listing every command run so far, the probe included.
+    A TimeoutExpired result stands for a trace that ran too long.
+    """
+    run = mocker.patch(
+        "subprocess.run",
+        return_value=CompletedProcess(None, returncode=0, stdout=help_output),
+    )
+
+    def run_trace(command, timeout):
+        result = results[stream.call_count - 1]
+        if isinstance(result, TimeoutExpired):
+            fake = FakeStream(CompletedProcess(command, returncode=0, stdout=""))
+            fake.returncode = None
+            return fake
+        return FakeStream(result)
+
+    stream = mocker.patch(
+        "internet_troubleshooter.trace_test.stream_command", side_effect=run_trace
+    )
+    return lambda: [call.args[0] for call in run.call_args_list + stream.call_args_list]
 
 
 @pytest.mark.parametrize(
@@ -105,19 +141,30 @@ def test_execute_test(mocker, capsys):
         "internet_troubleshooter.trace_test._traceroute_supports_numeric",
         return_value=True,
     )
-    run = mocker.patch(
-        "subprocess.run",
-        return_value=CompletedProcess(None, returncode=0, stdout=test_output),
+    stream = mocker.patch(
+        "internet_troubleshooter.trace_test.stream_command",
+        return_value=FakeStream(
+            CompletedProcess(None, returncode=0, stdout=test_output)
+        ),
     )
 
     x = TraceResult.execute_test("8.8.8.8")
     assert test_output == x
-    assert run.call_args.args[0] == ["traceroute", "-n", "8.8.8.8"]
+    assert stream.call_args.args[0] == ["traceroute", "-n", "8.8.8.8"]
     captured = capsys.readouterr()
     assert captured.out == ""
     assert captured.err == ""
 
 
+def test_execute_test_hands_on_each_line_as_it_is_printed(mocker):
+    trace_output = " 1  192.168.1.1  0.310 ms\n 2  8.8.8.8  9.310 ms\n"
+    patch_traceroute(mocker, CompletedProcess(None, returncode=0, stdout=trace_output))
+    lines = []
+
+    assert TraceResult.execute_test("8.8.8.8", lines.append) == trace_output
+    assert lines == [" 1  192.168.1.1  0.310 ms\n", " 2  8.8.8.8  9.310 ms\n"]
+
+
 @pytest.mark.parametrize(
     "help_output, expected_command",
     [
@@ -129,36 +176,29 @@ def test_execute_test_picks_command_from_help(
     mocker, capsys, help_output, expected_command
 ):
     test_output = """TEST STRING"""
-    run = mocker.patch(
-        "subprocess.run",
-        side_effect=[
-            CompletedProcess(None, returncode=0, stdout=help_output),
-            CompletedProcess(None, returncode=0, stdout=test_output),
-        ],
+    commands = patch_traceroute(
+        mocker,
+        CompletedProcess(None, returncode=0, stdout=test_output),
+        help_output=help_output,
     )
 
     assert TraceResult.execute_test("8.8.8.8") == test_output
-    assert [call.args[0] for call in run.call_args_list] == [
-        ["traceroute", "--help"],
-        expected_command,
-    ]
+    assert commands() == [["traceroute", "--help"], expected_command]
     captured = capsys.readouterr()
     assert captured.out == ""
     assert captured.err == ""
 
 
 def test_execute_test_probes_help_only_once(mocker):
-    run = mocker.patch(
-        "subprocess.run",
-        side_effect=_help_then(
-            CompletedProcess(None, returncode=0, stdout="FIRST"),
-            CompletedProcess(None, returncode=0, stdout="SECOND"),
-        ),
+    commands = patch_traceroute(
+        mocker,
+        CompletedProcess(None, returncode=0, stdout="FIRST"),
+        CompletedProcess(None, returncode=0, stdout="SECOND"),
     )
 
     assert TraceResult.execute_test("8.8.8.8") == "FIRST"
     assert TraceResult.execute_test("8.8.4.4") == "SECOND"
-    assert [call.args[0] for call in run.call_args_list] == [
+    assert commands() == [
         ["traceroute", "--help"],
         ["traceroute", "-n", "8.8.8.8"],
         ["traceroute", "-n", "8.8.4.4"],
@@ -166,10 +206,7 @@ def test_execute_test_probes_help_only_once(mocker):
 
 
 def test_execute_test_help_reports_numeric_support_at_debug_level(mocker, caplog):
-    mocker.patch(
-        "subprocess.run",
-        side_effect=_help_then(CompletedProcess(None, returncode=0, stdout="TRACE")),
-    )
+    patch_traceroute(mocker, CompletedProcess(None, returncode=0, stdout="TRACE"))
 
     with caplog.at_level(logging.DEBUG):
         TraceResult.execute_test("8.8.8.8")
@@ -180,20 +217,16 @@ def test_execute_test_help_reports_numeric_support_at_debug_level(mocker, caplog
 
 def test_execute_test_retries_without_numeric_option(mocker, capsys, caplog):
     test_output = """TEST STRING"""
-    run = mocker.patch(
-        "subprocess.run",
-        side_effect=_help_then(
-            CompletedProcess(
-                None, returncode=1, stdout="", stderr=INVALID_NUMERIC_ERROR
-            ),
-            CompletedProcess(None, returncode=0, stdout=test_output),
-        ),
+    commands = patch_traceroute(
+        mocker,
+        CompletedProcess(None, returncode=1, stdout="", stderr=INVALID_NUMERIC_ERROR),
+        CompletedProcess(None, returncode=0, stdout=test_output),
     )
 
     with caplog.at_level(logging.DEBUG):
         assert TraceResult.execute_test("8.8.8.8") == test_output
 
-    assert [call.args[0] for call in run.call_args_list] == [
+    assert commands() == [
         ["traceroute", "--help"],
         ["traceroute", "-n", "8.8.8.8"],
         ["traceroute", "8.8.8.8"],
@@ -205,20 +238,16 @@ def test_execute_test_retries_without_numeric_option(mocker, capsys, caplog):
 
 
 def test_execute_test_retry_updates_cached_numeric_support(mocker):
-    run = mocker.patch(
-        "subprocess.run",
-        side_effect=_help_then(
-            CompletedProcess(
-                None, returncode=1, stdout="", stderr=INVALID_NUMERIC_ERROR
-            ),
-            CompletedProcess(None, returncode=0, stdout="FIRST"),
-            CompletedProcess(None, returncode=0, stdout="SECOND"),
-        ),
+    commands = patch_traceroute(
+        mocker,
+        CompletedProcess(None, returncode=1, stdout="", stderr=INVALID_NUMERIC_ERROR),
+        CompletedProcess(None, returncode=0, stdout="FIRST"),
+        CompletedProcess(None, returncode=0, stdout="SECOND"),
     )
 
     assert TraceResult.execute_test("8.8.8.8") == "FIRST"
     assert TraceResult.execute_test("8.8.4.4") == "SECOND"
-    assert [call.args[0] for call in run.call_args_list] == [
+    assert commands() == [
         ["traceroute", "--help"],
         ["traceroute", "-n", "8.8.8.8"],
         ["traceroute", "8.8.8.8"],
@@ -226,42 +255,79 @@ def test_execute_test_retry_updates_cached_numeric_support(mocker):
     ]
 
 
+def install_traceroute(mocker, tmp_path):
+    binary = tmp_path / "traceroute"
+    binary.write_text("#!/bin/sh\n", encoding="utf-8")
+    mocker.patch("shutil.which", return_value=str(binary))
+
+
+def test_execute_test_remembers_numeric_support_across_runs(mocker, tmp_path):
+    install_traceroute(mocker, tmp_path)
+    commands = patch_traceroute(
+        mocker,
+        CompletedProcess(None, returncode=0, stdout="FIRST"),
+        CompletedProcess(None, returncode=0, stdout="SECOND"),
+    )
+
+    assert TraceResult.execute_test("8.8.8.8") == "FIRST"
+    # As a later run would start out.
+    mocker.patch("internet_troubleshooter.trace_test._numeric_supported", None)
+    assert TraceResult.execute_test("8.8.4.4") == "SECOND"
+
+    assert commands() == [
+        ["traceroute", "--help"],
+        ["traceroute", "-n", "8.8.8.8"],
+        ["traceroute", "-n", "8.8.4.4"],
+    ]
+
+
+def test_execute_test_remembers_a_rejected_numeric_option(mocker, tmp_path):
+    install_traceroute(mocker, tmp_path)
+    commands = patch_traceroute(
+        mocker,
+        CompletedProcess(None, returncode=1, stdout="", stderr=INVALID_NUMERIC_ERROR),
+        CompletedProcess(None, returncode=0, stdout="FIRST"),
+        CompletedProcess(None, returncode=0, stdout="SECOND"),
+    )
+
+    TraceResult.execute_test("8.8.8.8")
+    mocker.patch("internet_troubleshooter.trace_test._numeric_supported", None)
+    TraceResult.execute_test("8.8.4.4")
+
+    assert commands()[-1] == ["traceroute", "8.8.4.4"]
+    assert commands().count(["traceroute", "--help"]) == 1
+
+
 def test_execute_test_does_not_retry_other_option_errors(mocker, capsys):
     error_output = "traceroute: invalid option -- 'q'"
-    run = mocker.patch(
-        "subprocess.run",
-        side_effect=_help_then(
-            CompletedProcess(None, returncode=1, stdout="", stderr=error_output)
-        ),
+    commands = patch_traceroute(
+        mocker, CompletedProcess(None, returncode=1, stdout="", stderr=error_output)
     )
 
     assert TraceResult.execute_test("8.8.8.8") is None
-    assert run.call_count == 2
+    assert len(commands()) == 2
     captured = capsys.readouterr()
     assert captured.out == ""
     assert error_output in captured.err
 
 
-def test_execute_test_trace_timeout(mocker, capsys):
-    mocker.patch(
-        "subprocess.run",
-        side_effect=_help_then(TimeoutExpired("traceroute", 120)),
-    )
+def test_execute_test_trace_timeout(mocker):
+    patch_traceroute(mocker, TimeoutExpired("traceroute", 120))
 
+    # stream_command has already reported the timeout.
     assert TraceResult.execute_test("8.8.8.8") is None
-    captured = capsys.readouterr()
-    assert captured.out == ""
-    assert "timed out" in captured.err
 
 
 def test_execute_test_missing_binary(mocker, capsys):
     run = mocker.patch("subprocess.run", side_effect=FileNotFoundError)
+    stream = mocker.patch("internet_troubleshooter.trace_test.stream_command")
 
     x = TraceResult.execute_test("8.8.8.8")
     assert x is None
     # The probe already showed traceroute cannot run, so no trace is attempted
     # and the failure is only reported once.
     assert run.call_count == 1
+    assert not stream.called
     captured = capsys.readouterr()
     assert captured.out == ""
     assert "ERROR:" in captured.err
@@ -285,7 +351,9 @@ def test_run_test_skips_failed_hops(mocker):
     )
     mocker.patch(
         "internet_troubleshooter.trace_test.PingResult.run_test",
-        side_effect=[PingResult(ip="192.168.1.1", packet_loss=0.0), None],
+        side_effect=lambda ip, hop_count=None, per_packet=False, adaptive_loss=None: (
+            PingResult(ip=ip, packet_loss=0.0) if ip == "192.168.1.1" else None
+        ),
     )
 
     x = TraceResult.run_test("8.8.8.8")
@@ -312,18 +380,150 @@ def test_run_test_deduplicates_hop_ips(mocker):
     )
     ping = mocker.patch(
         "internet_troubleshooter.trace_test.PingResult.run_test",
-        side_effect=lambda ip, hop_count=None: PingResult(ip=ip, packet_loss=0.0),
+        side_effect=lambda ip, hop_count=None, per_packet=False, adaptive_loss=None: (
+            PingResult(ip=ip, packet_loss=0.0)
+        ),
     )
 
     x = TraceResult.run_test("8.8.8.8")
 
     assert [result.ip for result in x.ping_results] == ["192.168.1.1", "10.0.0.1"]
-    assert [call.args[0] for call in ping.call_args_list] == [
-        "192.168.1.1",
+    # Hops are pinged concurrently, so only which hops were pinged is fixed,
+    # not the order the pings started in.
+    assert sorted(call.args[0] for call in ping.call_args_list) == [
         "10.0.0.1",
+        "192.168.1.1",
     ]
 
 
+def test_run_test_pings_hops_concurrently_in_hop_order(mocker):
+    hop_ips = ["10.0.0.{}".format(hop) for hop in range(1, 5)]
+    trace_output = "\n".join(
+        " {}  {}  0.310 ms".format(number, hop_ip)
+        for number, hop_ip in enumerate(hop_ips, start=1)
+    )
+    mocker.patch(
+        "internet_troubleshooter.trace_test.TraceResult.execute_test",
+        return_value=trace_output,
+    )
+    # Every ping waits until all of them have started, which can only happen
+    # when the hops are pinged at the same time.
+    all_started = threading.Barrier(len(hop_ips), timeout=5)
+
+    def ping(ip, hop_count=None, per_packet=False, adaptive_loss=None):
+        all_started.wait()
+        # The earliest hops finish last, so the results come back out of order.
+        time.sleep(0.01 * (len(hop_ips) - hop_ips.index(ip)))
+        return PingResult(ip=ip, packet_loss=0.0)
+
+    mocker.patch(
+        "internet_troubleshooter.trace_test.PingResult.run_test", side_effect=ping
+    )
+
+    x = TraceResult.run_test("8.8.8.8", 10, parallelism=len(hop_ips))
+
+    assert [result.ip for result in x.ping_results] == hop_ips
+
+
+def test_run_test_pings_hops_while_traceroute_is_still_running(mocker):
+    first_hop_pinged = threading.Event()
+
+    def trace_lines():
+        yield " 1  192.168.1.1  0.310 ms\n"
+        # Hop 2 only shows up once hop 1 is being pinged, as it would when
+        # traceroute is waiting out a hop that never answers.
+        assert first_hop_pinged.wait(5)
+        yield " 2  * * *\n"
+        yield " 3  10.0.0.1  1.310 ms\n"
+
+    stream = FakeStream(CompletedProcess(None, returncode=0, stdout=""))
+    stream._lines = trace_lines()
+    mocker.patch(
+        "internet_troubleshooter.trace_test._traceroute_supports_numeric",
+        return_value=True,
+    )
+    mocker.patch(
+        "internet_troubleshooter.trace_test.stream_command", return_value=stream
+    )
+
+    def ping(ip, hop_count=None, per_packet=False, adaptive_loss=None):
+        if ip == "192.168.1.1":
+            first_hop_pinged.set()
+        return PingResult(ip=ip, packet_loss=0.0)
+
+    mocker.patch(
+        "internet_troubleshooter.trace_test.PingResult.run_test", side_effect=ping
+    )
+
+    x = TraceResult.run_test("8.8.8.8", 10)
+
+    assert [result.ip for result in x.ping_results] == ["192.168.1.1", "10.0.0.1"]
+
+
+def test_run_test_of_a_failed_trace_drops_the_hops_it_found(mocker, capsys):
+    patch_traceroute(
+        mocker,
+        CompletedProcess(
+            None, returncode=1, stdout=" 1  192.168.1.1  0.310 ms\n", stderr="boom"
+        ),
+    )
+    mocker.patch(
+        "internet_troubleshooter.trace_test.PingResult.run_test",
+        return_value=PingResult(ip="192.168.1.1", packet_loss=0.0),
+    )
+
+    assert TraceResult.run_test("8.8.8.8", 10) is None
+    assert "boom" in capsys.readouterr().err
+
+
+@pytest.mark.parametrize("parallelism, expected_peak", [(1, 1), (2, 2), (8, 3)])
+def test_ping_hops_bounds_the_pings_in_flight(mocker, parallelism, expected_peak):
+    lock = threading.Lock()
+    in_flight = [0]
+    peak = [0]
+
+    def ping(ip, hop_count=None, per_packet=False, adaptive_loss=None):
+        with lock:
+            in_flight[0] += 1
+            peak[0] = max(peak[0], in_flight[0])
+        time.sleep(0.02)
+        with lock:
+            in_flight[0] -= 1
+        return PingResult(ip=ip, packet_loss=0.0)
+
+    mocker.patch(
+        "internet_troubleshooter.trace_test.PingResult.run_test", side_effect=ping
+    )
+
+    hops = ["10.0.0.1", "10.0.0.2", "10.0.0.3"]
+    results = TraceResult.ping_hops(hops, 10, parallelism)
+
+    assert [result.ip for result in results] == hops
+    assert peak[0] <= expected_peak
+    if parallelism == 1:
+        assert peak[0] == 1
+
+
+def test_ping_hops_natively_pings_every_hop_at_once(mocker):
+    run_tests = mocker.patch(
+        "internet_troubleshooter.trace_test.PingResult.run_tests",
+        return_value=[PingResult(ip="10.0.0.1", packet_loss=0.0), None],
+    )
+
+    results = TraceResult.ping_hops(["10.0.0.1", "10.0.0.2"], 10, 8, native=True)
+
+    assert results == [PingResult(ip="10.0.0.1", packet_loss=0.0)]
+    assert run_tests.call_args.kwargs == {
+        "native": True,
+        "parallelism": 8,
+        "adaptive_loss": None,
+    }
+
+
+def test_ping_hops_without_hops():
+    assert TraceResult.ping_hops([], 10, 8) == []
+
+
 def test_hop_ips_preserves_first_seen_order():
     trace_output = "\n".join(
         [
@@ -453,11 +653,9 @@ def test_execute_test_error(mocker, capsys):
     test_output = """TEST STRING"""
     error_output = """ERROR STRING"""
 
-    mocker.patch(
-        "subprocess.run",
-        return_value=CompletedProcess(
-            None, returncode=1, stdout=test_output, stderr=error_output
-        ),
+    patch_traceroute(
+        mocker,
+        CompletedProcess(None, returncode=1, stdout=test_output, stderr=error_output),
     )
 
     x = TraceResult.execute_test("8.8.8.8")
@@ -466,3 +664,165 @@ def test_execute_test_error(mocker, capsys):
     assert captured.out == ""
     assert "ERROR:" in captured.err
     assert error_output in captured.err
+
+
+def test_trace_hops_natively(mocker):
+    mocker.patch(
+        "internet_troubleshooter.icmp.trace",
+        return_value=["192.168.1.1", None, "10.0.0.1", "10.0.0.1"],
+    )
+    traceroute = mocker.patch.object(TraceResult, "execute_test")
+
+    assert TraceResult.trace_hops("8.8.8.8", native=True) == [
+        "192.168.1.1",
+        "10.0.0.1",
+    ]
+    assert not traceroute.called
+
+
+def test_trace_hops_natively_falls_back_to_traceroute(mocker, capsys):
+    mocker.patch(
+        "internet_troubleshooter.icmp.trace",
+        side_effect=icmp.IcmpError("unable to open a raw ICMP socket"),
+    )
+    mocker.patch.object(
+        TraceResult, "execute_test", return_value=" 1  192.168.1.1  0.310 ms"
+    )
+
+    assert TraceResult.trace_hops("8.8.8.8", native=True) == ["192.168.1.1"]
+    assert "WARNING: Running traceroute instead" in capsys.readouterr().err
+
+
+def test_run_test_traces_natively_when_asked(mocker):
+    mocker.patch("internet_troubleshooter.icmp.trace", return_value=["10.0.0.1"])
+    mocker.patch.object(
+        PingResult,
+        "run_test",
+        side_effect=lambda ip, count=None, per_packet=False, adaptive_loss=None: (
+            PingResult(ip=ip, packet_loss=0.0)
+        ),
+    )
+
+    x = TraceResult.run_test("8.8.8.8", 5, native_trace=True)
+
+    assert x == TraceResult(ping_results=[PingResult(ip="10.0.0.1", packet_loss=0.0)])
+
+
+def hop_ping(ip, hop_count=None, per_packet=False, adaptive_loss=None):
+    return PingResult(ip=ip, packet_loss=0.0)
+
+
+def test_run_test_pings_the_cached_path_without_tracing(mocker, tmp_path):
+    cache = PathCache(tmp_path / "paths.json")
+    cache.put("8.8.8.8", ["192.168.1.1", "10.0.0.1"])
+    trace = mocker.patch.object(TraceResult, "execute_test")
+    mocker.patch.object(PingResult, "run_test", side_effect=hop_ping)
+
+    x = TraceResult.run_test("8.8.8.8", 5, path_cache=cache)
+
+    assert [result.ip for result in x.ping_results] == ["192.168.1.1", "10.0.0.1"]
+    assert not trace.called
+
+
+def test_run_test_caches_the_path_it_traced(mocker, tmp_path):
+    cache = PathCache(tmp_path / "paths.json")
+    patch_traceroute(
+        mocker,
+        CompletedProcess(
+            None,
+            returncode=0,
+            stdout=" 1  192.168.1.1  0.310 ms\n 2  * * *\n 3  8.8.8.8  9.310 ms\n",
+        ),
+    )
+    mocker.patch.object(PingResult, "run_test", side_effect=hop_ping)
+
+    TraceResult.run_test("8.8.8.8", 5, path_cache=cache)
+
+    assert cache.get("8.8.8.8") == ["192.168.1.1"]
+
+
+@pytest.mark.parametrize("silent_hop", ["192.168.1.1", "10.0.0.9"])
+def test_run_test_traces_again_when_the_cached_path_stops_answering(
+    mocker, tmp_path, silent_hop
+):
+    cache = PathCache(tmp_path / "paths.json")
+    cache.put("8.8.8.8", ["192.168.1.1", "10.0.0.1", "10.0.0.9"])
+    patch_traceroute(
+        mocker,
+        CompletedProcess(
+            None,
+            returncode=0,
+            stdout=(
+                " 1  192.168.1.1  0.310 ms\n"
+                " 2  10.0.0.2  1.310 ms\n"
+                " 3  8.8.8.8  9.310 ms\n"
+            ),
+        ),
+    )
+    mocker.patch.object(
+        PingResult,
+        "run_test",
+        side_effect=lambda ip, hop_count=None, per_packet=False, adaptive_loss=None: (
+            PingResult(ip=ip, packet_loss=100.0 if ip == silent_hop else 0.0)
+        ),
+    )
+
+    x = TraceResult.run_test("8.8.8.8", 5, path_cache=cache)
+
+    assert [result.ip for result in x.ping_results] == ["192.168.1.1", "10.0.0.2"]
+    assert cache.get("8.8.8.8") == ["192.168.1.1", "10.0.0.2"]
+
+
+@pytest.mark.parametrize(
+    "stdout",
+    [
+        "",
+        # Only the gateway answered, as in an outage upstream of it.
+        " 1  192.168.1.1  0.310 ms\n 2  * * *\n 3  * * *\n",
+    ],
+)
+def test_run_test_does_not_cache_a_path_short_of_the_target(mocker, tmp_path, stdout):
+    cache = PathCache(tmp_path / "paths.json")
+    patch_traceroute(mocker, CompletedProcess(None, returncode=0, stdout=stdout))
+    mocker.patch.object(PingResult, "run_test", side_effect=hop_ping)
+    mocker.patch("internet_troubleshooter.icmp.resolve", return_value="8.8.8.8")
+
+    TraceResult.run_test("8.8.8.8", 5, path_cache=cache)
+
+    assert cache.get("8.8.8.8") is None
+
+
+def test_run_test_caches_the_path_to_a_target_given_by_name(mocker, tmp_path):
+    cache = PathCache(tmp_path / "paths.json")
+    patch_traceroute(
+        mocker,
+        CompletedProcess(
+            None,
+            returncode=0,
+            stdout=" 1  192.168.1.1  0.310 ms\n 2  142.250.1.1  9.310 ms\n",
+        ),
+    )
+    mocker.patch.object(PingResult, "run_test", side_effect=hop_ping)
+    mocker.patch("internet_troubleshooter.icmp.resolve", return_value="142.250.1.1")
+
+    TraceResult.run_test("example.com", 5, path_cache=cache)
+
+    assert cache.get("example.com") == ["192.168.1.1", "142.250.1.1"]
+
+
+def test_run_test_keeps_the_cached_path_when_a_middle_hop_is_silent(mocker, tmp_path):
+    cache = PathCache(tmp_path / "paths.json")
+    cache.put("8.8.8.8", ["192.168.1.1", "10.0.0.1", "10.0.0.9"])
+    trace = mocker.patch.object(TraceResult, "execute_test")
+    mocker.patch.object(
+        PingResult,
+        "run_test",
+        side_effect=lambda ip, hop_count=None, per_packet=False, adaptive_loss=None: (
+            None if ip == "10.0.0.1" else PingResult(ip=ip, packet_loss=0.0)
+        ),
+    )
+
+    x = TraceResult.run_test("8.8.8.8", 5, path_cache=cache)
+
+    assert [result.ip for result in x.ping_results] == ["192.168.1.1", "10.0.0.9"]
+    assert not trace.called
@@ -0,0 +1,54 @@
+import base64
+import math
+import struct
+from datetime import datetime
+
+from internet_troubleshooter.typed_arrays import (
+    date_milliseconds,
+    date_offsets,
+    float32_array,
+    typed_array,
+)
+
+
+def unpacked(packed, format_character):
+    data = base64.b64decode(packed["bdata"])
+    count = len(data) // struct.calcsize(format_character)
+    return list(struct.unpack("<{}{}".format(count, format_character), data))
+
+
+def test_typed_array_is_little_endian_base64():
+    packed = typed_array("i", [1, -2])
+
+    assert packed == {
+        "dtype": "i4",
+        "bdata": base64.b64encode(struct.pack("<ii", 1, -2)).decode("ascii"),
+    }
+
+
+def test_float32_array_masks_missing_values_with_nan():
+    (first, missing, last) = unpacked(float32_array([1.5, None, 80.25]), "f")
+
+    assert (first, last) == (1.5, 80.25)
+    assert math.isnan(missing)
+
+
+def test_date_milliseconds_read_local_dates_as_utc():
+    packed = date_milliseconds([datetime(1970, 1, 2), datetime(2024, 1, 31, 18)])
+
+    assert packed["dtype"] == "f8"
+    assert unpacked(packed, "d") == [86_400_000.0, 1_706_724_000_000.0]
+
+
+def test_date_offsets_count_whole_seconds_from_the_first():
+    start, offsets = date_offsets(
+        [datetime(2024, 1, 31, 18), datetime(2024, 1, 31, 18, 5, 0, 600_000)]
+    )
+
+    assert start == 1_706_724_000_000.0
+    assert offsets["dtype"] == "i4"
+    assert unpacked(offsets, "i") == [0, 301]
+
+
+def test_date_offsets_of_nothing():
+    assert date_offsets([]) == (0.0, {"dtype": "i4", "bdata": ""})
@@ -12,6 +12,7 @@ from internet_troubleshooter.utils import (
     is_valid_host,
     run_command,
     safe_mean,
+    stream_command,
     summarize,
 )
 
@@ -87,6 +88,9 @@ def test_summarize():
     assert "Variance: 1.00" in x
     assert "Min: 1.00" in x
     assert "Max: 3.00" in x
+    assert "p50: 2.00" in x
+    assert "p95: 2.90" in x
+    assert "p99: 2.98" in x
 
 
 def test_summarize_error():
@@ -187,3 +191,58 @@ def test_run_command_os_error(mocker, capsys):
     assert captured.out == ""
     assert "ERROR:" in captured.err
     assert "denied" in captured.err
+
+
+def test_stream_command_returns_lines_as_they_are_written(capsys):
+    command = [
+        sys.executable,
+        "-c",
+        "import sys, time\n"
+        "print('first', flush=True)\n"
+        "time.sleep(0.2)\n"
+        "print('second', flush=True)\n"
+        "time.sleep(0.2)\n"
+        "print('third', flush=True)",
+    ]
+
+    lines = stream_command(command, timeout=10)
+    assert next(lines) == "first\n"
+    assert list(lines) == ["second\n", "third\n"]
+    assert capsys.readouterr().err == ""
+
+
+def test_stream_command_kills_a_command_that_runs_too_long(capsys):
+    command = [
+        sys.executable,
+        "-c",
+        "import time\nprint('started', flush=True)\ntime.sleep(30)",
+    ]
+
+    streamed = stream_command(command, timeout=0.5)
+    assert list(streamed) == ["started\n"]
+    assert streamed.returncode is None
+    captured = capsys.readouterr()
+    assert "ERROR:" in captured.err
+    assert "timed out" in captured.err
+
+
+def test_stream_command_reports_how_the_command_exited():
+    command = [
+        sys.executable,
+        "-c",
+        "import sys\nprint('out')\nprint('err', file=sys.stderr)\nsys.exit(3)",
+    ]
+
+    streamed = stream_command(command, timeout=10)
+    assert list(streamed) == ["out\n"]
+    assert streamed.returncode == 3
+    assert streamed.stderr == "err\n"
+
+
+def test_stream_command_missing_binary(mocker, capsys):
+    mocker.patch("subprocess.Popen", side_effect=FileNotFoundError)
+
+    assert stream_command(["mycommand"]) is None
+    captured = capsys.readouterr()
+    assert "ERROR:" in captured.err
+    assert "mycommand" in captured.err